@@ -0,0 +1,261 @@
+# benchmarks of the model stages with fixed scenarios: the default Hawaii and MORB melting columns of melting_crystallization2023.py,
+# olivine-only crystallization of the default Hawaii and MORB magmas (also with the kernels of kernels2023.py), one 'state' call, 'get_first_T' and the default ol-pl-cpx LLD for MORB,
+# isobaric melting of the default MORB source, adaptive-step polybaric melting (melting_adaptive2023.py) of the default Hawaii source,
+# 1000 draws of the partition-coefficient parameters for the default Hawaii scenario (uncertainty2023.py), batched polybaric and isobaric melting (melting_batch2023.py) of 100 columns, and batched olivine-only crystallization (olonly_batch2023.py) of 1, 100 and 10000 magmas.
+# For each stage: wall time (best and median of several runs), peak memory of the Python allocations (tracemalloc, in a separate run)
+# and counters (number of steps, number of 'state' calls and their iterations). Counters do not depend on the machine,
+# a changed counter means the results of the stage have changed.
+# Every run is appended to a JSON history file. Run with '--save-baseline' to save the results as the baseline,
+# later runs are compared with it and stages slower (or using more memory) than the baseline by more than '--tolerance' are flagged,
+# the exit status is 1 when a stage is flagged.
+# usage: python benchmark2023.py [--stages melting_Haw olonly_batch_100 ...] [--repeat 5] [--quick] [--save-baseline]
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import datetime
+import subprocess
+import tracemalloc
+from contextlib import contextmanager
+import wl1990models_2023
+from wl1990models_2023 import get_first_T, uaj, ta
+from wl1990stoich_2023 import oxideToComponent
+from wl1990kdcalc_2023 import kdCalc_langmuir1992
+from olonly_batch2023 import magma_columns, olonly_batch_steps
+from melting_batch2023 import melting_batch, melting_isoequ_batch
+from models2023 import melting_column, olonly_model, wl1990_model, scenarios, default_column
+from models2023 import default_olonly_inputs as setup_olonly, default_wl1990_inputs as setup_wl1990
+from uncertainty2023 import kd_monte_carlo
+
+here = os.path.dirname(os.path.abspath(__file__))
+history_file = os.path.join(here,'benchmark2023_history.json')
+baseline_file = os.path.join(here,'benchmark2023_baseline.json')
+
+## fixed scenarios: the default Hawaii and MORB scenarios of melting_crystallization2023.py ('scenarios' of models2023.py), the sizes of the batched stages
+batch_sizes = [1, 100, 10000]
+state_dT = 50  # the single 'state' call is made 50 Celsius below the liquidus of the MORB magma, where ol, plg and cpx crystallize
+
+# magmas for the batched stages: the accumulated melts of all rows of the Hawaii column, repeated up to n magmas,
+# each copy with its MgO, FeO, NiO and MnO changed by up to +-2% (fixed random seed)
+def batch_magmas(n):
+    F, magma = magma_columns(default_column('Haw'), itg='itg1')
+    idx = np.arange(n)%len(F)
+    rng = np.random.default_rng(2023)
+    out = {key:magma[key][idx].copy() for key in magma}
+    if n > 1:
+        for key in ['MgO','FeO','NiO','MnO']:
+            out[key] *= 1+rng.uniform(-0.02,0.02,n)
+    return out
+
+# melting columns for the batched melting stage: the Hawaii and MORB sources alternately, Po from 15 to 45 kbar
+def batch_columns(n):
+    settings = [['Haw','MORB'][i%2] for i in range(n)]
+    source_wt = {key:np.array([scenarios[s]['source_wt'][key] for s in settings]) for key in scenarios['Haw']['source_wt']}
+    source_phase = {key:np.array([scenarios[s]['source_phase'][key] for s in settings]) for key in scenarios['Haw']['source_phase']}
+    return (source_wt,source_phase,15+np.arange(n)%31)
+
+# count the 'state' calls and iterations made by wl1990models_2023 (get_first_T, frac_model_trange, eq_model_trange) inside the block
+@contextmanager
+def count_state():
+    counts = []
+    state = wl1990models_2023.state
+    def counted_state(*args, **kwargs):
+        out = state(*args, **kwargs)
+        counts.append(out[4])
+        return out
+    wl1990models_2023.state = counted_state
+    try:
+        yield counts
+    finally:
+        wl1990models_2023.state = state
+
+def state_counters(counts):
+    return {'state_calls':len(counts),'state_iterations':int(sum(counts)),'state_max_iterations':int(max(counts)) if counts else 0}
+
+## stages: setup (not timed) returns the arguments of run, run returns the counters
+def setup_melting(setting):
+    s = scenarios[setting]
+    return (s['source_wt'],s['source_phase'],s['Po'])
+
+def run_melting(source_wt, source_phase, Po, backend='python', melting_model='polybaric'):
+    return {'steps':len(melting_column(source_wt,source_phase,Po,melting_model,backend=backend))}
+
+def run_olonly(magma, Fe2Fet, Po, T_range, backend='python'):
+    return {'steps':len(olonly_model(magma,Fe2Fet,Po,0.001,T_range,'fractional',backend=backend))}
+
+def run_get_first_T(magma, Fe2Fet, T_range):
+    with count_state() as counts:
+        get_first_T(oxideToComponent(magma), P=1., kdCalc=kdCalc_langmuir1992)
+    return state_counters(counts)
+
+def setup_state():
+    magma, Fe2Fet, T_range = setup_wl1990()
+    components = oxideToComponent(magma)
+    return (components, get_first_T(components, P=1., kdCalc=kdCalc_langmuir1992)-state_dT)
+
+def run_state(components, T):
+    with count_state() as counts:
+        wl1990models_2023.state(components, T, uaj, ta, P=1., kdCalc=kdCalc_langmuir1992)
+    return state_counters(counts)
+
+def run_wl1990(magma, Fe2Fet, T_range, solver='newton'):
+    with count_state() as counts:
+        n = len(wl1990_model(magma,Fe2Fet,T_range,solver=solver))
+    out = {'steps':n}
+    out.update(state_counters(counts))
+    return out
+
+def run_melting_batch(source_wt, source_phase, Po):
+    melt = melting_batch(source_wt,source_phase,Po)
+    return {'steps':int(melt['steps'].sum()),'columns':len(Po)}
+
+def run_melting_isoequ_batch(source_wt, source_phase, Po):
+    melt = melting_isoequ_batch(source_wt,source_phase,Po)
+    return {'steps':int(melt['steps'].sum()),'columns':len(Po)}
+
+# only the last step is kept, so that the memory measured is the memory used by the crystallization, not by its output
+def run_olonly_batch(magma, T_range):
+    n = 0
+    for step in olonly_batch_steps(magma, P=0.001, T_range=T_range, xtalization_model='fractional'):
+        n += 1
+    return {'steps':n,'magmas':len(step['T Celsius']),'finite_at_end':int(np.isfinite(step['Fo']).sum())}
+
+def setup_uncertainty(setting, n):
+    s = scenarios[setting]
+    return (s['source_wt'],s['source_phase'],s['Po'],s['F_target'],s['itg'],s['T_range'],n)
+
+def run_uncertainty(source_wt, source_phase, Po, F_target, itg, T_range, n):
+    out = kd_monte_carlo(source_wt,source_phase,Po,F_target,n=n,seed=0,itg=itg,T_range=T_range)
+    return {'draws':n,'Fo_bins':int((out['olonly_CLD']['olppm_Ni_n'] > 0).sum())}
+
+stages = {
+    'melting_Haw': (lambda: setup_melting('Haw'), run_melting),
+    'melting_MORB': (lambda: setup_melting('MORB'), run_melting),
+    'olonly_Haw': (lambda: setup_olonly('Haw'), run_olonly),
+    'olonly_MORB': (lambda: setup_olonly('MORB'), run_olonly),
+    'melting_Haw_kernel': (lambda: setup_melting('Haw')+('kernel',), run_melting),
+    'olonly_Haw_kernel': (lambda: setup_olonly('Haw')+('kernel',), run_olonly),
+    'melting_batch_100': (lambda: batch_columns(100), run_melting_batch),
+    'melting_MORB_isobaric': (lambda: setup_melting('MORB')+('python','isobaric'), run_melting),
+    'melting_isobaric_batch_100': (lambda: batch_columns(100), run_melting_isoequ_batch),
+    'melting_Haw_adaptive': (lambda: setup_melting('Haw')+('python','adaptive'), run_melting),
+    'uncertainty_Haw_1000': (lambda: setup_uncertainty('Haw',1000), run_uncertainty),
+    'state_MORB': (setup_state, run_state),
+    'get_first_T_MORB': (setup_wl1990, run_get_first_T),
+    'wl1990_LLD_MORB': (setup_wl1990, run_wl1990),
+    'wl1990_LLD_MORB_robust': (lambda: setup_wl1990()+('robust',), run_wl1990),
+    }
+for n in batch_sizes:
+    stages['olonly_batch_'+str(n)] = ((lambda n=n: (batch_magmas(n),scenarios['Haw']['T_range'])), run_olonly_batch)
+
+# run one stage: a first run to load the modules imported on first use (e.g., sympy), one run under tracemalloc for the peak memory
+# and the counters, then 'repeat' timed runs
+def run_stage(name, repeat=5):
+    setup, run = stages[name]
+    args = setup()
+    run(*args)
+    tracemalloc.start()
+    try:
+        counters = run(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    times = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        run(*args)
+        times.append(time.perf_counter()-t0)
+    return {'time_s':min(times),'time_median_s':float(np.median(times)),'repeat':repeat,'peak_MiB':peak/2**20,'counters':counters}
+
+def git_commit():
+    try:
+        return subprocess.run(['git','rev-parse','--short','HEAD'],cwd=here,capture_output=True,text=True,timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def machine():
+    return {'node':platform.node(),'processor':platform.processor() or platform.machine(),'cpus':os.cpu_count(),
+            'python':platform.python_version(),'numpy':np.__version__}
+
+# compare the results with the baseline, returns a list of (stage, message)
+# a time is flagged when it is more than 'tolerance' (fraction) and more than 'min_time' seconds slower than the baseline
+def compare(results, baseline, tolerance=0.25, min_time=0.002):
+    flags = []
+    for name, res in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        if res['time_s'] > base['time_s']*(1+tolerance) and res['time_s']-base['time_s'] > min_time:
+            flags.append((name,'time %.4f s, baseline %.4f s (+%.0f%%)' % (res['time_s'],base['time_s'],100*(res['time_s']/base['time_s']-1))))
+        if res['peak_MiB'] > base['peak_MiB']*(1+tolerance) and res['peak_MiB']-base['peak_MiB'] > 0.1:
+            flags.append((name,'peak memory %.2f MiB, baseline %.2f MiB' % (res['peak_MiB'],base['peak_MiB'])))
+        for key, value in res['counters'].items():
+            if base['counters'].get(key) != value:
+                flags.append((name,'%s %s, baseline %s' % (key,value,base['counters'].get(key))))
+    return flags
+
+def read_json(path, default):
+    if not os.path.isfile(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+def write_json(path, data):
+    tmp = path+'.tmp'
+    with open(tmp,'w') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='benchmarks of the melting and crystallization stages')
+    parser.add_argument('--stages', nargs='+', choices=list(stages), default=None, help='stages to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timed runs per stage')
+    parser.add_argument('--quick', action='store_true', help='skip the 10000-magma batch')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown against the baseline, as a fraction')
+    parser.add_argument('--history', default=history_file)
+    parser.add_argument('--baseline', default=baseline_file)
+    parser.add_argument('--save-baseline', action='store_true', help='save the results as the new baseline')
+    args = parser.parse_args(argv)
+    names = list(stages) if args.stages is None else args.stages
+    if args.quick:
+        names = [name for name in names if name != 'olonly_batch_10000']
+
+    results = {}
+    print('%-20s %10s %10s %10s  %s' % ('stage','best s','median s','peak MiB','counters'))
+    for name in names:
+        results[name] = run_stage(name, args.repeat)
+        res = results[name]
+        print('%-20s %10.4f %10.4f %10.2f  %s' % (name,res['time_s'],res['time_median_s'],res['peak_MiB'],
+                                                 ' '.join(key+'='+str(value) for key, value in res['counters'].items())))
+
+    baseline = read_json(args.baseline, None)
+    flags = []
+    if baseline is not None:
+        if baseline['machine'] != machine():
+            print('note: the baseline was measured on another machine or with other versions:', baseline['machine'])
+        flags = compare(results, baseline['stages'], args.tolerance)
+        for name, message in flags:
+            print('REGRESSION', name+':', message)
+        if not flags:
+            print('no regression against the baseline of', baseline['date'])
+
+    run = {'date':datetime.datetime.now().isoformat(timespec='seconds'),'commit':git_commit(),'machine':machine(),
+           'stages':results,'regressions':[name+': '+message for name, message in flags]}
+    history = read_json(args.history, [])
+    history.append(run)
+    write_json(args.history, history)
+    if args.save_baseline:
+        if baseline is not None:  # stages not run now keep their previous baseline
+            run['stages'] = dict(baseline['stages'], **results)
+        write_json(args.baseline, run)
+        print('baseline saved in', args.baseline)
+    return 1 if flags else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+# constant tables shared by the melting and crystallization functions, defined once here and imported by the other modules
+# the tables are read-only (types.MappingProxyType), so a model run cannot change them for another run,
+# e.g., when several runs are done at the same time in a thread pool; use dict(table) to get a modifiable copy
+# also the default mantle sources and parameters of melting_crystallization2023.py, used by the driver and the default scenarios ('scenarios' of models2023.py)
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+from types import MappingProxyType
+
+# read-only view of a dictionary, nested dictionaries included
+def frozen(table):
+    return MappingProxyType({key:frozen(value) if isinstance(value, dict) else value for key, value in table.items()})
+
+## mantle melting (melting_function2023.py) and olivine-only crystallization (olonly_function2023.py)
+cm_mass = frozen({'SiO2':60.083, 'TiO2':79.865, 'Al2O3':50.98, 'FeO':71.844,'CaO':56.077,
+                  'MgO':40.304,'MnO':70.937,'K2O':47.098,
+                  'Na2O':30.99, 'P2O5':70.972,'Cr2O3':75.99,'NiO':74.69})  # relative molecular mass, e.g., SiO2, MgO, NaO1.5
+cm_mass_olonly = frozen({element:cm_mass[element] for element in ['MgO','FeO','SiO2','Na2O','K2O']})  # oxides of the magma used by olivine-only crystallization ('cm_mass' in olonly_function2023.py)
+molar_tot = 1.65  # sum of relative molecular mass, e.g., Na2O, SiO2, MgO, to calculate molar mass of SiO2, K2O and Na2O, estimated from melt compositions of Walter 1998 and Baker and Stolper 1994
+cm_tot = 1.833  # sum of relative cation mole mass, e.g., NaO0.5, SiO2, MgO, to converse between cation mole and wt%, estimated from melt compositions of Walter 1998 and Baker and Stolper 1994
+# partition-coefficient parameters of the batch functions (melting_batch2023.py, olonly_batch2023.py), the point values of the equations of melting_function2023.py and olonly_function2023.py,
+# each can be replaced by an array of values, one per melting column or magma (e.g., the draws of uncertainty2023.py)
+kd_default = frozen({'kdNi_A':4272., 'kdNi_B':0.01582, 'kdNi_C':-2.7622,  # KdNi(ol/l) = exp(A/T+B*SiO2+C)*KdMg(ol/l)*1.09, fitted by MPN+Hzb dataset (Eqn. 3 in the paper)
+                     'kdNi_opxol':0.4, 'kdNi_cpxol':0.24, 'kdNi_gtol':0.12, 'kdNi_spol':1.,  # KdNi(mineral/ol), Sobolev et al. (2005) Table S1, Righter et al. (2006) and Li et al. (2008) for spinel
+                     'KDMnFe':0.79,  # KDMnFe(ol/l) from Davis et al. (2013)
+                     'kdMn_opxl_highP':0.640, 'kdMn_opxl_lowP':0.7, 'kdMn_cpxl_highP':0.768, 'kdMn_cpxl_lowP':0.85, 'kdMn_gtl':1.241, 'kdMn_spl':0.46,  # KdMn(mineral/l), Le Roux et al. (2011), Po >= 30 (highP) and < 30 kbar (lowP)
+                     'Toplis_H':-6766., 'Toplis_S':-7.34, 'Toplis_W':3000.})  # KDFeMg(ol/l) of Toplis 2005: exp(H/RT+S/R+ln(0.036*SiO2_adjust-0.22)+W*(1-2*XFo)/RT+...)
+
+## ol-pl-cpx crystallization (wl1990stoich_2023.py, wl1990models_2023.py)
+mass = frozen({'Si':28.0855, 'Ti':47.867, 'Al':26.9815, 'Fe':55.845, 'Mg':24.305,
+               'Ca':40.078, 'Na':22.98977,'O':15.999,'K':39.0987, 'P':30.973, 'Mn':54.938, 'Ni': 58.6934})  # atomic mass
+# default values used to calculate the phase proportions in 'state' (wl1990state_2023.py)
+ta = frozen({'cpx':1., 'plg':1., 'ol':2./3.})
+uaj_plg = frozen({'CaAl2O4':5./3., 'NaAlO2':2.5, 'MgO':0., 'FeO':0., 'CaSiO3':0., 'TiO2':0., 'KAlO2':0., 'PO52':0., 'MnO':0.,'NiO':0.}) # CaAl2Si2O8, NaAlSi3O8
+uaj_ol = frozen({'CaAl2O4':0., 'NaAlO2':0., 'MgO':1, 'FeO':1, 'CaSiO3':0., 'TiO2':0., 'KAlO2':0., 'PO52':0., 'MnO':1., 'NiO':1.}) # (Mg,Fe,Ni,Mn)2SiO4
+uaj_cpx = frozen({'CaAl2O4':4./3., 'NaAlO2':2., 'MgO':2., 'FeO':2., 'CaSiO3':1., 'TiO2':1., 'KAlO2':0., 'PO52':0., 'MnO':2., 'NiO':2.}) # CaAl2SiO6, NaAlSi2O6, MgSiO3, FeSiO3, CaSiO3, MnSiO3, NiSiO3, CaTiO3
+uaj = MappingProxyType({'ol':uaj_ol, 'plg':uaj_plg, 'cpx':uaj_cpx})
+
+## default mantle sources and parameters of melting_crystallization2023.py (see the driver for the other sources)
+# source compositions in wt%, modes in percent
+source_wt_IonovMgO385 = frozen({'SiO2':45.27, 'TiO2':0.158, 'Al2O3':4.03, 'FeO':7.872,'CaO':3.36,'MgO':38.5,'MnO':0.1362,'K2O':0.013,'Na2O':0.306, 'P2O5':0.013,'Cr2O3':0.38,'NiO':0.252})  # Ionov peridotite when MgO=38.5
+source_phase_IonovMgO385 = frozen({'ol':55,'opx':7.5,'cpx':28,'gt':9.5,'sp':0})   # modifed after phase mode calculated by Walter 1998 run 40.2 minerals
+source_phase_IonovMgO385_lowP = frozen({'ol':56.5,'opx':27.5,'cpx':14,'gt':0,'sp':2})   # phase mode for Ionov pe MgO38.5 calculated using minerals from Workman and Hart 2005 mantle minerals
+eclope_fraction = 0.03  # fraction of eclogite melt in 'source_wt_IonovMgO385_eclope'
+source_wt_IonovMgO385_eclope = frozen({'SiO2':45.6, 'TiO2':0.3, 'Al2O3':4.37, 'FeO':7.87,'CaO':3.5,'MgO':37.4,'MnO':0.135,'K2O':0.021,'Na2O':0.415, 'P2O5':0.028,'Cr2O3':0.37,'NiO':0.245})  # mix 3% eclogite melt (run A177-82 from Pertermann and Hirschmann 2003) with 97% peridotite (MgO 38.5 wt%)
+source_phase_IonovMgO385_eclope = frozen({'ol':53.2,'opx':10.5,'cpx':27.1,'gt':9.2,'sp':0})  # add 3% eclogite melt to a modifed mineral mode for MgO 38.5 peridotite which is 55ol+7.5opx+28cpx+9.5grt (adding solidus eclogite melt will first increase opx in peridotite, Yaxley and Green 1998)
+Fe2Fet_Haw = 0.85  # assume ferrous/total Fe = 0.85 for Hawaiian basalts (Rhodes and Vollinger 2005, Brounce et al. 2017, Berry et al. 2018, Zhang et al. 2018, Brounce et al. 2022)
+Fe2Fet_MORB = 0.9  # assume ferrous/total Fe = 0.9 for Hawaiian basalts (Rhodes and Vollinger 2005, Brounce et al. 2017, Berry et al. 2018, Zhang et al. 2018, Brounce et al. 2022)
+Po_high = 45  # kbar, starting pressure of polybaric melting modeled for Hawaii
+Po_low = 20  # kbar, starting pressure of polybaric melting modeled for MORB
+F_target_Haw = 0.06  # fraction, extent of melting modeled for Hawaii
+F_target_MORB = 0.10  # fraction, extent of melting modeled for MORB
@@ -0,0 +1,266 @@
+# dual numbers over numpy arrays for forward-mode derivatives of the batched engines
+# a Dual carries the values (any shape) and their derivatives with respect to p inputs, an array (values shape + (p,));
+# numpy functions dispatch to it (__array_ufunc__ and __array_function__), so the engine code runs unchanged on Duals:
+# melting_batch2023.py, reactions2023.py, olonly_batch2023.py, inversion2023.py and misfit2023.py only allocate their arrays
+# with 'like=' and convert their inputs with 'asfloat', which keep plain arrays as before (no change of the results or the speed)
+# comparisons, isfinite and argsort use the values only, so every branch (reaction rules, exhausted phases, Newton convergence)
+# is taken as for the values and the derivatives are those of the branch taken; np.where mixes the derivatives of the branches
+# the Newton iterations (olivine FeO of 'KDFeMg', the liquidus of 'firstT_olonly_batch') iterate the derivatives too, they converge with the values
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+
+# values and derivatives (shape of the values + (p,)); dx None: derivatives 0 with respect to p inputs
+class Dual:
+    __array_priority__ = 100
+    __hash__ = None
+
+    def __init__(self, value, dx=None, p=None):
+        self.value = np.asarray(value, dtype=float)
+        self.dx = np.zeros(self.value.shape+(p,)) if dx is None else np.asarray(dx, dtype=float)
+
+    @property
+    def p(self):
+        return self.dx.shape[-1]
+
+    @property
+    def shape(self):
+        return self.value.shape
+
+    @property
+    def ndim(self):
+        return self.value.ndim
+
+    @property
+    def size(self):
+        return self.value.size
+
+    @property
+    def T(self):
+        return Dual(self.value.T, np.moveaxis(self.dx, -1, 0).T.copy())
+
+    def __len__(self):
+        return len(self.value)
+
+    def __iter__(self):
+        for k in range(len(self.value)):
+            yield self[k]
+
+    def __repr__(self):
+        return 'Dual(%r, dx shape %s)' % (self.value, self.dx.shape)
+
+    # a Dual cannot become a float array, the derivatives would be lost silently
+    def __array__(self, dtype=None):
+        raise TypeError('a Dual cannot be converted to a float array, allocate the array with like=')
+
+    def _dx_index(self, index):
+        return (index if isinstance(index, tuple) else (index,))+(slice(None),)
+
+    def __getitem__(self, index):
+        index = _value(index)
+        return Dual(self.value[index], self.dx[self._dx_index(index)])
+
+    def __setitem__(self, index, other):
+        index = _value(index)
+        self.value[index] = _value(other)
+        self.dx[self._dx_index(index)] = other.dx if isinstance(other, Dual) else 0.
+
+    def copy(self):
+        return Dual(self.value.copy(), self.dx.copy())
+
+    def astype(self, dtype):
+        return self.value.astype(dtype)
+
+    def reshape(self, *shape):
+        value = self.value.reshape(*shape)
+        return Dual(value, self.dx.reshape(value.shape+(self.p,)))
+
+    def sum(self, axis=None, keepdims=False):
+        if axis is None:
+            return Dual(self.value.sum(), self.dx.reshape(-1, self.p).sum(axis=0))
+        axis = _axis(axis, self.ndim)
+        return Dual(self.value.sum(axis=axis, keepdims=keepdims), self.dx.sum(axis=axis, keepdims=keepdims))
+
+    def __add__(self, other): return np.add(self, other)
+    def __radd__(self, other): return np.add(other, self)
+    def __sub__(self, other): return np.subtract(self, other)
+    def __rsub__(self, other): return np.subtract(other, self)
+    def __mul__(self, other): return np.multiply(self, other)
+    def __rmul__(self, other): return np.multiply(other, self)
+    def __truediv__(self, other): return np.true_divide(self, other)
+    def __rtruediv__(self, other): return np.true_divide(other, self)
+    def __pow__(self, other): return np.power(self, other)
+    def __rpow__(self, other): return np.power(other, self)
+    def __neg__(self): return np.negative(self)
+    def __pos__(self): return self.copy()
+    def __abs__(self): return np.absolute(self)
+    def __lt__(self, other): return np.less(self, other)
+    def __le__(self, other): return np.less_equal(self, other)
+    def __gt__(self, other): return np.greater(self, other)
+    def __ge__(self, other): return np.greater_equal(self, other)
+    def __eq__(self, other): return np.equal(self, other)
+    def __ne__(self, other): return np.not_equal(self, other)
+
+    # the engines call numpy under np.errstate, the derivatives are calculated under the same state (no errstate per call, it is slow)
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != '__call__' or 'out' in kwargs:
+            return NotImplemented
+        if ufunc in _value_ufuncs:
+            return ufunc(*[x.value if isinstance(x, Dual) else x for x in inputs], **kwargs)
+        if ufunc not in _rules:
+            return NotImplemented
+        values = [x.value if isinstance(x, Dual) else x for x in inputs]
+        value = ufunc(*values, **kwargs)
+        dx = None
+        for k, x in enumerate(inputs):
+            if isinstance(x, Dual):
+                term = _rules[ufunc](k, value, *values)
+                term = x.dx if term is None else np.asarray(term)[...,None]*x.dx
+                dx = term if dx is None else dx+term
+        if dx.shape[:-1] != np.shape(value) or any(dx is x.dx for x in inputs if isinstance(x, Dual)):
+            dx = np.broadcast_to(dx, np.shape(value)+dx.shape[-1:]).copy()
+        return Dual(value, dx)
+
+    # allocations with like=self (np.full, np.zeros, ...) are Duals with the p derivatives of self
+    def __array_function__(self, func, types, args, kwargs):
+        if func in _allocations:
+            return _allocations[func](self.p, *args, **kwargs)
+        if func not in _functions:
+            return NotImplemented
+        return _functions[func](*args, **kwargs)
+
+def _value(x):
+    if isinstance(x, Dual):
+        return x.value
+    if isinstance(x, tuple):
+        return tuple(_value(item) for item in x)
+    return x
+
+def _p(items):
+    for x in items:
+        if isinstance(x, Dual):
+            return x.p
+    raise ValueError('no Dual among the arguments')
+
+def _axis(axis, ndim):
+    return axis+ndim if axis < 0 else axis
+
+# x as a Dual with p derivatives (0 for numbers and arrays)
+def _dual(x, p):
+    return x if isinstance(x, Dual) else Dual(x, p=p)
+
+# derivative of a ufunc with respect to its input k, from its value and the values of the inputs
+# None: the derivative is 1 (the derivatives of the input are copied)
+_rules = {
+    np.add:lambda k, v, a, b:None,
+    np.subtract:lambda k, v, a, b:None if k == 0 else -1.,
+    np.multiply:lambda k, v, a, b:b if k == 0 else a,
+    np.true_divide:lambda k, v, a, b:1/b if k == 0 else -v/b,
+    np.power:lambda k, v, a, b:b*np.power(a, b-1.) if k == 0 else v*np.log(np.where(np.asarray(a) > 0, a, 1.)),
+    np.negative:lambda k, v, a:-1.,
+    np.exp:lambda k, v, a:v,
+    np.log:lambda k, v, a:1/a,
+    np.sqrt:lambda k, v, a:0.5/v,
+    np.absolute:lambda k, v, a:np.sign(a),
+    np.maximum:lambda k, v, a, b:np.asarray(a >= b if k == 0 else a < b, dtype=float),
+    np.minimum:lambda k, v, a, b:np.asarray(a <= b if k == 0 else a > b, dtype=float)}
+# ufuncs of the values only (no derivatives): comparisons, tests and logical operations
+_value_ufuncs = {np.less, np.less_equal, np.greater, np.greater_equal, np.equal, np.not_equal, np.isfinite, np.isnan, np.isinf,
+                 np.sign, np.floor, np.ceil, np.logical_and, np.logical_or, np.logical_not}
+
+def _where(condition, x, y):
+    if not isinstance(x, Dual) and not isinstance(y, Dual):
+        return np.where(_value(condition), x, y)
+    p = _p((x, y))
+    x, y = _dual(x, p), _dual(y, p)
+    condition = np.asarray(_value(condition))
+    return Dual(np.where(condition, x.value, y.value), np.where(condition[...,None], x.dx, y.dx))
+
+def _broadcast_to(x, shape):
+    shape = tuple(np.atleast_1d(shape))
+    return Dual(np.broadcast_to(x.value, shape).copy(), np.broadcast_to(x.dx, shape+(x.p,)).copy())
+
+def _broadcast_arrays(*args):
+    p = _p(args)
+    shape = np.broadcast_shapes(*[np.shape(_value(x)) for x in args])
+    return [_broadcast_to(_dual(x, p), shape) for x in args]
+
+def _atleast_1d(*args):
+    out = [x if np.ndim(_value(x)) >= 1 else x.reshape(1) if isinstance(x, Dual) else np.atleast_1d(x) for x in args]
+    return out[0] if len(out) == 1 else out
+
+def _atleast_2d(*args):
+    out = []
+    for x in args:
+        if isinstance(x, Dual) and x.ndim < 2:
+            x = x.reshape(1, -1)
+        out.append(x if isinstance(x, Dual) else np.atleast_2d(x))
+    return out[0] if len(out) == 1 else out
+
+def _concatenate(arrays, axis=0):
+    p = _p(arrays)
+    arrays = [_dual(x, p) for x in arrays]
+    axis = _axis(axis, arrays[0].ndim)
+    return Dual(np.concatenate([x.value for x in arrays], axis=axis), np.concatenate([x.dx for x in arrays], axis=axis))
+
+def _stack(arrays, axis=0):
+    p = _p(arrays)
+    arrays = [_dual(x, p) for x in arrays]
+    axis = _axis(axis, arrays[0].ndim+1)
+    return Dual(np.stack([x.value for x in arrays], axis=axis), np.stack([x.dx for x in arrays], axis=axis))
+
+def _column_stack(arrays):
+    p = _p(arrays)
+    return _concatenate([_dual(x, p).reshape(-1, 1) if np.ndim(_value(x)) < 2 else x for x in arrays], axis=1)
+
+def _cumsum(x, axis=None):
+    if axis is None:
+        x, axis = x.reshape(-1), 0
+    axis = _axis(axis, x.ndim)
+    return Dual(np.cumsum(x.value, axis=axis), np.cumsum(x.dx, axis=axis))
+
+# np.interp with Dual x, xp or fp (1-D xp increasing), linear between the points of xp, fp[0] and fp[-1] outside
+def _interp(x, xp, fp):
+    x_value, xp_value = np.asarray(_value(x), dtype=float), np.asarray(_value(xp), dtype=float)
+    k = np.clip(np.searchsorted(xp_value, x_value, side='right')-1, 0, len(xp_value)-2)
+    x = np.clip(x, xp[0], xp[-1]) if isinstance(x, Dual) else np.clip(x_value, xp_value[0], xp_value[-1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        dxp = xp[k+1]-xp[k]
+        w = np.where(_value(dxp) != 0, (x-xp[k])/dxp, 0.)
+    return fp[k]+w*(fp[k+1]-fp[k])
+
+# np.clip for Dual limits: the derivative of the limit where x is outside
+def _clip(x, lower, upper):
+    return np.minimum(np.maximum(x, lower), upper)
+
+def _full(p, shape, fill_value, dtype=None, order='C'):
+    return _broadcast_to(fill_value, shape) if isinstance(fill_value, Dual) else Dual(np.full(shape, fill_value), p=p)
+
+_allocations = {np.full:_full, np.zeros:lambda p, shape, dtype=None, order='C':Dual(np.zeros(shape), p=p),
+                np.ones:lambda p, shape, dtype=None, order='C':Dual(np.ones(shape), p=p),
+                np.empty:lambda p, shape, dtype=None, order='C':Dual(np.zeros(shape), p=p)}
+
+_functions = {np.where:_where, np.broadcast_to:_broadcast_to, np.broadcast_arrays:_broadcast_arrays,
+              np.atleast_1d:_atleast_1d, np.atleast_2d:_atleast_2d, np.concatenate:_concatenate, np.stack:_stack,
+              np.column_stack:_column_stack, np.cumsum:_cumsum, np.interp:_interp, np.clip:_clip,
+              np.shape:lambda x:x.shape, np.ndim:lambda x:x.ndim, np.copy:lambda x, **kwargs:x.copy(),
+              np.sum:lambda x, axis=None, keepdims=False:x.sum(axis=axis, keepdims=keepdims),
+              np.argsort:lambda x, axis=-1, kind=None:np.argsort(x.value, axis=axis, kind=kind),
+              np.all:lambda x, axis=None:np.all(x.value, axis=axis), np.any:lambda x, axis=None:np.any(x.value, axis=axis)}
+
+# inputs of the engines as float arrays, Duals kept as they are
+def asfloat(x):
+    return x if isinstance(x, Dual) else np.asarray(x, dtype=float)
+
+# independent variables: the values X (m, p) with the derivatives of every row with respect to its own p values (identity)
+def variables(X):
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+    return Dual(X, np.broadcast_to(np.eye(X.shape[1]), X.shape+(X.shape[1],)).copy())
+
+# values and derivatives (shape + (p,)) of an engine output, derivatives 0 (or None without p) for plain arrays
+def split(x, p=None):
+    if isinstance(x, Dual):
+        return x.value, x.dx
+    x = np.asarray(x, dtype=float)
+    return x, None if p is None else np.zeros(x.shape+(p,))
@@ -0,0 +1,187 @@
+# draw the six figures of melting_crystallization2023.py without a screen (Agg), for one scenario or for many scenarios in parallel
+# the natural data of a figure are drawn once (a 'template') and kept by each process, only the modeled curves of each scenario are added on top.
+# PNG: the rendered template is kept as an image and the curves (then the legend) are drawn over a copy of it.
+# PDF: the curves are added to the template figure and removed after saving, the natural data are rasterized to keep the files small.
+# A scenario is a dictionary with a 'name' and the model results:
+# 'olonly_Haw' (e.g., olonly_xtalization), 'olonly_MORB' (e.g., olonly_xtalization_lowP) and 'wl1990_MORB' (e.g., LLD_df), each a dataframe or a dictionary of arrays,
+# and optionally the percentile bands of uncertainty2023.py, drawn as shaded envelopes between the lowest and highest percentiles:
+# 'band_Haw_CLD', 'band_MORB_CLD' (e.g., uncertainty_Haw['olonly_CLD']) and 'band_Haw_LLD' (e.g., uncertainty_Haw['olonly_LLD']).
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import os
+from olivine_glass_data2023 import load_figure_data
+
+# color parameters, same as in melting_crystallization2023.py
+color_Haw = 'navajowhite'
+color_MORB = 'skyblue'
+area = np.pi*2**2
+color_mdlHaw = 'blue'
+color_mdlMORB = 'red'
+
+# natural data, axes and legend of each figure
+# 'data': (x column, y column, size, color, label) of each dataset, 'models': (scenario key, x column, y column, color, label) of each modeled curve,
+# 'bands': (scenario key, x column, y name, color) of each envelope, between the columns y_p<lowest> and y_p<highest percentile>
+figure_styles = {
+    'CLD_Ni_Fo': {'data':[('Fo_HawOL','Nippm_HawOL',area*0.8,color_Haw,'Hawaiian olivine'),('Fo_MORBOL','Nippm_MORBOL',area*0.8,color_MORB,'MORB olivine')],
+                  'models':[('olonly_Haw','Fo','olppm_Ni',color_mdlHaw,'fractional crystallization CLD for Hawaiian olivine'),
+                            ('olonly_MORB','Fo','olppm_Ni',color_mdlMORB,'fractional crystallization CLD for MORB olivine')],
+                  'bands':[('band_Haw_CLD','Fo','olppm_Ni',color_mdlHaw),('band_MORB_CLD','Fo','olppm_Ni',color_mdlMORB)],
+                  'xlabel':'Fo mol%','ylabel':'Ni ppm','fontsize':12,'labelsize':11,'xlim':(81,92),'ylim':(1000,5000),'legend':{'loc':'upper left'}},
+    'CLD_Mn_Fo': {'data':[('Fo_HawOL','Mnppm_HawOL',area*0.8,color_Haw,'Hawaiian olivine'),('Fo_MORBOL','Mnppm_MORBOL',area*0.8,color_MORB,'MORB olivine')],
+                  'models':[('olonly_Haw','Fo','olppm_Mn',color_mdlHaw,'fractional crystallization CLD for Hawaiian olivine'),
+                            ('olonly_MORB','Fo','olppm_Mn',color_mdlMORB,'fractional crystallization CLD for MORB olivine')],
+                  'bands':[('band_Haw_CLD','Fo','olppm_Mn',color_mdlHaw),('band_MORB_CLD','Fo','olppm_Mn',color_mdlMORB)],
+                  'xlabel':'Fo mol%','ylabel':'Mn ppm','fontsize':14,'labelsize':12,'xlim':(81,92),'ylim':(800,2400),'legend':{'loc':'lower left','facecolor':'none'}},
+    'LLD_Ni_MgO': {'data':[('MgO_100_Haw','Ni_Haw',area,color_Haw,'Hawaiian lava'),('MgO_MORB','Ni_MORB',area,color_MORB,'MORB')],
+                   'models':[('olonly_Haw','clwt_MgO','clppm_Ni',color_mdlHaw,'fractional crystallization LLD for Hawaiian basalts'),
+                             ('wl1990_MORB','liq_MgO','liq_Nippm',color_mdlMORB,'fractional crystallization LLD for MORB')],
+                   'bands':[('band_Haw_LLD','MgO','clppm_Ni',color_mdlHaw)],
+                   'xlabel':'MgO wt%','ylabel':'Ni ppm','fontsize':12,'labelsize':11,'xlim':(4,14),'ylim':(0,600),'legend':{'loc':'upper left'}},
+    'LLD_MnO_MgO': {'data':[('MgO_100_Haw','MnO_100_Haw',area,color_Haw,'Hawaiian lava'),('MgO_MORB','MnO_MORB',area,color_MORB,'MORB')],
+                    'models':[('olonly_Haw','clwt_MgO','clwt_MnO',color_mdlHaw,'fractional crystallization LLD for Hawaiian basalts'),
+                              ('wl1990_MORB','liq_MgO','liq_MnO',color_mdlMORB,'fractional crystallization LLD for MORB')],
+                    'bands':[('band_Haw_LLD','MgO','clwt_MnO',color_mdlHaw)],
+                    'xlabel':'MgO wt%','ylabel':'MnO wt%','fontsize':14,'labelsize':12,'xlim':(4,14),'ylim':(0.1,0.28),'legend':{'loc':'lower left','facecolor':'none'}},
+    'LLD_FeOt_MgO': {'data':[('MgO_100_Haw','FeOt_100_Haw',area,color_Haw,'Hawaiian lava'),('MgO_MORB','FeOt_MORB',area,color_MORB,'MORB')],
+                     'models':[('olonly_Haw','clwt_MgO','clwt_FeOt',color_mdlHaw,'fractional crystallization LLD for Hawaiian basalts'),
+                               ('wl1990_MORB','liq_MgO','liq_FeOt',color_mdlMORB,'fractional crystallization LLD for MORB')],
+                     'xlabel':'MgO wt%','ylabel':'FeOt wt%','fontsize':14,'labelsize':12,'xlim':(4,14),'ylim':(6,16),'legend':{'loc':'lower left','facecolor':'none'}},
+    'LLD_FeOtMnO_MgO': {'data':[('MgO_100_Haw','FeOMnO_100_Haw',area,color_Haw,'Hawaiian lava'),('MgO_MORB','FeOMnO_MORB',area,color_MORB,'MORB')],
+                        'models':[('olonly_Haw','clwt_MgO','clwt_FeOt/MnO',color_mdlHaw,'fractional crystallization LLD for Hawaiian basalts'),
+                                  ('wl1990_MORB','liq_MgO','liq_FeOtMnO',color_mdlMORB,'fractional crystallization LLD for MORB')],
+                        'xlabel':'MgO wt%','ylabel':'FeOt/MnO','fontsize':14,'labelsize':12,'xlim':(4,14),'ylim':(40,90),'legend':{'loc':'upper left','facecolor':'none'}},
+    }
+
+# names of the lowest and highest percentile columns of y in a band table (columns y_p<percentile>, see 'BinnedTracer.summary' in olonly_batch2023.py)
+def band_columns(table, y):
+    names = sorted([name for name in table if name.startswith(y+'_p') and name[len(y)+2:].replace('.','',1).isdigit()], key=lambda name:float(name[len(y)+2:]))
+    return names[0], names[-1]
+
+# one figure with its natural data drawn, kept by each process and reused for every scenario
+class FigureTemplate:
+    def __init__(self, figure, dpi=150, data=None):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.lines import Line2D
+        style = figure_styles[figure]
+        data = load_figure_data([figure]) if data is None else data
+        self.figure, self.style, self.dpi = figure, style, dpi
+        self.fig = Figure(figsize=(6.5,5), dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(111)
+        for x, y, s, c, label in style['data']:
+            self.ax.scatter(data[x], data[y], s=s, c=c, edgecolor='black', linewidths=0.1, label=label, rasterized=True)
+        # the modeled curves are only known later, their legend entries are drawn now with lines of the same style
+        handles = self.ax.get_legend_handles_labels()[0]
+        handles += [Line2D([], [], c=c, linestyle='-.', label=label) for key, x, y, c, label in style['models']]
+        self.ax.set_xlabel(style['xlabel'], fontsize=style['fontsize'])
+        self.ax.set_ylabel(style['ylabel'], fontsize=style['fontsize'])
+        self.ax.tick_params(labelsize=style['labelsize'])
+        self.ax.set_xlim(*style['xlim'])
+        self.ax.set_ylim(*style['ylim'])
+        self.legend = self.ax.legend(handles=handles, edgecolor='none', fontsize=10, labelspacing=0.5, handlelength=0.6, handletextpad=0.4, borderaxespad=0.15, **style['legend'])
+        self.title = self.ax.set_title('', fontsize=10)
+        # the legend is left out of the kept image and drawn after the curves, so that it stays on top of them as in plt.legend
+        self.legend.set_visible(False)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.legend.set_visible(True)
+
+    # modeled curves of one scenario as Line2D artists
+    def model_lines(self, scenario):
+        from matplotlib.lines import Line2D
+        lines = []
+        for key, x, y, c, label in self.style['models']:
+            if scenario.get(key) is not None:
+                lines.append(Line2D(np.asarray(scenario[key][x], dtype=float), np.asarray(scenario[key][y], dtype=float), c=c, linestyle='-.'))
+        return lines
+
+    # envelopes of one scenario, added to the axes (shaded areas under the curves)
+    def model_bands(self, scenario):
+        bands = []
+        for key, x, y, c in self.style.get('bands', []):
+            if scenario.get(key) is not None:
+                low, high = band_columns(scenario[key], y)
+                bands.append(self.ax.fill_between(np.asarray(scenario[key][x], dtype=float), np.asarray(scenario[key][low], dtype=float),
+                                                  np.asarray(scenario[key][high], dtype=float), color=c, alpha=0.2, linewidth=0))
+        return bands
+
+    def save(self, scenario, path, title=None):
+        lines = self.model_lines(scenario)
+        self.title.set_text(scenario.get('name','') if title is None else title)
+        bands = self.model_bands(scenario)
+        for line in lines:
+            self.ax.add_line(line)
+        try:
+            if path.lower().endswith('.png'):
+                from PIL import Image
+                self.canvas.restore_region(self.background)
+                for band in bands:
+                    self.ax.draw_artist(band)
+                for line in lines:
+                    self.ax.draw_artist(line)
+                self.ax.draw_artist(self.legend)
+                self.fig.draw_artist(self.title)
+                # PNG compression takes most of the time, level 1 is several times faster than the default for slightly larger files
+                Image.fromarray(np.asarray(self.canvas.buffer_rgba())[:,:,:3]).save(path, dpi=(self.dpi, self.dpi), compress_level=1)
+            else:
+                self.fig.savefig(path, dpi=self.dpi)
+        finally:
+            for artist in bands+lines:
+                artist.remove()
+        return path
+
+# templates of the current process, built when first needed
+_templates = {}
+
+def get_template(figure, dpi=150):
+    if (figure, dpi) not in _templates:
+        _templates[(figure, dpi)] = FigureTemplate(figure, dpi)
+    return _templates[(figure, dpi)]
+
+# keep only the columns the figures need, so that little data is sent to the worker processes
+def scenario_curves(scenario, figures=None):
+    figures = list(figure_styles) if figures is None else figures
+    out = {'name':scenario.get('name','')}
+    for figure in figures:
+        for key, x, y, c, label in figure_styles[figure]['models']:
+            if scenario.get(key) is not None:
+                out.setdefault(key, {})
+                out[key][x] = np.asarray(scenario[key][x], dtype=float)
+                out[key][y] = np.asarray(scenario[key][y], dtype=float)
+        for key, x, y, c in figure_styles[figure].get('bands', []):
+            if scenario.get(key) is not None:
+                out.setdefault(key, {})
+                for name in (x,)+band_columns(scenario[key], y):
+                    out[key][name] = np.asarray(scenario[key][name], dtype=float)
+    return out
+
+# save the figures of one scenario as '<out_dir>/<scenario name>_<figure>.<fmt>', fmt='png' or 'pdf'
+def render_scenario(scenario, out_dir, figures=None, fmt='png', dpi=150):
+    figures = list(figure_styles) if figures is None else figures
+    os.makedirs(out_dir, exist_ok=True)
+    return [get_template(figure, dpi).save(scenario, os.path.join(out_dir, str(scenario.get('name',''))+'_'+figure+'.'+fmt)) for figure in figures]
+
+def _render_chunk(scenarios, out_dir, figures, fmt, dpi):
+    return [render_scenario(scenario, out_dir, figures, fmt, dpi) for scenario in scenarios]
+
+# save the figures of many scenarios with 'workers' processes (None: number of CPUs, 1: in this process)
+# scenarios are sent to the workers in chunks, every worker builds each template once
+def render_batch(scenarios, out_dir, figures=None, fmt='png', dpi=150, workers=None, chunksize=20):
+    figures = list(figure_styles) if figures is None else figures
+    scenarios = [scenario_curves(scenario, figures) for scenario in scenarios]
+    names = [scenario['name'] for scenario in scenarios]
+    if len(set(names)) < len(names):
+        raise ValueError('scenario names must be unique, they are used as file names')
+    os.makedirs(out_dir, exist_ok=True)
+    load_figure_data(figures)  # build the data cache before the workers start
+    chunks = [scenarios[i:i+chunksize] for i in range(0, len(scenarios), chunksize)]
+    if workers == 1:
+        results = [_render_chunk(chunk, out_dir, figures, fmt, dpi) for chunk in chunks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_chunk, chunks, *[[arg]*len(chunks) for arg in (out_dir, figures, fmt, dpi)]))
+    return [paths for chunk in results for paths in chunk]
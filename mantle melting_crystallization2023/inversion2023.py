@@ -0,0 +1,239 @@
+# inversion of the mantle source, the initial pressure Po and the extent of melting F from the natural olivine and glass data
+# forward model: polybaric fractional melting of the source (melting_batch2023.py), the accumulated melt at F as the magma,
+# and its olivine-only crystallization (olonly_batch2023.py); the misfit is the weighted sum over panels of a metric of misfit2023.py ('bin_rms' by default).
+# Many parameter vectors are evaluated in one batch (one melting column and one magma per vector), e.g., the starting points of 'multistart',
+# and every evaluation is cached by its parameter vector, so a vector is never calculated twice.
+# 'Inversion.fit' minimizes the misfit within the bounds of the parameters (scipy.optimize.minimize, Powell by default),
+# 'multistart' screens a Latin hypercube of the bounds in one batch and fits from the best points in several processes.
+# The magma is interpolated at F between the melting steps (instead of the step closest to F as in 'select_magma'), so the misfit is continuous in F.
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import sys
+import time
+from constants2023 import kd_default
+from reactions2023 import phases
+from melting_batch2023 import melting_batch
+from olonly_batch2023 import magma_keys, olonly_batch
+from misfit2023 import build_indexes, bin_residuals, score_curves
+
+# model curves of the figures from the output of 'olonly_batch' (x, y; see 'model_columns_olonly' in misfit2023.py), FeOt from FeO and Fe2Fet
+def olonly_curves(out, Fe2Fet):
+    FeOt = out['clwt_FeO']/Fe2Fet
+    return {'CLD_Ni_Fo':(out['Fo'],out['olppm_Ni']), 'CLD_Mn_Fo':(out['Fo'],out['olppm_Mn']),
+            'LLD_Ni_MgO':(out['clwt_MgO'],out['clppm_Ni']), 'LLD_MnO_MgO':(out['clwt_MgO'],out['clwt_MnO']),
+            'LLD_FeOt_MgO':(out['clwt_MgO'],FeOt), 'LLD_FeOtMnO_MgO':(out['clwt_MgO'],FeOt/out['clwt_MnO'])}
+
+# accumulated melt of every column at the extent of melting F (array of the columns), interpolated between the melting steps, NaN outside the steps
+def magma_at_F(melt, F, itg='itg1', keys=magma_keys):
+    F_liq = melt['F_liq_'+itg]
+    magma = {key:np.full(len(F), np.nan, like=F_liq) for key in keys}
+    for j in range(len(F)):
+        ok = np.isfinite(F_liq[:,j])
+        if np.sum(ok) >= 2 and F_liq[ok,j][0] <= F[j] <= F_liq[ok,j][-1]:
+            for key in keys:
+                magma[key][j] = np.interp(F[j], F_liq[ok,j], melt['cl'+key+'_wt_'+itg][ok,j])
+    return magma
+
+# fit of a scenario to the data of some panels
+# setting: the scenario, with 'source_wt', 'source_phase', 'Po', 'F_target', 'itg', 'Fe2Fet', 'T_range' (e.g., 'scenarios' of models2023.py)
+# and the dataset of the panels 'data' ('Haw' or 'MORB'); bounds: {parameter: (lower, upper)}, the fitted parameters,
+# a parameter is an oxide of 'source_wt', a mineral of 'source_phase' (the modes are normalized to 100), 'Po' (kbar), 'F'
+# 'P' (kbar, pressure of crystallization, else P) or a partition-coefficient parameter of 'kd_default' (constants2023.py, e.g., 'kdNi_C');
+# without 'data' the model can be calculated (forward) but not scored
+# figures: the figures of the panels (panel = figure_data, see 'misfit_panels' in misfit2023.py), weights: {figure: weight}
+# metric: a metric of 'score_curves' or 'chi2', the sum of the squared per-bin residuals, a data bin not reached by the curve counts as 'miss'**2
+# indexes: None (the natural data) or {panel: DataIndex}, e.g., synthetic data
+# penalty: misfit of a parameter vector whose magma or curves cannot be calculated (F outside the melting column, no bins reached)
+class Inversion:
+    def __init__(self, setting, bounds, figures=('CLD_Ni_Fo','CLD_Mn_Fo'), weights=None, metric='bin_rms', indexes=None,
+                 P=0.001, xtalization_model='fractional', penalty=100., miss=3.):
+        self.setting = setting
+        self.names = list(bounds)
+        for name in self.names:
+            if not self.known(name):
+                raise ValueError('unknown parameter: '+str(name))
+        self.lower = np.array([bounds[name][0] for name in self.names], dtype=float)
+        self.upper = np.array([bounds[name][1] for name in self.names], dtype=float)
+        self.figures = list(figures)
+        self.panels = {figure:figure+'_'+setting['data'] for figure in self.figures} if 'data' in setting else {}
+        self.weights = {figure:1. for figure in self.figures} if weights is None else dict(weights)
+        self.metric = metric
+        self.P = P
+        self.xtalization_model = xtalization_model
+        self.penalty = penalty
+        self.miss = miss
+        self._indexes = indexes
+        self.natural = indexes is None
+        self.cache = {}
+        self.hits = 0
+        self.evaluations = 0
+
+    def known(self, name):
+        return name in self.setting['source_wt'] or name in phases or name in ('Po','F','P') or name in kd_default
+
+    # the data indexes are built when first needed (also in every worker process, from the data cache of olivine_glass_data2023.py)
+    @property
+    def indexes(self):
+        if self._indexes is None:
+            self._indexes = build_indexes(list(self.panels.values()))
+        return self._indexes
+
+    # the indexes of the natural data are not pickled (rebuilt in the worker processes), synthetic indexes are
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        if self.natural:
+            state['_indexes'] = None
+        return state
+
+    # inputs of the forward model for parameter vectors X (m, parameters): source_wt and source_phase (dictionaries of arrays m), Po and F (arrays m)
+    def inputs(self, X):
+        X = np.atleast_2d(X)
+        m = X.shape[0]
+        values = {name:X[:,k] for k, name in enumerate(self.names)}
+        source_wt = {key:values.get(key, np.full(m, float(value), like=X)) for key, value in self.setting['source_wt'].items()}
+        modes = np.column_stack([values.get(phase, np.full(m, float(self.setting['source_phase'][phase]), like=X)) for phase in phases])
+        modes = 100*modes/modes.sum(axis=1, keepdims=True)
+        source_phase = {phase:modes[:,j] for j, phase in enumerate(phases)}
+        Po = values.get('Po', np.full(m, float(self.setting['Po']), like=X))
+        F = values.get('F', np.full(m, float(self.setting['F_target']), like=X))
+        return source_wt, source_phase, Po, F
+
+    # partition-coefficient parameters of X (arrays m), None if none is a parameter (the point values of 'kd_default')
+    def kd(self, X):
+        X = np.atleast_2d(X)
+        kd = {name:X[:,k] for k, name in enumerate(self.names) if name in kd_default}
+        return kd if kd else None
+
+    # forward model of parameter vectors X in one batch: the magma of each vector and the model curves of the figures (x, y arrays (m, steps))
+    def forward(self, X):
+        source_wt, source_phase, Po, F = self.inputs(X)
+        P = np.atleast_2d(X)[:,self.names.index('P')] if 'P' in self.names else self.P
+        kd = self.kd(X)
+        melt = melting_batch(source_wt, source_phase, Po, kd)
+        magma = magma_at_F(melt, F, self.setting['itg'])
+        with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+            out = olonly_batch(magma, P=P, T_range=self.setting['T_range'], xtalization_model=self.xtalization_model, kd=kd)
+            curves = {figure:(x.T, y.T) for figure, (x, y) in olonly_curves(out, self.setting['Fe2Fet']).items() if figure in self.figures}
+        return magma, curves
+
+    # metric of the curves (X, Y arrays (m, steps)) of one figure, 'bin_rms' and 'chi2' only need the per-bin residuals
+    def score(self, figure, X, Y):
+        index = self.indexes[self.panels[figure]]
+        if self.metric not in ('bin_rms','chi2'):
+            s = score_curves(index, X, Y)[self.metric]
+            return 1-s if self.metric == 'coverage' else s
+        residuals = bin_residuals(index, X, Y)
+        n_bins = np.sum(np.isfinite(residuals), axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if self.metric == 'bin_rms':
+                s = np.sqrt(np.nansum(residuals**2, axis=1)/n_bins)
+            else:
+                s = np.nansum(residuals**2, axis=1)+self.miss**2*(np.sum(np.isfinite(index.bin_median))-n_bins)
+        return np.where(n_bins > 0, s, np.nan)
+
+    # misfit of parameter vectors X (m, parameters), from the cache or calculated in one batch; X is clipped to the bounds
+    def misfit(self, X):
+        X = np.clip(np.atleast_2d(np.asarray(X, dtype=float)), self.lower, self.upper)
+        keys = [x.tobytes() for x in X]
+        new = [i for i, key in enumerate(keys) if key not in self.cache]
+        self.hits += len(keys)-len(new)
+        new = list({keys[i]:i for i in new}.values())  # repeated vectors of the same batch are calculated once
+        if len(new) > 0:
+            magma, curves = self.forward(X[new])
+            total = np.zeros(len(new))
+            for figure in self.figures:
+                total = total+self.weights[figure]*self.score(figure, *curves[figure])
+            total = np.where(np.isfinite(total), total, self.penalty)
+            for k, i in enumerate(new):
+                self.cache[keys[i]] = total[k]
+            self.evaluations += len(new)
+        return np.array([self.cache[key] for key in keys])
+
+    def objective(self, x):
+        return float(self.misfit(x)[0])
+
+    # parameters of a vector as a dictionary
+    def values(self, x):
+        return dict(zip(self.names, np.clip(np.asarray(x, dtype=float), self.lower, self.upper).tolist()))
+
+    # scenario of a parameter vector: source_wt, source_phase (normalized modes), Po and F_target, as in 'setting'
+    def scenario(self, x):
+        source_wt, source_phase, Po, F = self.inputs(np.clip(np.asarray(x, dtype=float), self.lower, self.upper))
+        return dict(self.setting, source_wt={key:float(value[0]) for key, value in source_wt.items()},
+                    source_phase={phase:float(value[0]) for phase, value in source_phase.items()}, Po=float(Po[0]), F_target=float(F[0]))
+
+    # local fit from x0 within the bounds, method and options of scipy.optimize.minimize ('Powell', 'Nelder-Mead' and 'L-BFGS-B' use the bounds)
+    # the parameters are fitted scaled to the bounds (0-1), so the tolerances of options are fractions of the ranges of the parameters
+    def fit(self, x0, method='Powell', options=None):
+        from scipy.optimize import minimize
+        if options is None:
+            options = {'xtol':1e-3, 'ftol':1e-4} if method == 'Powell' else {}
+        evaluations = self.evaluations
+        scale = self.upper-self.lower
+        u0 = np.clip((np.asarray(x0, dtype=float)-self.lower)/scale, 0, 1)
+        result = minimize(lambda u:self.objective(self.lower+u*scale), u0, method=method, bounds=[(0,1)]*len(u0), options=options)
+        x = np.clip(self.lower+result.x*scale, self.lower, self.upper)
+        return {'x':x, 'values':self.values(x), 'misfit':self.objective(x), 'start':np.asarray(x0, dtype=float),
+                'success':bool(result.success), 'message':str(result.message), 'evaluations':self.evaluations-evaluations}
+
+# one local fit in a worker process, returns the result and the new cache entries
+def _fit_start(inversion, x0, method, options):
+    known = set(inversion.cache)
+    result = inversion.fit(x0, method, options)
+    return result, {key:value for key, value in inversion.cache.items() if key not in known}
+
+# fits from several starting points: n_screen points of a Latin hypercube of the bounds (seeded) are evaluated in one batch,
+# and the n_starts best are fitted with 'workers' processes (None: number of CPUs, 1: in this process);
+# the cache entries of the workers are added to the cache of the inversion
+# returns the results of the fits sorted by misfit (see 'Inversion.fit')
+def multistart(inversion, n_starts=4, n_screen=64, seed=0, workers=None, method='Powell', options=None):
+    from scipy.stats import qmc
+    X = qmc.scale(qmc.LatinHypercube(d=len(inversion.names), seed=seed).random(n_screen), inversion.lower, inversion.upper)
+    starts = X[np.argsort(inversion.misfit(X), kind='stable')[:n_starts]]
+    if workers == 1:
+        results = [inversion.fit(x0, method, options) for x0 in starts]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            done = list(pool.map(_fit_start, [inversion]*len(starts), starts, [method]*len(starts), [options]*len(starts)))
+        results = []
+        for result, cache in done:
+            inversion.evaluations += len(cache)
+            inversion.cache.update(cache)
+            results.append(result)
+    return sorted(results, key=lambda result:result['misfit'])
+
+## checks: recovery of known parameters from synthetic data (the curves of the known parameters as data),
+# and a fit of the default Hawaii scenario to the Hawaiian olivine
+if __name__ == '__main__':
+    from models2023 import scenarios
+    from misfit2023 import DataIndex, misfit_panels
+    setting = dict(scenarios['Haw'], data='Haw')
+    bounds = {'NiO':(0.2,0.3), 'Po':(35.,55.), 'F':(0.03,0.12)}
+    truth = np.array([0.26, 48., 0.08])
+    # synthetic data: points along the model curves of the known parameters
+    reference = Inversion(setting, bounds)
+    magma, curves = reference.forward(truth)
+    indexes = {}
+    for figure in reference.figures:
+        x, y = curves[figure][0][0], curves[figure][1][0]
+        ok = np.isfinite(x) & np.isfinite(y)
+        indexes[reference.panels[figure]] = DataIndex(x[ok], y[ok], misfit_panels[reference.panels[figure]]['bins'])
+    synthetic = Inversion(setting, bounds, indexes=indexes)
+    start = time.perf_counter()
+    results = multistart(synthetic, n_starts=2, n_screen=32, seed=0, workers=1, options={'xtol':1e-2, 'ftol':1e-3})
+    best = results[0]
+    error = np.abs(best['x']-truth)/(synthetic.upper-synthetic.lower)
+    print('synthetic: truth %s, fitted %s, misfit %.2e, largest error %.1e of the range; %d evaluations, %d cache hits, %.1f s'
+          % (dict(zip(synthetic.names, truth)), {k:round(v,4) for k, v in best['values'].items()}, best['misfit'], error.max(),
+             synthetic.evaluations, synthetic.hits, time.perf_counter()-start))
+    # the default Hawaii scenario and the fit to the Hawaiian olivine
+    natural = Inversion(setting, bounds)
+    default = natural.objective([setting['source_wt']['NiO'], setting['Po'], setting['F_target']])
+    start = time.perf_counter()
+    results = multistart(natural, n_starts=2, n_screen=32, seed=0, workers=2, options={'xtol':1e-2, 'ftol':1e-3})
+    print('Hawaii: default misfit %.3f, fitted %s misfit %.3f; %d evaluations, %d cache hits, %.1f s'
+          % (default, {k:round(v,4) for k, v in results[0]['values'].items()}, results[0]['misfit'], natural.evaluations, natural.hits, time.perf_counter()-start))
+    sys.exit(0 if error.max() <= 0.02 and results[0]['misfit'] <= default else 1)
@@ -0,0 +1,93 @@
+# derivatives of the primary magma and of the olivine and melt Ni of olivine-only crystallization with respect to the model inputs, in one pass
+# inputs: the parameters of 'Inversion' (inversion2023.py): source oxides and modes (normalized to 100), Po, F, P (pressure of crystallization)
+# and the partition-coefficient parameters of 'kd_default' (constants2023.py), e.g., 'kdNi_C', 'Toplis_S'
+# outputs: those of 'Surrogate' (surrogate2023.py): the primary magma (wt%, the accumulated melt at F), the Fo of its first olivine,
+# olivine Ni (ppm) at fixed Fo and melt Ni (ppm) at fixed MgO
+# forward-mode derivatives: the inputs are Duals (dual2023.py) with one derivative per parameter, and the batched engines
+# (polybaric melting, itg, the magma at F and olivine-only crystallization) run on them unchanged, so the Jacobians of all vectors come from one batch,
+# exact for the branch of the model taken (the reaction rules, the number of 1-kbar melting steps and the melting step bracketing F),
+# without the step size and the noise of finite differences
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import sys
+import time
+from olonly_batch2023 import magma_keys
+from inversion2023 import Inversion
+from misfit2023 import curve_at_bins
+from dual2023 import variables, split
+
+# Jacobians of a setting (e.g., 'scenarios' of models2023.py) with respect to the parameters 'names'
+class Jacobian:
+    def __init__(self, setting, names, fo_values=(88., 85.), mgo_values=(8.,), P=0.001, xtalization_model='fractional'):
+        self.engine = Inversion(setting, {name:(-np.inf, np.inf) for name in names}, figures=('CLD_Ni_Fo','LLD_Ni_MgO'), P=P,
+                                xtalization_model=xtalization_model)
+        self.names = list(names)
+        self.fo_values = np.asarray(fo_values, dtype=float)
+        self.mgo_values = np.asarray(mgo_values, dtype=float)
+        self.outputs = (['magma_'+key for key in magma_keys]+['Fo_first']+['olppm_Ni_Fo%g' % fo for fo in self.fo_values]
+                        +['clppm_Ni_MgO%g' % mgo for mgo in self.mgo_values])
+
+    # outputs Y (m, outputs) and Jacobians J (m, outputs, parameters) of parameter vectors X (m, parameters),
+    # NaN where an output cannot be calculated (same values as 'Surrogate.evaluate')
+    def evaluate(self, X):
+        X = variables(X)
+        magma, curves = self.engine.forward(X)
+        Fo, Ni = curves['CLD_Ni_Fo']
+        MgO, clNi = curves['LLD_Ni_MgO']
+        first = np.argmax(np.where(np.isfinite(Fo.value), Fo.value, -np.inf), axis=1)  # the most magnesian olivine
+        Fo_first = Fo[np.arange(len(first)),first]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            Y = np.column_stack([magma[key] for key in magma_keys]+[Fo_first, curve_at_bins(Fo, Ni, self.fo_values), curve_at_bins(MgO, clNi, self.mgo_values)])
+        Y, J = split(Y, len(self.names))
+        J[~np.isfinite(Y)] = np.nan
+        return Y, J
+
+    # Jacobians as a dataframe (outputs x parameters) of one parameter vector x
+    def table(self, x):
+        import pandas as pd
+        Y, J = self.evaluate(np.atleast_2d(x))
+        return pd.DataFrame(J[0], index=self.outputs, columns=self.names)
+
+## checks: the Jacobians against central finite differences of the engine ('Surrogate.evaluate', all perturbed vectors in one batch)
+# at the scenario of Hawaii and MORB and at random vectors around it, and the time of the Jacobians against the finite differences
+if __name__ == '__main__':
+    from models2023 import scenarios
+    from surrogate2023 import Surrogate
+    from constants2023 import kd_default
+    ok = True
+    for name, phases in (('Haw', ['ol','opx','cpx','gt']), ('MORB', ['ol','opx','cpx','sp'])):
+        setting = scenarios[name]
+        names = ['NiO','MgO','FeO','SiO2']+phases+['Po','F','kdNi_A','kdNi_C','kdNi_opxol','Toplis_S','Toplis_W']
+        x0 = np.array([setting['source_wt'].get(key, setting['source_phase'].get(key)) for key in names[:4+len(phases)]]
+                      +[setting['Po'], 0.95*setting['F_target']]+[kd_default[key] for key in names[-5:]], dtype=float)
+        model = Jacobian(setting, names)
+        engine = Surrogate(setting, {key:(-np.inf, np.inf) for key in names}, fo_values=model.fo_values, mgo_values=model.mgo_values)
+        # F inside the melting column (F_target of MORB is just past the last step of Po 20 kbar),
+        # random vectors: +-2% of the scenario (+-0.5 kbar of Po), away from the changes of reaction rule
+        rng = np.random.default_rng(0)
+        X = x0*(1+0.02*rng.uniform(-1, 1, (8, len(x0))))
+        X[:,names.index('Po')] = x0[names.index('Po')]+rng.uniform(-0.5, 0.5, 8)
+        X = np.vstack([x0, X])
+        m, d = X.shape
+        start = time.perf_counter()
+        Y, J = model.evaluate(X)
+        dual_time = time.perf_counter()-start
+        h = 1e-6*np.maximum(1., np.abs(X))
+        Xh = np.concatenate([X[:,None,:]+np.eye(d)*h[:,None,:], X[:,None,:]-np.eye(d)*h[:,None,:]], axis=1).reshape(-1, d)
+        start = time.perf_counter()
+        Yh = engine.evaluate(Xh).reshape(m, 2, d, -1)
+        fd_time = time.perf_counter()-start
+        FD = np.moveaxis((Yh[:,0]-Yh[:,1])/(2*h[:,:,None]), 1, 2)
+        Y_engine = engine.evaluate(X)
+        # error relative to the largest derivative of the output (times the parameter scale), the finite differences are good to about 1e-6
+        scale = np.nanmax(np.abs(J*np.maximum(1., np.abs(X))[:,None,:]), axis=2, keepdims=True)
+        error = np.nanmax(np.abs(J-FD)*np.maximum(1., np.abs(X))[:,None,:]/scale)
+        same = np.nanmax(np.abs(Y/Y_engine-1))
+        print('%-4s %d vectors x %d parameters: outputs against the engine %.1e, Jacobians against central differences %.1e;'
+              ' Jacobians %.2f s, differences (%d vectors in one batch) %.2f s' % (name, m, d, same, error, dual_time, 2*m*d, fd_time))
+        table = model.table(x0)
+        print(table.loc[['magma_MgO','magma_NiO','Fo_first','olppm_Ni_Fo88','clppm_Ni_MgO8']].to_string(float_format=lambda v:'%.4g' % v))
+        ok = ok and same < 1e-9 and error < 1e-4  # the values differ by the rounding of the interpolation at F and at the bins
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,476 @@
+# optional compiled kernels for the polybaric fractional melting and the olivine-only crystallization
+# a whole melting column ('melting_polyfrac_kernel') or a whole olivine-only path ('olonly_kernel') is one loop over float arrays,
+# with the same equations as melting_function2023.py and olonly_function2023.py written without dictionaries.
+# The kernels are compiled by numba (nopython mode) when it is installed, otherwise the same functions run as plain Python.
+# The olivine FeO of 'KDFeMg' (sympy.nsolve) is solved by Newton iterations in the kernel, so the results are floats instead of sympy Floats.
+# 'melting_column_kernel' and 'olonly_model_kernel' return the same dataframes as 'melting_column' and 'olonly_model' (models2023.py),
+# called with backend='kernel'. 'python kernels2023.py' runs the parity checks against the dictionary functions.
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import pandas as pd
+import math
+import sys
+from constants2023 import cm_mass, cm_tot, molar_tot
+from melting_function2023 import wttocm, itg
+from olonly_function2023 import cationmole_magma, get_firstT_olonly
+from reactions2023 import phases, rule_program
+
+try:
+    from numba import njit
+    has_numba = True
+except ImportError:  # numba is optional, the kernels run as plain Python
+    has_numba = False
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# the constants as floats, dictionaries cannot be used in the compiled kernels
+mass_SiO2 = cm_mass['SiO2']
+mass_MgO = cm_mass['MgO']
+mass_FeO = cm_mass['FeO']
+mass_Na2O = cm_mass['Na2O']
+mass_K2O = cm_mass['K2O']
+
+melting_rules = rule_program()  # the melting reaction rules of reactions2023.py as a float array
+res_keys = ['MgO','FeO','TiO2','Na2O','K2O','NiO','MnO']  # order of 'res' and 'cl_wt' in melting_column, cl_wt has SiO2 in addition
+
+## polybaric fractional melting
+# columns of the array returned by 'melting_polyfrac_kernel', one row per melting step
+melting_kernel_columns = (['T','P','f','f_step']+['f_'+phase for phase in phases]+['phase_tot']
+                          +['cl_wt_'+key for key in res_keys+['SiO2']]+['ol_MgOcm','ol_FeOcm','ol_Fo','ol_NiOwt','ol_MnOwt']
+                          +['cl_cm_MgO','cl_cm_FeO','cl_cm_Na2O','cl_cm_K2O','cl_molar_SiO2','cl_molar_Na2O','cl_molar_K2O','clSiO2_adjust']
+                          +['res_'+key for key in res_keys+['mgnumber']]+['kdMgO_oll_cm','kdFeO_oll_cm','kdFe2Mg_oll']
+                          +['bulkD_K2O','bulkD_Na2O','bulkD_TiO2','bulkD_Ni','bulkD_Mn']
+                          +['kdNi_'+key for key in ['oll','opxl','cpxl','gtl','spl','opxol','cpxol','gtol','spol']]
+                          +['kdMn_'+key for key in ['oll','opxl','cpxl','gtl','spl','opxol','cpxol','gtol','spol']])
+n_melting_columns = len(melting_kernel_columns)
+# names of the columns in the dataframe of 'melting_column' after the melt compositions
+melting_df_names = {'ol_MgOcm':'olMgO_cm','ol_FeOcm':'olFeO_cm','ol_Fo':'Fo','ol_NiOwt':'olNiO_wt','ol_MnOwt':'olMnO_wt',
+                    'cl_cm_MgO':'clMgO_cm','cl_cm_FeO':'clFeO_cm','cl_cm_Na2O':'clNa2O_cm','cl_cm_K2O':'clK2O_cm',
+                    'cl_molar_SiO2':'clSiO2_molar','cl_molar_Na2O':'clNa2O_molar','cl_molar_K2O':'clK2O_molar','clSiO2_adjust':'clSiO2_adjust',
+                    'res_MgO':'resMgO_cm','res_FeO':'resFeO_cm','res_TiO2':'resTiO2_wt','res_Na2O':'resNa2O_wt','res_K2O':'resK2O_wt',
+                    'res_NiO':'resNiO_wt','res_MnO':'resMnO_wt','res_mgnumber':'resMgnumber',
+                    'kdMgO_oll_cm':'kdMgO_oll_cm','kdFeO_oll_cm':'kdFeO_oll_cm','kdFe2Mg_oll':'KDFe2Mg_oll',
+                    'bulkD_K2O':'DK2O','bulkD_Na2O':'DNa2O','bulkD_TiO2':'DTiO2','bulkD_Ni':'DNiO','bulkD_Mn':'DMnO'}
+melting_df_names.update({'kd'+e+'_'+key:'Kd'+e+'_'+key+'_wt' for e in ['Ni','Mn'] for key in ['oll','opxl','cpxl','gtl','spl','opxol','cpxol','gtol','spol']})
+
+# same as 'mineral_phase_polyfrac': the rules of reactions2023.py ('rule_program') applied to one mode
+# fm: ol, opx, cpx, gt, sp in percent, changed in place, returns the sum of the phases
+@njit(cache=True)
+def mineral_phase_polyfrac_kernel(Po,P,f_step,fm,program=melting_rules):
+    x = np.empty(5)
+    i = 0
+    while i < program.shape[0]:
+        rule = program[i,0]
+        x[:] = fm
+        holds = True
+        factor = math.nan
+        while i < program.shape[0] and program[i,0] == rule:
+            op = program[i]
+            code = int(op[1])
+            name = int(op[2])
+            if holds:
+                if code == 0 or code == 4:  # if, factor
+                    if name < 0:
+                        ok = True
+                    else:
+                        value = P if name == 5 else (Po if name == 6 else x[name])
+                        comparison = int(op[3])
+                        if comparison == 0:
+                            ok = value > op[4]
+                        elif comparison == 1:
+                            ok = value >= op[4]
+                        elif comparison == 2:
+                            ok = value < op[4]
+                        else:
+                            ok = value <= op[4]
+                    if code == 0:
+                        holds = ok
+                    elif ok and math.isnan(factor):
+                        factor = op[5]
+                elif code == 1:  # zero
+                    x[name] = 0.
+                elif code == 2 or code == 6:  # remove, exhaust
+                    kept = 0.
+                    removed = False
+                    for j in range(5):
+                        if (code == 2 and j == name) or (code == 6 and x[j] < op[6+j]):
+                            removed = True
+                        else:
+                            kept += x[j]
+                    if removed:
+                        for j in range(5):
+                            if (code == 2 and j == name) or (code == 6 and x[j] < op[6+j]):
+                                x[j] = 0.
+                            else:
+                                x[j] = x[j]/kept*100
+                elif code == 7:  # only
+                    x[:] = 0.
+                    x[name] = 100.
+                elif code == 3:  # react
+                    for j in range(5):
+                        x[j] = (x[j]+op[6+j]*f_step)/(1-f_step)
+                else:  # convert
+                    converted = factor*x[name]
+                    for j in range(5):
+                        x[j] = x[j]+op[6+j]*converted
+            i += 1
+        if holds:
+            fm[:] = x
+            break
+    return fm[0]+fm[1]+fm[2]+fm[3]+fm[4]
+
+# same as 'KDFeMg': olivine FeO (cation mole %) solved by Newton iterations from 0 instead of sympy.nsolve
+@njit(cache=True)
+def olFeO_kernel(a,b,c,d,e,f,tol=1e-13,max_iter=100):
+    x = 0.
+    for i in range(max_iter):
+        u = math.exp(-(a+b*x))
+        g = c*(x**2-x**2*u)+d*x+e*x*u+f
+        dg = 2*c*x*(1-u)+c*x**2*b*u+d+e*u-e*x*b*u
+        dx = g/dg
+        x = x-dx
+        if abs(dx) <= tol*max(1.,abs(x)):
+            break
+    return x
+
+# one melting step after the mineral phases: liquid_wt_polyfrac, KDFeMg, MgOFeO_polyfrac, Ni_polyfrac and Mn_polyfrac
+# row: the output row (see 'melting_kernel_columns') with T, P, f, f_step and the mineral phases already filled, res and bulkD are changed in place
+@njit(cache=True)
+def melting_step_kernel(row,res,bulkD,Po):
+    T = row[0]
+    P = row[1]
+    f_step = row[3]
+    ol = row[4]
+    opx = row[5]
+    cpx = row[6]
+    gt = row[7]
+    sp = row[8]
+    # liquid_wt_polyfrac
+    cl_K2O = res[4]/(bulkD[0]*(1-f_step)+f_step)
+    if Po >= 30:
+        bulkD[1] = 0.015+0.6*cpx*0.01
+    else:
+        bulkD[1] = 0.015+0.4*cpx*0.01
+    cl_Na2O = res[3]/(bulkD[1]*(1-f_step)+f_step)
+    bulkD[2] = 0.015*ol*0.01+0.086*opx*0.01+0.35*gt*0.01+cpx*0.2*0.01
+    cl_TiO2 = res[2]/(bulkD[2]*(1-f_step)+f_step)
+    if Po >= 30:
+        cl_SiO2 = 55.7-0.233*P
+    else:
+        cl_SiO2 = 53.17-0.233*P
+    clcm_Na2O = cl_Na2O/(mass_Na2O*cm_tot)*100
+    clcm_K2O = cl_K2O/(mass_K2O*cm_tot)*100
+    res[4] = (res[4]-f_step*cl_K2O)/(1-f_step)
+    res[3] = (res[3]-f_step*cl_Na2O)/(1-f_step)
+    res[2] = (res[2]-f_step*cl_TiO2)/(1-f_step)
+    # KDFeMg
+    clmolar_SiO2 = cl_SiO2/mass_SiO2/molar_tot
+    clmolar_Na2O = cl_Na2O/(mass_Na2O*2)/molar_tot
+    clmolar_K2O = cl_K2O/(mass_K2O*2)/molar_tot
+    if clmolar_SiO2 <= 0.6:
+        clSiO2_adjust = 100*clmolar_SiO2+100*(clmolar_Na2O+clmolar_K2O)*((0.46*100/(100-100*clmolar_SiO2)-0.93)*100*(clmolar_Na2O+clmolar_K2O)-5.33*100/(100-100*clmolar_SiO2)+9.69)
+    else:
+        clSiO2_adjust = 100*clmolar_SiO2+100*(clmolar_Na2O+clmolar_K2O)*(11-5.5*100/(100-100*clmolar_SiO2))*math.exp(-0.13*100*(clmolar_Na2O+clmolar_K2O))
+    kdMgO_oll_cm = math.exp(6921/(T+273.15)+0.034*clcm_Na2O+0.063*clcm_K2O+0.01154*P-3.27)
+    a = -6766/(8.3144*(T+273.15))-7.34/8.3144+math.log(0.036*clSiO2_adjust-0.22)+3000/(8.3144*(T+273.15))+0.035*(P*10**3-1)/(8.3144*(T+273.15))-3000*2/(8.3144*(T+273.15))
+    b = 3000*2/(8.3144*(T+273.15)*66.67)
+    c = f_step/kdMgO_oll_cm
+    d = res[0]+res[1]-66.67*c
+    e = 66.67*c
+    ol_FeOcm = olFeO_kernel(a,b,c,d,e,-66.67*res[1])
+    kdFe2Mg_oll = math.exp(-6766/(8.3144*(T+273.15))-7.34/8.3144+math.log(0.036*clSiO2_adjust-0.22)+3000*(1-2*(66.67-ol_FeOcm)/66.67)/(8.3144*(T+237.15))+0.035*(P*10**3-1)/(8.3144*(T+273.15)))
+    # MgOFeO_polyfrac
+    ol_MgOcm = 66.67-ol_FeOcm
+    clcm_MgO = ol_MgOcm/kdMgO_oll_cm
+    res[0] = (res[0]-f_step*clcm_MgO)/(1-f_step)
+    kdFeO_oll_cm = kdFe2Mg_oll*kdMgO_oll_cm
+    clcm_FeO = ol_FeOcm/kdFeO_oll_cm
+    res[1] = (res[1]-f_step*clcm_FeO)/(1-f_step)
+    res[7] = 100*res[0]/(res[0]+res[1])
+    ol_Fo = 100*ol_MgOcm/(ol_MgOcm+ol_FeOcm)
+    cl_MgO = cm_tot*mass_MgO*clcm_MgO/100
+    cl_FeO = cm_tot*mass_FeO*clcm_FeO/100
+    # Ni_polyfrac, Sobolev et al. (2005) Table S1 average KdNi value, Righter et al. (2006) and Li et al. (2008) for spinel
+    kdNi_oll = math.exp(4272/(T+273.15)+0.01582*cl_SiO2-2.7622)*(kdMgO_oll_cm*1.09)
+    kdNi_opxl = kdNi_oll*0.4
+    kdNi_cpxl = kdNi_oll*0.24
+    kdNi_gtl = kdNi_oll*0.12
+    kdNi_spl = kdNi_oll*1
+    bulkD[3] = (ol*kdNi_oll+opx*kdNi_opxl+cpx*kdNi_cpxl+gt*kdNi_gtl+sp*kdNi_spl)*0.01
+    cl_NiO = res[5]/(bulkD[3]*(1-f_step)+f_step)
+    ol_NiOwt = cl_NiO*kdNi_oll
+    res[5] = (res[5]-f_step*cl_NiO)/(1-f_step)
+    # Mn_polyfrac, Le Roux et al. (2011) and Davis et al. (2013)
+    kdMn_oll = 0.79*kdFeO_oll_cm*1.09
+    if Po < 30:
+        kdMn_cpxl = 0.85
+        kdMn_opxl = 0.7
+    else:
+        kdMn_cpxl = 0.768
+        kdMn_opxl = 0.640
+    kdMn_gtl = 1.241
+    kdMn_spl = 0.46
+    bulkD[4] = (ol*kdMn_oll+opx*kdMn_opxl+cpx*kdMn_cpxl+gt*kdMn_gtl+sp*kdMn_spl)*0.01
+    cl_MnO = res[6]/(bulkD[4]*(1-f_step)+f_step)
+    ol_MnOwt = cl_MnO*kdMn_oll
+    res[6] = (res[6]-f_step*cl_MnO)/(1-f_step)
+    # output row, in the order of 'melting_kernel_columns'
+    k = 10
+    for value in (cl_MgO,cl_FeO,cl_TiO2,cl_Na2O,cl_K2O,cl_NiO,cl_MnO,cl_SiO2,ol_MgOcm,ol_FeOcm,ol_Fo,ol_NiOwt,ol_MnOwt,
+                  clcm_MgO,clcm_FeO,clcm_Na2O,clcm_K2O,clmolar_SiO2,clmolar_Na2O,clmolar_K2O,clSiO2_adjust):
+        row[k] = value
+        k += 1
+    for i in range(8):
+        row[k+i] = res[i]
+    k += 8
+    for value in (kdMgO_oll_cm,kdFeO_oll_cm,kdFe2Mg_oll):
+        row[k] = value
+        k += 1
+    for i in range(5):
+        row[k+i] = bulkD[i]
+    k += 5
+    for value in (kdNi_oll,kdNi_opxl,kdNi_cpxl,kdNi_gtl,kdNi_spl,0.4,0.24,0.12,1.,
+                  kdMn_oll,kdMn_opxl,kdMn_cpxl,kdMn_gtl,kdMn_spl,0.,0.,0.,0.):
+        row[k] = value
+        k += 1
+
+# whole polybaric fractional melting column, same steps as 'melting_column' with melting_model='polybaric'
+# source_phase: ol, opx, cpx, gt, sp in percent, res0: initial residue (see 'res_keys', MgO and FeO in cation mole %), returns the rows (see 'melting_kernel_columns')
+@njit(cache=True)
+def melting_polyfrac_kernel(source_phase,res0,mgnumber_source,Po):
+    out = np.zeros((int(Po)+3,n_melting_columns))  # P decreases by 1 kbar per step, the melting stops before P<0
+    fm = source_phase.copy()
+    res = np.zeros(8)
+    res[:7] = res0
+    bulkD = np.array([0.005,0.,0.,0.,0.])
+    f = 0.0000001
+    f_step = 0.0000001
+    P = float(Po)
+    T = 13*Po+1140+600*(1-Po/88)*f+20*(mgnumber_source-89)
+    p_remain = -Po
+    n = 0
+    while True:
+        phase_tot = mineral_phase_polyfrac_kernel(Po,P,f_step,fm)
+        row = out[n]
+        row[0] = T
+        row[1] = P
+        row[2] = f
+        row[3] = f_step
+        row[4:9] = fm
+        row[9] = phase_tot
+        melting_step_kernel(row,res,bulkD,Po)
+        n += 1
+        if p_remain > 0 or n == out.shape[0]:
+            break
+        # TPF_polyfrac
+        if round(f,2) < 0.22:
+            f = f+0.01*12/(6+6*(1-P/88))
+            f_step = 0.01*12/(6+6*(1-P/88))
+        else:
+            f = f+0.01*12/(9+9*(1-P/88))
+            f_step = 0.01*12/(9+9*(1-P/88))
+        P = P-1
+        T = 13*P+1140+600*(1-P/88)*f+20*(mgnumber_source-89)
+        crust_thickness = 0.5*f/(Po-P)*(Po-P)**2*10.2/(2.6212*Po**0.038)
+        p_remain = crust_thickness/3-P
+    return out[:n]
+
+## olivine-only crystallization
+# columns of the array returned by 'olonly_kernel', one row per step
+olonly_kernel_columns = ['T','f','f_step','cm_kdMg','cm_kdFe2','kdFe2Mg','clcm_MgO','clcm_FeO','clcm_SiO2','clcm_Na2O','clcm_K2O',
+                         'olcm_MgO','olcm_FeO','ol_stoich','Fo','clmolar_SiO2','clmolar_Na2O','clmolar_K2O','molarSiO2_adjust',
+                         'wt_kdNi','wt_kdMn','clppm_Ni','clppm_Mn','olppm_Ni','olppm_Mn']
+n_olonly_columns = len(olonly_kernel_columns)
+
+# same as 'TF_olonly'/'TF_olonly_equ' before the extent of crystallization: molar SiO2, Na2O, K2O, adjusted SiO2 and partition coefficients at T
+@njit(cache=True)
+def kd_olonly_kernel(T,clcm,P,clmolar):
+    clmolar[0] = 0.01*clcm[2]*cm_tot/molar_tot
+    clmolar[1] = 0.01*clcm[3]*cm_tot*mass_Na2O/(mass_Na2O*2)/molar_tot
+    clmolar[2] = 0.01*clcm[4]*cm_tot*mass_K2O/(mass_K2O*2)/molar_tot
+    if clmolar[0] <= 0.6:
+        molarSiO2_adjust = 100*clmolar[0]+100*(clmolar[1]+clmolar[2])*((0.46*100/(100-100*clmolar[0])-0.93)*100*(clmolar[1]+clmolar[2])-5.33*100/(100-100*clmolar[0])+9.69)
+    else:
+        molarSiO2_adjust = 100*clmolar[0]+100*(clmolar[1]+clmolar[2])*(11-5.5*100/(100-100*clmolar[0]))*math.exp(-0.13*100*(clmolar[1]+clmolar[2]))
+    cm_kdMg = math.exp(6921/(T+273.15)+0.034*clcm[3]+0.063*clcm[4]+0.01154*P-3.27)
+    kdFe2Mg = math.exp(-6766/(8.3144*(T+273.15))-7.34/8.3144+math.log(0.036*molarSiO2_adjust-0.22)+3000*(1-2*clcm[0]*cm_kdMg/66.67)/(8.3144*(T+237.15))+0.035*(P*10**3-1)/(8.3144*(T+273.15)))
+    return molarSiO2_adjust, cm_kdMg, kdFe2Mg, kdFe2Mg*cm_kdMg
+
+# extent of crystallization of a step (fractional) or of the system (equilibrium), 'clcm' is the liquid of the last step or the magma
+@njit(cache=True)
+def f_olonly_kernel(clcm,cm_kdMg,cm_kdFe2):
+    a = 66.67*(1-cm_kdMg)*(1-cm_kdFe2)
+    b = (66.67-clcm[1])*cm_kdFe2*(1-cm_kdMg)+(66.67-clcm[0])*cm_kdMg*(1-cm_kdFe2)
+    c = (66.67-clcm[0]-clcm[1])*cm_kdMg*cm_kdFe2
+    d2 = b**2-4*a*c
+    d = math.sqrt(d2) if d2 >= 0 else math.nan
+    return (-b-d)/(2*a)
+
+@njit(cache=True)
+def olonly_row(row,T,f,f_step,cm_kdMg,cm_kdFe2,kdFe2Mg,clcm,olcm,clmolar,molarSiO2_adjust,wt_kdNi,wt_kdMn,clppm,olppm):
+    row[0] = T
+    row[1] = f
+    row[2] = f_step
+    row[3] = cm_kdMg
+    row[4] = cm_kdFe2
+    row[5] = kdFe2Mg
+    row[6:11] = clcm
+    row[11:13] = olcm
+    row[13] = olcm[0]+olcm[1]
+    row[14] = 100*olcm[0]/66.67
+    row[15:18] = clmolar
+    row[18] = molarSiO2_adjust
+    row[19] = wt_kdNi
+    row[20] = wt_kdMn
+    row[21:23] = clppm
+    row[23:25] = olppm
+
+# whole olivine-only path, same steps as 'olonly_model': cm_magma (MgO, FeO, SiO2, Na2O, K2O in cation mole %), clppm_magma (Ni, Mn in ppm),
+# T0: liquidus temperature in Celsius (from 'get_firstT_olonly'), equilibrium: False for fractional, True for equilibrium crystallization
+@njit(cache=True)
+def olonly_kernel(cm_magma,clppm_magma,T0,P,T_range,equilibrium):
+    out = np.zeros((int(T_range)+2,n_olonly_columns))
+    clcm = cm_magma.copy()
+    clppm = clppm_magma.copy()
+    clmolar = np.zeros(3)
+    olcm = np.zeros(2)
+    olppm = np.zeros(2)
+    T = T0
+    molarSiO2_adjust, cm_kdMg, kdFe2Mg, cm_kdFe2 = kd_olonly_kernel(T,clcm,P,clmolar)
+    olcm[0] = clcm[0]*cm_kdMg
+    olcm[1] = clcm[1]*cm_kdFe2
+    wt_kdNi = math.exp(4272/(T+273.15)+0.01582*(clcm[2]*cm_tot*mass_SiO2/100)-2.7622)*(cm_kdMg*1.09)
+    wt_kdMn = 0.79*cm_kdFe2*1.09
+    olppm[0] = clppm[0]*wt_kdNi
+    olppm[1] = clppm[1]*wt_kdMn
+    f = 1.
+    f_step = 0. if equilibrium else 1.
+    olonly_row(out[0],T,f,f_step,cm_kdMg,cm_kdFe2,kdFe2Mg,clcm,olcm,clmolar,molarSiO2_adjust,wt_kdNi,wt_kdMn,clppm,olppm)
+    n = 1
+    while T > T0-T_range and n < out.shape[0]:
+        T = T-1  # 1 Celsius per step
+        molarSiO2_adjust, cm_kdMg, kdFe2Mg, cm_kdFe2 = kd_olonly_kernel(T,clcm,P,clmolar)
+        if equilibrium:  # TF_olonly_equ, concentration_olonly_equ and NiMn_olonly_equ
+            f_last = f
+            f = f_olonly_kernel(cm_magma,cm_kdMg,cm_kdFe2)
+            f_step = f_last-f
+            clcm[0] = cm_magma[0]/(cm_kdMg*(1-f)+f)
+            clcm[1] = cm_magma[1]/(cm_kdFe2*(1-f)+f)
+            clcm[3] = cm_magma[3]/f
+            clcm[4] = cm_magma[4]/f
+            clcm[2] = (cm_magma[2]-(1-f)*(100-66.67))/f
+        else:  # TF_olonly, concentration_olonly and NiMn_olonly
+            f_step = f_olonly_kernel(clcm,cm_kdMg,cm_kdFe2)
+            f = f*f_step
+            clcm[0] = clcm[0]/(cm_kdMg*(1-f_step)+f_step)
+            clcm[1] = clcm[1]/(cm_kdFe2*(1-f_step)+f_step)
+            clcm[3] = clcm[3]/f_step
+            clcm[4] = clcm[4]/f_step
+            clcm[2] = (clcm[2]-(1-f_step)*(100-66.67))/f_step
+        olcm[0] = clcm[0]*cm_kdMg
+        olcm[1] = clcm[1]*cm_kdFe2
+        wt_kdNi = math.exp(4272/(T+273.15)+0.01582*(clcm[2]*cm_tot*mass_SiO2/100)-2.7622)*(cm_kdMg*1.09)
+        wt_kdMn = 0.79*cm_kdFe2*1.09
+        if equilibrium:
+            clppm[0] = clppm_magma[0]/(wt_kdNi*(1-f)+f)
+            clppm[1] = clppm_magma[1]/(wt_kdMn*(1-f)+f)
+        else:
+            clppm[0] = clppm[0]/(wt_kdNi*(1-f_step)+f_step)
+            clppm[1] = clppm[1]/(wt_kdMn*(1-f_step)+f_step)
+        olppm[0] = clppm[0]*wt_kdNi
+        olppm[1] = clppm[1]*wt_kdMn
+        olonly_row(out[n],T,f,f_step,cm_kdMg,cm_kdFe2,kdFe2Mg,clcm,olcm,clmolar,molarSiO2_adjust,wt_kdNi,wt_kdMn,clppm,olppm)
+        n += 1
+    return out[:n]
+
+## dataframes, same columns as 'melting_column' and 'olonly_model' (models2023.py)
+# polybaric fractional melting column computed by 'melting_polyfrac_kernel'
+def melting_column_kernel(source_wt,source_phase,Po):
+    source_cm, mgnumber_source = wttocm(source_wt)
+    res0 = np.array([source_cm['MgO']*100,source_cm['FeO']*100]+[source_wt[key] for key in res_keys[2:]],dtype=float)
+    rows = melting_polyfrac_kernel(np.array([source_phase[phase] for phase in phases],dtype=float),res0,mgnumber_source,Po)
+    col = {name:rows[:,i] for i, name in enumerate(melting_kernel_columns)}
+    Cl_wt = {key:col['cl_wt_'+key].tolist() for key in res_keys+['SiO2']}
+    Cl_wt_itg1,Cl_wt_itg2,F_melting_itg1,F_melting_itg2 = itg(Cl_wt,col['f_step'].tolist(),col['f'].tolist(),Po)
+    P_melting = col['P'].astype(int) if isinstance(Po, (int, np.integer)) else col['P']  # integer pressures as in 'melting_column'
+    dfs = [pd.DataFrame({'T Celsius':col['T'],'P kbar':P_melting,'f_step':col['f_step']}),
+           pd.DataFrame({phase:col['f_'+phase] for phase in source_phase}),
+           pd.DataFrame({'mineral_phase_tot':col['phase_tot'],'F_liq_itg2':F_melting_itg2})]
+    Cl_wt_itg2_df = pd.DataFrame(Cl_wt_itg2)
+    Cl_wt_itg2_df.columns = ['cl'+key+'_wt_itg2' for key in Cl_wt]
+    Cl_wt_itg1_df = pd.DataFrame(Cl_wt_itg1)
+    Cl_wt_itg1_df.columns = ['cl'+key+'_wt_itg1' for key in Cl_wt]
+    dfs += [Cl_wt_itg2_df,pd.DataFrame({'F_liq_itg1':F_melting_itg1}),Cl_wt_itg1_df]
+    dfs.append(pd.DataFrame({melting_df_names[name]:col[name] for name in melting_df_names}))
+    return pd.concat(dfs,axis=1)
+
+# olivine-only crystallization computed by 'olonly_kernel', the liquidus temperature is solved by 'get_firstT_olonly' as in 'olonly_model'
+def olonly_model_kernel(magma,Fe2Fet,Po,P=0.001,T_range=350,xtalization_model='fractional'):
+    if xtalization_model not in ('fractional','equilibrium'):
+        raise ValueError("xtalization_model must be 'fractional' or 'equilibrium'")
+    cm_magma = cationmole_magma(magma)
+    clcm = np.array(list(cm_magma.values()),dtype=float)
+    clppm = np.array([magma['NiO']*58.6934/74.69*10**4,magma['MnO']*54.938/70.94*10**4])
+    molarSiO2_adjust = kd_olonly_kernel(0.,clcm,P,np.zeros(3))[0]
+    T0 = get_firstT_olonly(cm_magma,P,molarSiO2_adjust)
+    rows = olonly_kernel(clcm,clppm,T0,P,T_range,xtalization_model == 'equilibrium')
+    col = {name:rows[:,i] for i, name in enumerate(olonly_kernel_columns)}
+    clwt_FeO = col['clcm_FeO']*cm_tot*cm_mass['FeO']/100
+    clwt_MnO = col['clppm_Mn']/(10**4)*70.94/54.938
+    return pd.DataFrame({'T Celsius':col['T'],'melt fraction':col['f'],'F_step':col['f_step'],
+                         'clwt_MgO':col['clcm_MgO']*cm_tot*cm_mass['MgO']/100,'clwt_FeO':clwt_FeO,'clwt_FeOt':clwt_FeO/Fe2Fet,
+                         'clwt_MnO':clwt_MnO,'clwt_FeOt/MnO':clwt_FeO/Fe2Fet/clwt_MnO,'clwt_SiO2':col['clcm_SiO2']*cm_tot*cm_mass['SiO2']/100,
+                         'clppm_Ni':col['clppm_Ni'],'clppm_Mn':col['clppm_Mn'],'Fo':col['Fo'],'olppm_Ni':col['olppm_Ni'],'olppm_Mn':col['olppm_Mn'],
+                         'olcm_MgO':col['olcm_MgO'],'olcm_FeO':col['olcm_FeO'],'(MgO+FeO)ol':col['ol_stoich'],
+                         'cmkdMgoll':col['cm_kdMg'],'cmkdFe2oll':col['cm_kdFe2'],'KDFe2Mgoll':col['kdFe2Mg'],
+                         'wtkdNioll':col['wt_kdNi'],'wtkdMnoll':col['wt_kdMn'],
+                         'clcm_MgO':col['clcm_MgO'],'clcm_FeO':col['clcm_FeO'],'clcm_SiO2':col['clcm_SiO2'],'clcm_Na2O':col['clcm_Na2O'],'clcm_K2O':col['clcm_K2O'],
+                         'clmolar_SiO2':col['clmolar_SiO2'],'clmolar_Na2O':col['clmolar_Na2O'],'clmolar_K2O':col['clmolar_K2O'],
+                         'molarSiO2_adjust':col['molarSiO2_adjust']})
+
+## parity checks against the dictionary functions of models2023.py
+# largest relative difference between two dataframes with the same columns (NaN in both is no difference)
+def max_rel_diff(df, ref):
+    if list(df.columns) != list(ref.columns) or len(df) != len(ref):
+        return np.inf
+    a = df.to_numpy(dtype=float)
+    b = ref.to_numpy(dtype=float)
+    both_nan = np.isnan(a) & np.isnan(b)
+    diff = np.abs(a-b)/np.maximum(np.abs(b),1e-300)
+    diff[both_nan | (a == b)] = 0
+    return float(np.nanmax(np.where(np.isnan(diff),np.inf,diff))) if diff.size else 0.
+
+# the default Hawaii and MORB sources melted from several initial pressures (garnet, garnet-spinel and spinel melting reactions),
+# and fractional and equilibrium olivine-only crystallization of the accumulated melts at several extents of melting
+def parity_cases():
+    from models2023 import scenarios
+    cases = []
+    for name, s in scenarios.items():
+        for Po in ([45,35,30] if name == 'Haw' else [25,20,15]):
+            cases.append((name+'_Po'+str(Po),s['source_wt'],s['source_phase'],Po,s['Fe2Fet']))
+    return cases
+
+def parity_check(rtol=1e-9, verbose=True):
+    from models2023 import melting_column, select_magma, olonly_model
+    worst = 0.
+    for name, source_wt, source_phase, Po, Fe2Fet in parity_cases():
+        diffs = {'melting':max_rel_diff(melting_column_kernel(source_wt,source_phase,Po),melting_column(source_wt,source_phase,Po,'polybaric'))}
+        melting_df = melting_column(source_wt,source_phase,Po,'polybaric')
+        for F_target in [0.05,0.10,0.20]:
+            ip_magma, magma = select_magma(melting_df,F_target,itg='itg1')
+            for model in ['fractional','equilibrium']:
+                diffs['olonly_%s_F%.2f' % (model,F_target)] = max_rel_diff(olonly_model_kernel(magma,Fe2Fet,Po,0.001,350,model),
+                                                                            olonly_model(magma,Fe2Fet,Po,0.001,350,model))
+        worst = max([worst]+list(diffs.values()))
+        if verbose:
+            print('%-12s %s' % (name,'  '.join('%s %.1e' % item for item in diffs.items())))
+    if verbose:
+        print('numba: %s, largest relative difference: %.2e (tolerance %.0e)' % (has_numba,worst,rtol))
+    return worst <= rtol
+
+if __name__ == '__main__':
+    sys.exit(0 if parity_check() else 1)
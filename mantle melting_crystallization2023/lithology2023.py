@@ -0,0 +1,133 @@
+# two-lithology (peridotite + pyroxenite) co-melting of a heterogeneous mantle
+# the Hawaiian source of 'melting_crystallization2023.py' is one pre-mixed composition (3% eclogite melt + 97% peridotite) melted in one column;
+# here the peridotite and the pyroxenite are melted in separate polybaric columns (melting_batch2023.py, both columns in one batch),
+# and their accumulated melts are mixed at every pressure in proportion to the mass of melt of each lithology:
+# F = (1-phi)*F_peridotite+phi*F_pyroxenite, C = ((1-phi)*F_peridotite*C_peridotite+phi*F_pyroxenite*C_pyroxenite)/F, phi = mass fraction of pyroxenite in the source
+# phi is an array, so a sweep of many lithology proportions costs the two columns and the mixing of arrays, not one melting column per proportion.
+# Both lithologies melt with the equations of the polybaric column (temperature and melt productivity of 'TPF_polyfrac'),
+# they differ by their compositions, modes and initial pressures (e.g., the pyroxenite starts to melt deeper, 'Po_pyroxenite').
+# pyroxenite: by default the hybrid of the peridotite and the eclogite melt of the Hawaiian source ('hybrid_source'),
+# the eclogite melt reacting with the peridotite to opx (the modes change as from 'source_phase_IonovMgO385' to 'source_phase_IonovMgO385_eclope').
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import sys
+import time
+from reactions2023 import phases
+from melting_batch2023 import melting_batch
+from olonly_batch2023 import magma_keys
+# eclogite-melt fertilized peridotite of 'melting_crystallization2023.py' (constants2023.py): 3% eclogite melt (run A177-82 of Pertermann and Hirschmann 2003)
+# mixed with 97% peridotite (MgO 38.5 wt%), the peridotite and its modes before adding the eclogite melt
+from constants2023 import eclope_fraction, source_wt_IonovMgO385 as peridotite_wt, source_phase_IonovMgO385 as peridotite_phase
+from constants2023 import source_wt_IonovMgO385_eclope as eclope_wt, source_phase_IonovMgO385_eclope as eclope_phase
+
+# eclogite melt composition (wt%) calculated back from the mixture, and the change of the modes per unit fraction of eclogite melt (the melt reacts to opx)
+eclogite_melt_wt = {key:(eclope_wt[key]-(1-eclope_fraction)*peridotite_wt[key])/eclope_fraction for key in peridotite_wt}
+eclogite_mode_change = {phase:(eclope_phase[phase]-peridotite_phase[phase])/eclope_fraction for phase in phases}
+
+# source of a peridotite mixed with the fraction ecl (number or array) of eclogite melt: compositions mixed by mass,
+# modes changed by 'eclogite_mode_change' per unit ecl (negative modes set to 0) and normalized to 100
+def eclogite_mix(source_wt, source_phase, ecl):
+    ecl = np.asarray(ecl, dtype=float)
+    mixed_wt = {key:(1-ecl)*np.asarray(value, dtype=float)+ecl*eclogite_melt_wt[key] for key, value in source_wt.items()}
+    modes = np.stack(np.broadcast_arrays(*[np.maximum(np.asarray(source_phase[phase], dtype=float)+ecl*eclogite_mode_change[phase], 0) for phase in phases]), axis=-1)
+    modes = 100*modes/modes.sum(axis=-1, keepdims=True)
+    return mixed_wt, {phase:modes[...,j] for j, phase in enumerate(phases)}
+
+# hybrid pyroxenite: the peridotite reacted with the fraction x of eclogite melt, x=0.2 gives an olivine-poorer, opx-rich source (43% ol, 27.5% opx);
+# above x of about 0.25 the melts are outside the parameterization of the column (the major elements of the melts are NaN)
+def hybrid_source(x=0.2, source_wt=peridotite_wt, source_phase=peridotite_phase):
+    mixed_wt, mixed_phase = eclogite_mix(source_wt, source_phase, x)
+    return {key:float(value) for key, value in mixed_wt.items()}, {phase:float(value) for phase, value in mixed_phase.items()}
+
+# co-melting of a peridotite and a pyroxenite column and the mixing of their accumulated melts (itg1) for the pyroxenite fractions phi (array m)
+# the columns are put on the pressure steps of both columns (interpolated between the steps): a lithology has no melt above its initial pressure,
+# and keeps its last accumulated melt below its last step (a column stops where its own melt could form the crust, see 'TPF_polyfrac')
+# returns a dictionary: 'P kbar' (steps), 'F_liq' and 'cl<oxide>_wt' (steps, m) of the mixed melt, 'F_peridotite' and 'F_pyroxenite' (steps)
+# the melt fraction of each lithology, 'pyroxenite_melt' (steps, m) the fraction of the mixed melt from the pyroxenite, and 'columns': the output of 'melting_batch'
+def comelting(phi, peridotite=(peridotite_wt, peridotite_phase), pyroxenite=None, Po=45, Po_pyroxenite=None, keys=magma_keys, kd=None):
+    pyroxenite = hybrid_source() if pyroxenite is None else pyroxenite
+    phi = np.atleast_1d(np.asarray(phi, dtype=float))
+    Po_pyroxenite = Po if Po_pyroxenite is None else Po_pyroxenite
+    source_wt = {key:np.array([peridotite[0][key], pyroxenite[0][key]]) for key in peridotite[0]}
+    source_phase = {phase:np.array([peridotite[1][phase], pyroxenite[1][phase]]) for phase in phases}
+    columns = melting_batch(source_wt, source_phase, np.array([Po, Po_pyroxenite], dtype=float), kd)
+    P = np.unique(columns['P kbar'][np.isfinite(columns['P kbar'])])[::-1]  # the pressure steps of both columns, decreasing
+    # F and F*C of each lithology at P (P decreases, np.interp needs increasing values)
+    F, M = [], []
+    for c in range(2):
+        ok = np.isfinite(columns['P kbar'][:,c])
+        Pc = columns['P kbar'][ok,c][::-1]
+        F.append(np.interp(P, Pc, columns['F_liq_itg1'][ok,c][::-1], right=0.))
+        M.append({key:np.interp(P, Pc, (columns['F_liq_itg1'][:,c]*columns['cl'+key+'_wt_itg1'][:,c])[ok][::-1], right=0.) for key in keys})
+    F_mix = np.outer(F[0], 1-phi)+np.outer(F[1], phi)
+    out = {'P kbar':P, 'F_liq':F_mix, 'F_peridotite':F[0], 'F_pyroxenite':F[1], 'phi':phi, 'columns':columns}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for key in keys:
+            out['cl'+key+'_wt'] = (np.outer(M[0][key], 1-phi)+np.outer(M[1][key], phi))/F_mix
+        out['pyroxenite_melt'] = np.outer(F[1], phi)/F_mix
+    return out
+
+# mixed magma of every pyroxenite fraction at the mixed extent of melting F_target (number or array m), interpolated between the pressure steps,
+# NaN where F_target is not reached; returns the magma (dictionary of arrays m, wt%), the pressure and the pyroxenite fraction of the melt
+def select_mixed_magma(mix, F_target, keys=magma_keys):
+    m = mix['F_liq'].shape[1]
+    F_target = np.broadcast_to(np.asarray(F_target, dtype=float), (m,))
+    magma = {key:np.full(m, np.nan) for key in keys}
+    P = np.full(m, np.nan)
+    pyroxenite_melt = np.full(m, np.nan)
+    for i in range(m):
+        F = mix['F_liq'][:,i]
+        ok = np.isfinite(F)
+        if np.sum(ok) >= 2 and F[ok][0] <= F_target[i] <= F[ok][-1]:
+            for key in keys:
+                magma[key][i] = np.interp(F_target[i], F[ok], mix['cl'+key+'_wt'][ok,i])
+            P[i] = np.interp(F_target[i], F[ok], mix['P kbar'][ok])
+            pyroxenite_melt[i] = np.interp(F_target[i], F[ok], mix['pyroxenite_melt'][ok,i])
+    return magma, P, pyroxenite_melt
+
+## checks: without pyroxenite (phi=0) and with only pyroxenite (phi=1) the mixed melts are the melts of the columns,
+# the time of a sweep of 101 pyroxenite fractions against one melting column per fraction of the pre-mixed sources,
+# and the Ni of the mixed magmas of Hawaii at F=0.06 (olivine-only crystallization of all mixed magmas in one batch)
+if __name__ == '__main__':
+    from melting_batch2023 import melting_batch as columns_batch
+    from olonly_batch2023 import olonly_batch
+    ok = True
+    pyroxenite = hybrid_source()
+    print('hybrid pyroxenite (x=0.2): MgO %.1f SiO2 %.1f NiO %.3f wt%%, modes %s'
+          % (pyroxenite[0]['MgO'], pyroxenite[0]['SiO2'], pyroxenite[0]['NiO'], {p:round(v, 1) for p, v in pyroxenite[1].items()}))
+    mixed = eclogite_mix(peridotite_wt, peridotite_phase, eclope_fraction)
+    same_source = max(abs(mixed[0][key]-eclope_wt[key]) for key in eclope_wt) < 1e-12 and max(abs(mixed[1][p]-eclope_phase[p]) for p in phases) < 1e-12
+    print('3%% eclogite melt gives source_wt_IonovMgO385_eclope: %s' % same_source)
+    for Po_pyroxenite in (45, 50.5):
+        mix = comelting([0., 1.], Po=45, Po_pyroxenite=Po_pyroxenite)
+        c = mix['columns']
+        diff = 0.
+        for col, phi in ((0, 0), (1, 1)):
+            good = np.isfinite(c['P kbar'][:,col])
+            rows = np.searchsorted(-mix['P kbar'], -c['P kbar'][good,col])
+            diff = max([diff, np.max(np.abs(mix['F_liq'][rows,phi]/c['F_liq_itg1'][good,col]-1))]
+                       +[np.max(np.abs(mix['cl'+key+'_wt'][rows,phi]/c['cl'+key+'_wt_itg1'][good,col]-1)) for key in ('MgO','FeO','NiO','MnO')])
+        print('Po pyroxenite %.1f kbar: phi 0 and 1 same as the columns, largest relative difference %.1e' % (Po_pyroxenite, diff))
+        ok = ok and diff < 1e-12
+    phi = np.linspace(0, 1, 101)
+    start = time.perf_counter()
+    mix = comelting(phi, Po=45, Po_pyroxenite=50)
+    magma, P, pyroxenite_melt = select_mixed_magma(mix, 0.06)
+    sweep_time = time.perf_counter()-start
+    # one column per proportion: the pre-mixed source of every phi melted from Po=45 (all columns in one batch, itself much faster than one run per column)
+    start = time.perf_counter()
+    premixed_wt = {key:(1-phi)*peridotite_wt[key]+phi*pyroxenite[0][key] for key in peridotite_wt}
+    premixed_phase = {p:(1-phi)*peridotite_phase[p]+phi*pyroxenite[1][p] for p in phases}
+    columns_batch(premixed_wt, premixed_phase, np.full(len(phi), 45.))
+    premixed_time = time.perf_counter()-start
+    print('101 pyroxenite fractions: co-melting and mixing %.3f s, 101 pre-mixed columns %.3f s' % (sweep_time, premixed_time))
+    out = olonly_batch(magma, T_range=350)
+    for i in (0, 10, 30, 50, 100):
+        fo = out['Fo'][:,i]
+        k = np.nanargmin(np.abs(fo-88))
+        print('phi %.2f: magma at F 0.06 from P %.1f kbar, %.0f%% pyroxenite melt, MgO %.1f NiO %.3f wt%%, olivine Ni at Fo 88: %.0f ppm'
+              % (phi[i], P[i], 100*pyroxenite_melt[i], magma['MgO'][i], magma['NiO'][i], out['olppm_Ni'][k,i]))
+    ok = ok and same_source and all(np.all(np.isfinite(magma[key])) for key in magma)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,309 @@
+# Bayesian inversion of the mantle source and the initial pressure Po from the natural olivine and glass data by ensemble MCMC
+# sampler: affine-invariant ensemble sampler with the stretch move (Goodman and Weare 2010), the walkers are split into two halves
+# and all proposals of one half are evaluated together, i.e., one batch of the forward model of inversion2023.py
+# (batched melting and olivine-only crystallization, one melting column and one magma per walker), optionally split over several processes.
+# posterior: uniform prior within the bounds of the parameters, Gaussian likelihood of the per-bin residuals of the panels (misfit2023.py),
+# log posterior = -chi2/2 ('chi2' metric of 'Inversion'); the parameters are oxides and modes of the peridotite, Po, F
+# and 'ecl', the fraction of eclogite melt mixed into the peridotite (run A177-82 of Pertermann and Hirschmann 2003, as in the Hawaiian source).
+# The chains are appended to files on disk every few steps, so a run can be read while running and resumed after it stops,
+# and the convergence is checked by the integrated autocorrelation time, the effective sample size and the split R-hat of every parameter.
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import pandas as pd
+import json
+import os
+import sys
+import time
+from reactions2023 import phases
+from inversion2023 import Inversion
+from constants2023 import eclope_fraction, source_wt_IonovMgO385 as peridotite_wt, source_phase_IonovMgO385 as peridotite_phase
+from constants2023 import source_wt_IonovMgO385_eclope as eclope_wt, source_phase_IonovMgO385_eclope as eclope_phase
+from lithology2023 import eclogite_mix
+
+# log posterior of a scenario, called with parameter vectors X (m, parameters) and returns an array (m), -inf outside the bounds
+# setting, bounds and other inputs as 'Inversion' (inversion2023.py), with the peridotite as 'source_wt' and 'source_phase';
+# 'NiO', 'MnO' etc. are the oxides of the peridotite, 'ecl' (0-1) the fraction of eclogite melt mixed into it
+class Posterior(Inversion):
+    def __init__(self, setting, bounds, metric='chi2', penalty=np.inf, **kwargs):
+        Inversion.__init__(self, setting, bounds, metric=metric, penalty=penalty, **kwargs)
+
+    def known(self, name):
+        return name == 'ecl' or Inversion.known(self, name)
+
+    # source of the forward model: the peridotite of the parameters mixed with the eclogite melt
+    def inputs(self, X):
+        X = np.atleast_2d(X)
+        source_wt, source_phase, Po, F = Inversion.inputs(self, X)
+        if 'ecl' in self.names:
+            source_wt, source_phase = eclogite_mix(source_wt, source_phase, X[:,self.names.index('ecl')])
+        return source_wt, source_phase, Po, F
+
+    def __call__(self, X):
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        inside = np.all((X >= self.lower) & (X <= self.upper), axis=1)
+        log_prob = np.full(X.shape[0], -np.inf)
+        if np.any(inside):
+            log_prob[inside] = -0.5*self.misfit(X[inside])
+        return log_prob
+
+    # samples of a chain (steps, walkers, parameters) as a dataframe, with the NiO and MnO (wt%) and NiO/MnO of the mixed source
+    def samples(self, chain):
+        X = chain.reshape(-1, chain.shape[-1])
+        table = pd.DataFrame(X, columns=self.names)
+        source_wt = self.inputs(X)[0]
+        table['source_NiO'], table['source_MnO'] = source_wt['NiO'], source_wt['MnO']
+        table['source_NiO/MnO'] = source_wt['NiO']/source_wt['MnO']
+        return table
+
+# chains on disk: '<path>.chain' and '<path>.log_prob' (float64, appended one step of all walkers at a time)
+# and '<path>.json' (parameter names, number of walkers, number of stored steps, acceptance counts and the state of the random generator)
+class ChainStore:
+    def __init__(self, path, names, n_walkers):
+        self.path = path
+        self.names = list(names)
+        self.n_walkers = n_walkers
+        self.buffer = []
+
+    def exists(self):
+        return os.path.exists(self.path+'.json')
+
+    def read_state(self):
+        with open(self.path+'.json') as f:
+            state = json.load(f)
+        if state['names'] != self.names or state['n_walkers'] != self.n_walkers:
+            raise ValueError('the stored chains have other parameters or walkers: '+self.path)
+        return state
+
+    # start new files, or keep the stored steps (files cut to the steps of the json file, e.g., after a stop between writing a step and the json file)
+    def open(self, resume=False):
+        done = self.read_state()['done'] if resume else 0
+        d = len(self.names)
+        for ext, width in (('.chain', self.n_walkers*d), ('.log_prob', self.n_walkers)):
+            with open(self.path+ext, 'ab') as f:
+                f.truncate(done*width*8)
+        return done
+
+    def append(self, x, log_prob):
+        self.buffer.append((x.copy(), log_prob.copy()))
+
+    # write the buffered steps, then the json file (replaced at once, so it never counts steps that are not written)
+    def flush(self, done, accepted, rng, extra=None):
+        if self.buffer:
+            with open(self.path+'.chain', 'ab') as f:
+                f.write(b''.join(x.astype(np.float64).tobytes() for x, _ in self.buffer))
+            with open(self.path+'.log_prob', 'ab') as f:
+                f.write(b''.join(lp.astype(np.float64).tobytes() for _, lp in self.buffer))
+            self.buffer = []
+        state = {'names':self.names, 'n_walkers':self.n_walkers, 'done':int(done), 'accepted':[int(a) for a in accepted],
+                 'rng':rng.bit_generator.state}
+        state.update(extra or {})
+        with open(self.path+'.json.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(self.path+'.json.tmp', self.path+'.json')
+
+# stored chains of a run (also while it is running): chain (steps, walkers, parameters), log_prob (steps, walkers) and the json state
+def load_chain(path):
+    with open(path+'.json') as f:
+        state = json.load(f)
+    n, w, d = state['done'], state['n_walkers'], len(state['names'])
+    chain = np.fromfile(path+'.chain', dtype=np.float64, count=n*w*d).reshape(n, w, d)
+    log_prob = np.fromfile(path+'.log_prob', dtype=np.float64, count=n*w).reshape(n, w)
+    return chain, log_prob, state
+
+# log posterior evaluated in the worker processes, the posterior is sent once to every worker
+_worker_target = None
+
+def _init_worker(log_prob):
+    global _worker_target
+    _worker_target = log_prob
+
+def _worker_log_prob(X):
+    return np.asarray(_worker_target(X), dtype=float)
+
+# log posterior of the walkers X in one call, or split into one batch per worker process
+def _evaluate(log_prob, X, pool, workers):
+    if pool is None:
+        return np.asarray(log_prob(X), dtype=float)
+    return np.concatenate(list(pool.map(_worker_log_prob, np.array_split(X, workers))))
+
+# starting walkers: the n_walkers best points of a Latin hypercube of n_screen points within the bounds (one batch), all with finite log posterior
+def initial_walkers(log_prob, lower, upper, n_walkers, n_screen=None, seed=0):
+    from scipy.stats import qmc
+    n_screen = 4*n_walkers if n_screen is None else n_screen
+    X = qmc.scale(qmc.LatinHypercube(d=len(lower), seed=seed).random(n_screen), lower, upper)
+    lp = np.asarray(log_prob(X), dtype=float)
+    if np.sum(np.isfinite(lp)) < n_walkers:
+        raise ValueError('fewer than n_walkers points of the screen have a finite log posterior, narrow the bounds or screen more points')
+    return X[np.argsort(-np.where(np.isfinite(lp), lp, -np.inf), kind='stable')[:n_walkers]]
+
+# affine-invariant ensemble sampling of log_prob (called with an array (m, parameters), returns an array (m))
+# p0: starting walkers (walkers, parameters), an even number of walkers, at least twice the number of parameters, all with finite log_prob
+# a: scale of the stretch move; workers: processes evaluating the walkers (1: in this process)
+# store: path of the chain files (None: chains kept in memory only), written every 'flush_every' steps;
+# resume: continue the stored run up to n_steps (the same seed and walkers give the same chains as one uninterrupted run)
+# returns a dictionary: 'chain' (steps, walkers, parameters), 'log_prob' (steps, walkers), 'acceptance' (fraction of accepted moves of each walker)
+def ensemble_sample(log_prob, p0, n_steps, names=None, a=2., seed=0, workers=1, store=None, resume=False, flush_every=10):
+    x = np.array(p0, dtype=float)
+    n_walkers, d = x.shape
+    if n_walkers%2 or n_walkers < 2*d:
+        raise ValueError('the number of walkers must be even and at least twice the number of parameters')
+    names = ['x%d' % k for k in range(d)] if names is None else list(names)
+    pool = None
+    if workers != 1:
+        from concurrent.futures import ProcessPoolExecutor
+        workers = os.cpu_count() if workers is None else workers
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(log_prob,))
+    try:
+        rng = np.random.default_rng(seed)
+        accepted = np.zeros(n_walkers, dtype=int)
+        chain_store = None if store is None else ChainStore(store, names, n_walkers)
+        start = 0
+        if chain_store is not None and resume and chain_store.exists():
+            start = chain_store.open(resume=True)
+            chain, lps, state = load_chain(store)
+            rng.bit_generator.state = state['rng']
+            accepted = np.array(state['accepted'], dtype=int)
+            x, lp = chain[-1].copy(), lps[-1].copy()
+            chain, lps = list(chain), list(lps)
+        else:
+            lp = _evaluate(log_prob, x, pool, workers)
+            if not np.all(np.isfinite(lp)):
+                raise ValueError('all starting walkers must have a finite log posterior')
+            chain, lps = [], []
+            if chain_store is not None:
+                chain_store.open(resume=False)
+        half = n_walkers//2
+        groups = (np.arange(half), np.arange(half, n_walkers))
+        for step in range(start, n_steps):
+            for k in (0, 1):
+                S, C = groups[k], groups[1-k]
+                z = ((a-1)*rng.random(len(S))+1)**2/a  # stretch factors, density proportional to 1/sqrt(z) in [1/a, a]
+                partners = x[C][rng.integers(len(C), size=len(S))]
+                proposal = partners+z[:,None]*(x[S]-partners)
+                lp_new = _evaluate(log_prob, proposal, pool, workers)
+                with np.errstate(invalid='ignore'):
+                    log_accept = (d-1)*np.log(z)+lp_new-lp[S]
+                accept = np.log(rng.random(len(S))) < log_accept
+                x[S[accept]] = proposal[accept]
+                lp[S[accept]] = lp_new[accept]
+                accepted[S[accept]] += 1
+            chain.append(x.copy())
+            lps.append(lp.copy())
+            if chain_store is not None:
+                chain_store.append(x, lp)
+                if (step+1)%flush_every == 0 or step+1 == n_steps:
+                    chain_store.flush(step+1, accepted, rng, {'a':a, 'seed':seed})
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    chain = np.array(chain).reshape(-1, n_walkers, d)
+    return {'chain':chain, 'log_prob':np.array(lps).reshape(-1, n_walkers), 'acceptance':accepted/max(len(chain), 1), 'names':names}
+
+# integrated autocorrelation time of every parameter of a chain (steps, walkers, parameters):
+# autocorrelation function of each walker (FFT), averaged over the walkers, summed up to the first lag M >= c*tau(M) (Sokal 1997)
+def autocorr_time(chain, c=5.):
+    n = chain.shape[0]
+    size = 2**int(np.ceil(np.log2(2*n)))
+    tau = np.full(chain.shape[2], np.nan)
+    for k in range(chain.shape[2]):
+        x = chain[:,:,k]-np.mean(chain[:,:,k], axis=0)
+        acf = np.fft.irfft(np.abs(np.fft.rfft(x, n=size, axis=0))**2, n=size, axis=0)[:n]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rho = np.nanmean(acf/acf[0], axis=1)
+        if not np.all(np.isfinite(rho)):
+            continue
+        taus = 2*np.cumsum(rho)-1
+        window = np.arange(n) >= c*taus
+        tau[k] = taus[np.argmax(window)] if np.any(window) else taus[-1]
+    return tau
+
+# split R-hat of every parameter: each walker split into two halves, between-chain and within-chain variances (Gelman et al. 2013)
+def split_rhat(chain):
+    h = chain.shape[0]//2
+    if h < 2:
+        return np.full(chain.shape[2], np.nan)
+    chains = np.concatenate([chain[:h], chain[h:2*h]], axis=1)
+    within = np.mean(np.var(chains, axis=0, ddof=1), axis=0)
+    between = h*np.var(np.mean(chains, axis=0), axis=0, ddof=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.sqrt(((h-1)/h*within+between/h)/within)
+
+# summary and convergence of a chain after discarding 'burn' steps (default: the first half)
+# columns: mean, sd, percentiles, tau (autocorrelation time in steps), ess (effective sample size), rhat (split R-hat),
+# steps/tau and 'converged' (at least 50 autocorrelation times and R-hat below 1.05)
+def diagnostics(chain, names=None, burn=None, percentiles=(5, 50, 95)):
+    burn = chain.shape[0]//2 if burn is None else burn
+    kept = chain[burn:]
+    names = ['x%d' % k for k in range(chain.shape[2])] if names is None else names
+    flat = kept.reshape(-1, kept.shape[2])
+    table = pd.DataFrame({'mean':flat.mean(axis=0), 'sd':flat.std(axis=0, ddof=1)}, index=names)
+    for p in percentiles:
+        table['p'+str(p)] = np.percentile(flat, p, axis=0)
+    tau = autocorr_time(kept)
+    table['tau'] = tau
+    with np.errstate(invalid='ignore', divide='ignore'):
+        table['ess'] = kept.shape[0]*kept.shape[1]/tau
+        table['steps/tau'] = kept.shape[0]/tau
+    table['rhat'] = split_rhat(kept)
+    table['converged'] = (table['steps/tau'] >= 50) & (table['rhat'] < 1.05)
+    return table
+
+# Bayesian inversion of one scenario: posterior, starting walkers (screen of the bounds) and the ensemble sampling
+# returns the result of 'ensemble_sample' with 'posterior', 'diagnostics' and 'samples' (after burn-in, with the mixed-source NiO/MnO)
+def run_mcmc(setting, bounds, n_walkers=32, n_steps=500, seed=0, workers=1, store=None, resume=False, burn=None, **kwargs):
+    posterior = Posterior(setting, bounds, **kwargs)
+    p0 = initial_walkers(posterior, posterior.lower, posterior.upper, n_walkers, seed=seed)
+    result = ensemble_sample(posterior, p0, n_steps, posterior.names, seed=seed, workers=workers, store=store, resume=resume)
+    burn = len(result['chain'])//2 if burn is None else burn
+    result.update(posterior=posterior, diagnostics=diagnostics(result['chain'], posterior.names, burn), samples=posterior.samples(result['chain'][burn:]))
+    return result
+
+# correlated 2-D Gaussian, target of the check of the sampler
+_mean = np.array([1., -2.])
+_cov = np.array([[1., 0.8], [0.8, 2.]])
+
+def _gaussian(X):
+    r = np.atleast_2d(X)-_mean
+    return -0.5*np.einsum('ij,jk,ik->i', r, np.linalg.inv(_cov), r)
+
+## checks: the sampler recovers the mean and covariance of a Gaussian, a resumed run gives the same chains as one run,
+# and the posteriors of the peridotite NiO and MnO, the eclogite melt fraction and Po of Hawaii and MORB ('python mcmc2023.py [steps]')
+if __name__ == '__main__':
+    import tempfile
+    ok = True
+    p0 = _mean+0.1*np.random.default_rng(1).standard_normal((32, 2))
+    run = ensemble_sample(_gaussian, p0, 3000, seed=2)
+    table = diagnostics(run['chain'], burn=500)
+    flat = run['chain'][500:].reshape(-1, 2)
+    mean_error = np.max(np.abs(flat.mean(axis=0)-_mean))
+    cov_error = np.max(np.abs(np.cov(flat.T)/_cov-1))
+    print('Gaussian: mean error %.3f, covariance error %.3f, acceptance %.2f, tau %s, R-hat %s'
+          % (mean_error, cov_error, run['acceptance'].mean(), np.round(table['tau'].values, 1), np.round(table['rhat'].values, 3)))
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'gaussian')
+        ensemble_sample(_gaussian, p0, 120, seed=3, store=path, flush_every=7)
+        resumed = ensemble_sample(_gaussian, p0, 200, seed=3, store=path, resume=True, flush_every=7)
+        whole = ensemble_sample(_gaussian, p0, 200, seed=3)
+        stored = load_chain(path)[0]
+        same = np.array_equal(stored, whole['chain']) and np.array_equal(resumed['chain'], whole['chain'])
+    print('resumed run same as one run: %s' % same)
+    ok = ok and mean_error < 0.15 and cov_error < 0.2 and same
+    # Hawaii and MORB: the Hawaiian source is the peridotite with 3% eclogite melt, the MORB source the spinel peridotite
+    from models2023 import scenarios
+    s = dict(scenarios['Haw'], source_wt=peridotite_wt, source_phase=peridotite_phase, data='Haw')
+    mixed = Posterior(s, {'ecl':(0, 0.1)}).inputs([[eclope_fraction]])
+    ok = ok and max(abs(mixed[0][key][0]-eclope_wt[key]) for key in eclope_wt) < 1e-12 and max(abs(mixed[1][p][0]-eclope_phase[p]) for p in phases) < 1e-12
+    n_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    bounds = {'NiO':(0.2,0.3), 'MnO':(0.11,0.16), 'ecl':(0.,0.1), 'Po':(20.,60.)}
+    for name, data in (('Haw', 'Haw'), ('MORB', 'MORB')):
+        setting = dict(scenarios[name], data=data) if name == 'MORB' else s
+        start = time.perf_counter()
+        result = run_mcmc(setting, bounds, n_walkers=16, n_steps=n_steps, seed=0)
+        seconds = time.perf_counter()-start
+        print('%s: %d walkers x %d steps in %.1f s (%d forward evaluations), acceptance %.2f' % (name, 16, n_steps, seconds,
+              result['posterior'].evaluations, result['acceptance'].mean()))
+        print(result['diagnostics'][['p5','p50','p95','tau','ess','rhat','converged']].to_string(float_format=lambda v:'%.4g' % v))
+        print('source NiO/MnO p5-p50-p95: %.3f-%.3f-%.3f' % tuple(np.percentile(result['samples']['source_NiO/MnO'], (5, 50, 95))))
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,247 @@
+# polybaric fractional melting with an adaptive pressure step
+# 'melting_column' (models2023.py) decompresses by 1 kbar per step, the same resolution through garnet exhaustion and cpx-out as through the smooth parts.
+# Here each step of dP kbar is compared with two steps of dP/2 (step doubling): the difference of the oxides added to the accumulated melt
+# is the error estimate and the step is extrapolated from both (2*halves-full), a step is repeated with a smaller dP when the error is larger than 'tol', and dP grows where the melting is smooth.
+# A step in which the reaction rule changes (a phase is exhausted, reactions2023.py) is repeated with half dP until dP reaches 'dP_min',
+# so the exhaustion points are resolved, and the last step is refined in the same way so that the melting stops close to the top of the column.
+# The melting step is the same as 'melting_step_batch' (melting_batch2023.py): f_step = dP times the melt productivity per kbar of 'TPF_polyfrac',
+# the garnet-spinel conversion below 30 kbar (20% of garnet per 1 kbar step) is scaled to dP, and the column averages (itg2) are integrals over pressure ('itg_steps').
+# With dP = 1 kbar ('melting_polyfrac_steps') the results are the same as 'melting_column'.
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import pandas as pd
+import sys
+from melting_function2023 import wttocm
+from reactions2023 import phases, mineral_phase_rules
+from kernels2023 import res_keys
+from melting_batch2023 import batch_inputs, batch_names, melting_step_batch, itg_batch
+
+# melt productivity of 'TPF_polyfrac', extent of melting per kbar of decompression
+def productivity(P, f):
+    return np.where(f <= 0.215, 0.01*12/(6+6*(1-P/88)), 0.01*12/(9+9*(1-P/88)))  # f <= 0.215: same as round(f,2) < 0.22
+
+# first step of the columns at Po (f = 0.0000001), as in 'melting_polyfrac_batch'
+# returns the state of the columns (dictionary of arrays) and the output of the step (see 'batch_names')
+def first_step(source_wt, source_fm, Po, mgnumber_source, source_cm):
+    n = len(Po)
+    res = {key:source_wt[key].copy() for key in res_keys}
+    res['MgO'] = source_cm['MgO']*100
+    res['FeO'] = source_cm['FeO']*100
+    res['mgnumber'] = np.zeros(n)
+    bulkD = {'K2O':np.full(n, 0.005),'Na2O':np.zeros(n),'TiO2':np.zeros(n),'Ni':np.zeros(n),'Mn':np.zeros(n)}
+    f = np.full(n, 0.0000001)
+    T = 13*Po+1140+600*(1-Po/88)*f+20*(mgnumber_source-89)
+    fm, rule = mineral_phase_rules(Po, Po, f, source_fm)
+    step, res, bulkD = melting_step_batch(T, Po.copy(), f.copy(), fm, res, bulkD, Po)
+    step.update({'T':T,'P':Po.copy(),'f':f,'f_step':f.copy(),'phase_tot':fm.sum(axis=1),'dP':np.zeros(n)})
+    step.update({'f_'+phase:fm[:,j] for j, phase in enumerate(phases)})
+    state = {'P':Po.copy(),'f':f.copy(),'fm':fm.copy(),'res':{key:res[key].copy() for key in res},
+             'bulkD':{key:bulkD[key].copy() for key in bulkD},'rule':rule,'p_remain':-Po}  # copies, the state is changed in place
+    return state, step
+
+# one melting step of dP kbar of the columns, same equations as 'TPF_polyfrac' and 'melting_step_batch'
+# state: dictionary of arrays of the columns (see 'first_step'), returns the new state and the output of the step
+def polyfrac_step(state, dP, Po, mgnumber_source):
+    f_step = dP*productivity(state['P'], state['f'])
+    f = state['f']+f_step
+    P = state['P']-dP
+    T = 13*P+1140+600*(1-P/88)*f+20*(mgnumber_source-89)
+    fm, rule = mineral_phase_rules(Po, P, f_step, state['fm'], dP=dP)
+    step, res, bulkD = melting_step_batch(T, P, f_step, fm, state['res'], state['bulkD'], Po)
+    crust_thickness = 0.5*f/(Po-P)*(Po-P)**2*10.2/(2.6212*Po**0.038)
+    step.update({'T':T,'P':P,'f':f,'f_step':f_step,'phase_tot':fm.sum(axis=1),'dP':dP})
+    step.update({'f_'+phase:fm[:,j] for j, phase in enumerate(phases)})
+    return {'P':P,'f':f,'fm':fm,'res':res,'bulkD':bulkD,'rule':rule,'p_remain':crust_thickness/3-P}, step
+
+# state or step of the columns i
+def _take(d, i):
+    return {key:(_take(value, i) if isinstance(value, dict) else value[i]) for key, value in d.items()}
+
+# oxides added to the accumulated melt by a step (wt% times extent of melting)
+def _melt_added(step):
+    return np.array([step['cl_wt_'+key]*step['f_step'] for key in res_keys+['SiO2']])
+
+# local extrapolation of two steps of dP/2 (b) with one step of dP (a) of the columns: 2b-a (Richardson, the error of the steps is proportional to dP),
+# b where 'keep' is True (the reaction rule changes within the step) and for the pressure, rule and pressure step
+def _extrapolate(a, b, keep):
+    return {key:(_extrapolate(a[key], b[key], keep) if isinstance(b[key], dict)
+                 else (b[key] if key in ('P','rule','dP') else np.where(keep.reshape((-1,)+(1,)*(np.ndim(b[key])-1)), b[key], 2*b[key]-a[key]))) for key in b}
+
+# rows of the columns (list of (column index, step)) as arrays (steps, columns), NaN after the last step of a column
+def _rows_to_arrays(rows, n):
+    counts = np.bincount(np.concatenate([i for i, step in rows]), minlength=n)
+    out = {batch_names.get(key, key):np.full((int(counts.max()), n), np.nan) for key in rows[0][1]}
+    k = np.zeros(n, dtype=int)
+    for i, step in rows:
+        for key, value in step.items():
+            out[batch_names.get(key, key)][k[i],i] = value
+        k[i] += 1
+    out['steps'] = counts
+    return out
+
+# polybaric fractional melting of all columns with a fixed pressure step dP (kbar), e.g., a fine reference for 'melting_polyfrac_adaptive'
+# same output as 'melting_polyfrac_batch' with the pressure step of each step ('dP'), dP = 1 gives the same steps as 'melting_polyfrac_batch'
+def melting_polyfrac_steps(source_wt, source_phase, Po, dP=1.):
+    Po, source_wt, source_fm = batch_inputs(source_wt, source_phase, Po)
+    source_cm, mgnumber_source = wttocm(source_wt)
+    state, step = first_step(source_wt, source_fm, Po, mgnumber_source, source_cm)
+    rows = [(np.arange(len(Po)), step)]
+    active = np.arange(len(Po))
+    count = np.ones(len(Po), dtype=int)
+    max_steps = (Po/dP).astype(int)+3  # the melting stops before P<0 as in 'melting_polyfrac_batch'
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        while len(active) > 0:
+            i = active
+            new, step = polyfrac_step(_take(state, i), np.full(len(i), float(dP)), Po[i], mgnumber_source[i])
+            count[i] += 1
+            for key in state:
+                if isinstance(state[key], dict):
+                    for name in state[key]:
+                        state[key][name][i] = new[key][name]
+                else:
+                    state[key][i] = new[key]
+            rows.append((i, step))
+            active = i[(new['p_remain'] <= 0) & (count[i] < max_steps[i])]
+    return _rows_to_arrays(rows, len(Po))
+
+# polybaric fractional melting of all columns with an adaptive pressure step
+# every step of dP kbar is also calculated as two steps of dP/2: their difference is the error estimate and the step is extrapolated from both ('_extrapolate')
+# tol: error of the oxides added to the accumulated melt by a step relative to the accumulated melt, per kbar
+# dP_min, dP_max: smallest and largest pressure steps in kbar, dP0: first pressure step
+# same output as 'melting_polyfrac_steps' with 'evaluations': number of melting steps calculated for each column (three per try, accepted or not)
+def melting_polyfrac_adaptive(source_wt, source_phase, Po, tol=1e-3, dP_min=0.02, dP_max=5., dP0=0.5):
+    Po, source_wt, source_fm = batch_inputs(source_wt, source_phase, Po)
+    n = len(Po)
+    source_cm, mgnumber_source = wttocm(source_wt)
+    state, step = first_step(source_wt, source_fm, Po, mgnumber_source, source_cm)
+    rows = [(np.arange(n), step)]
+    accumulated = _melt_added(step)
+    dP = np.full(n, float(dP0))
+    evaluations = np.ones(n, dtype=int)
+    active = np.arange(n)
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        while len(active) > 0:
+            i = active
+            # the step ends at 30 kbar when it crosses it (the garnet-spinel conversion starts), and not below 0 kbar
+            P = state['P'][i]
+            dP_i = np.where((P > 30) & (P-dP[i] < 30), P-30, np.minimum(dP[i], np.maximum(P, dP_min)))
+            start = _take(state, i)
+            full, full_step = polyfrac_step(start, dP_i, Po[i], mgnumber_source[i])
+            half1, half1_step = polyfrac_step(start, dP_i/2, Po[i], mgnumber_source[i])
+            half2, half2_step = polyfrac_step(half1, dP_i/2, Po[i], mgnumber_source[i])
+            evaluations[i] += 3
+            added_full = _melt_added(full_step)
+            added = _melt_added(half1_step)+_melt_added(half2_step)
+            error = np.max(np.abs(added_full-added)/np.abs(accumulated[:,i]+added), axis=0)/dP_i
+            refine = dP_i > dP_min
+            event = (half1['rule'] != start['rule']) | (half2['rule'] != half1['rule']) | (half2['p_remain'] > 0)
+            accept = ~refine | ((error <= tol) & ~event)
+            # next pressure step: smaller after a rejected step (half of it when the rule changes), larger (at most twice) after an accepted step
+            scale = np.clip(0.9*np.sqrt(tol/np.maximum(error, 1e-300)), 0.2, 2.)
+            dP[i] = np.clip(np.where(accept, dP_i*scale, np.where(event & (error <= tol), dP_i/2, dP_i*np.minimum(scale, 0.5))), dP_min, dP_max)
+            j = np.flatnonzero(accept)
+            if len(j) > 0:
+                keep = event[j]
+                new = _extrapolate(_take(full, j), _take(half2, j), keep)
+                half2_step = _take(half2_step, j)
+                half2_step['f_step'] = half1_step['f_step'][j]+half2_step['f_step']  # the two steps of dP/2 as one step of dP
+                half2_step['dP'] = dP_i[j]
+                row = _extrapolate(_take(full_step, j), half2_step, keep)
+                added = np.where(keep, added[:,j], 2*added[:,j]-added_full[:,j])
+                row['f_step'] = row['f']-start['f'][j]
+                for k, key in enumerate(res_keys+['SiO2']):
+                    row['cl_wt_'+key] = added[k]/row['f_step']
+                for key in state:
+                    if isinstance(state[key], dict):
+                        for name in state[key]:
+                            state[key][name][i[j]] = new[key][name]
+                    else:
+                        state[key][i[j]] = new[key]
+                accumulated[:,i[j]] += added
+                rows.append((i[j], row))
+            active = i[~accept | ((half2['p_remain'] <= 0) & (half2['P'] > 0))]
+    out = _rows_to_arrays(rows, n)
+    out['evaluations'] = evaluations
+    return out
+
+# accumulated fractional melts of steps of any pressure intervals: itg1 as 'itg_batch' (melting_batch2023.py),
+# itg2 (column averages, Po < 30 kbar) as integrals over pressure with the trapezoidal rule instead of the sums over 1 kbar steps of 'itg'
+def itg_steps(melt, Po, keys=res_keys+['SiO2']):
+    out = itg_batch(melt, Po, keys)
+    Po = np.broadcast_to(np.asarray(Po, dtype=float), melt['F_liq'].shape[1:])
+    dP = np.diff(melt['P kbar'], axis=0)
+    def integral(y):  # integral of y over pressure from Po to each step, y at Po (the first step) for the first step
+        return np.concatenate([y[:1], np.cumsum((y[1:]+y[:-1])/2*-dP, axis=0)])
+    F = melt['F_liq']
+    F_integral = integral(F)
+    out['F_liq_itg2'] = np.concatenate([F[:1], F_integral[1:]/(melt['P kbar'][:1]-melt['P kbar'][1:])])
+    for key in keys:
+        out['cl'+key+'_wt_itg2'] = np.where(Po < 30, integral(out['cl'+key+'_wt_itg1']*F)/F_integral, np.nan)
+    return out
+
+# adaptive melting steps and accumulated melts of all columns in one dictionary
+def melting_adaptive(source_wt, source_phase, Po, **options):
+    melt = melting_polyfrac_adaptive(source_wt, source_phase, Po, **options)
+    melt.update(itg_steps(melt, Po))
+    return melt
+
+# one melting column with adaptive pressure steps as a dataframe, same columns as 'melting_column' (models2023.py) with 'dP kbar'
+def melting_column_adaptive(source_wt, source_phase, Po, **options):
+    melt = melting_adaptive(source_wt, source_phase, Po, **options)
+    n = melt['steps'][0]
+    columns = ['T Celsius','P kbar','f_step']+list(source_phase)+['mineral_phase_tot','F_liq_itg2']
+    columns += ['cl'+key+'_wt_itg2' for key in res_keys+['SiO2']]+['F_liq_itg1']+['cl'+key+'_wt_itg1' for key in res_keys+['SiO2']]
+    columns += [name for key, name in batch_names.items() if key not in ('T','P','f','f_step','phase_tot') and not key.startswith('f_') and not key.startswith('cl_wt_')]
+    df = pd.DataFrame({column:melt[column][:n,0] for column in columns})
+    df['dP kbar'] = melt['dP'][:n,0]
+    return df
+
+## comparison with a fine fixed-step reference
+# the reference is extrapolated from fixed steps of dP_ref and dP_ref/2 (2*fine-coarse), the fixed steps are first order in dP;
+# the reference is interpolated at the pressures of the adaptive steps and compared with their accumulated melts (itg1, and itg2 when Po < 30 kbar)
+# below the first kbar of the column (the column averages of the first steps depend on the size of the first step, also for the reference),
+# returns for each column the largest relative difference over all steps and oxides, the numbers of steps and of melting steps calculated
+def compare_reference(source_wt, source_phase, Po, dP_ref=0.02, keys=res_keys+['SiO2'], **options):
+    Po = np.atleast_1d(np.asarray(Po, dtype=float))
+    coarse = melting_polyfrac_steps(source_wt, source_phase, Po, dP_ref)
+    coarse.update(itg_steps(coarse, Po))
+    fine = melting_polyfrac_steps(source_wt, source_phase, Po, dP_ref/2)
+    fine.update(itg_steps(fine, Po))
+    melt = melting_adaptive(source_wt, source_phase, Po, **options)
+    out = []
+    for j in range(len(Po)):
+        P_ref = coarse['P kbar'][:coarse['steps'][j],j]
+        P_fine = fine['P kbar'][:fine['steps'][j],j]
+        P = melt['P kbar'][:melt['steps'][j],j]
+        inside = (P >= max(P_ref[-1], P_fine[-1])) & (P <= Po[j]-1)
+        diffs = {}
+        for itg in (['itg1','itg2'] if Po[j] < 30 else ['itg1']):
+            worst = 0.
+            for key in keys:
+                name = 'cl'+key+'_wt_'+itg
+                ref = (2*np.interp(P[inside][::-1], P_fine[::-1], fine[name][:len(P_fine),j][::-1])
+                       -np.interp(P[inside][::-1], P_ref[::-1], coarse[name][:len(P_ref),j][::-1]))[::-1]
+                worst = max(worst, np.max(np.abs(melt[name][:len(P),j][inside]/ref-1)))
+            diffs[itg] = worst
+        out.append({'diffs':diffs,'steps':len(P),'evaluations':int(melt['evaluations'][j]),'reference_steps':len(P_ref)+len(P_fine)})
+    return out
+
+if __name__ == '__main__':
+    from models2023 import scenarios
+    cases = [(name, Po) for name in scenarios for Po in ([45,35] if name == 'Haw' else [25,20])]
+    source_wt = {key:[scenarios[name]['source_wt'][key] for name, Po in cases] for key in scenarios['Haw']['source_wt']}
+    source_phase = {phase:[scenarios[name]['source_phase'][phase] for name, Po in cases] for phase in phases}
+    tol = 1e-3  # local error of the accumulated melt per kbar of each step
+    global_tol = 5*tol  # bound of the global error: the local errors of the steps add up along the column
+    results = compare_reference(source_wt, source_phase, [Po for name, Po in cases], tol=tol)
+    worst = 0.
+    for (name, Po), result in zip(cases, results):
+        print('%-5s Po %2d  adaptive steps %3d (%4d melting steps calculated), reference steps %4d  %s'
+              % (name, Po, result['steps'], result['evaluations'], result['reference_steps'], '  '.join('%s %.1e' % item for item in result['diffs'].items())))
+        worst = max([worst]+list(result['diffs'].values()))
+    ok = worst <= global_tol
+    print('largest relative difference of the accumulated melts: %.2e %s global bound %.0e (5 x tol, local tol %.0e per step): %s'
+          % (worst, '<=' if ok else '>', global_tol, tol, 'ok' if ok else 'FAILED'))
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,346 @@
+# polybaric fractional melting and isobaric equilibrium melting of many melting columns in one pass
+# every column is one element of the input arrays (source compositions, mineral modes and Po), all columns decompress together by 1 kbar per step
+# the equations are the same as in 'melting_function2023.py' (and 'melting_step_kernel' in kernels2023.py) written with numpy arrays,
+# the mineral phases of all columns are calculated by the reaction rules of reactions2023.py in one call per step,
+# olivine FeO of 'KDFeMg' is solved by Newton iterations on all columns together;
+# isobaric melting ('melting_isoequ_batch') calculates all steps of all columns at once, see below
+# used for sweeps over sources and initial pressures, e.g., envelopes, uncertainties and inversions,
+# the partition-coefficient parameters can also differ between the columns ('kd', e.g., the draws of uncertainty2023.py)
+# polybaric melting also runs on Duals (dual2023.py) for the derivatives of the melts with respect to the inputs, see jacobian2023.py
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import sys
+from constants2023 import cm_mass, cm_tot, molar_tot, kd_default
+from dual2023 import asfloat
+from melting_function2023 import wttocm
+from reactions2023 import phases, mineral_phase_rules, mineral_phase_isoequ_rules
+from kernels2023 import res_keys, melting_df_names, melting_column_kernel, max_rel_diff
+
+# names of the arrays returned by 'melting_polyfrac_batch', one row per step and one column per melting column
+# same names as the columns of the dataframe of 'melting_column' (models2023.py), with the melt compositions of each step ('clMgO_wt', ...)
+# and the extent of melting ('F_liq') as in the isobaric dataframe, and 'rule': index of the reaction rule used (reactions2023.py)
+batch_names = dict({'T':'T Celsius','P':'P kbar','f':'F_liq','f_step':'f_step'},**{'f_'+phase:phase for phase in phases})
+batch_names.update({'phase_tot':'mineral_phase_tot'})
+batch_names.update({'cl_wt_'+key:'cl'+key+'_wt' for key in res_keys+['SiO2']})
+batch_names.update(melting_df_names)
+
+# same as 'olFeO_kernel' for all columns, each column stops when its Newton step is small enough
+def olFeO_batch(a, b, c, d, e, f, tol=1e-13, max_iter=100):
+    x = np.zeros(np.shape(a))
+    done = np.zeros(np.shape(a), dtype=bool)
+    for i in range(max_iter):
+        u = np.exp(-(a+b*x))
+        g = c*(x**2-x**2*u)+d*x+e*x*u+f
+        dg = 2*c*x*(1-u)+c*x**2*b*u+d+e*u-e*x*b*u
+        dx = g/dg
+        x = np.where(done, x, x-dx)
+        done = done | (np.abs(dx) <= tol*np.maximum(1., np.abs(x)))
+        if done.all():
+            break
+    return x
+
+# one melting step of the columns after the mineral phases, same as 'melting_step_kernel'
+# res and bulkD: dictionaries of arrays, updated copies are returned with the output of the step (see 'batch_names')
+# kd: partition-coefficient parameters, numbers or arrays of the columns (see 'kd_default' in constants2023.py)
+def melting_step_batch(T, P, f_step, fm, res, bulkD, Po, kd=kd_default):
+    res = dict(res)
+    bulkD = dict(bulkD)
+    ol, opx, cpx, gt, sp = fm.T
+    high = Po >= 30
+    # liquid_wt_polyfrac
+    cl_K2O = res['K2O']/(bulkD['K2O']*(1-f_step)+f_step)
+    bulkD['Na2O'] = np.where(high, 0.015+0.6*cpx*0.01, 0.015+0.4*cpx*0.01)
+    cl_Na2O = res['Na2O']/(bulkD['Na2O']*(1-f_step)+f_step)
+    bulkD['TiO2'] = 0.015*ol*0.01+0.086*opx*0.01+0.35*gt*0.01+cpx*0.2*0.01
+    cl_TiO2 = res['TiO2']/(bulkD['TiO2']*(1-f_step)+f_step)
+    cl_SiO2 = np.where(high, 55.7-0.233*P, 53.17-0.233*P)
+    clcm_Na2O = cl_Na2O/(cm_mass['Na2O']*cm_tot)*100
+    clcm_K2O = cl_K2O/(cm_mass['K2O']*cm_tot)*100
+    res['K2O'] = (res['K2O']-f_step*cl_K2O)/(1-f_step)
+    res['Na2O'] = (res['Na2O']-f_step*cl_Na2O)/(1-f_step)
+    res['TiO2'] = (res['TiO2']-f_step*cl_TiO2)/(1-f_step)
+    # KDFeMg
+    clmolar_SiO2 = cl_SiO2/cm_mass['SiO2']/molar_tot
+    clmolar_Na2O = cl_Na2O/(cm_mass['Na2O']*2)/molar_tot
+    clmolar_K2O = cl_K2O/(cm_mass['K2O']*2)/molar_tot
+    alkali = clmolar_Na2O+clmolar_K2O
+    low = 100*clmolar_SiO2+100*alkali*((0.46*100/(100-100*clmolar_SiO2)-0.93)*100*alkali-5.33*100/(100-100*clmolar_SiO2)+9.69)
+    high_SiO2 = 100*clmolar_SiO2+100*alkali*(11-5.5*100/(100-100*clmolar_SiO2))*np.exp(-0.13*100*alkali)
+    clSiO2_adjust = np.where(clmolar_SiO2 <= 0.6, low, high_SiO2)
+    kdMgO_oll_cm = np.exp(6921/(T+273.15)+0.034*clcm_Na2O+0.063*clcm_K2O+0.01154*P-3.27)
+    a = kd['Toplis_H']/(8.3144*(T+273.15))+kd['Toplis_S']/8.3144+np.log(0.036*clSiO2_adjust-0.22)+kd['Toplis_W']/(8.3144*(T+273.15))+0.035*(P*10**3-1)/(8.3144*(T+273.15))-kd['Toplis_W']*2/(8.3144*(T+273.15))
+    b = kd['Toplis_W']*2/(8.3144*(T+273.15)*66.67)
+    c = f_step/kdMgO_oll_cm
+    d = res['MgO']+res['FeO']-66.67*c
+    e = 66.67*c
+    ol_FeOcm = olFeO_batch(a, b, c, d, e, -66.67*res['FeO'])
+    kdFe2Mg_oll = np.exp(kd['Toplis_H']/(8.3144*(T+273.15))+kd['Toplis_S']/8.3144+np.log(0.036*clSiO2_adjust-0.22)+kd['Toplis_W']*(1-2*(66.67-ol_FeOcm)/66.67)/(8.3144*(T+237.15))+0.035*(P*10**3-1)/(8.3144*(T+273.15)))
+    # MgOFeO_polyfrac
+    ol_MgOcm = 66.67-ol_FeOcm
+    clcm_MgO = ol_MgOcm/kdMgO_oll_cm
+    res['MgO'] = (res['MgO']-f_step*clcm_MgO)/(1-f_step)
+    kdFeO_oll_cm = kdFe2Mg_oll*kdMgO_oll_cm
+    clcm_FeO = ol_FeOcm/kdFeO_oll_cm
+    res['FeO'] = (res['FeO']-f_step*clcm_FeO)/(1-f_step)
+    res['mgnumber'] = 100*res['MgO']/(res['MgO']+res['FeO'])
+    ol_Fo = 100*ol_MgOcm/(ol_MgOcm+ol_FeOcm)
+    cl_MgO = cm_tot*cm_mass['MgO']*clcm_MgO/100
+    cl_FeO = cm_tot*cm_mass['FeO']*clcm_FeO/100
+    # Ni_polyfrac, Sobolev et al. (2005) Table S1 average KdNi value, Righter et al. (2006) and Li et al. (2008) for spinel
+    kdNi = {'oll':np.exp(kd['kdNi_A']/(T+273.15)+kd['kdNi_B']*cl_SiO2+kd['kdNi_C'])*(kdMgO_oll_cm*1.09)}
+    kdNi_ol = {key:kd['kdNi_'+key+'ol'] for key in ['opx','cpx','gt','sp']}
+    kdNi.update({key+'l':kdNi['oll']*kdNi_ol[key] for key in kdNi_ol})
+    bulkD['Ni'] = (ol*kdNi['oll']+opx*kdNi['opxl']+cpx*kdNi['cpxl']+gt*kdNi['gtl']+sp*kdNi['spl'])*0.01
+    cl_NiO = res['NiO']/(bulkD['Ni']*(1-f_step)+f_step)
+    ol_NiOwt = cl_NiO*kdNi['oll']
+    res['NiO'] = (res['NiO']-f_step*cl_NiO)/(1-f_step)
+    # Mn_polyfrac, Le Roux et al. (2011) and Davis et al. (2013)
+    kdMn = {'oll':kd['KDMnFe']*kdFeO_oll_cm*1.09, 'opxl':np.where(high, kd['kdMn_opxl_highP'], kd['kdMn_opxl_lowP']),
+            'cpxl':np.where(high, kd['kdMn_cpxl_highP'], kd['kdMn_cpxl_lowP']), 'gtl':np.full(np.shape(T), kd['kdMn_gtl'], like=T), 'spl':np.full(np.shape(T), kd['kdMn_spl'], like=T)}
+    bulkD['Mn'] = (ol*kdMn['oll']+opx*kdMn['opxl']+cpx*kdMn['cpxl']+gt*kdMn['gtl']+sp*kdMn['spl'])*0.01
+    cl_MnO = res['MnO']/(bulkD['Mn']*(1-f_step)+f_step)
+    ol_MnOwt = cl_MnO*kdMn['oll']
+    res['MnO'] = (res['MnO']-f_step*cl_MnO)/(1-f_step)
+    step = {'cl_wt_MgO':cl_MgO,'cl_wt_FeO':cl_FeO,'cl_wt_TiO2':cl_TiO2,'cl_wt_Na2O':cl_Na2O,'cl_wt_K2O':cl_K2O,'cl_wt_NiO':cl_NiO,
+            'cl_wt_MnO':cl_MnO,'cl_wt_SiO2':cl_SiO2,'ol_MgOcm':ol_MgOcm,'ol_FeOcm':ol_FeOcm,'ol_Fo':ol_Fo,'ol_NiOwt':ol_NiOwt,'ol_MnOwt':ol_MnOwt,
+            'cl_cm_MgO':clcm_MgO,'cl_cm_FeO':clcm_FeO,'cl_cm_Na2O':clcm_Na2O,'cl_cm_K2O':clcm_K2O,
+            'cl_molar_SiO2':clmolar_SiO2,'cl_molar_Na2O':clmolar_Na2O,'cl_molar_K2O':clmolar_K2O,'clSiO2_adjust':clSiO2_adjust,
+            'kdMgO_oll_cm':kdMgO_oll_cm,'kdFeO_oll_cm':kdFeO_oll_cm,'kdFe2Mg_oll':kdFe2Mg_oll}
+    step.update({'res_'+key:res[key] for key in res_keys+['mgnumber']})
+    step.update({'bulkD_'+key:bulkD[key] for key in bulkD})
+    step.update({'kdNi_'+key:kdNi[key] for key in ['oll','opxl','cpxl','gtl','spl']})
+    step.update({'kdNi_'+key+'ol':np.full(np.shape(T), kdNi_ol[key], like=T) for key in kdNi_ol})
+    step.update({'kdMn_'+key:kdMn[key] for key in ['oll','opxl','cpxl','gtl','spl']})
+    step.update({'kdMn_'+key+'ol':np.zeros(np.shape(T)) for key in kdNi_ol})
+    return step, res, bulkD
+
+# the inputs of the batch functions as arrays of the columns: Po (n), source_wt (dictionary of arrays n) and the mineral modes (n, 5)
+def batch_inputs(source_wt, source_phase, Po):
+    inputs = np.broadcast_arrays(*([asfloat(Po)]+[asfloat(source_wt[key]) for key in source_wt]+[asfloat(source_phase[phase]) for phase in phases]))
+    Po = np.atleast_1d(inputs[0])
+    source_wt = {key:np.atleast_1d(value) for key, value in zip(source_wt, inputs[1:1+len(source_wt)])}
+    fm = np.column_stack([np.atleast_1d(value) for value in inputs[1+len(source_wt):]])
+    return Po, source_wt, fm
+
+# partition-coefficient parameters of n columns: 'kd_default' with the values of kd (numbers, or arrays of the n columns) replaced,
+# every parameter as an array of the n columns
+def batch_kd(kd, n):
+    kd = dict(kd_default, **({} if kd is None else kd))
+    return {key:np.broadcast_to(asfloat(value), (n,)) for key, value in kd.items()}
+
+# polybaric fractional melting of all columns, same steps as 'melting_column' with melting_model='polybaric'
+# source_wt: dictionary of arrays (or numbers) in wt%, source_phase: dictionary of arrays (or numbers) in percent, Po: array (or number) in kbar
+# kd: None (the point values) or partition-coefficient parameters, numbers or arrays of the columns (see 'batch_kd')
+# returns a dictionary of arrays with shape (steps, columns) named as in 'batch_names', NaN after the last step of a column,
+# and 'steps': the number of steps of each column
+def melting_polyfrac_batch(source_wt, source_phase, Po, kd=None):
+    Po, source_wt, fm = batch_inputs(source_wt, source_phase, Po)
+    n = len(Po)
+    kd = batch_kd(kd, n)
+    source_cm, mgnumber_source = wttocm(source_wt)
+    res = {key:source_wt[key].copy() for key in res_keys}
+    res['MgO'] = source_cm['MgO']*100
+    res['FeO'] = source_cm['FeO']*100
+    res['mgnumber'] = np.zeros(n, like=Po)
+    bulkD = {'K2O':np.full(n, 0.005, like=Po),'Na2O':np.zeros(n, like=Po),'TiO2':np.zeros(n, like=Po),'Ni':np.zeros(n, like=Po),'Mn':np.zeros(n, like=Po)}
+    f = np.full(n, 0.0000001, like=Po)
+    f_step = np.full(n, 0.0000001, like=Po)
+    P = Po.copy()
+    T = 13*Po+1140+600*(1-Po/88)*f+20*(mgnumber_source-89)
+    p_remain = -Po
+    max_steps = Po.astype(int)+3  # P decreases by 1 kbar per step, the melting stops before P<0
+    out = {name:np.full((int(max_steps.max()), n), np.nan, like=Po) for name in batch_names.values()}
+    out['rule'] = np.full((int(max_steps.max()), n), np.nan)
+    steps = np.zeros(n, dtype=int)
+    active = np.arange(n)
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        for k in range(out['rule'].shape[0]):
+            if len(active) == 0:
+                break
+            i = active
+            fm[i], rule = mineral_phase_rules(Po[i], P[i], f_step[i], fm[i])
+            step, res_i, bulkD_i = melting_step_batch(T[i], P[i], f_step[i], fm[i], {key:res[key][i] for key in res},
+                                                      {key:bulkD[key][i] for key in bulkD}, Po[i], {key:kd[key][i] for key in kd})
+            for key in res:
+                res[key][i] = res_i[key]
+            for key in bulkD:
+                bulkD[key][i] = bulkD_i[key]
+            step.update({'T':T[i],'P':P[i],'f':f[i],'f_step':f_step[i],'phase_tot':fm[i].sum(axis=1)})
+            step.update({'f_'+phase:fm[i,j] for j, phase in enumerate(phases)})
+            for key in step:
+                out[batch_names[key]][k,i] = step[key]
+            out['rule'][k,i] = rule
+            steps[i] += 1
+            # TPF_polyfrac for the columns that continue
+            active = i[(p_remain[i] <= 0) & (steps[i] < max_steps[i])]
+            i = active
+            f_step[i] = np.where(f[i] <= 0.215, 0.01*12/(6+6*(1-P[i]/88)), 0.01*12/(9+9*(1-P[i]/88)))  # f <= 0.215: same as round(f,2) < 0.22
+            f[i] = f[i]+f_step[i]
+            P[i] = P[i]-1
+            T[i] = 13*P[i]+1140+600*(1-P[i]/88)*f[i]+20*(mgnumber_source[i]-89)
+            crust_thickness = 0.5*f[i]/(Po[i]-P[i])*(Po[i]-P[i])**2*10.2/(2.6212*Po[i]**0.038)
+            p_remain[i] = crust_thickness/3-P[i]
+    out['steps'] = steps
+    return out
+
+# accumulated fractional melts of all columns, same as 'itg': 'F_liq_itg1', 'F_liq_itg2', 'cl<oxide>_wt_itg1' and 'cl<oxide>_wt_itg2'
+# (NaN for the columns with Po >= 30 kbar, as in the dataframe of 'melting_column')
+def itg_batch(melt, Po, keys=res_keys+['SiO2']):
+    F = melt['F_liq']
+    Po = np.broadcast_to(asfloat(Po), F.shape[1:])
+    out = {'F_liq_itg1':F, 'F_liq_itg2':np.cumsum(F, axis=0)/np.arange(1, F.shape[0]+1)[:,None]}
+    F_sum = np.cumsum(F, axis=0)
+    for key in keys:
+        itg1 = np.cumsum(melt['cl'+key+'_wt']*melt['f_step'], axis=0)/F
+        out['cl'+key+'_wt_itg1'] = itg1
+        out['cl'+key+'_wt_itg2'] = np.where(Po < 30, np.cumsum(itg1*F, axis=0)/F_sum, np.nan)
+    return out
+
+# melting steps and accumulated melts of all columns in one dictionary
+def melting_batch(source_wt, source_phase, Po, kd=None):
+    melt = melting_polyfrac_batch(source_wt, source_phase, Po, kd)
+    melt.update(itg_batch(melt, Po))
+    return melt
+
+## isobaric equilibrium melting of many columns, same steps as 'melting_column' with melting_model='isobaric'
+# each step is calculated from the source at the extent of melting f of the step (batch melting equations), so the f grid ('TPF_isoequ' depends on Po only),
+# the mineral phases ('mineral_phase_isoequ_rules' of reactions2023.py) and the melt compositions are calculated for all steps at once;
+# only olivine FeO of 'KDFeMg' depends on the residue of the previous step, it is solved step by step for all columns together
+
+# extents of melting and temperatures of the isobaric steps of all columns, same as 'TPF_isoequ' from f = 0.0000001 until f > 0.5
+# returns T, f and f_step, arrays (steps, columns), NaN after the last step of a column
+def TPF_isoequ_batch(Po, mgnumber_source):
+    f = [np.full(len(Po), 0.0000001)]
+    f_step = [np.full(len(Po), 0.0000001)]
+    while (f[-1] <= 0.5).any():
+        step = np.where(f[-1] <= 0.215, 0.01*12/(6+6*(1-Po/88)), 0.01*12/(9+9*(1-Po/88)))  # f <= 0.215: same as round(f,2) < 0.22
+        step = np.where(f[-1] <= 0.5, step, np.nan)
+        f_step.append(step)
+        f.append(f[-1]+step)
+    f = np.array(f)
+    T = 13*Po+1140+600*(1-Po/88)*f+20*(mgnumber_source-89)
+    return T, f, np.array(f_step)
+
+# isobaric equilibrium melting of all columns, same inputs and output as 'melting_polyfrac_batch',
+# 'rule': index of the rule of 'isoequ_rules' (reactions2023.py) used for the mineral phases
+def melting_isoequ_batch(source_wt, source_phase, Po, kd=None):
+    Po, source_wt, source_fm = batch_inputs(source_wt, source_phase, Po)
+    kd = batch_kd(kd, len(Po))
+    source_cm, mgnumber_source = wttocm(source_wt)
+    T, f, f_step = TPF_isoequ_batch(Po, mgnumber_source)
+    steps = np.isfinite(f).sum(axis=0)
+    P = np.where(np.isfinite(f), Po, np.nan)
+    high = Po >= 30
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        fm, rule = mineral_phase_isoequ_rules(Po, source_fm, f)
+        ol, opx, cpx, gt, sp = np.moveaxis(fm, -1, 0)
+        # liquid_wt_isoequ
+        bulkD = {'K2O':np.where(np.isfinite(f), 0.005, np.nan)}
+        cl_K2O = source_wt['K2O']/(bulkD['K2O']*(1-f)+f)
+        bulkD['Na2O'] = np.where(high, 0.015+0.6*cpx*0.01, 0.015+0.4*cpx*0.01)
+        cl_Na2O = source_wt['Na2O']/(bulkD['Na2O']*(1-f)+f)
+        bulkD['TiO2'] = 0.015*ol*0.01+0.086*opx*0.01+0.35*gt*0.01+cpx*0.2*0.01
+        cl_TiO2 = source_wt['TiO2']/(bulkD['TiO2']*(1-f)+f)
+        cl_SiO2 = np.where(high, np.where(f <= 0.37, (55.7-0.233*P)+12*(f-0), (55.7-0.233*P)+12*(0.37-0)-6.4*(f-0.37)),
+                           np.where(f <= 0.135, (53.17-0.233*P)-12*(f-0), (53.17-0.233*P)-12*(0.135-0)+6.2*(f-0.135)))
+        clcm_Na2O = cl_Na2O/(cm_mass['Na2O']*cm_tot)*100
+        clcm_K2O = cl_K2O/(cm_mass['K2O']*cm_tot)*100
+        res = {'K2O':(source_wt['K2O']-f*cl_K2O)/(1-f), 'Na2O':(source_wt['Na2O']-f*cl_Na2O)/(1-f), 'TiO2':(source_wt['TiO2']-f*cl_TiO2)/(1-f)}
+        # KDFeMg
+        clmolar_SiO2 = cl_SiO2/cm_mass['SiO2']/molar_tot
+        clmolar_Na2O = cl_Na2O/(cm_mass['Na2O']*2)/molar_tot
+        clmolar_K2O = cl_K2O/(cm_mass['K2O']*2)/molar_tot
+        alkali = clmolar_Na2O+clmolar_K2O
+        low = 100*clmolar_SiO2+100*alkali*((0.46*100/(100-100*clmolar_SiO2)-0.93)*100*alkali-5.33*100/(100-100*clmolar_SiO2)+9.69)
+        high_SiO2 = 100*clmolar_SiO2+100*alkali*(11-5.5*100/(100-100*clmolar_SiO2))*np.exp(-0.13*100*alkali)
+        clSiO2_adjust = np.where(clmolar_SiO2 <= 0.6, low, high_SiO2)
+        kdMgO_oll_cm = np.exp(6921/(T+273.15)+0.034*clcm_Na2O+0.063*clcm_K2O+0.01154*P-3.27)
+        a = kd['Toplis_H']/(8.3144*(T+273.15))+kd['Toplis_S']/8.3144+np.log(0.036*clSiO2_adjust-0.22)+kd['Toplis_W']/(8.3144*(T+273.15))+0.035*(P*10**3-1)/(8.3144*(T+273.15))-kd['Toplis_W']*2/(8.3144*(T+273.15))
+        b = kd['Toplis_W']*2/(8.3144*(T+273.15)*66.67)
+        c = f_step/kdMgO_oll_cm
+        # MgOFeO_isoequ, step by step: olivine FeO of a step is solved with the residue of the previous step
+        ol_FeOcm = np.full(f.shape, np.nan)
+        kdFe2Mg_oll = np.full(f.shape, np.nan)
+        res['MgO'] = np.full(f.shape, np.nan)
+        res['FeO'] = np.full(f.shape, np.nan)
+        res_MgO = source_cm['MgO']*100
+        res_FeO = source_cm['FeO']*100
+        for k in range(f.shape[0]):
+            i = np.flatnonzero(k < steps)
+            ol_FeOcm[k,i] = olFeO_batch(a[k,i], b[k,i], c[k,i], res_MgO[i]+res_FeO[i]-66.67*c[k,i], 66.67*c[k,i], -66.67*res_FeO[i])
+            kdFe2Mg_oll[k,i] = np.exp(kd['Toplis_H'][i]/(8.3144*(T[k,i]+273.15))+kd['Toplis_S'][i]/8.3144+np.log(0.036*clSiO2_adjust[k,i]-0.22)
+                                      +kd['Toplis_W'][i]*(1-2*(66.67-ol_FeOcm[k,i])/66.67)/(8.3144*(T[k,i]+237.15))+0.035*(P[k,i]*10**3-1)/(8.3144*(T[k,i]+273.15)))
+            res_MgO = res['MgO'][k] = (source_cm['MgO']*100-f[k]*((66.67-ol_FeOcm[k])/kdMgO_oll_cm[k]))/(1-f[k])
+            res_FeO = res['FeO'][k] = (source_cm['FeO']*100-f[k]*(ol_FeOcm[k]/(kdFe2Mg_oll[k]*kdMgO_oll_cm[k])))/(1-f[k])
+        ol_MgOcm = 66.67-ol_FeOcm
+        clcm_MgO = ol_MgOcm/kdMgO_oll_cm
+        kdFeO_oll_cm = kdFe2Mg_oll*kdMgO_oll_cm
+        clcm_FeO = ol_FeOcm/kdFeO_oll_cm
+        res['mgnumber'] = 100*res['MgO']/(res['MgO']+res['FeO'])
+        ol_Fo = 100*ol_MgOcm/(ol_MgOcm+ol_FeOcm)
+        cl_MgO = cm_tot*cm_mass['MgO']*clcm_MgO/100
+        cl_FeO = cm_tot*cm_mass['FeO']*clcm_FeO/100
+        # Ni_isoequ
+        kdNi = {'oll':np.exp(kd['kdNi_A']/(T+273.15)+kd['kdNi_B']*cl_SiO2+kd['kdNi_C'])*(kdMgO_oll_cm*1.09)}
+        kdNi_ol = {key:kd['kdNi_'+key+'ol'] for key in ['opx','cpx','gt','sp']}
+        kdNi.update({key+'l':kdNi['oll']*kdNi_ol[key] for key in kdNi_ol})
+        bulkD['Ni'] = (ol*kdNi['oll']+opx*kdNi['opxl']+cpx*kdNi['cpxl']+gt*kdNi['gtl']+sp*kdNi['spl'])*0.01
+        cl_NiO = source_wt['NiO']/(bulkD['Ni']*(1-f)+f)
+        ol_NiOwt = cl_NiO*kdNi['oll']
+        res['NiO'] = (source_wt['NiO']-f*cl_NiO)/(1-f)
+        # Mn_isoequ
+        kdMn = {'oll':kd['KDMnFe']*kdFeO_oll_cm*1.09, 'opxl':np.where(high, kd['kdMn_opxl_highP'], kd['kdMn_opxl_lowP']),
+                'cpxl':np.where(high, kd['kdMn_cpxl_highP'], kd['kdMn_cpxl_lowP']), 'gtl':np.full(f.shape, kd['kdMn_gtl']), 'spl':np.full(f.shape, kd['kdMn_spl'])}
+        bulkD['Mn'] = (ol*kdMn['oll']+opx*kdMn['opxl']+cpx*kdMn['cpxl']+gt*kdMn['gtl']+sp*kdMn['spl'])*0.01
+        cl_MnO = source_wt['MnO']/(bulkD['Mn']*(1-f)+f)
+        ol_MnOwt = cl_MnO*kdMn['oll']
+        res['MnO'] = (source_wt['MnO']-f*cl_MnO)/(1-f)
+    out = {'T':T,'P':P,'f':f,'f_step':f_step,'phase_tot':ol+opx+cpx+gt+sp,
+           'cl_wt_MgO':cl_MgO,'cl_wt_FeO':cl_FeO,'cl_wt_TiO2':cl_TiO2,'cl_wt_Na2O':cl_Na2O,'cl_wt_K2O':cl_K2O,'cl_wt_NiO':cl_NiO,
+           'cl_wt_MnO':cl_MnO,'cl_wt_SiO2':cl_SiO2,'ol_MgOcm':ol_MgOcm,'ol_FeOcm':ol_FeOcm,'ol_Fo':ol_Fo,'ol_NiOwt':ol_NiOwt,'ol_MnOwt':ol_MnOwt,
+           'cl_cm_MgO':clcm_MgO,'cl_cm_FeO':clcm_FeO,'cl_cm_Na2O':clcm_Na2O,'cl_cm_K2O':clcm_K2O,
+           'cl_molar_SiO2':clmolar_SiO2,'cl_molar_Na2O':clmolar_Na2O,'cl_molar_K2O':clmolar_K2O,'clSiO2_adjust':clSiO2_adjust,
+           'kdMgO_oll_cm':kdMgO_oll_cm,'kdFeO_oll_cm':kdFeO_oll_cm,'kdFe2Mg_oll':kdFe2Mg_oll}
+    out.update({'f_'+phase:fm[...,j] for j, phase in enumerate(phases)})
+    out.update({'res_'+key:res[key] for key in res_keys+['mgnumber']})
+    out.update({'bulkD_'+key:bulkD[key] for key in bulkD})
+    out.update({'kdNi_'+key:kdNi[key] for key in ['oll','opxl','cpxl','gtl','spl']})
+    out.update({'kdNi_'+key+'ol':np.where(np.isfinite(f), kdNi_ol[key], np.nan) for key in kdNi_ol})
+    out.update({'kdMn_'+key:np.where(np.isfinite(f), kdMn[key], np.nan) for key in ['oll','opxl','cpxl','gtl','spl']})
+    out.update({'kdMn_'+key+'ol':np.where(np.isfinite(f), 0., np.nan) for key in kdNi_ol})
+    out = {batch_names[key]:value for key, value in out.items()}
+    out['rule'] = rule
+    out['steps'] = steps
+    return out
+
+## parity check against 'melting_column_kernel' (and so against the dictionary functions, see kernels2023.py) for polybaric melting,
+# and against 'melting_column' (models2023.py) for isobaric melting, every case of 'parity_cases' of kernels2023.py is one column of the same batch
+def parity_check(rtol=1e-9, verbose=True):
+    from kernels2023 import parity_cases
+    from models2023 import melting_column
+    cases = parity_cases()
+    source_wt = {key:[case[1][key] for case in cases] for key in cases[0][1]}
+    source_phase = {phase:[case[2][phase] for case in cases] for phase in phases}
+    Po = [case[3] for case in cases]
+    melt = {'polybaric':melting_batch(source_wt, source_phase, Po), 'isobaric':melting_isoequ_batch(source_wt, source_phase, Po)}
+    worst = 0.
+    for j, (name, source_wt, source_phase, Po, Fe2Fet) in enumerate(cases):
+        diffs = {}
+        for model in melt:
+            ref = melting_column_kernel(source_wt, source_phase, Po) if model == 'polybaric' else melting_column(source_wt, source_phase, Po, 'isobaric')
+            n = melt[model]['steps'][j]
+            df = ref.copy()
+            for column in ref.columns:
+                df[column] = melt[model][column][:n,j]
+            diffs[model] = max_rel_diff(df, ref) if n == len(ref) else np.inf
+        worst = max([worst]+list(diffs.values()))
+        if verbose:
+            print('%-12s %s' % (name, '  '.join('%s steps %3d %.1e' % (model, melt[model]['steps'][j], diffs[model]) for model in melt)))
+    if verbose:
+        print('largest relative difference: %.2e (tolerance %.0e)' % (worst, rtol))
+    return worst <= rtol
+
+if __name__ == '__main__':
+    sys.exit(0 if parity_check() else 1)
@@ -3,21 +3,17 @@
 # 'cmf' means calculate based on the unit as cation mole fraction, 'wt' means calculate based on the unit as wt%
 # Jan 16, 2023
 # written by: Mingzhen Yu
-# last modified: Jun 20, 2023
+# Oct 19, 2026: the functions do not change their input dictionaries, the updated dictionaries are returned (copies of the inputs)
+# Oct 19, 2026: the melting reactions of 'mineral_phase_polyfrac' are tables in reactions2023.py
+# last modified: Oct 19, 2026
     
 import numpy as np
-import pandas as pd
 import math
-import sympy  
-import copy
 
 
-# default parameters with default values
-cm_mass = {'SiO2':60.083, 'TiO2':79.865, 'Al2O3':50.98, 'FeO':71.844,'CaO':56.077,\
-           'MgO':40.304,'MnO':70.937,'K2O':47.098, 
-         'Na2O':30.99, 'P2O5':70.972,'Cr2O3':75.99,'NiO':74.69}  # relative molecular mass, e.g., SiO2, MgO, NaO1.5  
-molar_tot = 1.65  # sum of relative molecular mass, e.g., Na2O, SiO2, MgO, to calculate molar mass of SiO2, K2O and Na2O, estimated from melt compositions of Walter 1998 and Baker and Stolper 1994
-cm_tot = 1.833  # sum of relative cation mole mass, e.g., NaO0.5, SiO2, MgO, to converse between cation mole and wt%, estimated from melt compositions of Walter 1998 and Baker and Stolper 1994
+# default parameters with default values: cm_mass (relative molecular mass), molar_tot and cm_tot (see constants2023.py)
+from constants2023 import cm_mass, molar_tot, cm_tot
+from reactions2023 import phases, mineral_phase_rules
 
 # change the unit of source compositions from wt% to cation mole fraction, and calculate the Mg number of the source
 def wttocm(source_wt):  
@@ -33,6 +29,7 @@ def wttocm(source_wt):
 # 'f' is the melting fraction during the current melting cell, 
 # 'D' is the bulk distribution coefficients of the composition
 def liquid_wt_polyfrac(res,f_step,f_mineral,P,T,cl_wt,cl_cm,bulkD,Po): 
+    cl_wt,bulkD,cl_cm,res = dict(cl_wt),dict(bulkD),dict(cl_cm),dict(res)  # copies, the inputs are not changed
     cl_wt['K2O'] = res['K2O']/(bulkD['K2O']*(1-f_step)+f_step)  # bulk D of K2O is assumed to be 0.005
     if Po >= 30:
         bulkD['Na2O'] = 0.015+0.6*f_mineral['cpx']*0.01  # Na partitioning are from looking experimental data (e.g., Walter 1998, Davis et al. 2013, Salters and Longhi 1999),here the contribution from opx, grt and ol to the bulk D of Na2O is simplified to be 0.015, KdNa2O(cpx/l)=0.6
@@ -58,6 +55,7 @@ def liquid_wt_polyfrac(res,f_step,f_mineral,P,T,cl_wt,cl_cm,bulkD,Po):
 # 'f' is the melting fraction of the system, 
 # 'D' is the bulk distribution coefficients of the composition
 def liquid_wt_isoequ(source_wt,f,f_mineral,P,T,cl_wt,cl_cm,bulkD,res,Po):  
+    cl_wt,bulkD,cl_cm,res = dict(cl_wt),dict(bulkD),dict(cl_cm),dict(res)  # copies, the inputs are not changed
     cl_wt['K2O'] = source_wt['K2O']/(bulkD['K2O']*(1-f)+f)  # bulk D of K2O is assumed to be 0.005
     if Po >= 30:
         bulkD['Na2O'] = 0.015+0.6*f_mineral['cpx']*0.01  # Na partitioning are from looking experimental data (e.g., Walter 1998, Davis et al. 2013, Salters and Longhi 1999),here the contribution from opx, grt and ol to the bulk D of Na2O is simplified to be 0.015, KdNa2O(cpx/l)=0.6
@@ -87,6 +85,7 @@ def liquid_wt_isoequ(source_wt,f,f_mineral,P,T,cl_wt,cl_cm,bulkD,res,Po):
 # using equations developed by Toplis 2005, 
 # then use olivine stoichiometry (MgO+FeO=66.67) to calculate the FeO concentration in olivine
 def KDFeMg(T,P,f_step,cl_wt,cl_cm,res,cl_molar,ol):  
+    cl_molar,ol = dict(cl_molar),dict(ol)  # copies, the inputs are not changed
     cl_molar['SiO2'] = cl_wt['SiO2']/cm_mass['SiO2']/molar_tot
     cl_molar['Na2O'] = cl_wt['Na2O']/(cm_mass['Na2O']*2)/molar_tot
     cl_molar['K2O'] = cl_wt['K2O']/(cm_mass['K2O']*2)/molar_tot
@@ -101,6 +100,7 @@ def KDFeMg(T,P,f_step,cl_wt,cl_cm,res,cl_molar,ol):
     d = res['MgO']+res['FeO']-66.67*c
     e = 66.67*c
     f = -66.67*res['FeO']
+    import sympy  # imported here so that the melting functions can be used without loading sympy
     x = sympy.Symbol('x')
     ol['FeOcm'] = sympy.nsolve(c*(x**2-x**2/sympy.exp(a+b*x))+d*x+e*x/sympy.exp(a+b*x)+f,0)
     kdFe2Mg_oll = math.exp(-6766/(8.3144*(T+273.15))-7.34/8.3144+math.log(0.036*clSiO2_adjust-0.22)+3000*(1-2*(66.67-ol['FeOcm'])/66.67)/(8.3144*(T+237.15))+0.035*(P*10**3-1)/(8.3144*(T+273.15)))
@@ -109,6 +109,7 @@ def KDFeMg(T,P,f_step,cl_wt,cl_cm,res,cl_molar,ol):
 # calculate MgO in the liquid and olivine as well as the FeO(Fe2+) in the liquid during polyfrac
 # use the olivine stoichiometry and mass balance equation 
 def MgOFeO_polyfrac(ol,kdMgO_oll_cm,f_step,kdFe2Mg_oll,res,cl_cm,cl_wt):  
+    ol,cl_cm,res,cl_wt = dict(ol),dict(cl_cm),dict(res),dict(cl_wt)  # copies, the inputs are not changed
     ol['MgOcm'] = 66.67-ol['FeOcm']
     cl_cm['MgO'] = ol['MgOcm']/kdMgO_oll_cm
     res['MgO'] = (res['MgO']-f_step*cl_cm['MgO'])/(1-f_step)
@@ -124,6 +125,7 @@ def MgOFeO_polyfrac(ol,kdMgO_oll_cm,f_step,kdFe2Mg_oll,res,cl_cm,cl_wt):
 # calculate MgO in the liquid and olivine as well as the FeO(Fe2+) in the liquid during isoequ
 # use the olivine stoichiometry and mass balance equation 
 def MgOFeO_isoequ(ol,kdMgO_oll_cm,f,kdFe2Mg_oll,res,cl_cm,cl_wt,source_cm):  
+    ol,cl_cm,res,cl_wt = dict(ol),dict(cl_cm),dict(res),dict(cl_wt)  # copies, the inputs are not changed
     ol['MgOcm'] = 66.67-ol['FeOcm']
     cl_cm['MgO'] = ol['MgOcm']/kdMgO_oll_cm
     res['MgO'] = (source_cm['MgO']*100-f*cl_cm['MgO'])/(1-f)
@@ -162,197 +164,18 @@ def TPF_isoequ(P,f,mgnumber_source):
     return T,f,f_step
 
 # calculate mineral phase proportions during the polybaric fractional melting 
+# the melting reactions (Walter 1998, Baker and Stolper 1994, Wasylenki et al. 2003), the garnet-spinel conversion when Po >= 30 kbar
+# and the removal of exhausted phases are given as tables in reactions2023.py ('reactions' and 'rules')
 def mineral_phase_polyfrac(Po,P,f_step,f_mineral):
-    if Po >= 30:  # here we assume that when pressure is higher than 30 kbar, garnet will converse to spinel in addition to the melting reactions
-        if f_mineral['gt'] > 0:
-            if P > 30:  # calculate the garnet-spinel conversion factor
-                gt_factor = 0
-            elif (f_mineral['gt']-45*f_step)/(1-f_step) >=1:
-                gt_factor = 0.2
-            else:
-                gt_factor = 1  # when there is garnet remainning in the mineral, 45gt+12ol+137cpx=94opx+100melt (Walter 1998, 3 GPa grt-out) and 100gt+20ol=23sp+60opx+37cpx (garnet converse to spinel)
-            if f_mineral['cpx'] > 0:
-                f_mineral['sp'] = (f_mineral['sp']-0*f_step)/(1-f_step)+0.23*gt_factor*(f_mineral['gt']-45*f_step)/(1-f_step)
-                f_mineral['ol'] = (f_mineral['ol']-12*f_step)/(1-f_step)-0.2*gt_factor*(f_mineral['gt']-45*f_step)/(1-f_step)
-                f_mineral['opx'] = (f_mineral['opx']+94*f_step)/(1-f_step)+0.6*gt_factor*(f_mineral['gt']-45*f_step)/(1-f_step)
-                f_mineral['cpx'] = (f_mineral['cpx']-137*f_step)/(1-f_step)+0.37*gt_factor*(f_mineral['gt']-45*f_step)/(1-f_step)
-                f_mineral['gt'] = (1-gt_factor)*(f_mineral['gt']-45*f_step)/(1-f_step)
-                if f_mineral['cpx'] < 0:
-                    if f_mineral['gt'] < 0:
-                        phase_tot = sum(f_mineral.values())
-                        f_mineral['ol'] = f_mineral['ol']/(phase_tot-f_mineral['cpx']-f_mineral['gt'])*100
-                        f_mineral['opx'] = f_mineral['opx']/(phase_tot-f_mineral['cpx']-f_mineral['gt'])*100
-                        f_mineral['sp'] = f_mineral['sp']/(phase_tot-f_mineral['cpx']-f_mineral['gt'])*100
-                        f_mineral['gt'] = 0
-                        f_mineral['cpx'] = 0
-                    else:
-                        phase_tot = sum(f_mineral.values())
-                        f_mineral['ol'] = f_mineral['ol']/(phase_tot-f_mineral['cpx'])*100
-                        f_mineral['opx'] = f_mineral['opx']/(phase_tot-f_mineral['cpx'])*100
-                        f_mineral['sp'] = f_mineral['sp']/(phase_tot-f_mineral['cpx'])*100
-                        f_mineral['gt'] = f_mineral['gt']/(phase_tot-f_mineral['cpx'])*100
-                        f_mineral['cpx'] = 0
-                if f_mineral['gt'] < 0:
-                    phase_tot = sum(f_mineral.values())
-                    f_mineral['ol'] = f_mineral['ol']/(phase_tot-f_mineral['gt'])*100
-                    f_mineral['opx'] = f_mineral['opx']/(phase_tot-f_mineral['gt'])*100
-                    f_mineral['sp'] = f_mineral['sp']/(phase_tot-f_mineral['gt'])*100
-                    f_mineral['cpx'] = f_mineral['cpx']/(phase_tot-f_mineral['gt'])*100
-                    f_mineral['gt'] = 0     
-            else:  # no cpx originally, so 100gt+20ol=23sp+60opx+37cpx (garnet converse to spinel) and 25gt+13ol+62opx = 100melt (Walter 1998, 7 GPa)
-                if P > 30:
-                    f_mineral['ol'] = (f_mineral['ol']-13*f_step)/(1-f_step)
-                    f_mineral['opx'] = (f_mineral['opx']-62*f_step)/(1-f_step)
-                    f_mineral['gt'] = (f_mineral['gt']-25*f_step)/(1-f_step)
-                    f_mineral['cpx'] = 0
-                    f_mineral['sp'] = 0
-                    if f_mineral['gt'] < 0:
-                        phase_tot = sum(f_mineral.values())
-                        f_mineral['ol'] = f_mineral['ol']/(phase_tot-f_mineral['gt'])*100
-                        f_mineral['opx'] = f_mineral['opx']/(phase_tot-f_mineral['gt'])*100
-                        f_mineral['cpx'] = 0
-                        f_mineral['sp'] = 0
-                        f_mineral['gt'] = 0
-                else:
-                    f_mineral['sp'] = (f_mineral['sp']-0*f_step)/(1-f_step)+0.23*gt_factor*(f_mineral['gt']-45*f_step)/(1-f_step)
-                    f_mineral['ol'] = (f_mineral['ol']-12*f_step)/(1-f_step)-0.2*gt_factor*(f_mineral['gt']-45*f_step)/(1-f_step)
-                    f_mineral['opx'] = (f_mineral['opx']+94*f_step)/(1-f_step)+0.6*gt_factor*(f_mineral['gt']-45*f_step)/(1-f_step)
-                    f_mineral['cpx'] = (f_mineral['cpx']-137*f_step)/(1-f_step)+0.37*gt_factor*(f_mineral['gt']-45*f_step)/(1-f_step)
-                    f_mineral['gt'] = (1-gt_factor)*(f_mineral['gt']-45*f_step)/(1-f_step)
-                    if f_mineral['cpx'] < 0:
-                        if f_mineral['gt'] < 0:
-                            phase_tot = sum(f_mineral.values())
-                            f_mineral['ol'] = f_mineral['ol']/(phase_tot-f_mineral['cpx']-f_mineral['gt'])*100
-                            f_mineral['opx'] = f_mineral['opx']/(phase_tot-f_mineral['cpx']-f_mineral['gt'])*100
-                            f_mineral['sp'] = f_mineral['sp']/(phase_tot-f_mineral['cpx']-f_mineral['gt'])*100
-                            f_mineral['cpx'] = 0
-                            f_mineral['gt'] = 0 
-                        else:
-                            phase_tot = sum(f_mineral.values())
-                            f_mineral['ol'] = f_mineral['ol']/(phase_tot-f_mineral['cpx'])*100
-                            f_mineral['opx'] = f_mineral['opx']/(phase_tot-f_mineral['cpx'])*100
-                            f_mineral['sp'] = f_mineral['sp']/(phase_tot-f_mineral['cpx'])*100
-                            f_mineral['gt'] = f_mineral['gt']/(phase_tot-f_mineral['cpx'])*100
-                            f_mineral['cpx'] = 0
-                    if f_mineral['gt'] < 0:
-                        phase_tot = sum(f_mineral.values())
-                        f_mineral['ol'] = f_mineral['ol']/(phase_tot-f_mineral['gt'])*100
-                        f_mineral['opx'] = f_mineral['opx']/(phase_tot-f_mineral['gt'])*100
-                        f_mineral['sp'] = f_mineral['sp']/(phase_tot-f_mineral['gt'])*100
-                        f_mineral['cpx'] = f_mineral['cpx']/(phase_tot-f_mineral['gt'])*100
-                        f_mineral['gt'] = 0 
-        else:
-            f_mineral['gt'] = 0
-            if f_mineral['cpx'] > 0:
-                if f_mineral['sp'] > 0.1:  # when garnet is consumed and there is spinel remainning, 38opx+13sp+71cpx=100melt+22ol (Barker and Stolper 1994, 1 GPa sp-out)
-                    f_mineral['ol'] = (f_mineral['ol']+22*f_step)/(1-f_step)
-                    f_mineral['opx'] = (f_mineral['opx']-38*f_step)/(1-f_step)
-                    f_mineral['cpx'] = (f_mineral['cpx']-71*f_step)/(1-f_step)
-                    f_mineral['sp'] = (f_mineral['sp']-13*f_step)/(1-f_step)
-                    if f_mineral['sp'] < 0.1:  # normalize to 100 when the calculated proportion of spinel is negative
-                        phase_tot = sum(f_mineral.values())
-                        f_mineral['ol'] = f_mineral['ol']/(phase_tot-f_mineral['sp'])*100
-                        f_mineral['opx'] = f_mineral['opx']/(phase_tot-f_mineral['sp'])*100
-                        f_mineral['cpx'] = f_mineral['cpx']/(phase_tot-f_mineral['sp'])*100
-                        f_mineral['sp'] = 0                    
-                else:
-                    phase_tot = sum(f_mineral.values())
-                    f_mineral['ol'] = f_mineral['ol']/(phase_tot-f_mineral['sp'])*100
-                    f_mineral['opx'] = f_mineral['opx']/(phase_tot-f_mineral['sp'])*100
-                    f_mineral['cpx'] = f_mineral['cpx']/(phase_tot-f_mineral['sp'])*100
-                    f_mineral['sp'] = 0
-                    if f_mineral['cpx'] > 0.5:  # when garnet and spinel are consumed, and there is clinopyroxene remainning, 147cpx+9ol=56opx+100melt (Walter 1998, 3 GPa cpx-out opx-max)
-                        f_mineral['ol'] = (f_mineral['ol']-100*f_step*0.09)/(1-f_step)
-                        f_mineral['opx'] = (f_mineral['opx']+100*f_step*0.56)/(1-f_step)
-                        f_mineral['cpx'] = (f_mineral['cpx']-100*f_step*1.47)/(1-f_step)
-                        if f_mineral['cpx'] < 0.5:  # normalize to 100 when the calculated proportion of clinopyroxene is negative
-                            phase_tot = sum(f_mineral.values())
-                            f_mineral['ol'] = f_mineral['ol']/(phase_tot-f_mineral['cpx'])*100
-                            f_mineral['opx'] = f_mineral['opx']/(phase_tot-f_mineral['cpx'])*100
-                            f_mineral['cpx'] = 0
-                    else:
-                        phase_tot = sum(f_mineral.values())
-                        f_mineral['ol'] = f_mineral['ol']/(phase_tot-f_mineral['cpx'])*100
-                        f_mineral['opx'] = f_mineral['opx']/(phase_tot-f_mineral['cpx'])*100
-                        f_mineral['cpx'] = 0
-                        if f_mineral['opx'] > 0.5:  # when there are only opx and ol remainning, 97opx+3ol=100melt (Walter 1998, 3 GPa opx-out)
-                            f_mineral['ol'] = (f_mineral['ol']-3*f_step)/(1-f_step)
-                            f_mineral['opx'] = (f_mineral['opx']-97*f_step)/(1-f_step)
-                            if f_mineral['opx'] < 0:  # normalize to 100 when the calculated proportion of orthopyroxene is negative
-                                f_mineral['ol'] = 100
-                                f_mineral['opx'] = 0
-                        else:
-                            f_mineral['ol'] = 100
-                            f_mineral['opx'] = 0
-            else:
-                f_mineral['cpx'] = 0
-                if f_mineral['sp'] > 0.1:  # when there are only sp, opx and ol remainning, 109opx+20sp=100melt+29ol (Wasylenki et al. 2003, 1 GPa, sp-out)
-                    f_mineral['ol'] = (f_mineral['ol']+29*f_step)/(1-f_step)
-                    f_mineral['opx'] = (f_mineral['opx']-109*f_step)/(1-f_step)
-                    f_mineral['sp'] = (f_mineral['sp']-20*f_step)/(1-f_step)
-                    if f_mineral['sp'] < 0.1:
-                        phase_tot = sum(f_mineral.values())
-                        f_mineral['ol'] = f_mineral['ol']/(phase_tot-f_mineral['sp'])*100
-                        f_mineral['opx'] = f_mineral['opx']/(phase_tot-f_mineral['sp'])*100
-                        f_mineral['sp'] = 0
-                else:
-                    f_mineral['sp'] = 0
-                    if f_mineral['opx'] > 0.5:
-                        f_mineral['ol'] = (f_mineral['ol']-3*f_step)/(1-f_step)
-                        f_mineral['opx'] = (f_mineral['opx']-97*f_step)/(1-f_step)
-                        if f_mineral['opx'] < 0:  
-                            f_mineral['ol'] = 100
-                            f_mineral['opx'] = 0
-                    else:
-                        f_mineral['ol'] = 100
-                        f_mineral['opx'] = 0                             
-    else:  # when pressure is lower than 30 kbar, we assume there is no garnet in the source
-        f_mineral['gt'] = 0
-        if f_mineral['sp'] > 0.1:  # 38opx+13sp+71cpx=100melt+22ol (Barker and Stolper 1994, 1 GPa sp-out)
-            f_mineral['ol'] = (f_mineral['ol']+22*f_step)/(1-f_step)
-            f_mineral['opx'] = (f_mineral['opx']-38*f_step)/(1-f_step)
-            f_mineral['cpx'] = (f_mineral['cpx']-71*f_step)/(1-f_step)
-            f_mineral['sp'] = (f_mineral['sp']-13*f_step)/(1-f_step)
-            if f_mineral['sp'] < 0.1:  # normalize to 100 when the calculated proportion of spinel is negative
-                phase_tot = sum(f_mineral.values())
-                f_mineral['ol'] = f_mineral['ol']/(phase_tot-f_mineral['sp'])*100
-                f_mineral['opx'] = f_mineral['opx']/(phase_tot-f_mineral['sp'])*100
-                f_mineral['cpx'] = f_mineral['cpx']/(phase_tot-f_mineral['sp'])*100
-                f_mineral['sp'] = 0                
-        else:
-            phase_tot = sum(f_mineral.values())
-            f_mineral['ol'] = f_mineral['ol']/(phase_tot-f_mineral['sp'])*100
-            f_mineral['opx'] = f_mineral['opx']/(phase_tot-f_mineral['sp'])*100
-            f_mineral['cpx'] = f_mineral['cpx']/(phase_tot-f_mineral['sp'])*100
-            f_mineral['sp'] = 0    
-            if f_mineral['cpx'] >= 0.5:  # 147cpx+9ol=56opx+100melt (Walter 1998, 3 GPa cpx-out opx-max)
-                f_mineral['ol'] = (f_mineral['ol']-100*f_step*0.09)/(1-f_step)
-                f_mineral['opx'] = (f_mineral['opx']+100*f_step*0.56)/(1-f_step)
-                f_mineral['cpx'] = (f_mineral['cpx']-100*f_step*1.47)/(1-f_step)
-                if f_mineral['cpx'] < 0.5:  # normalize to 100 when the calculated proportion of clinopyroxene is negative
-                    phase_tot = sum(f_mineral.values())
-                    f_mineral['ol'] = f_mineral['ol']/(phase_tot-f_mineral['cpx'])*100
-                    f_mineral['opx'] = f_mineral['opx']/(phase_tot-f_mineral['cpx'])*100
-                    f_mineral['cpx'] = 0                    
-            else:
-                phase_tot = sum(f_mineral.values())
-                f_mineral['ol'] = f_mineral['ol']/(phase_tot-f_mineral['cpx'])*100
-                f_mineral['opx'] = f_mineral['opx']/(phase_tot-f_mineral['cpx'])*100
-                f_mineral['cpx'] = 0  
-                if f_mineral['opx'] > 0.5:  # 124opx=24ol+100melt (Wasylenki etal 2003, 1 GPa opx out)
-                    f_mineral['ol'] = (f_mineral['ol']+100*f_step*0.24)/(1-f_step)
-                    f_mineral['opx'] = (f_mineral['opx']-100*f_step*1.24)/(1-f_step)
-                    if f_mineral['opx'] < 0:  # normalize to 100 when the calculated proportion of orthopyroxene is negative
-                        f_mineral['ol'] = 100
-                        f_mineral['opx'] = 0
-                else:
-                    f_mineral['ol'] = 100
-                    f_mineral['opx'] = 0
+    fm, rule_used = mineral_phase_rules(Po,P,f_step,[[f_mineral[phase] for phase in phases]])
+    f_mineral = dict(f_mineral)  # copy, the input is not changed
+    f_mineral.update(zip(phases,fm[0].tolist()))
     phase_tot = sum(f_mineral.values())
     return f_mineral, phase_tot
 
 # calculate mineral phase proportions during the isobaric equilibrium melting, refer to Baker and Stolper 1994, and Walter 1998
 def mineral_phase_isoequ(Po,P,f,source_phase,source_phase2,f_gt0,source_phase3,source_phase4,f_cpx0,f_sp0,f_mineral):  
+    f_mineral = dict(f_mineral)  # copy, the input is not changed
     if Po >= 30:  # when pressure is higher than 30 kbar, we assume there is garnet in the source but with no spinel
         if source_phase['gt'] > 0 and f_mineral['gt'] > 0:  # when there is garnet remainning, 45gt+12ol+137cpx=94opx+100melt (Walter 1998, 3 GPa grt-out)
             if f_mineral['cpx'] > 0.5:
@@ -500,6 +323,7 @@ def mineral_phase_isoequ(Po,P,f,source_phase,source_phase2,f_gt0,source_phase3,s
 
 # calculate Ni in the liquid and olivine during polyfrac melting
 def Ni_polyfrac(T,kdMgO_oll_cm,cl_wt,f_mineral,res,f_step,bulkD,ol):  
+    bulkD,cl_wt,ol,res = dict(bulkD),dict(cl_wt),dict(ol),dict(res)  # copies, the inputs are not changed
     keys = ['oll','opxl','cpxl','gtl','spl','opxol','cpxol','gtol','spol']
     kdNi_wt = {key:0 for key in keys}  
     kdNi_wt['oll'] = math.exp(4272/(T+273.15)+0.01582*cl_wt['SiO2']-2.7622)*(kdMgO_oll_cm*1.09) ## fitted by MPN+Hzb dataset (Eqn. 3 in the paper), *1.09 to convert from cmf to wt%, observed from Walter 1998 
@@ -520,6 +344,7 @@ def Ni_polyfrac(T,kdMgO_oll_cm,cl_wt,f_mineral,res,f_step,bulkD,ol):
 
 # calculate Ni in the liquid and olivine during isoequ melting
 def Ni_isoequ(T,kdMgO_oll_cm,cl_wt,f,f_mineral,res,bulkD,ol,source_wt):  
+    bulkD,cl_wt,ol,res = dict(bulkD),dict(cl_wt),dict(ol),dict(res)  # copies, the inputs are not changed
     keys = ['oll','opxl','cpxl','gtl','spl','opxol','cpxol','gtol','spol']
     kdNi_wt = {key:0 for key in keys}  
     kdNi_wt['oll'] = math.exp(4272/(T+273.15)+0.01582*cl_wt['SiO2']-2.7622)*(kdMgO_oll_cm*1.09) ## fitted by MPN+Hzb dataset (Eqn. 3 in the paper), *1.09 to convert from cmf to wt%, observed from Walter 1998 
@@ -540,6 +365,7 @@ def Ni_isoequ(T,kdMgO_oll_cm,cl_wt,f,f_mineral,res,bulkD,ol,source_wt):
 
 # calculate Mn in the liquid and olivine during the polybaric fractional melting
 def Mn_polyfrac(T,kdMgO_oll_cm,cl_wt,f_mineral,res,f_step,bulkD,ol,Po,kdFeO_oll_cm):  
+    bulkD,cl_wt,ol,res = dict(bulkD),dict(cl_wt),dict(ol),dict(res)  # copies, the inputs are not changed
     keys = ['oll','opxl','cpxl','gtl','spl','opxol','cpxol','gtol','spol']
     kdMn_wt = {key:0 for key in keys}   
     ## Le Roux et al. (2011) Table 3 for low P-T opx and cpx, Davis et al. (2013) GCA Table 13 for high P-T opx, cpx, and grt, sp
@@ -563,6 +389,7 @@ def Mn_polyfrac(T,kdMgO_oll_cm,cl_wt,f_mineral,res,f_step,bulkD,ol,Po,kdFeO_oll_
 
 # calculate Mn in the liquid and olivine during the isobaric equilibrium melting
 def Mn_isoequ(T,kdMgO_oll_cm,cl_wt,f,f_mineral,res,bulkD,ol,source_wt,Po,kdFeO_oll_cm):  
+    bulkD,cl_wt,ol,res = dict(bulkD),dict(cl_wt),dict(ol),dict(res)  # copies, the inputs are not changed
     keys = ['oll','opxl','cpxl','gtl','spl','opxol','cpxol','gtol','spol']
     kdMn_wt = {key:0 for key in keys}    
     ## Le Roux et al. (2011) Table 3 for low P-T opx and cpx, Davis et al. (2013) GCA Table 13 for high P-T opx, cpx, and grt, sp
@@ -0,0 +1,200 @@
+# score modeled CLDs and LLDs against the natural olivine and glass data
+# each panel is one natural dataset in one figure (e.g., Hawaiian olivine in the Ni-Fo figure), the data of a panel are indexed once
+# (KD-tree over the data scaled by their standard deviations, and median/spread of y in x bins),
+# then many modeled curves are scored together:
+# 'curve_to_data': mean distance from the points along a curve to the nearest data point, 'curve_to_data_max': the largest of these distances
+# 'coverage': fraction of the data points lying within 'radius' of a curve
+# 'bin_rms': root mean square of the per-bin residuals (model y - median data y)/(spread of data y) over the bins reached by the curve
+# all distances are in the scaled units (1 = one standard deviation of the data)
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+from olivine_glass_data2023 import load_columns
+
+# data columns (x, y) and x bins of each panel, named by the figure and the dataset
+misfit_panels = {
+    'CLD_Ni_Fo_Haw': {'data':('Fo_HawOL','Nippm_HawOL'), 'bins':np.arange(80,92.01,0.5)},
+    'CLD_Ni_Fo_MORB': {'data':('Fo_MORBOL','Nippm_MORBOL'), 'bins':np.arange(80,92.01,0.5)},
+    'CLD_Mn_Fo_Haw': {'data':('Fo_HawOL','Mnppm_HawOL'), 'bins':np.arange(80,92.01,0.5)},
+    'CLD_Mn_Fo_MORB': {'data':('Fo_MORBOL','Mnppm_MORBOL'), 'bins':np.arange(80,92.01,0.5)},
+    'LLD_Ni_MgO_Haw': {'data':('MgO_100_Haw','Ni_Haw'), 'bins':np.arange(4,14.01,0.5)},
+    'LLD_Ni_MgO_MORB': {'data':('MgO_MORB','Ni_MORB'), 'bins':np.arange(4,14.01,0.5)},
+    'LLD_MnO_MgO_Haw': {'data':('MgO_100_Haw','MnO_100_Haw'), 'bins':np.arange(4,14.01,0.5)},
+    'LLD_MnO_MgO_MORB': {'data':('MgO_MORB','MnO_MORB'), 'bins':np.arange(4,14.01,0.5)},
+    'LLD_FeOt_MgO_Haw': {'data':('MgO_100_Haw','FeOt_100_Haw'), 'bins':np.arange(4,14.01,0.5)},
+    'LLD_FeOt_MgO_MORB': {'data':('MgO_MORB','FeOt_MORB'), 'bins':np.arange(4,14.01,0.5)},
+    'LLD_FeOtMnO_MgO_Haw': {'data':('MgO_100_Haw','FeOMnO_100_Haw'), 'bins':np.arange(4,14.01,0.5)},
+    'LLD_FeOtMnO_MgO_MORB': {'data':('MgO_MORB','FeOMnO_MORB'), 'bins':np.arange(4,14.01,0.5)},
+    }
+
+# model columns (x, y) compared with each panel, for the olivine-only dataframes ('olonly_xtalization', 'olonly_xtalization_lowP') and the ol-pl-cpx dataframe 'LLD_df'
+model_columns_olonly = {'CLD_Ni_Fo':('Fo','olppm_Ni'), 'CLD_Mn_Fo':('Fo','olppm_Mn'), 'LLD_Ni_MgO':('clwt_MgO','clppm_Ni'),
+                        'LLD_MnO_MgO':('clwt_MgO','clwt_MnO'), 'LLD_FeOt_MgO':('clwt_MgO','clwt_FeOt'), 'LLD_FeOtMnO_MgO':('clwt_MgO','clwt_FeOt/MnO')}
+model_columns_wl1990 = {'CLD_Ni_Fo':('Fo','olNippm'), 'CLD_Mn_Fo':('Fo','olMnppm'), 'LLD_Ni_MgO':('liq_MgO','liq_Nippm'),
+                        'LLD_MnO_MgO':('liq_MgO','liq_MnO'), 'LLD_FeOt_MgO':('liq_MgO','liq_FeOt'), 'LLD_FeOtMnO_MgO':('liq_MgO','liq_FeOtMnO')}
+
+# x and y of the modeled curve of a figure, from an olivine-only or an ol-pl-cpx dataframe
+def model_curve(df, figure):
+    kind, model_columns = ('ol-pl-cpx (LLD_df)', model_columns_wl1990) if 'liq_MgO' in df.columns else ('olivine-only', model_columns_olonly)
+    if figure not in model_columns:
+        raise ValueError('no model columns of figure %r for an %s dataframe, known figures: %s' % (figure, kind, ', '.join(model_columns)))
+    columns = model_columns[figure]
+    return df[columns[0]], df[columns[1]]
+
+# index of the data of one panel, built once and reused for any number of curves
+class DataIndex:
+    def __init__(self, x, y, bins, scale=None, min_bin_count=3):
+        from scipy.spatial import cKDTree
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        keep = np.isfinite(x) & np.isfinite(y)
+        self.x, self.y = x[keep], y[keep]
+        self.scale = np.array([np.std(self.x), np.std(self.y)]) if scale is None else np.asarray(scale, dtype=float)
+        self.tree = cKDTree(np.column_stack([self.x, self.y])/self.scale)
+        self.n = len(self.x)
+        # median and spread (half of the 16-84 percentile range) of data y in each x bin, bins with few data are not used
+        self.bins = np.asarray(bins, dtype=float)
+        centers = (self.bins[:-1]+self.bins[1:])/2
+        which = np.digitize(self.x, self.bins)-1
+        med = np.full(len(centers), np.nan)
+        spread = np.full(len(centers), np.nan)
+        for b in range(len(centers)):
+            yb = self.y[which == b]
+            if len(yb) >= min_bin_count:
+                med[b] = np.median(yb)
+                spread[b] = max((np.percentile(yb,84)-np.percentile(yb,16))/2, 1e-12)
+        self.bin_centers, self.bin_median, self.bin_spread = centers, med, spread
+
+    @classmethod
+    def from_panel(cls, panel, data=None, **kwargs):
+        x_name, y_name = misfit_panels[panel]['data']
+        data = load_columns([x_name, y_name]) if data is None else data
+        return cls(data[x_name], data[y_name], misfit_panels[panel]['bins'], **kwargs)
+
+# build the indexes of some panels (all panels if panels=None), loading each data column only once
+def build_indexes(panels=None, **kwargs):
+    panels = list(misfit_panels) if panels is None else panels
+    columns = sorted({c for panel in panels for c in misfit_panels[panel]['data']})
+    data = load_columns(columns)
+    return {panel:DataIndex.from_panel(panel, data, **kwargs) for panel in panels}
+
+# put curves of different lengths into two (n_curves, n_points) arrays padded with NaN
+# curves: list of (x, y) pairs or dataframes, dataframes are read with 'columns'=(x name, y name)
+def curve_array(curves, columns=None):
+    xs, ys = [], []
+    for c in curves:
+        x, y = (c[columns[0]], c[columns[1]]) if hasattr(c, 'columns') else c
+        xs.append(np.asarray(x, dtype=float))
+        ys.append(np.asarray(y, dtype=float))
+    n = max([len(x) for x in xs]+[1])
+    X = np.full((len(xs), n), np.nan)
+    Y = np.full((len(xs), n), np.nan)
+    for i in range(len(xs)):
+        X[i,:len(xs[i])] = xs[i]
+        Y[i,:len(ys[i])] = ys[i]
+    return X, Y
+
+# points along the curves (scaled units) with spacing <= step, returned flat with the curve number of every point
+# NaN points (padding, or steps where the model failed) break a curve into pieces
+def densify(X, Y, scale, step):
+    P = np.stack([X/scale[0], Y/scale[1]], axis=-1)  # (n_curves, n_points, 2)
+    a, b = P[:,:-1], P[:,1:]
+    ok = np.all(np.isfinite(a), axis=-1) & np.all(np.isfinite(b), axis=-1)
+    seg_len = np.where(ok, np.linalg.norm(b-a, axis=-1), 0)
+    n_sub = np.where(ok, np.maximum(np.ceil(seg_len/step), 1), 0).astype(int)
+    curve_id = np.repeat(np.broadcast_to(np.arange(P.shape[0])[:,None], n_sub.shape).ravel(), n_sub.ravel())
+    start = np.repeat(a.reshape(-1,2), n_sub.ravel(), axis=0)
+    delta = np.repeat((b-a).reshape(-1,2)/np.maximum(n_sub,1).reshape(-1,1), n_sub.ravel(), axis=0)
+    k = np.arange(len(curve_id))-np.repeat(np.cumsum(n_sub.ravel())-n_sub.ravel(), n_sub.ravel())
+    pts = start+delta*k[:,None]
+    # add the last point of every piece
+    last = ok & ~np.concatenate([ok[:,1:], np.zeros((ok.shape[0],1), bool)], axis=1)
+    ci, si = np.nonzero(last)
+    # single isolated points
+    finite = np.all(np.isfinite(P), axis=-1)
+    prev_ok = np.concatenate([np.zeros((ok.shape[0],1), bool), ok], axis=1)
+    next_ok = np.concatenate([ok, np.zeros((ok.shape[0],1), bool)], axis=1)
+    ci1, pi1 = np.nonzero(finite & ~prev_ok & ~next_ok)
+    pts = np.concatenate([pts, b[ci,si], P[ci1,pi1]])
+    curve_id = np.concatenate([curve_id, ci, ci1])
+    return pts, curve_id
+
+# model y of every curve at the bin centers, by linear interpolation along x (NaN outside the x range of a curve)
+def curve_at_bins(X, Y, centers):
+    out = np.full((X.shape[0], len(centers)), np.nan, like=Y)
+    for i in range(X.shape[0]):
+        ok = np.isfinite(X[i]) & np.isfinite(Y[i])
+        if np.sum(ok) < 2:
+            continue
+        x, y = X[i,ok], Y[i,ok]
+        order = np.argsort(x, kind='stable')
+        x, y = x[order], y[order]
+        inside = (centers >= x[0]) & (centers <= x[-1])
+        out[i,inside] = np.interp(centers[inside], x, y)
+    return out
+
+# per-bin residuals (model y - median data y)/(spread of data y) of many curves, (n_curves, n_bins) array, NaN where a curve does not reach a bin
+def bin_residuals(index, X, Y):
+    return (curve_at_bins(np.atleast_2d(X), np.atleast_2d(Y), index.bin_centers)-index.bin_median)/index.bin_spread
+
+# misfit of many curves against the data of one panel, curves are handled in batches of 'batch_size' to limit memory
+# returns a dictionary of arrays with one value per curve, and the per-bin residuals as a (n_curves, n_bins) array
+def score_curves(index, X, Y, radius=0.1, batch_size=500):
+    from scipy.spatial import cKDTree
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    n_curves = X.shape[0]
+    curve_to_data = np.full(n_curves, np.nan)
+    curve_to_data_max = np.full(n_curves, np.nan)
+    coverage = np.zeros(n_curves)
+    for start in range(0, n_curves, batch_size):
+        stop = min(start+batch_size, n_curves)
+        pts, cid = densify(X[start:stop], Y[start:stop], index.scale, radius/2)
+        if len(pts) == 0:
+            continue
+        d, _ = index.tree.query(pts)  # nearest data point of every point along the curves
+        n_pts = np.bincount(cid, minlength=stop-start)
+        has = n_pts > 0
+        curve_to_data[start:stop][has] = (np.bincount(cid, weights=d, minlength=stop-start)[has])/n_pts[has]
+        dmax = np.zeros(stop-start)
+        np.maximum.at(dmax, cid, d)
+        curve_to_data_max[start:stop][has] = dmax[has]
+        # pairs (data point, curve point) closer than radius, counted once per data point and curve
+        pairs = index.tree.sparse_distance_matrix(cKDTree(pts), radius, output_type='ndarray')
+        if len(pairs):
+            key = np.unique(cid[pairs['j']].astype(np.int64)*index.n+pairs['i'])
+            coverage[start:stop] = np.bincount(key//index.n, minlength=stop-start)/index.n
+    residuals = bin_residuals(index, X, Y)
+    reached = np.isfinite(residuals)
+    n_bins = np.sum(reached, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bin_rms = np.sqrt(np.nansum(residuals**2, axis=1)/n_bins)
+    return {'curve_to_data':curve_to_data, 'curve_to_data_max':curve_to_data_max, 'coverage':coverage,
+            'bin_rms':np.where(n_bins > 0, bin_rms, np.nan), 'n_bins':n_bins, 'bin_residuals':residuals}
+
+# score and rank scenarios, each scenario gives the curves of some panels
+# scenarios: {scenario name: {panel: (x, y) or dataframe}}, dataframes are read with model_curve
+# the ranking uses the sum over panels of weights[panel]*metric, lower is better ('coverage' is used as 1-coverage)
+def rank_scenarios(scenarios, indexes=None, metric='bin_rms', weights=None, radius=0.1, batch_size=500):
+    import pandas as pd
+    names = list(scenarios)
+    panels = sorted({panel for name in names for panel in scenarios[name]})
+    indexes = build_indexes(panels) if indexes is None else indexes
+    table = {}
+    for panel in panels:
+        have = [name for name in names if panel in scenarios[name]]
+        curves = [model_curve(c, panel.rsplit('_',1)[0]) if hasattr(c, 'columns') else c for c in (scenarios[name][panel] for name in have)]
+        X, Y = curve_array(curves)
+        s = score_curves(indexes[panel], X, Y, radius, batch_size)
+        for m in ('curve_to_data','curve_to_data_max','coverage','bin_rms'):
+            table[(panel, m)] = pd.Series(s[m], index=have)
+    out = pd.DataFrame(table, index=names)
+    weights = {panel:1 for panel in panels} if weights is None else weights
+    total = 0
+    for panel in weights:
+        v = out[(panel, metric)]
+        total = total+weights[panel]*(1-v if metric == 'coverage' else v)
+    out[('total', metric)] = total
+    out[('total', 'rank')] = out[('total', metric)].rank(method='min')
+    return out.sort_values(('total', 'rank'))
@@ -0,0 +1,689 @@
+# model functions of melting_crystallization2023.py, each function runs one stage of the portal with the same code as the portal
+# 'melting_column': mantle melting for one source, returns the melting dataframe (e.g., 'melting_df_highP')
+# 'select_magma': the accumulated melt at the extent of melting F_target, used as the magma for crystallization
+# 'olonly_model': olivine-only crystallization of a magma, returns the crystallization dataframe (e.g., 'olonly_xtalization')
+# 'wl1990_model': ol-pl-cpx crystallization of a magma, returns the crystallization dataframe (e.g., 'LLD_df')
+# 'scenarios': the default Hawaii and MORB settings of the portal, 'default_column', 'default_olonly_inputs', 'default_wl1990_inputs': their melting columns and magmas
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import pandas as pd
+import math
+from melting_function2023 import *
+from olonly_function2023 import *
+from wl1990stoich_2023 import *
+from wl1990kdcalc_2023 import *
+from wl1990models_2023 import *
+from olonly_batch2023 import magma_fixed_wl1990
+from kernels2023 import melting_column_kernel, olonly_model_kernel
+from melting_adaptive2023 import melting_column_adaptive
+from constants2023 import source_wt_IonovMgO385, source_phase_IonovMgO385_lowP, source_wt_IonovMgO385_eclope, source_phase_IonovMgO385_eclope
+from constants2023 import Fe2Fet_Haw, Fe2Fet_MORB, Po_high, Po_low, F_target_Haw, F_target_MORB
+
+# mantle melting of a source, polybaric fractional melting ('polybaric') or isobaric equilibrium melting ('isobaric')
+# 'adaptive': polybaric fractional melting with adaptive pressure steps (melting_adaptive2023.py), same columns as 'polybaric' with 'dP kbar'
+# input parameters: source compositions in wt.%, initial mineral phases in percent, initial pressure Po in kbar (>=30 is high-pressure, <30 is low-pressure)
+# backend: 'python' (the dictionary functions of melting_function2023.py) or 'kernel' (kernels2023.py, polybaric melting only, isobaric melting always uses 'python')
+def melting_column(source_wt,source_phase,Po,melting_model='polybaric',backend='python'):
+    if backend not in ('python','kernel'):
+        raise ValueError("backend must be 'python' or 'kernel'")
+    if backend == 'kernel' and melting_model == 'polybaric':
+        return melting_column_kernel(source_wt,source_phase,Po)
+    if melting_model == 'adaptive':
+        return melting_column_adaptive(source_wt,source_phase,Po)
+    # parameters used in calculating mineral phases during isobaric equilibrium melting
+    source_phase2 = source_phase 
+    source_phase3 = source_phase
+    source_phase4 = source_phase
+    f_gt0 = 0.0000001
+    f_cpx0 = 0.0000001
+    f_sp0 = 0.0000001
+
+    # calculate melting
+    source_cm, mgnumber_source = wttocm(source_wt)
+    if melting_model == 'polybaric':  # polybaric fractional melting
+        ## calculate all parameters near solidus assuming the the extent of melting is 0.0000001
+        f = 0.0000001  
+        f_step = 0.0000001
+        T = 13*Po+1140+600*(1-Po/88)*f+20*(mgnumber_source-89)
+        crust_thickness = 0
+        p_remain = -Po
+        P = Po
+        f_mineral, phase_tot = mineral_phase_polyfrac(Po,P,f_step,f_mineral=source_phase)
+        keys = ['MgO','FeO','TiO2', 'Na2O', 'K2O','NiO','MnO']
+        res = {key:source_wt[key] for key in keys}
+        res['MgO'] = source_cm['MgO']*100
+        res['FeO'] = source_cm['FeO']*100
+        res['mgnumber'] = 0.0
+        cl_wt = {key:0.0 for key in keys}
+        cl_wt['SiO2'] = 0.0
+        cl_cm = {'MgO':0.0,'FeO':0.0,'Na2O':0.0,'K2O':0.0}
+        bulkD = {'K2O':0.005,'Na2O':0.0,'TiO2':0.0,'Ni':0.0,'Mn':0.0}
+        cl_wt,bulkD,cl_cm,res = liquid_wt_polyfrac(res,f_step,f_mineral,P,T,cl_wt,cl_cm,bulkD,Po)
+        cl_molar = {'SiO2':0.0,'Na2O':0.0,'K2O':0.0}
+        ol = {'MgOcm':0.0,'FeOcm':0.0,'Fo':0.0,'NiOwt':0.0,'MnOwt':0.0}
+        cl_molar,clSiO2_adjust,kdMgO_oll_cm,ol,kdFe2Mg_oll = KDFeMg(T,P,f_step,cl_wt,cl_cm,res,cl_molar,ol)
+        ol,cl_cm,res,kdFeO_oll_cm,cl_wt = MgOFeO_polyfrac(ol,kdMgO_oll_cm,f_step,kdFe2Mg_oll,res,cl_cm,cl_wt)
+        kdNi_wt, bulkD, cl_wt, ol, res = Ni_polyfrac(T,kdMgO_oll_cm,cl_wt,f_mineral,res,f_step,bulkD,ol)
+        kdMn_wt, bulkD, cl_wt, ol, res = Mn_polyfrac(T,kdMgO_oll_cm,cl_wt,f_mineral,res,f_step,bulkD,ol,Po,kdFeO_oll_cm)
+        ## format data
+        F_mineral = {element: [] for element in f_mineral}
+        Res = {element: [] for element in res}  
+        Cl_wt = {element: [] for element in cl_wt}
+        Cl_cm = {element: [] for element in cl_cm}
+        KdNi_wt = {element: [] for element in kdNi_wt}
+        KdMn_wt = {element: [] for element in kdMn_wt}
+        BulkD = {element: [] for element in bulkD}
+        Cl_molar = {element: [] for element in cl_molar}
+        ClSiO2_adjust = []
+        Ol = {element: [] for element in ol}
+        Phase_tot = []
+        T_melting = []
+        P_melting = []
+        F_melting = []
+        F_step = []
+        Crust_thickness = []
+        P_remain = []
+        KdMgO_oll_cm = []
+        KdFeO_oll_cm = []
+        KdFe2Mg_oll = []
+        for element in F_mineral:
+            F_mineral[element].append(f_mineral[element])
+        for element in Res:
+            Res[element].append(res[element])
+        for element in Cl_wt:
+            Cl_wt[element].append(cl_wt[element])
+        for element in Cl_cm:
+            Cl_cm[element].append(cl_cm[element])
+        for element in KdNi_wt:
+            KdNi_wt[element].append(kdNi_wt[element])
+        for element in KdMn_wt:
+            KdMn_wt[element].append(kdMn_wt[element])
+        for element in BulkD:
+            BulkD[element].append(bulkD[element])
+        for element in Cl_molar:
+            Cl_molar[element].append(cl_molar[element])
+        for element in Ol:
+            Ol[element].append(ol[element])
+        ClSiO2_adjust.append(clSiO2_adjust)
+        Phase_tot.append(phase_tot)
+        T_melting.append(T)
+        P_melting.append(P)
+        F_melting.append(f)
+        F_step.append(f_step)
+        Crust_thickness.append(crust_thickness)
+        P_remain.append(p_remain)
+        KdMgO_oll_cm.append(kdMgO_oll_cm)
+        KdFeO_oll_cm.append(kdFeO_oll_cm)
+        KdFe2Mg_oll.append(kdFe2Mg_oll)
+        ## melting stops when the top of melting column reaches to the bottom of the crust
+        while p_remain <=0:
+            T, P, f, f_step, crust_thickness, p_remain = TPF_polyfrac(P,f,mgnumber_source,Po)
+            f_mineral, phase_tot = mineral_phase_polyfrac(Po,P,f_step,f_mineral)
+            cl_wt,bulkD,cl_cm,res = liquid_wt_polyfrac(res,f_step,f_mineral,P,T,cl_wt,cl_cm,bulkD,Po)
+            cl_molar,clSiO2_adjust,kdMgO_oll_cm,ol,kdFe2Mg_oll = KDFeMg(T,P,f_step,cl_wt,cl_cm,res,cl_molar,ol)
+            ol,cl_cm,res,kdFeO_oll_cm,cl_wt = MgOFeO_polyfrac(ol,kdMgO_oll_cm,f_step,kdFe2Mg_oll,res,cl_cm,cl_wt)
+            kdNi_wt, bulkD, cl_wt, ol, res = Ni_polyfrac(T,kdMgO_oll_cm,cl_wt,f_mineral,res,f_step,bulkD,ol)
+            kdMn_wt, bulkD, cl_wt, ol, res = Mn_polyfrac(T,kdMgO_oll_cm,cl_wt,f_mineral,res,f_step,bulkD,ol,Po,kdFeO_oll_cm)
+            for element in F_mineral:
+                F_mineral[element].append(f_mineral[element])
+            for element in Res:
+                Res[element].append(res[element])
+            for element in Cl_wt:
+                Cl_wt[element].append(cl_wt[element])
+            for element in Cl_cm:
+                Cl_cm[element].append(cl_cm[element])
+            for element in KdNi_wt:
+                KdNi_wt[element].append(kdNi_wt[element])
+            for element in KdMn_wt:
+                KdMn_wt[element].append(kdMn_wt[element])
+            for element in BulkD:
+                BulkD[element].append(bulkD[element])
+            for element in Cl_molar:
+                Cl_molar[element].append(cl_molar[element])
+            for element in Ol:
+                Ol[element].append(ol[element])
+            ClSiO2_adjust.append(clSiO2_adjust)
+            Phase_tot.append(phase_tot)
+            T_melting.append(T)
+            P_melting.append(P)
+            F_melting.append(f)
+            F_step.append(f_step)
+            Crust_thickness.append(crust_thickness)
+            P_remain.append(p_remain)
+            KdMgO_oll_cm.append(kdMgO_oll_cm)
+            KdFeO_oll_cm.append(kdFeO_oll_cm)
+            KdFe2Mg_oll.append(kdFe2Mg_oll)
+        ## calcluate the accumulated melt compositions for polybaric fractional melting    
+        Cl_wt_itg1,Cl_wt_itg2,F_melting_itg1,F_melting_itg2 = itg(Cl_wt,F_step,F_melting,Po) 
+
+    elif melting_model == 'isobaric':  # isobaric equilibrium melting 
+        P = Po  # pressure will be constant during the melting
+        f = 0.0000001  # calculate all parameters near solidus assuming the the extent of melting is 0.0000001 
+        f_step = 0.0000001
+        T = 13*Po+1140+600*(1-Po/88)*f+20*(mgnumber_source-89)
+        f_mineral = source_phase.copy()
+        f_mineral, phase_tot,source_phase2,source_phase3,source_phase4,f_gt0,f_cpx0,f_sp0 = mineral_phase_isoequ(Po,P,f,source_phase,source_phase2,f_gt0,source_phase3,source_phase4,f_cpx0,f_sp0,f_mineral)
+        keys = ['MgO','FeO','TiO2','Na2O', 'K2O','NiO','MnO']
+        res = {key:source_wt[key] for key in keys}
+        res['MgO'] = source_cm['MgO']*100
+        res['FeO'] = source_cm['FeO']*100
+        res['mgnumber'] = 0.0
+        cl_wt = {key:0.0 for key in keys}
+        cl_wt['SiO2'] = 0.0
+        cl_cm = {'MgO':0.0,'FeO':0.0,'Na2O':0.0,'K2O':0.0}
+        bulkD = {'K2O':0.005,'Na2O':0.0,'TiO2':0.0,'Ni':0.0,'Mn':0.0}
+        cl_wt,bulkD,cl_cm,res = liquid_wt_isoequ(source_wt,f,f_mineral,P,T,cl_wt,cl_cm,bulkD,res,Po)
+        cl_molar = {'SiO2':0.0,'Na2O':0.0,'K2O':0.0}
+        ol = {'MgOcm':0.0,'FeOcm':0.0,'Fo':0.0,'NiOwt':0.0,'MnOwt':0.0}
+        cl_molar,clSiO2_adjust,kdMgO_oll_cm,ol,kdFe2Mg_oll = KDFeMg(T,P,f_step,cl_wt,cl_cm,res,cl_molar,ol)
+        ol,cl_cm,res,kdFeO_oll_cm,cl_wt = MgOFeO_isoequ(ol,kdMgO_oll_cm,f,kdFe2Mg_oll,res,cl_cm,cl_wt,source_cm)
+        kdNi_wt, bulkD, cl_wt, ol, res = Ni_isoequ(T,kdMgO_oll_cm,cl_wt,f,f_mineral,res,bulkD,ol,source_wt)
+        kdMn_wt, bulkD, cl_wt, ol, res = Mn_isoequ(T,kdMgO_oll_cm,cl_wt,f,f_mineral,res,bulkD,ol,source_wt,Po,kdFeO_oll_cm)
+        ## format data
+        F_mineral = {element: [] for element in f_mineral}
+        Res = {element: [] for element in res}  
+        Cl_wt = {element: [] for element in cl_wt}
+        Cl_cm = {element: [] for element in cl_cm}
+        KdNi_wt = {element: [] for element in kdNi_wt}
+        KdMn_wt = {element: [] for element in kdMn_wt}
+        BulkD = {element: [] for element in bulkD}
+        Cl_molar = {element: [] for element in cl_molar}
+        ClSiO2_adjust = []
+        Ol = {element: [] for element in ol}
+        Phase_tot = []
+        T_melting = []
+        P_melting = []
+        F_melting = []
+        F_step = []
+        KdMgO_oll_cm = []
+        KdFeO_oll_cm = []
+        KdFe2Mg_oll = []
+        for element in F_mineral:
+            F_mineral[element].append(f_mineral[element])
+        for element in Res:
+            Res[element].append(res[element])
+        for element in Cl_wt:
+            Cl_wt[element].append(cl_wt[element])
+        for element in Cl_cm:
+            Cl_cm[element].append(cl_cm[element])
+        for element in KdNi_wt:
+            KdNi_wt[element].append(kdNi_wt[element])
+            KdMn_wt[element].append(kdMn_wt[element])
+        for element in BulkD:
+            BulkD[element].append(bulkD[element])
+        for element in Cl_molar:
+            Cl_molar[element].append(cl_molar[element])
+        for element in Ol:
+            Ol[element].append(ol[element])
+        ClSiO2_adjust.append(clSiO2_adjust)
+        Phase_tot.append(phase_tot)
+        T_melting.append(T)
+        P_melting.append(Po)
+        F_melting.append(f)
+        F_step.append(f_step)
+        KdMgO_oll_cm.append(kdMgO_oll_cm)
+        KdFeO_oll_cm.append(kdFeO_oll_cm)
+        KdFe2Mg_oll.append(kdFe2Mg_oll)
+        ## melting stops when the extent of melting reaches to about 50%
+        while f <=0.5:
+            T,f,f_step = TPF_isoequ(P,f,mgnumber_source)
+            f_mineral, phase_tot,source_phase2,source_phase3,source_phase4,f_gt0,f_cpx0,f_sp0 = mineral_phase_isoequ(Po,P,f,source_phase,source_phase2,f_gt0,source_phase3,source_phase4,f_cpx0,f_sp0,f_mineral)
+            cl_wt,bulkD,cl_cm,res = liquid_wt_isoequ(source_wt,f,f_mineral,P,T,cl_wt,cl_cm,bulkD,res,Po)
+            cl_molar,clSiO2_adjust,kdMgO_oll_cm,ol,kdFe2Mg_oll = KDFeMg(T,P,f_step,cl_wt,cl_cm,res,cl_molar,ol)
+            ol,cl_cm,res,kdFeO_oll_cm,cl_wt = MgOFeO_isoequ(ol,kdMgO_oll_cm,f,kdFe2Mg_oll,res,cl_cm,cl_wt,source_cm)
+            kdNi_wt, bulkD, cl_wt, ol, res = Ni_isoequ(T,kdMgO_oll_cm,cl_wt,f,f_mineral,res,bulkD,ol,source_wt)
+            kdMn_wt, bulkD, cl_wt, ol, res = Mn_isoequ(T,kdMgO_oll_cm,cl_wt,f,f_mineral,res,bulkD,ol,source_wt,Po,kdFeO_oll_cm)
+            for element in F_mineral:
+                F_mineral[element].append(f_mineral[element])
+            for element in Res:
+                Res[element].append(res[element])
+            for element in Cl_wt:
+                Cl_wt[element].append(cl_wt[element])
+            for element in Cl_cm:
+                Cl_cm[element].append(cl_cm[element])
+            for element in KdNi_wt:
+                KdNi_wt[element].append(kdNi_wt[element])
+                KdMn_wt[element].append(kdMn_wt[element])
+            for element in BulkD:
+                BulkD[element].append(bulkD[element])
+            for element in Cl_molar:
+                Cl_molar[element].append(cl_molar[element])
+            for element in Ol:
+                Ol[element].append(ol[element])
+            ClSiO2_adjust.append(clSiO2_adjust)
+            Phase_tot.append(phase_tot)
+            T_melting.append(T)
+            P_melting.append(Po)
+            F_melting.append(f)
+            F_step.append(f_step)
+            KdMgO_oll_cm.append(kdMgO_oll_cm)
+            KdFeO_oll_cm.append(kdFeO_oll_cm)
+            KdFe2Mg_oll.append(kdFe2Mg_oll)
+
+    # melting results output, see readme file for an inroduction of each column
+    BulkD_df = pd.DataFrame(BulkD)
+    BulkD_df.columns = ['DK2O','DNa2O','DTiO2','DNiO','DMnO']
+    Cl_cm_df = pd.DataFrame(Cl_cm)
+    Cl_cm_df.columns = ['clMgO_cm','clFeO_cm','clNa2O_cm','clK2O_cm']
+    Cl_molar_df = pd.DataFrame(Cl_molar)
+    Cl_molar_df.columns = ['clSiO2_molar','clNa2O_molar','clK2O_molar']
+    ClSiO2_adjust = {'clSiO2_adjust':ClSiO2_adjust}
+    ClSiO2_adjust = pd.DataFrame(ClSiO2_adjust)
+    F_mineral = pd.DataFrame(F_mineral)
+    F_step = {'f_step':F_step}
+    F_step = pd.DataFrame(F_step)
+    KDFeMg_oll = {'kdMgO_oll_cm':KdMgO_oll_cm,'kdFeO_oll_cm':KdFeO_oll_cm,'KDFe2Mg_oll':KdFe2Mg_oll}
+    KDFeMg_oll = pd.DataFrame(KDFeMg_oll)
+    KdMn_wt_df = pd.DataFrame(KdMn_wt)
+    KdMn_wt_df.columns = ['KdMn_oll_wt','KdMn_opxl_wt','KdMn_cpxl_wt','KdMn_gtl_wt','KdMn_spl_wt','KdMn_opxol_wt','KdMn_cpxol_wt','KdMn_gtol_wt','KdMn_spol_wt']
+    Ol_df = pd.DataFrame(Ol)
+    Ol_df.columns = ['olMgO_cm','olFeO_cm','Fo','olNiO_wt','olMnO_wt']
+    P_melting = {'P kbar':P_melting}
+    P_melting = pd.DataFrame(P_melting)
+    Phase_tot = {'mineral_phase_tot':Phase_tot}
+    Phase_tot = pd.DataFrame(Phase_tot)
+    Res = pd.DataFrame(Res)
+    Res.columns = ['resMgO_cm','resFeO_cm','resTiO2_wt','resNa2O_wt','resK2O_wt','resNiO_wt','resMnO_wt','resMgnumber']
+    T_melting = {'T Celsius':T_melting}
+    T_melting = pd.DataFrame(T_melting)
+    if melting_model == 'polybaric':
+        Cl_wt_itg1_df = pd.DataFrame(Cl_wt_itg1)
+        Cl_wt_itg1_df.columns = ['clMgO_wt_itg1','clFeO_wt_itg1','clTiO2_wt_itg1','clNa2O_wt_itg1','clK2O_wt_itg1','clNiO_wt_itg1','clMnO_wt_itg1','clSiO2_wt_itg1']
+        Cl_wt_itg2_df = pd.DataFrame(Cl_wt_itg2)
+        Cl_wt_itg2_df.columns = ['clMgO_wt_itg2','clFeO_wt_itg2','clTiO2_wt_itg2','clNa2O_wt_itg2','clK2O_wt_itg2','clNiO_wt_itg2','clMnO_wt_itg2','clSiO2_wt_itg2']
+        F_melting_itg1 = {'F_liq_itg1':F_melting_itg1}
+        F_melting_itg1 = pd.DataFrame(F_melting_itg1)
+        F_melting_itg2 = {'F_liq_itg2':F_melting_itg2}
+        F_melting_itg2 = pd.DataFrame(F_melting_itg2)
+        KdNi_wt_df = pd.DataFrame(KdNi_wt)
+        KdNi_wt_df.columns = ['KdNi_oll_wt','KdNi_opxl_wt','KdNi_cpxl_wt','KdNi_gtl_wt','KdNi_spl_wt','KdNi_opxol_wt','KdNi_cpxol_wt','KdNi_gtol_wt','KdNi_spol_wt']
+        melting_df = pd.concat([T_melting,P_melting,F_step,F_mineral,Phase_tot,F_melting_itg2,Cl_wt_itg2_df,F_melting_itg1,Cl_wt_itg1_df,Ol_df,Cl_cm_df,Cl_molar_df,ClSiO2_adjust,Res,KDFeMg_oll,BulkD_df,KdNi_wt_df,KdMn_wt_df],axis=1)        
+    else:
+        KdNi_wt_df = pd.DataFrame(KdNi_wt)
+        KdNi_wt_df.columns = ['KdNi_oll_wt','KdNi_opxl_wt','KdNi_cpxl_wt','KdNi_gtl_wt','KdNi_spl_wt','KdNi_opxol_wt','KdNi_cpxol_wt','KdNi_gtol_wt','KdNi_spol_wt']
+        Cl_wt_df = pd.DataFrame(Cl_wt)
+        Cl_wt_df.columns = ['clMgO_wt','clFeO_wt','clTiO2_wt','clNa2O_wt','clK2O_wt','clNiO_wt','clMnO_wt','clSiO2_wt']
+        F_melting = {'F_liq':F_melting}
+        F_melting = pd.DataFrame(F_melting)
+        melting_df = pd.concat([T_melting,P_melting,F_melting,F_step,F_mineral,Phase_tot,Cl_wt_df,Ol_df,Cl_cm_df,Cl_molar_df,ClSiO2_adjust,Res,KDFeMg_oll,BulkD_df,KdNi_wt_df,KdMn_wt_df],axis=1)
+    return melting_df
+
+# the accumulated melt at the extent of melting closest to F_target, as the magma compositions in wt% for crystallization
+# itg='itg1' or 'itg2' for polybaric melting (see function itg), itg=None for isobaric melting
+def select_magma(melting_df,F_target,itg='itg1',keys=('MgO','FeO','SiO2','Na2O','K2O','NiO','MnO')):
+    suffix = '' if itg is None else '_'+itg
+    ip_magma = abs(melting_df['F_liq'+suffix]-F_target).idxmin()
+    magma = {key:float(melting_df.loc[ip_magma,'cl'+key+'_wt'+suffix]) for key in keys}
+    return ip_magma, magma
+
+# olivine-only crystallization of a magma (wt%: MgO,FeO,SiO2,Na2O,K2O,NiO,MnO) at pressure P in kbar, 'fractional' or 'equilibrium'
+# Fe2Fet: ferrous/total Fe of the magma, Po: starting pressure of the melting, T_range: the crystallization stops when temperature decreases by T_range Celsius
+# backend: 'python' (the dictionary functions of olonly_function2023.py) or 'kernel' (kernels2023.py)
+def olonly_model(magma,Fe2Fet,Po,P=0.001,T_range=350,xtalization_model='fractional',backend='python'):
+    if backend not in ('python','kernel'):
+        raise ValueError("backend must be 'python' or 'kernel'")
+    if backend == 'kernel':
+        return olonly_model_kernel(magma,Fe2Fet,Po,P,T_range,xtalization_model)
+    cm_magma = cationmole_magma(magma)
+    if xtalization_model == 'fractional':
+        clcm_olonly = cm_magma
+        clppm_olonly = {'Ni':magma['NiO']*58.6934/74.69*10**4,'Mn':magma['MnO']*54.938/70.94*10**4}
+        clmolar_olonly = {'SiO2':0,'Na2O':0,'K2O':0}
+        clmolar_olonly['SiO2'] = 0.01*clcm_olonly['SiO2']*cm_tot/molar_tot
+        clmolar_olonly['Na2O'] = 0.01*clcm_olonly['Na2O']*cm_tot*cm_mass['Na2O']/(cm_mass['Na2O']*2)/molar_tot
+        clmolar_olonly['K2O'] = 0.01*clcm_olonly['K2O']*cm_tot*cm_mass['K2O']/(cm_mass['K2O']*2)/molar_tot
+        if clmolar_olonly['SiO2'] <= 0.6:
+            molarSiO2_adjust = 100*clmolar_olonly['SiO2']+100*(clmolar_olonly['Na2O']+clmolar_olonly['K2O'])*((0.46*100/(100-100*clmolar_olonly['SiO2'])-0.93)*100*(clmolar_olonly['Na2O']+clmolar_olonly['K2O'])-5.33*100/(100-100*clmolar_olonly['SiO2'])+9.69)
+        else:
+            molarSiO2_adjust = 100*clmolar_olonly['SiO2']+100*(clmolar_olonly['Na2O']+clmolar_olonly['K2O'])*(11-5.5*100/(100-100*clmolar_olonly['SiO2']))*math.exp(-0.13*100*(clmolar_olonly['Na2O']+clmolar_olonly['K2O']))
+        T = get_firstT_olonly(clcm_olonly,P,molarSiO2_adjust)
+        liquidusT_olonly = T
+        cm_kdMg_oll_olonly = math.exp(6921/(T+273.15)+0.034*clcm_olonly['Na2O']+0.063*clcm_olonly['K2O']+0.01154*P-3.27)
+        kdFe2Mg_oll_olonly = math.exp(-6766/(8.3144*(T+273.15))-7.34/8.3144+math.log(0.036*molarSiO2_adjust-0.22)+3000*(1-2*clcm_olonly['MgO']*cm_kdMg_oll_olonly/66.67)/(8.3144*(T+237.15))+0.035*(P*10**3-1)/(8.3144*(T+273.15)))
+        cm_kdFe2_oll_olonly = kdFe2Mg_oll_olonly*cm_kdMg_oll_olonly
+        olcm_olonly = {'MgO':0,'FeO':0}
+        olcm_olonly['MgO'] = clcm_olonly['MgO']*cm_kdMg_oll_olonly
+        olcm_olonly['FeO'] = clcm_olonly['FeO']*cm_kdFe2_oll_olonly
+        ol_stoich_olonly = olcm_olonly['MgO']+olcm_olonly['FeO']
+        fo_olonly = 100*olcm_olonly['MgO']/66.67
+        wt_kdNi_oll_olonly = math.exp(4272/(T+273.15)+0.01582*(clcm_olonly['SiO2']*cm_tot*cm_mass['SiO2']/100)-2.7622)*(cm_kdMg_oll_olonly*1.09)
+        olppm_olonly = {'Ni':0,'Mn':0}
+        olppm_olonly['Ni'] = clppm_olonly['Ni']*wt_kdNi_oll_olonly
+        wt_kdMn_oll_olonly = 0.79*cm_kdFe2_oll_olonly*1.09
+        olppm_olonly['Mn'] = clppm_olonly['Mn']*wt_kdMn_oll_olonly
+        f_step_olonly = 1
+        f_olonly = 1
+
+        ## format data
+        T_olonly = []
+        F_olonly = []
+        F_step_olonly = []
+        cmKdMgoll_olonly = []
+        cmKdFe2oll_olonly = []
+        KdFe2Mgoll_olonly = []
+        Clcm_olonly = {element: [] for element in clcm_olonly}
+        Olcm_olonly = {element: [] for element in olcm_olonly}
+        Olstoich_olonly = []
+        Fo_olonly = []
+        Clmolar_olonly = {element: [] for element in clmolar_olonly}
+        MolarSiO2_adjust = []
+        wtKdNioll_olonly = []
+        wtKdMnoll_olonly = []
+        Clppm_olonly = {element: [] for element in clppm_olonly}
+        Olppm_olonly = {element: [] for element in olppm_olonly}
+
+        T_olonly.append(T)
+        F_olonly.append(f_olonly)
+        F_step_olonly.append(f_step_olonly)
+        cmKdMgoll_olonly.append(cm_kdMg_oll_olonly)
+        cmKdFe2oll_olonly.append(cm_kdFe2_oll_olonly)
+        KdFe2Mgoll_olonly.append(kdFe2Mg_oll_olonly)
+        for element in Clcm_olonly:
+            Clcm_olonly[element].append(clcm_olonly[element])
+        for element in Olcm_olonly:
+            Olcm_olonly[element].append(olcm_olonly[element])
+        Olstoich_olonly.append(ol_stoich_olonly)
+        Fo_olonly.append(fo_olonly)
+        for element in Clmolar_olonly:
+            Clmolar_olonly[element].append(clmolar_olonly[element])
+        MolarSiO2_adjust.append(molarSiO2_adjust)
+        wtKdNioll_olonly.append(wt_kdNi_oll_olonly)
+        wtKdMnoll_olonly.append(wt_kdMn_oll_olonly)
+        for element in Clppm_olonly:
+            Clppm_olonly[element].append(clppm_olonly[element])
+        for element in Olppm_olonly:
+            Olppm_olonly[element].append(olppm_olonly[element])
+
+        while T>liquidusT_olonly-T_range:
+            T,f_step_olonly,f_olonly,cm_kdMg_oll_olonly,kdFe2Mg_oll_olonly,cm_kdFe2_oll_olonly,clmolar_olonly,molarSiO2_adjust = TF_olonly(T,clmolar_olonly,clcm_olonly,P,f_olonly)
+            clcm_olonly,olcm_olonly,ol_stoich_olonly,fo_olonly = concentration_olonly(clcm_olonly,cm_kdMg_oll_olonly,f_step_olonly,cm_kdFe2_oll_olonly,olcm_olonly)
+            wt_kdNi_oll_olonly,clppm_olonly,olppm_olonly,wt_kdMn_oll_olonly = NiMn_olonly(T,cm_kdMg_oll_olonly,clppm_olonly,f_step_olonly,olppm_olonly,clcm_olonly,cm_kdFe2_oll_olonly,Po)
+            T_olonly.append(T)
+            F_olonly.append(f_olonly)
+            F_step_olonly.append(f_step_olonly)
+            cmKdMgoll_olonly.append(cm_kdMg_oll_olonly)
+            cmKdFe2oll_olonly.append(cm_kdFe2_oll_olonly)
+            KdFe2Mgoll_olonly.append(kdFe2Mg_oll_olonly)
+            for element in Clcm_olonly:
+                Clcm_olonly[element].append(clcm_olonly[element])
+            for element in Olcm_olonly:
+                Olcm_olonly[element].append(olcm_olonly[element])
+            Olstoich_olonly.append(ol_stoich_olonly)
+            Fo_olonly.append(fo_olonly)
+            for element in Clmolar_olonly:
+                Clmolar_olonly[element].append(clmolar_olonly[element])
+            MolarSiO2_adjust.append(molarSiO2_adjust)
+            wtKdNioll_olonly.append(wt_kdNi_oll_olonly)
+            wtKdMnoll_olonly.append(wt_kdMn_oll_olonly)
+            for element in Clppm_olonly:
+                Clppm_olonly[element].append(clppm_olonly[element])
+            for element in Olppm_olonly:
+                Olppm_olonly[element].append(olppm_olonly[element])
+    elif xtalization_model == 'equilibrium':
+        clcm_olonly = cm_magma
+        clppm_olonly = {'Ni':magma['NiO']*58.6934/74.69*10**4,'Mn':magma['MnO']*54.938/70.94*10**4}
+        clmolar_olonly = {'SiO2':0,'Na2O':0,'K2O':0}
+        clmolar_olonly['SiO2'] = 0.01*clcm_olonly['SiO2']*cm_tot/molar_tot
+        clmolar_olonly['Na2O'] = 0.01*clcm_olonly['Na2O']*cm_tot*cm_mass['Na2O']/(cm_mass['Na2O']*2)/molar_tot
+        clmolar_olonly['K2O'] = 0.01*clcm_olonly['K2O']*cm_tot*cm_mass['K2O']/(cm_mass['K2O']*2)/molar_tot
+        if clmolar_olonly['SiO2'] <= 0.6:
+            molarSiO2_adjust = 100*clmolar_olonly['SiO2']+100*(clmolar_olonly['Na2O']+clmolar_olonly['K2O'])*((0.46*100/(100-100*clmolar_olonly['SiO2'])-0.93)*100*(clmolar_olonly['Na2O']+clmolar_olonly['K2O'])-5.33*100/(100-100*clmolar_olonly['SiO2'])+9.69)
+        else:
+            molarSiO2_adjust = 100*clmolar_olonly['SiO2']+100*(clmolar_olonly['Na2O']+clmolar_olonly['K2O'])*(11-5.5*100/(100-100*clmolar_olonly['SiO2']))*math.exp(-0.13*100*(clmolar_olonly['Na2O']+clmolar_olonly['K2O']))
+        T = get_firstT_olonly(clcm_olonly,P,molarSiO2_adjust)
+        liquidusT_olonly = T
+        cm_kdMg_oll_olonly = math.exp(6921/(T+273.15)+0.034*clcm_olonly['Na2O']+0.063*clcm_olonly['K2O']+0.01154*P-3.27)
+        kdFe2Mg_oll_olonly = math.exp(-6766/(8.3144*(T+273.15))-7.34/8.3144+math.log(0.036*molarSiO2_adjust-0.22)+3000*(1-2*clcm_olonly['MgO']*cm_kdMg_oll_olonly/66.67)/(8.3144*(T+237.15))+0.035*(P*10**3-1)/(8.3144*(T+273.15)))
+        cm_kdFe2_oll_olonly = kdFe2Mg_oll_olonly*cm_kdMg_oll_olonly
+        olcm_olonly = {'MgO':0,'FeO':0}
+        olcm_olonly['MgO'] = clcm_olonly['MgO']*cm_kdMg_oll_olonly
+        olcm_olonly['FeO'] = clcm_olonly['FeO']*cm_kdFe2_oll_olonly
+        ol_stoich_olonly = olcm_olonly['MgO']+olcm_olonly['FeO']
+        fo_olonly = 100*olcm_olonly['MgO']/66.67
+        wt_kdNi_oll_olonly = math.exp(4272/(T+273.15)+0.01582*(clcm_olonly['SiO2']*cm_tot*cm_mass['SiO2']/100)-2.7622)*(cm_kdMg_oll_olonly*1.09)
+        olppm_olonly = {'Ni':0,'Mn':0}
+        olppm_olonly['Ni'] = clppm_olonly['Ni']*wt_kdNi_oll_olonly
+        wt_kdMn_oll_olonly = 0.79*cm_kdFe2_oll_olonly*1.09
+        olppm_olonly['Mn'] = clppm_olonly['Mn']*wt_kdMn_oll_olonly
+        f_step_olonly = 0
+        f_olonly = 1
+
+        ## format data
+        T_olonly = []
+        F_olonly = []
+        F_step_olonly = []
+        cmKdMgoll_olonly = []
+        cmKdFe2oll_olonly = []
+        KdFe2Mgoll_olonly = []
+        Clcm_olonly = {element: [] for element in clcm_olonly}
+        Olcm_olonly = {element: [] for element in olcm_olonly}
+        Olstoich_olonly = []
+        Fo_olonly = []
+        Clmolar_olonly = {element: [] for element in clmolar_olonly}
+        MolarSiO2_adjust = []
+        wtKdNioll_olonly = []
+        wtKdMnoll_olonly = []
+        Clppm_olonly = {element: [] for element in clppm_olonly}
+        Olppm_olonly = {element: [] for element in olppm_olonly}
+
+        T_olonly.append(T)
+        F_olonly.append(f_olonly)
+        F_step_olonly.append(f_step_olonly)
+        cmKdMgoll_olonly.append(cm_kdMg_oll_olonly)
+        cmKdFe2oll_olonly.append(cm_kdFe2_oll_olonly)
+        KdFe2Mgoll_olonly.append(kdFe2Mg_oll_olonly)
+        for element in Clcm_olonly:
+            Clcm_olonly[element].append(clcm_olonly[element])
+        for element in Olcm_olonly:
+            Olcm_olonly[element].append(olcm_olonly[element])
+        Olstoich_olonly.append(ol_stoich_olonly)
+        Fo_olonly.append(fo_olonly)
+        for element in Clmolar_olonly:
+            Clmolar_olonly[element].append(clmolar_olonly[element])
+        MolarSiO2_adjust.append(molarSiO2_adjust)
+        wtKdNioll_olonly.append(wt_kdNi_oll_olonly)
+        wtKdMnoll_olonly.append(wt_kdMn_oll_olonly)
+        for element in Clppm_olonly:
+            Clppm_olonly[element].append(clppm_olonly[element])
+        for element in Olppm_olonly:
+            Olppm_olonly[element].append(olppm_olonly[element])
+
+        while T>liquidusT_olonly-T_range:
+            cm_magma = cationmole_magma(magma)
+            clppm_magma = {'Ni':magma['NiO']*58.6934/74.69*10**4,'Mn':magma['MnO']*54.938/70.94*10**4}
+            T,f_step_olonly,f_olonly,cm_kdMg_oll_olonly,kdFe2Mg_oll_olonly,cm_kdFe2_oll_olonly,clmolar_olonly,molarSiO2_adjust = TF_olonly_equ(T,clmolar_olonly,clcm_olonly,P,f_olonly,cm_magma)
+            clcm_olonly,olcm_olonly,ol_stoich_olonly,fo_olonly = concentration_olonly_equ(clcm_olonly,cm_kdMg_oll_olonly,f_step_olonly,cm_kdFe2_oll_olonly,olcm_olonly,cm_magma,f_olonly)
+            wt_kdNi_oll_olonly,clppm_olonly,olppm_olonly,wt_kdMn_oll_olonly = NiMn_olonly_equ(T,cm_kdMg_oll_olonly,clppm_olonly,f_step_olonly,olppm_olonly,clcm_olonly,clppm_magma,f_olonly,cm_kdFe2_oll_olonly)
+            T_olonly.append(T)
+            F_olonly.append(f_olonly)
+            F_step_olonly.append(f_step_olonly)
+            cmKdMgoll_olonly.append(cm_kdMg_oll_olonly)
+            cmKdFe2oll_olonly.append(cm_kdFe2_oll_olonly)
+            KdFe2Mgoll_olonly.append(kdFe2Mg_oll_olonly)
+            for element in Clcm_olonly:
+                Clcm_olonly[element].append(clcm_olonly[element])
+            for element in Olcm_olonly:
+                Olcm_olonly[element].append(olcm_olonly[element])
+            Olstoich_olonly.append(ol_stoich_olonly)
+            Fo_olonly.append(fo_olonly)
+            for element in Clmolar_olonly:
+                Clmolar_olonly[element].append(clmolar_olonly[element])
+            MolarSiO2_adjust.append(molarSiO2_adjust)
+            wtKdNioll_olonly.append(wt_kdNi_oll_olonly)
+            wtKdMnoll_olonly.append(wt_kdMn_oll_olonly)
+            for element in Clppm_olonly:
+                Clppm_olonly[element].append(clppm_olonly[element])
+            for element in Olppm_olonly:
+                Olppm_olonly[element].append(olppm_olonly[element])
+
+    # olivine-only crystallization results output, see readme file for an introduction of each column
+    clwtMgOarray_olonly = np.asarray(Clcm_olonly['MgO'])*cm_tot*cm_mass['MgO']/100
+    clwtFeOarray_olonly = np.asarray(Clcm_olonly['FeO'])*cm_tot*cm_mass['FeO']/100
+    clwtFeOtarray_olonly = clwtFeOarray_olonly/Fe2Fet
+    clwtMnOarray_olonly = np.asarray(Clppm_olonly['Mn'])/(10**4)*70.94/54.938
+    clwtFeOtMnOarray_olonly = clwtFeOarray_olonly/Fe2Fet/clwtMnOarray_olonly
+    clwtSiO2array_olonly = np.asarray(Clcm_olonly['SiO2'])*cm_tot*cm_mass['SiO2']/100
+    Clwt_olonly = {'MgO':clwtMgOarray_olonly.tolist(),'FeO':clwtFeOarray_olonly.tolist(),\
+                   'FeOt':clwtFeOtarray_olonly.tolist(),'MnO':clwtMnOarray_olonly.tolist(),\
+                       'FeOt/MnO':clwtFeOtMnOarray_olonly.tolist(),\
+                           'SiO2':clwtSiO2array_olonly.tolist()}
+    T_olonly = {'T Celsius':T_olonly}
+    T_olonly = pd.DataFrame(T_olonly)
+    F_olonly = {'melt fraction':F_olonly}
+    F_olonly = pd.DataFrame(F_olonly)
+    F_step_olonly = {'F_step':F_step_olonly}
+    F_step_olonly = pd.DataFrame(F_step_olonly)
+    cmKdMgoll_olonly = {'cmkdMgoll':cmKdMgoll_olonly}
+    cmKdMgoll_olonly = pd.DataFrame(cmKdMgoll_olonly)
+    cmKdFe2oll_olonly = {'cmkdFe2oll':cmKdFe2oll_olonly}
+    cmKdFe2oll_olonly = pd.DataFrame(cmKdFe2oll_olonly)
+    KdFe2Mgoll_olonly = {'KDFe2Mgoll':KdFe2Mgoll_olonly}
+    KdFe2Mgoll_olonly = pd.DataFrame(KdFe2Mgoll_olonly)
+    Clcm_olonly = pd.DataFrame(Clcm_olonly)
+    Clcm_olonly.columns = ['clcm_MgO','clcm_FeO','clcm_SiO2','clcm_Na2O','clcm_K2O']
+    Olcm_olonly = pd.DataFrame(Olcm_olonly)
+    Olcm_olonly.columns = ['olcm_MgO','olcm_FeO']
+    Olstoich_olonly = {'(MgO+FeO)ol':Olstoich_olonly}
+    Olstoich_olonly = pd.DataFrame(Olstoich_olonly)
+    Fo_olonly = {'Fo':Fo_olonly}
+    Fo_olonly = pd.DataFrame(Fo_olonly)
+    Clmolar_olonly = pd.DataFrame(Clmolar_olonly)
+    Clmolar_olonly.columns = ['clmolar_SiO2','clmolar_Na2O','clmolar_K2O']
+    MolarSiO2_adjust = {'molarSiO2_adjust':MolarSiO2_adjust}
+    MolarSiO2_adjust = pd.DataFrame(MolarSiO2_adjust)
+    wtKdNioll_olonly = {'wtkdNioll':wtKdNioll_olonly}
+    wtKdNioll_olonly = pd.DataFrame(wtKdNioll_olonly)
+    wtKdMnoll_olonly = {'wtkdMnoll':wtKdMnoll_olonly}
+    wtKdMnoll_olonly = pd.DataFrame(wtKdMnoll_olonly)
+    Clppm_olonly = pd.DataFrame(Clppm_olonly)
+    Clppm_olonly.columns = ['clppm_Ni','clppm_Mn']
+    Olppm_olonly = pd.DataFrame(Olppm_olonly)
+    Olppm_olonly.columns = ['olppm_Ni','olppm_Mn']
+    Clwt_olonly = pd.DataFrame(Clwt_olonly)
+    Clwt_olonly.columns = ['clwt_MgO','clwt_FeO','clwt_FeOt','clwt_MnO','clwt_FeOt/MnO','clwt_SiO2'] 
+    olonly_xtalization = pd.concat([T_olonly,F_olonly,F_step_olonly,Clwt_olonly,Clppm_olonly,Fo_olonly,Olppm_olonly,\
+                                    Olcm_olonly,Olstoich_olonly,cmKdMgoll_olonly,cmKdFe2oll_olonly,\
+                                    KdFe2Mgoll_olonly,wtKdNioll_olonly,wtKdMnoll_olonly,Clcm_olonly,\
+                                        Clmolar_olonly,MolarSiO2_adjust],axis=1)
+
+    return olonly_xtalization
+
+# magma for ol-pl-cpx crystallization, the accumulated melt at F_target with fixed Al2O3, P2O5 and CaO
+def select_magma_wl1990(melting_df,F_target,itg='itg2',fixed=magma_fixed_wl1990):
+    ip_magma, magma = select_magma(melting_df,F_target,itg,keys=('SiO2','TiO2','FeO','MgO','K2O','MnO','Na2O','NiO'))
+    magma = {key:(fixed[key] if key in fixed else magma[key]) for key in ('SiO2','TiO2','Al2O3','FeO','MgO','K2O','MnO','Na2O','P2O5','CaO','NiO')}
+    return ip_magma, magma
+
+# ol-pl-cpx crystallization of a magma (wt%) at 1 kbar, the crystallization stops when temperature decreases by T_range Celsius
+# diagnostics: None, or a list that receives the diagnostics record of every 'state' call (see wl1990diagnostics_2023.py)
+# solver: 'newton' (original) or 'robust' (see 'state_robust' in wl1990state_2023.py)
+# trace_start_comp: None, or the trace elements of the magma (e.g., ppm), added as columns 'liq_<element>' (partition coefficients kd_dict, see wl1990trace_2023.py)
+def wl1990_model(magma,Fe2Fet,T_range=250,diagnostics=None,solver='newton',trace_start_comp=None,kd_dict=kd_trace_default):
+    system_components = magma
+    T_system_components = oxideToComponent(system_components)
+    t_start = get_first_T(T_system_components, P = 1., kdCalc = kdCalc_langmuir1992, diagnostics = diagnostics, solver = solver)
+    t_stop = t_start -T_range
+    fl,fa_dict,major_oxide_dict,major_phase_oxide_dict = frac_model_trange(t_start, t_stop,system_components,P=1.,kdCalc = kdCalc_langmuir1992, diagnostics = diagnostics, solver = solver) 
+    trace_dict = {} if trace_start_comp is None else trace_model(fl,fa_dict,trace_start_comp,kd_dict,'fractional')
+
+    # ol-pl-cpx crystallization output, see readme file for an introduction of each column
+    T_df = pd.DataFrame(np.arange(t_start,t_stop,-1))
+    T_df = T_df-273.15
+    T_df.columns = ['T_C']
+    fl_dict = {'fl':fl}
+    fl_df = pd.DataFrame(fl_dict)
+    fa_df = pd.DataFrame(fa_dict)
+    major_oxide_df = pd.DataFrame(major_oxide_dict)
+    major_ol_oxide_df = pd.DataFrame(major_phase_oxide_dict['ol'])
+    major_cpx_oxide_df = pd.DataFrame(major_phase_oxide_dict['cpx'])
+    major_plg_oxide_df = pd.DataFrame(major_phase_oxide_dict['plg'])
+
+    LLD_df = pd.concat([T_df,fl_df,fa_df,major_oxide_df,major_ol_oxide_df,major_cpx_oxide_df,major_plg_oxide_df],axis=1)
+    LLD_df.columns = ['T_C','f_liq','f_plg','f_cpx','f_ol','liq_SiO2','liq_TiO2','liq_Al2O3','liq_FeO',\
+                   'liq_MgO','liq_K2O','liq_MnO','liq_Na2O','liq_P2O5','liq_CaO','liq_NiO','olSiO2',\
+                       'olTiO2','olAl2O3','olFeO','olMgO','olK2O','olMnO','olNa2O','olP2O5','olCaO','olNiO',\
+                           'cpxSiO2','cpxTiO2','cpxAl2O3','cpxFeO','cpxMgO','cpxK2O','cpxMnO','cpxNa2O',\
+                               'cpxP2O5','cpxCaO','cpxNiO','plgSiO2','plgTiO2','plgAl2O3','plgFeO','plgMgO',\
+                                   'plgK2O','plgMnO','plgNa2O','plgP2O5','plgCaO','plgNiO']
+    LLD_df['liq_FeOt'] = LLD_df['liq_FeO']/Fe2Fet
+    LLD_df['Fo'] = 100/(1+LLD_df['olFeO']/LLD_df['olMgO']*40.3/71.84)
+    LLD_df['olNippm'] = LLD_df['olNiO']*58.6934/74.69*10**4
+    LLD_df['olMnppm'] = LLD_df['olMnO']*54.938/70.94*10**4
+    LLD_df['liq_Nippm'] = LLD_df['liq_NiO']*58.6934/74.69*10**4
+    LLD_df['liq_FeOtMnO'] = LLD_df['liq_FeOt']/LLD_df['liq_MnO']
+    for elem in trace_dict:
+        LLD_df['liq_'+elem] = trace_dict[elem]
+
+    return LLD_df
+
+## default scenarios: the default Hawaii and MORB settings of melting_crystallization2023.py (sources and parameters of constants2023.py),
+# used by the benchmarks, the checks of the other codes and, e.g., 'Inversion' (inversion2023.py); the source dictionaries are copies, so a scenario can be sent as JSON (service2023.py)
+scenarios = {
+    'Haw': {'source_wt':dict(source_wt_IonovMgO385_eclope), 'source_phase':dict(source_phase_IonovMgO385_eclope),
+            'Po':Po_high, 'F_target':F_target_Haw, 'itg':'itg1', 'Fe2Fet':Fe2Fet_Haw, 'T_range':350},
+    'MORB': {'source_wt':dict(source_wt_IonovMgO385), 'source_phase':dict(source_phase_IonovMgO385_lowP),
+             'Po':Po_low, 'F_target':F_target_MORB, 'itg':'itg2', 'Fe2Fet':Fe2Fet_MORB, 'T_range':250},
+    }
+
+# polybaric melting column of a default scenario, calculated once and shared by the callers (do not change it)
+_columns = {}
+
+def default_column(setting):
+    if setting not in _columns:
+        s = scenarios[setting]
+        _columns[setting] = melting_column(s['source_wt'],s['source_phase'],s['Po'],'polybaric')
+    return _columns[setting]
+
+# magma of a default scenario and the inputs of 'olonly_model': (magma, Fe2Fet, Po, T_range)
+def default_olonly_inputs(setting):
+    s = scenarios[setting]
+    ip_magma, magma = select_magma(default_column(setting),s['F_target'],itg=s['itg'])
+    return (magma,s['Fe2Fet'],s['Po'],s['T_range'])
+
+# magma of a default scenario (MORB) and the inputs of 'wl1990_model': (magma, Fe2Fet, T_range)
+def default_wl1990_inputs(setting='MORB'):
+    s = scenarios[setting]
+    ip_magma, magma = select_magma_wl1990(default_column(setting),s['F_target'],itg=s['itg'])
+    return (magma,s['Fe2Fet'],s['T_range'])
+
+## checks: the model functions run at the same time in a thread pool give the same results as serial runs,
+# and do not change the dictionaries passed to them (the same source and magma dictionaries are passed to every run)
+if __name__ == '__main__':
+    import sys
+    import copy
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    s = scenarios['Haw']
+    source_wt, source_phase = s['source_wt'], s['source_phase']
+    magma, Fe2Fet, Po, T_range = default_olonly_inputs('Haw')
+    magma_wl1990, Fe2Fet_wl1990, T_range_wl1990 = default_wl1990_inputs()
+    inputs = {'source_wt':source_wt,'source_phase':source_phase,'magma':magma,'magma_wl1990':magma_wl1990}
+    inputs_before = copy.deepcopy(inputs)
+    runs = {'melting_column polybaric':lambda: melting_column(source_wt,source_phase,s['Po'],'polybaric'),
+            'melting_column isobaric':lambda: melting_column(source_wt,source_phase,s['Po'],'isobaric'),
+            'olonly_model':lambda: olonly_model(magma,Fe2Fet,Po,0.001,T_range,'fractional'),
+            'wl1990_model newton':lambda: wl1990_model(magma_wl1990,Fe2Fet_wl1990,T_range_wl1990,solver='newton'),
+            'wl1990_model robust':lambda: wl1990_model(magma_wl1990,Fe2Fet_wl1990,T_range_wl1990,solver='robust')}
+    n = 16
+    start = time.perf_counter()
+    serial = {name:run() for name, run in runs.items()}
+    serial_time = time.perf_counter()-start
+    jobs = [name for i in range(n) for name in runs]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda name: runs[name](), jobs))
+    pool_time = time.perf_counter()-start
+    ok = True
+    for name in runs:
+        expected = np.asarray(serial[name], dtype=float)  # sympy Float columns of the melting dataframes as floats
+        same = all(list(df.columns) == list(serial[name].columns) and
+                   np.allclose(np.asarray(df, dtype=float), expected, rtol=1e-12, atol=0., equal_nan=True)
+                   for job, df in zip(jobs, results) if job == name)
+        print('%-26s %d runs in 8 threads against the serial run: %s' % (name, n, 'same' if same else 'DIFFERENT'))
+        ok = ok and same
+    unchanged = inputs == inputs_before
+    print('source_wt, source_phase and magma dictionaries unchanged: %s' % unchanged)
+    print('serial %.2f s (one run each), thread pool %.2f s (%d runs)' % (serial_time, pool_time, len(jobs)))
+    sys.exit(0 if ok and unchanged else 1)
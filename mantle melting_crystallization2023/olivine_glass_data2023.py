@@ -0,0 +1,135 @@
+# load the natural data in olivine_glass_data.csv
+# the csv file packs four datasets side by side (Hawaiian olivine, MORB olivine, Hawaiian basalts, MORB glasses) with different numbers of rows,
+# here they are split into four tables with fixed dtypes. Group, locality and citation columns are categorical.
+# The first time the csv file is read, every column is saved as a '.npy' file in a cache folder named by the sha256 hash of the csv file,
+# later runs read only the columns they need from the cache (memory-mapped), and a changed csv file gets a new cache.
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import os
+import json
+import hashlib
+import shutil
+import tempfile
+
+data_file = os.path.join(os.path.dirname(os.path.abspath(__file__)),'olivine_glass_data.csv')
+
+# column dtypes of each table, 'category' is saved as integer codes + categories, 'str' is saved as a fixed-width string array
+data_tables = {
+    'Haw_olivine': {'GROUP_HawOL':'category','Sample_HawOL':'category','GeographicSetting_HawOL':'category','Locality_HawOL':'category',
+                    'NumberPoint_HawOL':'str','Fo_HawOL':'float64','Mnppm_HawOL':'float64','Nippm_HawOL':'float64'},
+    'MORB_olivine': {'GROUP_MORBOL':'category','Sample_MORBOL':'category','GeographicSetting_MORBOL':'category','Locality_MORBOL':'category',
+                     'NumberPoint_MORBOL':'str','Fo_MORBOL':'float64','Mnppm_MORBOL':'float64','Nippm_MORBOL':'float64'},
+    'Haw_basalt': {'volcano_island':'category','Year_Haw':'int16','CITATION_Haw':'category','SAMPLE NAME_Haw':'str','LOCATION_Haw':'category',
+                   'FeOt_100_Haw':'float64','MgO_100_Haw':'float64','MnO_100_Haw':'float64','Ni_Haw':'float64','FeOMnO_100_Haw':'float64'},
+    'MORB_glass': {'GeoName_MORB':'category','VG no#_MORB':'str','Ocean_MORB':'category',
+                   'FeOt_MORB':'float64','MgO_MORB':'float64','MnO_MORB':'float64','Ni_MORB':'float64','FeOMnO_MORB':'float64'},
+    'references': {'references':'str'},
+    }
+column_table = {column:table for table in data_tables for column in data_tables[table]}
+
+# natural data needed by each figure of melting_crystallization2023.py
+figure_columns = {
+    'CLD_Ni_Fo': ['Fo_HawOL','Nippm_HawOL','Fo_MORBOL','Nippm_MORBOL'],
+    'CLD_Mn_Fo': ['Fo_HawOL','Mnppm_HawOL','Fo_MORBOL','Mnppm_MORBOL'],
+    'LLD_Ni_MgO': ['MgO_100_Haw','Ni_Haw','MgO_MORB','Ni_MORB'],
+    'LLD_MnO_MgO': ['MgO_100_Haw','MnO_100_Haw','MgO_MORB','MnO_MORB'],
+    'LLD_FeOt_MgO': ['MgO_100_Haw','FeOt_100_Haw','MgO_MORB','FeOt_MORB'],
+    'LLD_FeOtMnO_MgO': ['MgO_100_Haw','FeOMnO_100_Haw','MgO_MORB','FeOMnO_MORB'],
+    }
+
+# sha256 hash of the csv file, used to name the cache
+def file_hash(path=data_file):
+    h = hashlib.sha256()
+    with open(path,'rb') as f:
+        for block in iter(lambda: f.read(1<<20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def default_cache_dir(path=data_file):
+    return os.path.splitext(path)[0]+'_cache'
+
+# parse the csv file once and save every column of every table as a '.npy' file
+# the table length is the last row that has any value in the table columns, the other datasets' rows are blank
+def build_cache(path=data_file, cache_dir=None):
+    import pandas as pd
+    cache_dir = default_cache_dir(path) if cache_dir is None else cache_dir
+    key = file_hash(path)
+    target = os.path.join(cache_dir,key[:16])
+    if os.path.isfile(os.path.join(target,'meta.json')):
+        return target
+    dtype = {column:{'category':'category','str':'object'}.get(data_tables[column_table[column]][column],'float64') for column in column_table}
+    raw = pd.read_csv(path, usecols=list(column_table), dtype=dtype)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=cache_dir)  # written to a temporary folder first, so that other processes never see a half-written cache
+    meta = {'csv_sha256':key,'tables':{}}
+    for table in data_tables:
+        filled = raw[list(data_tables[table])].notna().any(axis=1).to_numpy()
+        n = int(np.flatnonzero(filled)[-1])+1 if filled.any() else 0
+        meta['tables'][table] = {'rows':n,'columns':{}}
+        for i,(column,t) in enumerate(data_tables[table].items()):
+            s = raw[column].iloc[:n]
+            info = {'dtype':t}
+            if t == 'category':
+                arr = s.cat.codes.to_numpy().astype(np.int32)  # -1 for blank cells
+                info['categories'] = [str(c) for c in s.cat.categories]
+            elif t == 'str':
+                arr = s.fillna('').astype(str).to_numpy().astype(str)
+            else:
+                arr = s.to_numpy(dtype=np.float64).astype(t)
+            info['file'] = table+'_'+str(i)+'.npy'  # column names contain spaces and '#'
+            np.save(os.path.join(tmp,info['file']), arr)
+            meta['tables'][table]['columns'][column] = info
+    with open(os.path.join(tmp,'meta.json'),'w') as f:
+        json.dump(meta, f, indent=1)
+    try:
+        os.rename(tmp, target)
+    except OSError:  # another process has written the same cache in the meantime
+        shutil.rmtree(tmp, ignore_errors=True)
+    for old in os.listdir(cache_dir):  # remove caches of previous versions of the csv file
+        if old != key[:16] and os.path.isfile(os.path.join(cache_dir,old,'meta.json')):
+            shutil.rmtree(os.path.join(cache_dir,old), ignore_errors=True)
+    return target
+
+def read_meta(path=data_file, cache_dir=None):
+    target = build_cache(path, cache_dir)
+    with open(os.path.join(target,'meta.json')) as f:
+        return target, json.load(f)
+
+# load some columns (of any tables) as numpy arrays, categorical columns are returned as pandas Categorical when categorical=True,
+# otherwise as a string array with '' for blank cells
+def load_columns(columns, path=data_file, cache_dir=None, mmap=True, categorical=True):
+    target, meta = read_meta(path, cache_dir)
+    out = {}
+    for column in columns:
+        if column not in column_table:
+            raise KeyError('unknown column: '+str(column))
+        info = meta['tables'][column_table[column]]['columns'][column]
+        arr = np.load(os.path.join(target,info['file']), mmap_mode='r' if mmap else None)
+        if info['dtype'] == 'category':
+            categories = np.array(info['categories']+[''], dtype=str)
+            if categorical:
+                import pandas as pd
+                arr = pd.Categorical.from_codes(np.asarray(arr), categories=info['categories'])
+            else:
+                arr = categories[np.asarray(arr)]  # code -1 picks the last entry ''
+        out[column] = arr
+    return out
+
+# load one table as a dataframe, columns=None loads all columns of the table
+def load_table(table, columns=None, path=data_file, cache_dir=None, mmap=True):
+    import pandas as pd
+    columns = list(data_tables[table]) if columns is None else columns
+    for column in columns:
+        if column_table.get(column) != table:
+            raise KeyError(str(column)+' is not a column of table '+table)
+    return pd.DataFrame(load_columns(columns, path, cache_dir, mmap))
+
+# load the natural data needed by some figures (all figures if figures=None), as a dictionary of numpy arrays keyed by the csv column names
+def load_figure_data(figures=None, path=data_file, cache_dir=None, mmap=True):
+    figures = list(figure_columns) if figures is None else figures
+    columns = []
+    for figure in figures:
+        columns += [column for column in figure_columns[figure] if column not in columns]
+    return load_columns(columns, path, cache_dir, mmap)
@@ -0,0 +1,264 @@
+# olivine-only crystallization of many magmas in one pass
+# every magma is one element of the input arrays, all magmas are cooled together by 1 Celsius per step
+# the equations are the same as in 'olonly_function2023.py' written with numpy arrays instead of dictionaries of floats
+# used to crystallize all accumulated melts along a melting column (all rows of 'melting_df_highP'/'melting_df_lowP')
+# and to summarize the resulting CLDs and LLDs as envelopes (min, max and percentiles at each Fo or MgO bin)
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import warnings
+from constants2023 import frozen, cm_mass_olonly as cm_mass, cm_tot, molar_tot, kd_default
+from dual2023 import asfloat
+from wl1990stoich_2023 import oxideToComponent
+from wl1990kdcalc_2023 import kdCalc_langmuir1992
+from wl1990models_2023 import get_first_T, frac_model_trange
+
+magma_keys = ['MgO','FeO','SiO2','Na2O','K2O','NiO','MnO']  # magma compositions in wt% needed by olivine-only crystallization
+magma_fixed_wl1990 = frozen({'Al2O3':14.8,'P2O5':0.06,'CaO':11.5})  # oxides not calculated by the melting model, same values as used for the ol-pl-cpx crystallization of MORB in 'melting_crystallization2023.py'
+
+# read the magma compositions of every row of a melting dataframe
+# 'itg' is 'itg1' or 'itg2' for polybaric fractional melting and None for isobaric equilibrium melting
+def magma_columns(melting_df, itg='itg1', keys=magma_keys):
+    if itg is None:
+        F = melting_df['F_liq'].to_numpy(dtype=float)
+        magma = {key:melting_df['cl'+key+'_wt'].to_numpy(dtype=float) for key in keys}
+    else:
+        F = melting_df['F_liq_'+itg].to_numpy(dtype=float)
+        magma = {key:melting_df['cl'+key+'_wt_'+itg].to_numpy(dtype=float) for key in keys}
+    valid = np.isfinite(F)
+    for key in keys:
+        valid = valid & np.isfinite(magma[key])
+    return F[valid], {key:magma[key][valid] for key in keys}
+
+# convert unit of magma concentrations from wt% to cation mole percent, same as 'cationmole_magma'
+def cationmole_magma_batch(magma):
+    return {element:100*asfloat(magma[element])/cm_mass[element]/cm_tot for element in cm_mass}
+
+# molar fraction of SiO2, Na2O and K2O and the adjusted SiO2 of Toplis 2005, same as in 'TF_olonly'
+def molarSiO2_adjust_batch(clcm):
+    clmolar = {}
+    clmolar['SiO2'] = 0.01*clcm['SiO2']*cm_tot/molar_tot
+    clmolar['Na2O'] = 0.01*clcm['Na2O']*cm_tot*cm_mass['Na2O']/(cm_mass['Na2O']*2)/molar_tot
+    clmolar['K2O'] = 0.01*clcm['K2O']*cm_tot*cm_mass['K2O']/(cm_mass['K2O']*2)/molar_tot
+    alkali = 100*(clmolar['Na2O']+clmolar['K2O'])
+    low = 100*clmolar['SiO2']+alkali*((0.46*100/(100-100*clmolar['SiO2'])-0.93)*alkali-5.33*100/(100-100*clmolar['SiO2'])+9.69)
+    high = 100*clmolar['SiO2']+alkali*(11-5.5*100/(100-100*clmolar['SiO2']))*np.exp(-0.13*alkali)
+    molarSiO2_adjust = np.where(clmolar['SiO2'] <= 0.6, low, high)
+    return clmolar, molarSiO2_adjust
+
+# liquidus temperature (Celsius) of every magma based on olivine MgO+olivine FeO=66.67, same equation as 'get_firstT_olonly'
+# solved by Newton's method on all magmas together instead of calling fsolve once per magma
+def firstT_olonly_batch(clcm, P, molarSiO2_adjust, tol=1e-10, max_iter=100, kd=kd_default):
+    constantA = clcm['MgO']
+    constantB = 0.034*clcm['Na2O']+0.063*clcm['K2O']+0.01154*P-3.27
+    constantC = clcm['FeO']
+    constantD = kd['Toplis_S']/8.3144+np.log(0.036*molarSiO2_adjust-0.22)
+    constantH = kd['Toplis_H']+kd['Toplis_W']  # -6766+3000 of KDFeMg(ol/l), Toplis 2005
+    tk = np.full(np.shape(constantA), 1600.)
+    for i in range(max_iter):
+        E = np.exp(6921/tk+constantB)
+        dE = -6921/tk**2*E
+        h = (constantH-2*kd['Toplis_W']*constantA/66.67*E)/(8.3144*tk)+constantD
+        dh = (-2*kd['Toplis_W']*constantA/66.67*dE)/(8.3144*tk)-(constantH-2*kd['Toplis_W']*constantA/66.67*E)/(8.3144*tk**2)
+        g = constantA*E+constantC*E*np.exp(h)-66.67
+        dg = constantA*dE+constantC*np.exp(h)*(dE+E*dh)
+        step = g/dg
+        tk = tk-step
+        if np.all(np.abs(step[np.isfinite(step)]) < tol):
+            break
+    return tk-273.15
+
+# Mg and Fe2+ partition coefficients between olivine and liquid, same equations as 'TF_olonly'
+# kd: partition-coefficient parameters, numbers or arrays of the magmas (see 'kd_default' in constants2023.py)
+def kd_olonly_batch(T, clcm, P, molarSiO2_adjust, kd=kd_default):
+    cm_kdMg = np.exp(6921/(T+273.15)+0.034*clcm['Na2O']+0.063*clcm['K2O']+0.01154*P-3.27)  # KdMg(ol/l) refers to Langmuir et al. 1992
+    kdFe2Mg = np.exp(kd['Toplis_H']/(8.3144*(T+273.15))+kd['Toplis_S']/8.3144+np.log(0.036*molarSiO2_adjust-0.22)+kd['Toplis_W']*(1-2*clcm['MgO']*cm_kdMg/66.67)/(8.3144*(T+237.15))+0.035*(P*10**3-1)/(8.3144*(T+273.15)))  # KDFeMg(ol/l) refers to Toplis 2005
+    return cm_kdMg, kdFe2Mg, kdFe2Mg*cm_kdMg
+
+# Ni and Mn partition coefficients between olivine and liquid in wt%, same equations as 'NiMn_olonly'
+def kdNiMn_olonly_batch(T, clcm, cm_kdMg, cm_kdFe2, kd=kd_default):
+    wt_kdNi = np.exp(kd['kdNi_A']/(T+273.15)+kd['kdNi_B']*(clcm['SiO2']*cm_tot*cm_mass['SiO2']/100)+kd['kdNi_C'])*(cm_kdMg*1.09)  # Eqn. 3 in the paper
+    wt_kdMn = kd['KDMnFe']*cm_kdFe2*1.09  # KDMnFe(ol/l) from Davis et al. (2013)
+    return wt_kdNi, wt_kdMn
+
+# melt and olivine compositions reported per step, liquid in wt% and ppm, olivine in Fo and ppm
+def _olonly_step_output(T, f, f_step, clcm, olcm, clppm, olppm, cm_kdMg, kdFe2Mg, cm_kdFe2, wt_kdNi, wt_kdMn):
+    return {'T Celsius':T, 'melt fraction':f, 'F_step':f_step,
+            'clwt_MgO':clcm['MgO']*cm_tot*cm_mass['MgO']/100, 'clwt_FeO':clcm['FeO']*cm_tot*cm_mass['FeO']/100,
+            'clwt_MnO':clppm['Mn']/(10**4)*70.94/54.938, 'clwt_SiO2':clcm['SiO2']*cm_tot*cm_mass['SiO2']/100,
+            'clppm_Ni':clppm['Ni'], 'clppm_Mn':clppm['Mn'], 'Fo':100*olcm['MgO']/66.67,
+            'olppm_Ni':olppm['Ni'], 'olppm_Mn':olppm['Mn'], 'cmkdMgoll':cm_kdMg, 'cmkdFe2oll':cm_kdFe2,
+            'KDFe2Mgoll':kdFe2Mg, 'wtkdNioll':wt_kdNi, 'wtkdMnoll':wt_kdMn}
+
+# olivine-only crystallization of all magmas, yields the melt and olivine compositions step by step
+# so that callers can summarize the paths without keeping all of them in memory
+# magma: dictionary of arrays in wt% with keys MgO, FeO, SiO2, Na2O, K2O, NiO, MnO; P in kbar
+# T_range: crystallization stops when temperature decreases by T_range Celsius from the liquidus
+# kd: None (the point values) or partition-coefficient parameters, numbers or arrays of the magmas (see 'kd_default' in constants2023.py)
+def olonly_batch_steps(magma, P=0.001, T_range=350, xtalization_model='fractional', kd=None):
+    kd = dict(kd_default, **({} if kd is None else kd))
+    cm_magma = cationmole_magma_batch(magma)
+    clcm = dict(cm_magma)
+    clppm_magma = {'Ni':asfloat(magma['NiO'])*58.6934/74.69*10**4,'Mn':asfloat(magma['MnO'])*54.938/70.94*10**4}
+    clppm = dict(clppm_magma)
+    clmolar, molarSiO2_adjust = molarSiO2_adjust_batch(clcm)
+    T = firstT_olonly_batch(clcm, P, molarSiO2_adjust, kd=kd)
+    cm_kdMg, kdFe2Mg, cm_kdFe2 = kd_olonly_batch(T, clcm, P, molarSiO2_adjust, kd)
+    olcm = {'MgO':clcm['MgO']*cm_kdMg,'FeO':clcm['FeO']*cm_kdFe2}
+    wt_kdNi, wt_kdMn = kdNiMn_olonly_batch(T, clcm, cm_kdMg, cm_kdFe2, kd)
+    olppm = {'Ni':clppm['Ni']*wt_kdNi,'Mn':clppm['Mn']*wt_kdMn}
+    f = np.ones(np.shape(T))
+    f_step = np.ones(np.shape(T)) if xtalization_model == 'fractional' else np.zeros(np.shape(T))
+    yield _olonly_step_output(T, f, f_step, clcm, olcm, clppm, olppm, cm_kdMg, kdFe2Mg, cm_kdFe2, wt_kdNi, wt_kdMn)
+    n_steps = int(np.ceil(T_range))  # 1 Celsius per step
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for i in range(n_steps):
+            T = T-1
+            clmolar, molarSiO2_adjust = molarSiO2_adjust_batch(clcm)
+            cm_kdMg, kdFe2Mg, cm_kdFe2 = kd_olonly_batch(T, clcm, P, molarSiO2_adjust, kd)
+            if xtalization_model == 'fractional':
+                base = clcm
+            else:
+                base = cm_magma
+            a = 66.67*(1-cm_kdMg)*(1-cm_kdFe2)
+            b = (66.67-base['FeO'])*cm_kdFe2*(1-cm_kdMg)+(66.67-base['MgO'])*cm_kdMg*(1-cm_kdFe2)
+            c = (66.67-base['MgO']-base['FeO'])*cm_kdMg*cm_kdFe2
+            root = (-b-(b**2-4*a*c)**0.5)/(2*a)
+            clcm = dict(clcm)
+            if xtalization_model == 'fractional':  # same as 'TF_olonly', 'concentration_olonly' and 'NiMn_olonly'
+                f_step = root
+                f = f*f_step
+                clcm['MgO'] = clcm['MgO']/(cm_kdMg*(1-f_step)+f_step)
+                clcm['FeO'] = clcm['FeO']/(cm_kdFe2*(1-f_step)+f_step)
+                clcm['Na2O'] = clcm['Na2O']/f_step
+                clcm['K2O'] = clcm['K2O']/f_step
+                clcm['SiO2'] = (clcm['SiO2']-(1-f_step)*(100-66.67))/f_step
+                wt_kdNi, wt_kdMn = kdNiMn_olonly_batch(T, clcm, cm_kdMg, cm_kdFe2, kd)
+                clppm = {'Ni':clppm['Ni']/(wt_kdNi*(1-f_step)+f_step),'Mn':clppm['Mn']/(wt_kdMn*(1-f_step)+f_step)}
+            else:  # same as 'TF_olonly_equ', 'concentration_olonly_equ' and 'NiMn_olonly_equ'
+                f_step = f-root
+                f = root
+                clcm['MgO'] = cm_magma['MgO']/(cm_kdMg*(1-f)+f)
+                clcm['FeO'] = cm_magma['FeO']/(cm_kdFe2*(1-f)+f)
+                clcm['Na2O'] = cm_magma['Na2O']/f
+                clcm['K2O'] = cm_magma['K2O']/f
+                clcm['SiO2'] = (cm_magma['SiO2']-(1-f)*(100-66.67))/f
+                wt_kdNi, wt_kdMn = kdNiMn_olonly_batch(T, clcm, cm_kdMg, cm_kdFe2, kd)
+                clppm = {'Ni':clppm_magma['Ni']/(wt_kdNi*(1-f)+f),'Mn':clppm_magma['Mn']/(wt_kdMn*(1-f)+f)}
+            olcm = {'MgO':clcm['MgO']*cm_kdMg,'FeO':clcm['FeO']*cm_kdFe2}
+            olppm = {'Ni':clppm['Ni']*wt_kdNi,'Mn':clppm['Mn']*wt_kdMn}
+            yield _olonly_step_output(T, f, f_step, clcm, olcm, clppm, olppm, cm_kdMg, kdFe2Mg, cm_kdFe2, wt_kdNi, wt_kdMn)
+
+# olivine-only crystallization of all magmas, returns every column as an array with shape (steps, magmas)
+# (Duals of dual2023.py for magmas, P or kd of Duals)
+def olonly_batch(magma, P=0.001, T_range=350, xtalization_model='fractional', kd=None):
+    steps = {}
+    for step in olonly_batch_steps(magma, P=P, T_range=T_range, xtalization_model=xtalization_model, kd=kd):
+        for key in step:
+            steps.setdefault(key, []).append(step[key])
+    return {key:np.stack(steps[key]) for key in steps}
+
+# record y at the first crossing of each x bin along many paths
+# only the interpolated values (paths x bins) are kept, not the paths themselves
+class BinnedTracer:
+    def __init__(self, x_bins, n_paths, names):
+        self.x_bins = np.asarray(x_bins, dtype=float)
+        self.values = {name:np.full((n_paths, len(self.x_bins)), np.nan) for name in names}
+        self.filled = np.zeros((n_paths, len(self.x_bins)), dtype=bool)
+        self.x_last = None
+        self.y_last = None
+
+    # interpolate y at the bins crossed by segments (x0,y0)-(x1,y1), one segment per path
+    def _cross(self, rows, x0, x1, y0, y1):
+        bins = self.x_bins[None,:]
+        x0 = x0[:,None]
+        x1 = x1[:,None]
+        cross = (((x0 >= bins) & (x1 <= bins)) | ((x0 <= bins) & (x1 >= bins))) & (x0 != x1) & ~self.filled[rows]
+        if cross.any():
+            with np.errstate(invalid='ignore', divide='ignore'):
+                w = (bins-x0)/(x1-x0)
+            r, b = np.nonzero(cross)
+            for name in self.values:
+                y = y0[name][:,None]+w*(y1[name][:,None]-y0[name][:,None])
+                self.values[name][rows[r],b] = y[r,b]
+            self.filled[rows[r],b] = True
+
+    # all paths advance by one step together
+    def update(self, x, y):
+        x = np.asarray(x, dtype=float)
+        y = {name:np.asarray(y[name], dtype=float) for name in self.values}
+        if self.x_last is not None:
+            self._cross(np.arange(len(x)), self.x_last, x, self.y_last, y)
+        self.x_last = x
+        self.y_last = y
+
+    # one whole path at a time, for paths that are calculated one by one
+    def add_path(self, i, x, y):
+        x = np.asarray(x, dtype=float)
+        y = {name:np.asarray(y[name], dtype=float) for name in self.values}
+        bins = self.x_bins[None,:]
+        x0 = x[:-1,None]
+        x1 = x[1:,None]
+        cross = (((x0 >= bins) & (x1 <= bins)) | ((x0 <= bins) & (x1 >= bins))) & (x0 != x1) & ~self.filled[i][None,:]
+        has = cross.any(axis=0)
+        k = np.argmax(cross, axis=0)  # the first segment crossing each bin
+        with np.errstate(invalid='ignore', divide='ignore'):
+            w = (self.x_bins-x[k])/(x[k+1]-x[k])
+        for name in self.values:
+            self.values[name][i,has] = (y[name][k]+w*(y[name][k+1]-y[name][k]))[has]
+        self.filled[i,has] = True
+
+    # number of paths with a value (name_n), min, max and percentiles of y over all paths at each x bin
+    def summary(self, x_name, percentiles=(5, 50, 95)):
+        out = {x_name:self.x_bins}
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # bins that no path reaches give all-NaN slices
+            for name in self.values:
+                v = self.values[name]
+                out[name+'_n'] = np.sum(np.isfinite(v), axis=0)
+                out[name+'_min'] = np.nanmin(v, axis=0)
+                out[name+'_max'] = np.nanmax(v, axis=0)
+                for q in percentiles:
+                    out[name+'_p'+str(q)] = np.nanpercentile(v, q, axis=0)
+        import pandas as pd
+        return pd.DataFrame(out)
+
+# crystallize the magma of every row of a melting dataframe and summarize the CLDs and LLDs as envelopes
+# olivine-only crystallization of all rows is done together in one pass, the ol-pl-cpx (WL1990) crystallization is optional and run row by row
+# only the values at the Fo and MgO bins are kept, so memory does not grow with the number of steps
+# returns a dictionary of dataframes: 'olonly_CLD' (olivine Ni, Mn vs Fo), 'olonly_LLD' (melt Ni, MnO vs MgO), and 'wl1990_CLD', 'wl1990_LLD' if wl1990 is True
+def cld_envelope(melting_df, itg='itg1', P=0.001, T_range=350, xtalization_model='fractional', fo_bins=None, mgo_bins=None,
+                 percentiles=(5, 50, 95), wl1990=False, wl1990_T_range=250, wl1990_fixed=magma_fixed_wl1990):
+    if fo_bins is None:
+        fo_bins = np.arange(78., 93.01, 0.25)
+    if mgo_bins is None:
+        mgo_bins = np.arange(4., 20.01, 0.25)
+    F, magma = magma_columns(melting_df, itg=itg)
+    n = len(F)
+    cld = BinnedTracer(fo_bins, n, ['olppm_Ni','olppm_Mn'])
+    lld = BinnedTracer(mgo_bins, n, ['clppm_Ni','clwt_MnO'])
+    for step in olonly_batch_steps(magma, P=P, T_range=T_range, xtalization_model=xtalization_model):
+        cld.update(step['Fo'], step)
+        lld.update(step['clwt_MgO'], step)
+    envelope = {'olonly_CLD':cld.summary('Fo', percentiles), 'olonly_LLD':lld.summary('MgO', percentiles)}
+    if wl1990:
+        F_wl, magma_wl = magma_columns(melting_df, itg=itg, keys=['SiO2','TiO2','FeO','MgO','K2O','MnO','Na2O','NiO'])
+        wl_cld = BinnedTracer(fo_bins, len(F_wl), ['olNippm','olMnppm'])
+        wl_lld = BinnedTracer(mgo_bins, len(F_wl), ['liq_Nippm','liq_MnO'])
+        for i in range(len(F_wl)):
+            system_components = {'SiO2':magma_wl['SiO2'][i],'TiO2':magma_wl['TiO2'][i],'Al2O3':wl1990_fixed['Al2O3'],'FeO':magma_wl['FeO'][i],
+                                 'MgO':magma_wl['MgO'][i],'K2O':magma_wl['K2O'][i],'MnO':magma_wl['MnO'][i],'Na2O':magma_wl['Na2O'][i],
+                                 'P2O5':wl1990_fixed['P2O5'],'CaO':wl1990_fixed['CaO'],'NiO':magma_wl['NiO'][i]}
+            t_start = get_first_T(oxideToComponent(system_components), P=1., kdCalc=kdCalc_langmuir1992)
+            fl, fa_dict, major_oxide_dict, major_phase_oxide_dict = frac_model_trange(t_start, t_start-wl1990_T_range, system_components, P=1., kdCalc=kdCalc_langmuir1992)
+            ol = {key:np.asarray(major_phase_oxide_dict['ol'][key]) for key in ['FeO','MgO','NiO','MnO']}
+            with np.errstate(invalid='ignore', divide='ignore'):
+                Fo = 100/(1+ol['FeO']/ol['MgO']*40.3/71.84)
+            path = {'olNippm':ol['NiO']*58.6934/74.69*10**4,'olMnppm':ol['MnO']*54.938/70.94*10**4,
+                    'liq_Nippm':np.asarray(major_oxide_dict['NiO'])*58.6934/74.69*10**4,'liq_MnO':np.asarray(major_oxide_dict['MnO'])}
+            wl_cld.add_path(i, Fo, path)
+            wl_lld.add_path(i, np.asarray(major_oxide_dict['MgO']), path)
+        envelope['wl1990_CLD'] = wl_cld.summary('Fo', percentiles)
+        envelope['wl1990_LLD'] = wl_lld.summary('MgO', percentiles)
+    return envelope
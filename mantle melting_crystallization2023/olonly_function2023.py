@@ -3,18 +3,14 @@
 # 'equ' refers to 'equilibrium crystalliztaion'. Otherwise, fractional crystalliztaion is calculated
 # Jan 17, 2023
 # written by: Mingzhen Yu
-# last modified: Jun 20, 2023
+# Oct 19, 2026: the functions do not change their input dictionaries, the updated dictionaries are returned (copies of the inputs)
+# last modified: Oct 19, 2026
 
 import numpy as np
-import pandas as pd
 import math
-import sympy  
-import copy  
-from scipy.optimize import fsolve  
 
-cm_mass = {'MgO':40.304,'FeO':71.844,'SiO2':60.083,'Na2O':30.99,'K2O':47.098}  # relative molecular mass, e.g., SiO2, MgO, NaO1.5  
-cm_tot = 1.833  # sum of relative cation mole mass, e.g., NaO0.5, SiO2, MgO, to converse between cation mole and wt%, estimated from melt compositions of Walter 1998 and Baker and Stolper 1994
-molar_tot = 1.65  # sum of relative molecular mass, e.g., Na2O, SiO2, MgO, to calculate molar mass of SiO2, K2O and Na2O, estimated from melt compositions of Walter 1998 and Baker and Stolper 1994
+# cm_mass (relative molecular mass of MgO, FeO, SiO2, Na2O and K2O), cm_tot and molar_tot (see constants2023.py)
+from constants2023 import cm_mass_olonly as cm_mass, cm_tot, molar_tot
 
 # convert unit of magma concentrations from wt% to cation mole percent
 def cationmole_magma(magma):  
@@ -23,6 +19,7 @@ def cationmole_magma(magma):
 
 # calculate the liquidus temperature based on olivine MgO+olivine FeO=66.67, T in Celsius    
 def get_firstT_olonly(clcm_olonly,P,molarSiO2_adjust):
+    from scipy.optimize import fsolve  # imported here so that the crystallization functions can be used without loading scipy
     constantA = clcm_olonly['MgO']
     constantB = 0.034*clcm_olonly['Na2O']+0.063*clcm_olonly['K2O']+0.01154*P-3.27
     constantC = clcm_olonly['FeO']
@@ -33,6 +30,7 @@ def get_firstT_olonly(clcm_olonly,P,molarSiO2_adjust):
 
 # calculate the extent of fractional crysatallization per each step, The decrease of temperature by 1 Celsius is set as one step.
 def TF_olonly(T,clmolar_olonly,clcm_olonly,P,f_olonly):
+    clmolar_olonly = dict(clmolar_olonly)  # copy, the input is not changed
     T = T-1  # 1 Celsius per step
     clmolar_olonly['SiO2'] = 0.01*clcm_olonly['SiO2']*cm_tot/molar_tot  
     clmolar_olonly['Na2O'] = 0.01*clcm_olonly['Na2O']*cm_tot*cm_mass['Na2O']/(cm_mass['Na2O']*2)/molar_tot
@@ -54,6 +52,7 @@ def TF_olonly(T,clmolar_olonly,clcm_olonly,P,f_olonly):
 
 # calculate MgO, FeO, SiO2 in the melts and olivines and Na2O and K2O in the melts during fractional crystallization    
 def concentration_olonly(clcm_olonly,cm_kdMg_oll_olonly,f_step_olonly,cm_kdFe2_oll_olonly,olcm_olonly):
+    clcm_olonly,olcm_olonly = dict(clcm_olonly),dict(olcm_olonly)  # copies, the inputs are not changed
     clcm_olonly['MgO'] = clcm_olonly['MgO']/(cm_kdMg_oll_olonly*(1-f_step_olonly)+f_step_olonly)
     clcm_olonly['FeO'] = clcm_olonly['FeO']/(cm_kdFe2_oll_olonly*(1-f_step_olonly)+f_step_olonly)
     olcm_olonly['MgO'] = clcm_olonly['MgO']*cm_kdMg_oll_olonly
@@ -67,6 +66,7 @@ def concentration_olonly(clcm_olonly,cm_kdMg_oll_olonly,f_step_olonly,cm_kdFe2_o
 
 # calculate Ni and Mn in the melts and olivines during fractional crystallization 
 def NiMn_olonly(T,cm_kdMg_oll_olonly,clppm_olonly,f_step_olonly,olppm_olonly,clcm_olonly,cm_kdFe2_oll_olonly,Po):
+    clppm_olonly,olppm_olonly = dict(clppm_olonly),dict(olppm_olonly)  # copies, the inputs are not changed
     wt_kdNi_oll_olonly = math.exp(4272/(T+273.15)+0.01582*(clcm_olonly['SiO2']*cm_tot*cm_mass['SiO2']/100)-2.7622)*(cm_kdMg_oll_olonly*1.09) ## fitted by MPN+Hzb dataset (Eqn. 3 in the paper), *1.09 to convert from cmf to wt%, observed from Walter 1998 
     clppm_olonly['Ni'] = clppm_olonly['Ni']/(wt_kdNi_oll_olonly*(1-f_step_olonly)+f_step_olonly)
     olppm_olonly['Ni'] = clppm_olonly['Ni']*wt_kdNi_oll_olonly
@@ -77,6 +77,7 @@ def NiMn_olonly(T,cm_kdMg_oll_olonly,clppm_olonly,f_step_olonly,olppm_olonly,clc
 
 # calculate the extent of equilibrium crysatallization per each step, The decrease of temperature by 1 Celsius is set as one step.
 def TF_olonly_equ(T,clmolar_olonly,clcm_olonly,P,f_olonly,cm_magma):
+    clmolar_olonly = dict(clmolar_olonly)  # copy, the input is not changed
     T = T-1  # 1 Celsius per step
     clmolar_olonly['SiO2'] = 0.01*clcm_olonly['SiO2']*cm_tot/molar_tot
     clmolar_olonly['Na2O'] = 0.01*clcm_olonly['Na2O']*cm_tot*cm_mass['Na2O']/(cm_mass['Na2O']*2)/molar_tot
@@ -99,6 +100,7 @@ def TF_olonly_equ(T,clmolar_olonly,clcm_olonly,P,f_olonly,cm_magma):
 
 # calculate MgO, FeO, SiO2 in the melts and olivines and Na2O and K2O in the melts during equilibrium crystallization   
 def concentration_olonly_equ(clcm_olonly,cm_kdMg_oll_olonly,f_step_olonly,cm_kdFe2_oll_olonly,olcm_olonly,cm_magma,f_olonly):
+    clcm_olonly,olcm_olonly = dict(clcm_olonly),dict(olcm_olonly)  # copies, the inputs are not changed
     clcm_olonly['MgO'] = cm_magma['MgO']/(cm_kdMg_oll_olonly*(1-f_olonly)+f_olonly)
     clcm_olonly['FeO'] = cm_magma['FeO']/(cm_kdFe2_oll_olonly*(1-f_olonly)+f_olonly)
     olcm_olonly['MgO'] = clcm_olonly['MgO']*cm_kdMg_oll_olonly
@@ -112,6 +114,7 @@ def concentration_olonly_equ(clcm_olonly,cm_kdMg_oll_olonly,f_step_olonly,cm_kdF
 
 # calculate Ni and Mn in the melts and olivines during equilibrium crystallization 
 def NiMn_olonly_equ(T,cm_kdMg_oll_olonly,clppm_olonly,f_step_olonly,olppm_olonly,clcm_olonly,clppm_magma,f_olonly,cm_kdFe2_oll_olonly):
+    clppm_olonly,olppm_olonly = dict(clppm_olonly),dict(olppm_olonly)  # copies, the inputs are not changed
     wt_kdNi_oll_olonly = math.exp(4272/(T+273.15)+0.01582*(clcm_olonly['SiO2']*cm_tot*cm_mass['SiO2']/100)-2.7622)*(cm_kdMg_oll_olonly*1.09) ## fitted by MPN+Hzb dataset (Eqn.3 in the paper), *1.09 to convert from cmf to wt%, observed from Walter 1998 
     clppm_olonly['Ni'] = clppm_magma['Ni']/(wt_kdNi_oll_olonly*(1-f_olonly)+f_olonly)
     olppm_olonly['Ni'] = clppm_olonly['Ni']*wt_kdNi_oll_olonly
@@ -0,0 +1,210 @@
+# opt-in timers and counters for the model functions, to find where the time of a run goes
+# (e.g., sympy.nsolve in 'KDFeMg', fsolve in 'get_firstT_olonly', 'state' in the ol-pl-cpx crystallization, or pandas)
+# While a Profiler is started, the functions listed in 'targets' are replaced by timed wrappers in every module of this folder
+# (and in the running script) and restored when it is stopped, so nothing is changed and nothing is slower when no Profiler is running.
+# For each function: number of calls, cumulative time, self time (cumulative time minus the time of the other timed functions it calls),
+# and for 'state' the solver iterations and the runs that did not converge within the maximum number of iterations of the solver ('MAX ITERATION'),
+# for 'solve_matrix' the singular matrices ('Singular').
+# The functions are replaced for the whole process, not for one thread: the calls of every thread are counted while a Profiler is started,
+# and only one Profiler can be started at a time ('start' raises an error if another one is running).
+# usage:
+#     with Profiler('Hawaii') as prof:
+#         melting_df = melting_column(source_wt,source_phase,45)
+#     prof.write_json('profile_Hawaii.json'); print(format_table(prof.report()))
+# or 'python profile2023.py profile_*.json' to print the table of several reports added together.
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import os
+import sys
+import json
+import time
+import importlib
+import threading
+
+# (module, function) timed by the profiler, the record of each function is named 'module.function'
+targets = [
+    ('models2023','melting_column'), ('models2023','select_magma'), ('models2023','olonly_model'),
+    ('models2023','select_magma_wl1990'), ('models2023','wl1990_model'),
+    ('kernels2023','melting_column_kernel'), ('kernels2023','olonly_model_kernel'),
+    ('melting_batch2023','melting_polyfrac_batch'), ('reactions2023','mineral_phase_rules'),
+    ('melting_function2023','liquid_wt_polyfrac'), ('melting_function2023','liquid_wt_isoequ'), ('melting_function2023','KDFeMg'),
+    ('melting_function2023','mineral_phase_polyfrac'), ('melting_function2023','mineral_phase_isoequ'), ('melting_function2023','itg'),
+    ('olonly_function2023','get_firstT_olonly'), ('olonly_function2023','TF_olonly'), ('olonly_function2023','TF_olonly_equ'),
+    ('wl1990models_2023','get_first_T'), ('wl1990models_2023','frac_model_trange'), ('wl1990models_2023','eq_model_trange'),
+    ('wl1990state_2023','state'), ('wl1990state_2023','solve_matrix'), ('wl1990kdcalc_2023','kdCalc_langmuir1992'),
+    ('olonly_batch2023','olonly_batch'), ('olonly_batch2023','firstT_olonly_batch'), ('olonly_batch2023','cld_envelope'),
+    ('sympy','nsolve'), ('scipy.optimize','fsolve'), ('pandas','concat'),
+    ]
+
+# counters read from the output of a function: (solver iterations, not converged within the maximum iterations, singular matrix)
+def _check_state(out):
+    return out[4], not out[5], False
+
+def _check_solve_matrix(out):
+    return 0, False, isinstance(out, str) and out == 'Singular'
+
+checks = {'wl1990state_2023.state':_check_state, 'wl1990state_2023.solve_matrix':_check_solve_matrix}
+
+# the Profiler whose wrappers are in place (one at a time, the functions are replaced for the whole process)
+_lock = threading.Lock()
+_active = None
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+# modules of this folder that are imported, and the running script, where the functions are looked up (they are imported with 'from ... import *')
+def _namespaces():
+    out = []
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None)
+        if name == '__main__' or (path is not None and os.path.dirname(os.path.abspath(path)) == here):
+            out.append(module)
+    return out
+
+def _new_record():
+    return {'calls':0,'time_s':0.,'self_s':0.,'iterations':0,'max_iter_hits':0,'singular_hits':0}
+
+class Profiler:
+    def __init__(self, name=''):
+        self.name = name
+        self.records = {}
+        self.wall_s = 0.
+        self._stack = [0.]  # time of the timed functions called by the running function, to compute self time
+        self._patches = []
+        self._t0 = None
+
+    def wrap(self, key, func):
+        record = self.records.setdefault(key, _new_record())
+        check = checks.get(key)
+        stack = self._stack
+        perf_counter = time.perf_counter
+        def timed(*args, **kwargs):
+            stack.append(0.)
+            t0 = perf_counter()
+            try:
+                out = func(*args, **kwargs)
+            finally:
+                dt = perf_counter()-t0
+                child = stack.pop()
+                stack[-1] += dt
+                record['calls'] += 1
+                record['time_s'] += dt
+                record['self_s'] += dt-child
+            if check is not None:
+                iterations, max_iter, singular = check(out)
+                record['iterations'] += iterations
+                record['max_iter_hits'] += max_iter
+                record['singular_hits'] += singular
+            return out
+        timed.__wrapped__ = func
+        timed.__name__ = getattr(func, '__name__', key)
+        return timed
+
+    # replace every reference to the target functions: module attributes, names imported by other modules, and default arguments
+    # (e.g., 'kdCalc = kdCalc_langmuir1992' in 'state')
+    def start(self):
+        global _active
+        with _lock:
+            if _active is not None:
+                raise RuntimeError('a profiler is already started' if _active is not self else 'the profiler is already started')
+            _active = self
+        try:
+            self._patch()
+        except BaseException:
+            self._restore()
+            with _lock:
+                _active = None
+            raise
+        self._t0 = time.perf_counter()
+        return self
+
+    def _patch(self):
+        originals = {}
+        for module_name, func_name in targets:
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError:  # optional module not installed, e.g., scipy
+                continue
+            func = getattr(module, func_name, None)
+            if func is not None and id(func) not in originals:
+                originals[id(func)] = (func, self.wrap(module_name+'.'+func_name, func))
+        def wrapped(value):
+            return originals[id(value)][1] if id(value) in originals and value is originals[id(value)][0] else None
+        namespaces = _namespaces()
+        for module in namespaces:  # default arguments first, the functions themselves are replaced below
+            for value in list(vars(module).values()):
+                defaults = getattr(value, '__defaults__', None)
+                if callable(value) and defaults and getattr(value, '__module__', None) == module.__name__:
+                    if any(wrapped(d) is not None for d in defaults):
+                        self._patches.append((value, '__defaults__', defaults))
+                        value.__defaults__ = tuple(d if wrapped(d) is None else wrapped(d) for d in defaults)
+        for module in [importlib.import_module(module_name) for module_name in dict(targets) if module_name in sys.modules]+namespaces:
+            for name, value in list(vars(module).items()):
+                if wrapped(value) is not None:
+                    self._patches.append((module, name, value))
+                    setattr(module, name, wrapped(value))
+
+    def _restore(self):
+        for obj, name, value in reversed(self._patches):
+            setattr(obj, name, value)
+        self._patches = []
+
+    def stop(self):
+        global _active
+        if _active is not self:
+            return self
+        if self._t0 is not None:
+            self.wall_s += time.perf_counter()-self._t0
+            self._t0 = None
+        self._restore()
+        with _lock:
+            _active = None
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def report(self):
+        return {'scenario':self.name,'wall_s':self.wall_s,
+                'functions':{key:dict(record) for key, record in self.records.items() if record['calls']}}
+
+    def write_json(self, path):
+        with open(path,'w') as f:
+            json.dump(self.report(), f, indent=1)
+        return path
+
+# add several reports (e.g., one per scenario) together
+def aggregate(reports):
+    out = {'scenario':'%d scenarios' % len(reports),'wall_s':0.,'functions':{}}
+    for report in reports:
+        out['wall_s'] += report['wall_s']
+        for key, record in report['functions'].items():
+            total = out['functions'].setdefault(key, _new_record())
+            for name in total:
+                total[name] += record[name]
+    return out
+
+# table of a report, sorted by self time
+def format_table(report, sort='self_s'):
+    lines = ['%s: %.3f s' % (report['scenario'], report['wall_s']),
+             '%-42s %8s %10s %10s %7s %11s %9s %9s' % ('function','calls','time s','self s','self %','iterations','max iter','singular')]
+    wall = report['wall_s'] if report['wall_s'] > 0 else 1.
+    for key, r in sorted(report['functions'].items(), key=lambda item: -item[1][sort]):
+        lines.append('%-42s %8d %10.4f %10.4f %6.1f%% %11d %9d %9d' % (key, r['calls'], r['time_s'], r['self_s'], 100*r['self_s']/wall,
+                                                                      r['iterations'], r['max_iter_hits'], r['singular_hits']))
+    return '\n'.join(lines)
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+if __name__ == '__main__':
+    reports = [read_json(path) for path in sys.argv[1:]]
+    if not reports:
+        print('usage: python profile2023.py report.json [report.json ...]')
+    else:
+        print(format_table(reports[0] if len(reports) == 1 else aggregate(reports)))
@@ -0,0 +1,299 @@
+# melting reactions of the polybaric fractional melting written as data tables, and the engine that applies them
+# 'reactions': stoichiometric coefficients of the mineral phases per melting reaction (Walter 1998, Baker and Stolper 1994, Wasylenki et al. 2003)
+# and of the garnet-spinel conversion; 'rules': when each reaction is used (pressures and phases present) and how exhausted phases are removed
+# 'mineral_phase_rules' applies the rules to many mineral modes at once (numpy arrays), it gives the same mineral phases
+# as the former branches of 'mineral_phase_polyfrac' (melting_function2023.py), which now calls it for one mode.
+# 'rule_program' writes the rules as a float array for the compiled kernel ('mineral_phase_polyfrac_kernel' in kernels2023.py).
+# A new reaction is a new entry in 'reactions' and a new rule, no code is changed.
+# 'isoequ_rules' and 'mineral_phase_isoequ_rules': the same for isobaric equilibrium melting ('mineral_phase_isoequ'), for all steps of many columns at once
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import operator
+from constants2023 import frozen
+from dual2023 import asfloat
+
+phases = ['ol','opx','cpx','gt','sp']  # order of the mineral phases in the arrays
+
+## melting reactions, coefficient: percent of the phase consumed (<0) or produced (>0) per percent of melt,
+# a melting step of extent f_step changes a phase proportion (percent of the residue) to (phase+coefficient*f_step)/(1-f_step)
+reactions = frozen({
+    'walter1998_gt': {'equation':'45gt+12ol+137cpx=94opx+100melt', 'reference':'Walter 1998, 3 GPa grt-out',
+                      'coefficients':{'ol':-12,'opx':94,'cpx':-137,'gt':-45,'sp':0}},
+    'walter1998_gt_7GPa': {'equation':'25gt+13ol+62opx=100melt', 'reference':'Walter 1998, 7 GPa',
+                           'coefficients':{'ol':-13,'opx':-62,'cpx':0,'gt':-25,'sp':0}},
+    'walter1998_cpx': {'equation':'147cpx+9ol=56opx+100melt', 'reference':'Walter 1998, 3 GPa cpx-out opx-max',
+                       'coefficients':{'ol':-9,'opx':56,'cpx':-147,'gt':0,'sp':0}},
+    'walter1998_opx': {'equation':'97opx+3ol=100melt', 'reference':'Walter 1998, 3 GPa opx-out',
+                       'coefficients':{'ol':-3,'opx':-97,'cpx':0,'gt':0,'sp':0}},
+    'bakerstolper1994_sp': {'equation':'38opx+13sp+71cpx=100melt+22ol', 'reference':'Baker and Stolper 1994, 1 GPa sp-out',
+                            'coefficients':{'ol':22,'opx':-38,'cpx':-71,'gt':0,'sp':-13}},
+    'wasylenki2003_sp': {'equation':'109opx+20sp=100melt+29ol', 'reference':'Wasylenki et al. 2003, 1 GPa sp-out',
+                         'coefficients':{'ol':29,'opx':-109,'cpx':0,'gt':0,'sp':-20}},
+    'wasylenki2003_opx': {'equation':'124opx=24ol+100melt', 'reference':'Wasylenki et al. 2003, 1 GPa opx-out',
+                          'coefficients':{'ol':24,'opx':-124,'cpx':0,'gt':0,'sp':0}},
+    # solid-solid conversion, coefficient per percent of the 'basis' phase converted
+    'garnet_spinel': {'equation':'100gt+20ol=23sp+60opx+37cpx', 'reference':'garnet converses to spinel', 'basis':'gt',
+                      'coefficients':{'ol':-0.2,'opx':0.6,'cpx':0.37,'gt':-1,'sp':0.23}},
+    })
+
+## rules, the first rule whose conditions hold is used for a melting step, its steps are done in order:
+# ('if', name, comparison, value): condition on 'Po', 'P' (kbar) or a phase proportion at this point of the rule
+# ('zero', phase): the phase is set to 0 without normalizing the others
+# ('remove', phase): the phase is set to 0 and the others are normalized to 100
+# ('only', phase): the phase is set to 100 and the others to 0
+# ('react', reaction): melting reaction of extent f_step
+# ('convert', reaction, factors): the basis phase times a factor is converted, factors: (name, comparison, value, factor), the first that holds is used
+# ('exhaust', ((phase, threshold), ...)): the phases below their threshold are removed together
+rules = (
+    # Po >= 30 kbar: garnet melts and converses to spinel below 30 kbar
+    frozen({'name':'garnet, no cpx, P>30', 'steps':(('if','Po','>=',30),('if','gt','>',0),('if','cpx','<=',0),('if','P','>',30),
+                                                      ('zero','cpx'),('zero','sp'),('react','walter1998_gt_7GPa'),('exhaust',(('gt',0),)))}),
+    frozen({'name':'garnet', 'steps':(('if','Po','>=',30),('if','gt','>',0),('react','walter1998_gt'),
+                                       ('convert','garnet_spinel',(('P','>',30,0.),('gt','>=',1,0.2),(None,None,None,1.))),
+                                       ('exhaust',(('cpx',0),('gt',0))))}),
+    frozen({'name':'garnet-out, spinel', 'steps':(('if','Po','>=',30),('zero','gt'),('if','cpx','>',0),('if','sp','>',0.1),
+                                                   ('react','bakerstolper1994_sp'),('exhaust',(('sp',0.1),)))}),
+    frozen({'name':'garnet-out, cpx', 'steps':(('if','Po','>=',30),('zero','gt'),('if','cpx','>',0),('remove','sp'),('if','cpx','>',0.5),
+                                                ('react','walter1998_cpx'),('exhaust',(('cpx',0.5),)))}),
+    frozen({'name':'garnet-out, opx', 'steps':(('if','Po','>=',30),('zero','gt'),('if','cpx','>',0),('remove','sp'),('remove','cpx'),('if','opx','>',0.5),
+                                                ('react','walter1998_opx'),('exhaust',(('opx',0),)))}),
+    frozen({'name':'garnet-out, ol', 'steps':(('if','Po','>=',30),('zero','gt'),('if','cpx','>',0),('remove','sp'),('remove','cpx'),('only','ol'))}),
+    frozen({'name':'garnet-out, no cpx, spinel', 'steps':(('if','Po','>=',30),('zero','gt'),('zero','cpx'),('if','sp','>',0.1),
+                                                           ('react','wasylenki2003_sp'),('exhaust',(('sp',0.1),)))}),
+    frozen({'name':'garnet-out, no cpx, opx', 'steps':(('if','Po','>=',30),('zero','gt'),('zero','cpx'),('zero','sp'),('if','opx','>',0.5),
+                                                        ('react','walter1998_opx'),('exhaust',(('opx',0),)))}),
+    frozen({'name':'garnet-out, no cpx, ol', 'steps':(('if','Po','>=',30),('zero','gt'),('zero','cpx'),('zero','sp'),('only','ol'))}),
+    # Po < 30 kbar: no garnet in the source
+    frozen({'name':'spinel', 'steps':(('if','Po','<',30),('zero','gt'),('if','sp','>',0.1),('react','bakerstolper1994_sp'),('exhaust',(('sp',0.1),)))}),
+    frozen({'name':'cpx', 'steps':(('if','Po','<',30),('zero','gt'),('remove','sp'),('if','cpx','>=',0.5),('react','walter1998_cpx'),('exhaust',(('cpx',0.5),)))}),
+    frozen({'name':'opx', 'steps':(('if','Po','<',30),('zero','gt'),('remove','sp'),('remove','cpx'),('if','opx','>',0.5),
+                                    ('react','wasylenki2003_opx'),('exhaust',(('opx',0),)))}),
+    frozen({'name':'ol', 'steps':(('if','Po','<',30),('zero','gt'),('remove','sp'),('remove','cpx'),('only','ol'))}),
+    )
+
+comparisons = {'>':operator.gt, '>=':operator.ge, '<':operator.lt, '<=':operator.le, '==':operator.eq}
+
+# phases of the rows in 'removed' set to 0, the other phases normalized to 100
+def _remove(fm, removed):
+    kept = np.where(removed, 0., fm)
+    rows = removed.any(axis=1)
+    fm[rows] = kept[rows]/kept[rows].sum(axis=1)[:,None]*100
+    return fm
+
+# mineral phase proportions after one melting step for n modes at once
+# Po, P (kbar) and f_step: numbers or arrays of n values, fm: array (n, 5) in the order of 'phases' (percent)
+# dP: pressure interval of the step (kbar), the factors of 'convert' are per 1 kbar step and a factor a becomes 1-(1-a)**dP
+# returns the new proportions (n, 5) and the index in 'rules' of the rule used for each mode
+def mineral_phase_rules(Po, P, f_step, fm, rules=rules, dP=1):
+    fm = np.atleast_2d(asfloat(fm)).copy()
+    n = fm.shape[0]
+    values = {'Po':np.broadcast_to(asfloat(Po), (n,)), 'P':np.broadcast_to(asfloat(P), (n,))}
+    f_step = np.broadcast_to(asfloat(f_step), (n,))
+    dP = np.broadcast_to(np.asarray(dP, dtype=float), (n,))
+    out = fm.copy()
+    rule_used = np.full(n, -1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for k, rule in enumerate(rules):
+            rows = np.flatnonzero(rule_used < 0)
+            x = fm[rows].copy()
+            for step in rule['steps']:
+                if len(rows) == 0:
+                    break
+                if step[0] == 'if':
+                    value = values[step[1]][rows] if step[1] in values else x[:,phases.index(step[1])]
+                    keep = comparisons[step[2]](value, step[3])
+                    rows, x = rows[keep], x[keep]
+                elif step[0] == 'zero':
+                    x[:,phases.index(step[1])] = 0
+                elif step[0] == 'remove':
+                    removed = np.zeros(x.shape, dtype=bool)
+                    removed[:,phases.index(step[1])] = True
+                    x = _remove(x, removed)
+                elif step[0] == 'only':
+                    x[:] = 0
+                    x[:,phases.index(step[1])] = 100
+                elif step[0] == 'react':
+                    nu = np.array([reactions[step[1]]['coefficients'][phase] for phase in phases], dtype=float)
+                    x = (x+nu*f_step[rows,None])/(1-f_step[rows,None])
+                elif step[0] == 'convert':
+                    reaction = reactions[step[1]]
+                    nu = np.array([reaction['coefficients'][phase] for phase in phases], dtype=float)
+                    basis = x[:,phases.index(reaction['basis'])]
+                    factor = np.full(len(rows), np.nan)
+                    for name, comparison, value, f in step[2]:
+                        if name is None:
+                            holds = np.ones(len(rows), dtype=bool)
+                        else:
+                            holds = comparisons[comparison](values[name][rows] if name in values else x[:,phases.index(name)], value)
+                        factor = np.where(np.isnan(factor) & holds, f, factor)
+                    factor = np.where(dP[rows] == 1, factor, 1-(1-factor)**dP[rows])
+                    x = x+nu*(factor*basis)[:,None]
+                elif step[0] == 'exhaust':
+                    removed = np.zeros(x.shape, dtype=bool)
+                    for phase, threshold in step[1]:
+                        removed[:,phases.index(phase)] = x[:,phases.index(phase)] < threshold
+                    x = _remove(x, removed)
+                else:
+                    raise ValueError('unknown rule step: '+str(step[0]))
+            out[rows] = x
+            rule_used[rows] = k
+    return out, rule_used
+
+## isobaric equilibrium melting ('mineral_phase_isoequ' in melting_function2023.py): every step is calculated from a reference mode at the f of the step,
+# the reference is the source or the mode saved when a phase was exhausted ('gt': source_phase2 and f_gt0, 'cpx': source_phase3 and f_cpx0,
+# 'sp': source_phase4 and f_sp0), a phase of the reaction changes to (reference+coefficient*x)/(1-x), x = f (reference None) or f minus the saved f of 'extent',
+# the other phases keep their proportions of the previous step. The first rule whose conditions hold for the previous step is used:
+# 'if': (name, comparison, value) on 'Po', 'source_gt' (garnet of the source) or a phase, 'zero': phases set to 0 before the reaction,
+# 'exhaust': (phase, threshold, saved), the phases below their threshold are removed and the phases of the reaction normalized to 100,
+# the modes of 'saved' are then set to the new mode and f; 'exhausted': phases set instead of the normalization; 'set': phases set without reaction
+isoequ_rules = (
+    # Po >= 30 kbar
+    frozen({'name':'garnet, cpx', 'if':(('Po','>=',30),('source_gt','>',0),('gt','>',0),('cpx','>',0.5)), 'zero':('sp',),
+            'reaction':'walter1998_gt', 'reference':None, 'extent':None, 'exhaust':(('gt',0,('gt',)),('cpx',0.5,('cpx',)))}),
+    frozen({'name':'garnet, no cpx', 'if':(('Po','>=',30),('source_gt','>',0),('gt','>',0)),
+            'reaction':'walter1998_gt_7GPa', 'reference':'cpx', 'extent':'cpx', 'exhaust':(('gt',0,('gt','cpx')),)}),
+    frozen({'name':'garnet-out, cpx', 'if':(('Po','>=',30),('gt','==',0),('cpx','>',0.5)),
+            'reaction':'walter1998_cpx', 'reference':'gt', 'extent':'gt', 'exhaust':(('cpx',0.5,('cpx',)),)}),
+    frozen({'name':'garnet-out, opx', 'if':(('Po','>=',30),('gt','==',0),('opx','>',0.5)),
+            'reaction':'walter1998_opx', 'reference':'cpx', 'extent':'cpx', 'exhaust':(('opx',0.5,()),), 'exhausted':{'ol':100,'opx':0}}),
+    frozen({'name':'garnet-out, ol', 'if':(('Po','>=',30),('gt','==',0)), 'set':{'ol':100,'opx':0}}),
+    frozen({'name':'no change', 'if':(('Po','>=',30),)}),
+    # Po < 30 kbar: no garnet
+    frozen({'name':'spinel, cpx', 'if':(('Po','<',30),('sp','>',0),('cpx','>',0.5)), 'zero':('gt',),
+            'reaction':'bakerstolper1994_sp', 'reference':None, 'extent':None, 'exhaust':(('sp',0,('sp',)),('cpx',0.5,('cpx',)))}),
+    frozen({'name':'spinel, no cpx', 'if':(('Po','<',30),('sp','>',0)), 'zero':('gt',),
+            'reaction':'wasylenki2003_sp', 'reference':'sp', 'extent':'cpx', 'exhaust':(('sp',0,('sp','cpx')),)}),
+    frozen({'name':'spinel-out, cpx', 'if':(('Po','<',30),('cpx','>',0.5)), 'zero':('gt',),
+            'reaction':'walter1998_cpx', 'reference':'sp', 'extent':'sp', 'exhaust':(('cpx',0.5,('cpx',)),)}),
+    frozen({'name':'spinel-out, opx', 'if':(('Po','<',30),('opx','>',0.5)), 'zero':('gt',),
+            'reaction':'wasylenki2003_opx', 'reference':'cpx', 'extent':'cpx', 'exhaust':(('opx',0.5,()),), 'exhausted':{'ol':100,'opx':0}}),
+    frozen({'name':'spinel-out, ol', 'if':(('Po','<',30),), 'zero':('gt',), 'set':{'ol':100,'opx':0}}),
+    )
+isoequ_saved = ['gt','cpx','sp']  # saved modes: source_phase2 (garnet-out), source_phase3 (cpx-out), source_phase4 (spinel-out)
+
+# index in 'rules' of the isobaric rule used after the modes fm (..., 5), Po and source_gt broadcast to fm[...,0], -1: no rule
+def _isoequ_rule_index(Po, source_gt, fm, rules=isoequ_rules):
+    values = {'Po':Po, 'source_gt':source_gt}
+    index = np.full(fm.shape[:-1], -1)
+    for k, rule in enumerate(rules):
+        holds = index < 0
+        for name, comparison, value in rule['if']:
+            holds = holds & comparisons[comparison](values[name] if name in values else fm[...,phases.index(name)], value)
+        index[holds] = k
+    return index
+
+# one rule used at all steps f (steps, m) of m columns: prev, source (m, 5), saved and f_saved: dictionaries of the saved modes (m, 5) and f (m)
+# returns the modes (steps, m, 5) as if the rule was used at every step, and for each saved mode whether it is set at the step (steps, m)
+def _isoequ_rule_grid(rule, prev, source, saved, f_saved, f):
+    x = np.broadcast_to(prev, f.shape+(5,)).copy()
+    for phase in rule.get('zero', ()):
+        x[...,phases.index(phase)] = 0
+    for phase, value in rule.get('set', {}).items():
+        x[...,phases.index(phase)] = value
+    events = {name:np.zeros(f.shape, dtype=bool) for name in saved}
+    if 'reaction' not in rule:
+        return x, events
+    reference = source if rule['reference'] is None else saved[rule['reference']]
+    extent = f if rule['extent'] is None else f-f_saved[rule['extent']]
+    coefficients = reactions[rule['reaction']]['coefficients']
+    reacting = [j for j, phase in enumerate(phases) if coefficients[phase] != 0]
+    for j in reacting:
+        x[...,j] = (reference[:,j]+coefficients[phases[j]]*extent)/(1-extent)
+    removed = np.zeros(x.shape, dtype=bool)
+    for phase, threshold, names in rule['exhaust']:
+        below = x[...,phases.index(phase)] < threshold
+        removed[...,phases.index(phase)] = below
+        for name in names:
+            events[name] |= below
+    exhausted = removed.any(axis=-1)
+    if 'exhausted' in rule:
+        for phase, value in rule['exhausted'].items():
+            x[...,phases.index(phase)] = np.where(exhausted, value, x[...,phases.index(phase)])
+        return x, events
+    rest = x[...,0]+x[...,1]+x[...,2]+x[...,3]+x[...,4]  # same order of the sums as 'mineral_phase_isoequ'
+    for j in range(5):
+        rest = np.where(removed[...,j], rest-x[...,j], rest)
+    normalized = x/rest[...,None]*100
+    for j in reacting:
+        x[...,j] = np.where(removed[...,j], 0., np.where(exhausted, normalized[...,j], x[...,j]))
+    return x, events
+
+# mineral phase proportions of isobaric equilibrium melting at all steps of n columns, same as calling 'mineral_phase_isoequ' step by step
+# Po: n values (kbar), source_phase: array (n, 5) in the order of 'phases', f: array (steps, n) of the extents of melting, NaN after the last step of a column
+# a rule is used at consecutive steps until a phase is exhausted or the next step needs another rule: each rule is evaluated on the whole f grid
+# of its columns and the exhaustion steps are found at once, so the loop is over the few rules used, not over the steps
+# returns the proportions (steps, n, 5) and the index in 'isoequ_rules' of the rule used at each step (-1 after the last step)
+def mineral_phase_isoequ_rules(Po, source_phase, f, rules=isoequ_rules):
+    f = np.array(f, dtype=float, ndmin=2)
+    n_steps, n = f.shape
+    Po = np.broadcast_to(np.asarray(Po, dtype=float), (n,))
+    source = np.array(source_phase, dtype=float, ndmin=2)
+    steps = np.isfinite(f).sum(axis=0)
+    fm = np.full((n_steps, n, 5), np.nan)
+    rule_used = np.full((n_steps, n), -1)
+    prev = source.copy()
+    saved = {name:source.copy() for name in isoequ_saved}
+    f_saved = {name:np.full(n, 0.0000001) for name in isoequ_saved}
+    start = np.zeros(n, dtype=int)
+    rows = np.arange(n_steps)[:,None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        while (start < steps).any():
+            active = np.flatnonzero(start < steps)
+            index = _isoequ_rule_index(Po[active], source[active,3], prev[active], rules)
+            start[active[index < 0]] = steps[active[index < 0]]  # no rule (e.g., Po is NaN)
+            for k in np.unique(index[index >= 0]):
+                i = active[index == k]
+                m = np.arange(len(i))
+                x, events = _isoequ_rule_grid(rules[k], prev[i], source[i], {name:saved[name][i] for name in saved},
+                                              {name:f_saved[name][i] for name in f_saved}, f[:,i])
+                stop = _isoequ_rule_index(Po[i], source[i,3], x, rules) != k
+                for name in events:
+                    stop |= events[name]
+                stop = (stop & (rows >= start[i])) | (rows == steps[i]-1)
+                end = np.argmax(stop, axis=0)
+                used = (rows >= start[i]) & (rows <= end)
+                block, block_rule = fm[:,i], rule_used[:,i]
+                block[used] = x[used]
+                block_rule[used] = k
+                fm[:,i], rule_used[:,i] = block, block_rule
+                for name in events:
+                    hit = events[name][end,m]
+                    saved[name][i[hit]] = x[end[hit],m[hit]]
+                    f_saved[name][i[hit]] = f[end[hit],i[hit]]
+                prev[i] = x[end,m]
+                start[i] = end+1
+    return fm, rule_used
+
+## the rules as a float array for the compiled kernel, one row per step:
+# rule index, step code, name (phase index 0-4, 5: P, 6: Po, -1: none), comparison code, value, factor, then 5 coefficients or thresholds
+step_codes = {'if':0, 'zero':1, 'remove':2, 'react':3, 'factor':4, 'convert':5, 'exhaust':6, 'only':7}
+comparison_codes = {'>':0, '>=':1, '<':2, '<=':3}
+program_width = 11
+
+def _name_code(name):
+    return {'P':5, 'Po':6, None:-1}[name] if name in ('P','Po',None) else phases.index(name)
+
+def rule_program(rules=rules):
+    program = []
+    for k, rule in enumerate(rules):
+        for step in rule['steps']:
+            row = [k, step_codes[step[0]], -1, -1, 0., 0.]+[0.]*5
+            if step[0] == 'if':
+                row[2:5] = [_name_code(step[1]), comparison_codes[step[2]], step[3]]
+            elif step[0] in ('zero','remove','only'):
+                row[2] = _name_code(step[1])
+            elif step[0] == 'react':
+                row[6:] = [reactions[step[1]]['coefficients'][phase] for phase in phases]
+            elif step[0] == 'convert':
+                for name, comparison, value, f in step[2]:  # the factors first, the first that holds is used
+                    program.append([k, step_codes['factor'], _name_code(name), -1 if comparison is None else comparison_codes[comparison],
+                                    0. if value is None else value, f]+[0.]*5)
+                row[2] = _name_code(reactions[step[1]]['basis'])
+                row[6:] = [reactions[step[1]]['coefficients'][phase] for phase in phases]
+            elif step[0] == 'exhaust':
+                thresholds = dict(step[1])
+                row[6:] = [thresholds.get(phase, -np.inf) for phase in phases]  # -inf: the phase is never exhausted
+            program.append(row)
+    return np.array(program, dtype=float)
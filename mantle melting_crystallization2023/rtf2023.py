@@ -0,0 +1,211 @@
+# open-system magma chamber: periodically replenished, tapped and fractionated (RTF, O'Hara 1977; O'Hara and Mathews 1981)
+# every cycle the chamber liquid (mass M) is mixed with the mass R of parental magma, the fraction x of the mixed liquid crystallizes
+# (fractional crystallization by the olivine-only or the ol-pl-cpx engine) and the fraction t of the remaining liquid is erupted:
+# M' = (M+R)*(1-x)*(1-t); the mass of the chamber is constant with R = 1/((1-x)*(1-t))-1 (default).
+# The erupted liquid is the fractionated liquid (tap='after') or the mixed magma before crystallization (tap='before').
+# The chamber liquid converges to a steady state after many cycles (as (1-t)^cycles for an incompatible element with constant mass);
+# with 'accelerate' the cycles are extrapolated to the steady state by reduced rank extrapolation (RRE, a vector form of Aitken's delta-squared
+# that follows 'rank' geometric modes at once, e.g., the liquid and the phase proportions approaching the steady state at different rates):
+# after rank+1 cycles the chamber jumps to the extrapolated state, and the run stops when one cycle changes no component by more than 'tol'.
+# A steady state needs a parent that makes up for the crystals: with olivine only, x must be small against t (e.g., x 0.02, t 0.1 for the Hawaiian magma),
+# otherwise the liquid runs out of MgO, olivine-only crystallization fails (NaN) and the chamber is returned with converged=False.
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import sys
+import time
+from olonly_batch2023 import magma_keys, olonly_batch_steps
+from wl1990stoich_2023 import oxideToComponent
+from wl1990kdcalc_2023 import kdCalc_langmuir1992
+from wl1990models_2023 import get_first_T, frac_model_trange
+
+wl1990_keys = ['SiO2','TiO2','Al2O3','FeO','MgO','K2O','MnO','Na2O','P2O5','CaO','NiO']  # magma compositions of ol-pl-cpx crystallization
+
+# replenishment mass per cycle that keeps the mass of the chamber constant
+def constant_mass_R(x, t):
+    return 1/((1-np.asarray(x, dtype=float))*(1-np.asarray(t, dtype=float)))-1
+
+# steady-state mass of the chamber and liquid of an element that does not enter the crystals (e.g., K2O in olivine), C0: parental magma
+def steady_incompatible(C0, R, x, t):
+    M = R*(1-x)*(1-t)/(1-(1-x)*(1-t))
+    return M, R*C0/((M+R)*(1-x)-M)
+
+# one cycle of olivine-only chambers (arrays of the chambers): liquid (dictionary of 'magma_keys' in wt%) and mass M mixed with the parent (mass R),
+# fractional crystallization of the fraction x (olonly_batch_steps, 1 Celsius steps, the liquid interpolated between the steps at the melt fraction 1-x)
+# returns the liquid after crystallization and the olivine in equilibrium with it (Fo, olppm_Ni, olppm_Mn), NaN where 1-x is not reached within T_range
+def olonly_cycle(liquid, parent, M, R, x, P=0.001, T_range=300, kd=None):
+    mixed = {key:(M*liquid[key]+R*parent[key])/(M+R) for key in magma_keys}
+    target = 1-x
+    out = {key:np.full(len(M), np.nan) for key in magma_keys+['Fo','olppm_Ni','olppm_Mn','T Celsius']}
+    done = np.zeros(len(M), dtype=bool)
+    previous = None
+    for step in olonly_batch_steps(mixed, P=P, T_range=T_range, xtalization_model='fractional', kd=kd):
+        f = step['melt fraction']
+        step = dict(step, Na2O=mixed['Na2O']/f, K2O=mixed['K2O']/f, NiO=step['clppm_Ni']*74.69/58.6934/10**4)
+        reached = ~done & (f <= target)
+        if previous is not None and reached.any():
+            with np.errstate(invalid='ignore', divide='ignore'):
+                w = np.where(reached, (previous['melt fraction']-target)/(previous['melt fraction']-f), 0.)
+            for key, name in [(key, 'clwt_'+key) for key in ('MgO','FeO','SiO2','MnO')]+[(key, key) for key in ('Na2O','K2O','NiO','Fo','olppm_Ni','olppm_Mn','T Celsius')]:
+                out[key][reached] = ((1-w)*previous[name]+w*step[name])[reached]
+            done = done | reached
+        if done.all():
+            break
+        previous = step
+    return out
+
+# one cycle of one ol-pl-cpx chamber (numbers): mixing as 'olonly_cycle', fractional crystallization from the liquidus of the mixed magma
+# (frac_model_trange, 1 Celsius steps, run by blocks of 'block' Celsius until the melt fraction 1-x), the liquid interpolated at 1-x
+# returns the liquid (wl1990_keys, wt%) and the fractions of ol, cpx and plg crystallized in the cycle (of the mixed magma), T at the end
+def wl1990_cycle(liquid, parent, M, R, x, P=1., block=20, max_T_range=300, solver='newton'):
+    mixed = {key:(M*liquid[key]+R*parent[key])/(M+R) for key in wl1990_keys}
+    target = 1-x
+    t_start = get_first_T(oxideToComponent(mixed), P=P, kdCalc=kdCalc_langmuir1992, solver=solver)
+    start_comp, fl_start, T = mixed, 1., t_start
+    crystallized = {phase:0. for phase in ['ol','cpx','plg']}
+    previous = (1., mixed)
+    while t_start-T < max_T_range:
+        fl, fa_dict, major_oxide_dict, major_phase_oxide_dict = frac_model_trange(T, T-block, start_comp, P=P, kdCalc=kdCalc_langmuir1992, solver=solver)
+        for i in range(len(fl)):
+            f = fl_start*fl[i]
+            liquid = {key:major_oxide_dict[key][i] for key in wl1990_keys}
+            if f <= target:
+                w = (previous[0]-target)/(previous[0]-f)
+                out = {key:(1-w)*previous[1][key]+w*liquid[key] for key in wl1990_keys}
+                # crystals of the cycle: the phases of the blocks before and the interpolated part of this block
+                fa = {phase:fa_dict[phase][i-1]+w*(fa_dict[phase][i]-fa_dict[phase][i-1]) if i > 0 else w*fa_dict[phase][0] for phase in crystallized}
+                out.update({phase:crystallized[phase]+fl_start*fa[phase] for phase in crystallized})
+                out['T Celsius'] = T-(i+w)-273.15
+                return out
+            previous = (f, liquid)
+        crystallized = {phase:crystallized[phase]+fl_start*fa_dict[phase][-1] for phase in crystallized}
+        start_comp, fl_start, T = previous[1], previous[0], T-block
+    return dict({key:np.nan for key in wl1990_keys+['T Celsius']}, **crystallized)
+
+# reduced rank extrapolation of successive cycles (list of rank+2 arrays of the components): the combination of the states sum(g*x), sum(g)=1,
+# whose differences cancel best (least squares of the relative differences); the last state where the system cannot be solved
+def rre(states):
+    X = np.array(states)
+    U = np.diff(X, axis=0)/np.maximum(np.abs(X[-1]), 1e-30)
+    A = U @ U.T
+    try:
+        g = np.linalg.solve(A+1e-14*np.trace(A)*np.eye(len(A)), np.ones(len(A)))
+    except np.linalg.LinAlgError:
+        return X[-1]
+    jump = (g/g.sum()) @ X[:-1]
+    return jump if np.all(np.isfinite(jump)) else X[-1]
+
+# cycles of chambers until steady state: cycle(liquid, M, index) returns the liquid of the chambers 'index' after one cycle (dictionary of arrays,
+# the keys of 'keys' are carried to the next cycle, other keys are reported), M: mass of the chambers before the cycle, R, x, t: arrays of the chambers
+# a chamber is at steady state when one cycle changes no component of 'keys' or M by more than tol (relative)
+# accelerate: extrapolate every rank+1 cycles ('rre'), a jump with a negative component is not used
+# returns the last cycle of every chamber (dictionary of arrays), 'M', 'cycles' (cycles calculated), 'jumps' (extrapolations) and 'converged'
+def run_chambers(cycle, liquid, M, R, x, t, keys, tol=1e-6, max_cycles=3000, accelerate=True, rank=2):
+    n = len(M)
+    X = np.column_stack([np.asarray(liquid[key], dtype=float) for key in keys]+[np.asarray(M, dtype=float)])
+    history = [[X[j].copy()] for j in range(n)]
+    last = {}
+    cycles = np.zeros(n, dtype=int)
+    jumps = np.zeros(n, dtype=int)
+    converged = np.zeros(n, dtype=bool)
+    active = np.arange(n)
+    while len(active) > 0:
+        out = cycle({key:X[active,k] for k, key in enumerate(keys)}, X[active,-1], active)
+        new = np.column_stack([out[key] for key in keys]+[(X[active,-1]+R[active])*(1-x[active])*(1-t[active])])
+        for key in out:
+            last.setdefault(key, np.full(n, np.nan))[active] = out[key]
+        cycles[active] += 1
+        with np.errstate(invalid='ignore', divide='ignore'):
+            change = np.max(np.abs(new-X[active])/np.maximum(np.abs(X[active]), 1e-30), axis=1)
+        failed = ~np.all(np.isfinite(new), axis=1)
+        converged[active] = change <= tol
+        X[active] = new
+        keep = []
+        for a, j in enumerate(active):
+            if converged[j] or failed[a] or cycles[j] >= max_cycles:
+                continue
+            keep.append(j)
+            history[j].append(new[a])
+            if accelerate and len(history[j]) == rank+2:
+                jump = rre(history[j])
+                if np.all(jump > 0):
+                    X[j] = jump
+                    jumps[j] += 1
+                history[j] = [X[j].copy()]
+        active = np.array(keep, dtype=int)
+    last['M'] = X[:,-1]
+    last.update({'cycles':cycles, 'jumps':jumps, 'converged':converged})
+    return last
+
+# steady state of olivine-only RTF chambers: parent (dictionary of 'magma_keys', numbers or arrays of the chambers), x: crystallized fraction per cycle,
+# t: erupted fraction per cycle, R: replenishment mass per cycle (default: constant mass), M0: initial mass of the chamber liquid (of parent composition)
+# the erupted liquid has the keys 'erupted_<oxide>' (tap='before': the mixed magma); other inputs as 'olonly_cycle' and 'run_chambers'
+def rtf_olonly(parent, x=0.02, t=0.1, R=None, M0=1., tap='after', P=0.001, kd=None, tol=1e-6, max_cycles=3000, accelerate=True, rank=2):
+    inputs = np.broadcast_arrays(*([np.asarray(x, dtype=float), np.asarray(t, dtype=float), np.asarray(M0, dtype=float)]
+                                   +[np.asarray(parent[key], dtype=float) for key in magma_keys]))
+    x, t, M0 = (np.atleast_1d(value).copy() for value in inputs[:3])
+    parent = {key:np.atleast_1d(value) for key, value in zip(magma_keys, inputs[3:])}
+    R = constant_mass_R(x, t) if R is None else np.broadcast_to(np.asarray(R, dtype=float), x.shape).copy()
+    cycle = lambda liquid, M, i: olonly_cycle(liquid, {key:parent[key][i] for key in magma_keys}, M, R[i], x[i], P, kd=kd)
+    out = run_chambers(cycle, {key:parent[key].copy() for key in magma_keys}, M0, R, x, t, magma_keys, tol, max_cycles, accelerate, rank)
+    M = out['M']/((1-x)*(1-t))-R  # mass before the last cycle (at steady state the liquid is the same before and after a cycle)
+    for key in magma_keys:
+        out['erupted_'+key] = out[key] if tap == 'after' else (M*out[key]+R*parent[key])/(M+R)
+    return out
+
+# steady state of one ol-pl-cpx RTF chamber: parent (dictionary of 'wl1990_keys', numbers), other inputs as 'rtf_olonly' and 'wl1990_cycle'
+# returns numbers: the liquid, the crystals of the last cycle (ol, cpx, plg), 'M', 'cycles', 'jumps' and 'converged'
+def rtf_wl1990(parent, x=0.1, t=0.1, R=None, M0=1., tap='after', P=1., tol=1e-6, max_cycles=1000, accelerate=True, rank=3, solver='newton'):
+    R = float(constant_mass_R(x, t)) if R is None else float(R)
+    cycle = lambda liquid, M, i: {key:np.atleast_1d(value) for key, value in
+                                  wl1990_cycle({key:float(liquid[key][0]) for key in wl1990_keys}, parent, float(M[0]), R, x, P, solver=solver).items()}
+    out = run_chambers(cycle, {key:[parent[key]] for key in wl1990_keys}, np.array([float(M0)]), np.array([R]), np.array([float(x)]), np.array([float(t)]),
+                       wl1990_keys, tol, max_cycles, accelerate, rank)
+    out = {key:value[0] for key, value in out.items()}
+    M = out['M']/((1-x)*(1-t))-R
+    for key in wl1990_keys:
+        out['erupted_'+key] = out[key] if tap == 'after' else (M*out[key]+R*parent[key])/(M+R)
+    return out
+
+## checks: steady state of the Hawaiian magma (olivine-only) and of the MORB magma (ol-pl-cpx, models2023.py) with and without the extrapolation,
+# K2O and the mass against the analytical steady state of an element that does not enter the crystals,
+# and a batch of olivine-only chambers with different eruption fractions
+if __name__ == '__main__':
+    from models2023 import default_olonly_inputs, default_wl1990_inputs
+    ok = True
+    magma = default_olonly_inputs('Haw')[0]
+    for x, t in ((0.02, 0.1), (0.01, 0.02)):
+        runs = {}
+        for accelerate in (False, True):
+            start = time.perf_counter()
+            runs[accelerate] = rtf_olonly(magma, x, t, accelerate=accelerate)
+            runs[accelerate]['seconds'] = time.perf_counter()-start
+        slow, fast = runs[False], runs[True]
+        diff = max(abs(fast[key][0]/slow[key][0]-1) for key in magma_keys)
+        M_ss, K2O_ss = steady_incompatible(magma['K2O'], constant_mass_R(x, t), x, t)
+        K2O_diff = abs(fast['K2O'][0]/K2O_ss-1)
+        print('olivine-only x %.2f t %.2f: %d cycles %.2f s, extrapolated %d cycles (%d jumps) %.2f s, difference to the run of all cycles %.1e; K2O x%.2f (relative to analytical %.1e), MgO %.2f wt%%, NiO %.4f wt%%, Fo %.1f, olivine Ni %.0f ppm'
+              % (x, t, slow['cycles'][0], slow['seconds'], fast['cycles'][0], fast['jumps'][0], fast['seconds'], diff,
+                 fast['K2O'][0]/magma['K2O'], K2O_diff, fast['MgO'][0], fast['NiO'][0], fast['Fo'][0], fast['olppm_Ni'][0]))
+        ok = ok and slow['converged'][0] and fast['converged'][0] and diff < 1e-4 and K2O_diff < 1e-4 and abs(fast['M'][0]-1) < 1e-9
+    t = np.array([0.02, 0.05, 0.1, 0.2, 0.5])
+    start = time.perf_counter()
+    batch = rtf_olonly(magma, 0.01, t)
+    print('%d olivine-only chambers (x 0.01, t %s) in %.2f s, cycles %s: MgO %s wt%%, olivine Ni %s ppm'
+          % (len(t), t, time.perf_counter()-start, batch['cycles'], np.round(batch['MgO'], 2), np.round(batch['olppm_Ni'])))
+    ok = ok and batch['converged'].all()
+    magma = default_wl1990_inputs()[0]
+    runs = {}
+    for accelerate in (False, True):
+        start = time.perf_counter()
+        runs[accelerate] = rtf_wl1990(magma, 0.1, 0.1, accelerate=accelerate)
+        runs[accelerate]['seconds'] = time.perf_counter()-start
+    slow, fast = runs[False], runs[True]
+    diff = max(abs(fast[key]/slow[key]-1) for key in wl1990_keys)
+    M_ss, K2O_ss = steady_incompatible(magma['K2O'], constant_mass_R(0.1, 0.1), 0.1, 0.1)
+    print('ol-pl-cpx x 0.10 t 0.10: %d cycles %.2f s, extrapolated %d cycles (%d jumps) %.2f s, difference to the run of all cycles %.1e; K2O x%.2f (analytical without K2O in the crystals x%.2f), MgO %.2f wt%%, crystals ol %.3f cpx %.3f plg %.3f'
+          % (slow['cycles'], slow['seconds'], fast['cycles'], fast['jumps'], fast['seconds'], diff, fast['K2O']/magma['K2O'], K2O_ss/magma['K2O'],
+             fast['MgO'], fast['ol'], fast['cpx'], fast['plg']))
+    ok = ok and slow['converged'] and fast['converged'] and diff < 1e-3
+    sys.exit(0 if ok else 1)
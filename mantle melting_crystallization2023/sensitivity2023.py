@@ -0,0 +1,196 @@
+# global sensitivity of the model outputs (e.g., olivine Ni at Fo 88 and melt Ni at MgO 8) to the parameters of 'Inversion' (inversion2023.py):
+# source oxides and modes, Po, F, P (pressure of crystallization) and the partition-coefficient parameters of 'kd_default' (constants2023.py), within bounds
+# Sobol indices: Saltelli design (matrices A and B of scrambled Sobol points, and AB_i: A with column i of B), n*(d+2) model runs,
+# first-order index S1 (Saltelli et al. 2010) and total index ST (Jansen 1999), bootstrap confidence intervals
+# Morris screening: r trajectories of d+1 points on a grid of 'levels' levels, elementary effects per unit of the range of every parameter,
+# mu, mu* (mean of the absolute effects) and sigma, bootstrap confidence interval of mu*
+# the design points are calculated by the batched engines ('Surrogate.evaluate', surrogate2023.py, not the emulator) in chunks on a process pool,
+# so the time is the time of the batched engines divided by the number of workers
+# runs whose output could not be calculated (NaN, e.g., F beyond the melting column) are left out of the indices of that output
+# Fe2Fet is not a parameter: melting and olivine-only crystallization are calculated with FeO and it only converts FeO to FeOt of the outputs
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import pandas as pd
+import sys
+import time
+from surrogate2023 import Surrogate
+
+# Saltelli design of d parameters within lower and upper, array (n*(d+2), d): A (n), B (n), AB_1 ... AB_d (n each)
+def saltelli_design(lower, upper, n=512, seed=0):
+    from scipy.stats import qmc
+    lower, upper = np.asarray(lower, dtype=float), np.asarray(upper, dtype=float)
+    d = len(lower)
+    U = qmc.Sobol(d=2*d, seed=seed).random(n)
+    A, B = U[:,:d], U[:,d:]
+    AB = np.tile(A, (d, 1))
+    for i in range(d):
+        AB[i*n:(i+1)*n,i] = B[:,i]
+    return lower+(upper-lower)*np.vstack([A, B, AB])
+
+# first-order and total indices (d, ...) of the runs of one output (A, B: arrays n, AB: array (d, n)) for the samples idx (n, or bootstrap samples (samples, n))
+def _sobol_estimates(fA, fB, fAB, idx):
+    fA, fB, fAB = fA[idx], fB[idx], fAB[:,idx]
+    # centred on the mean of A and B: the same indices, a much smaller variance of S1 for outputs of large mean (e.g., Ni in ppm)
+    fAB_all = np.concatenate([fA, fB], axis=-1)
+    mean = np.mean(fAB_all, axis=-1, keepdims=True)
+    var = np.var(fAB_all, axis=-1)
+    S1 = np.mean((fB-mean)*(fAB-fA), axis=-1)/var
+    ST = 0.5*np.mean((fA-fAB)**2, axis=-1)/var
+    return S1, ST
+
+# Sobol indices of the runs Y (n*(d+2), outputs) of 'saltelli_design', a dataframe with a row for every output and parameter:
+# S1 and ST with their bootstrap confidence intervals (conf), and the number of valid A, B and AB_i runs of the output
+def sobol_indices(Y, names, outputs=None, n_boot=500, conf=0.95, seed=0):
+    Y = np.asarray(Y, dtype=float).reshape(len(Y), -1)
+    d = len(names)
+    n = len(Y)//(d+2)
+    if len(Y) != n*(d+2):
+        raise ValueError('the number of runs is not a multiple of the number of parameters + 2')
+    outputs = list(outputs) if outputs is not None else ['y%d' % j for j in range(Y.shape[1])]
+    rng = np.random.default_rng(seed)
+    q = [(1-conf)/2, (1+conf)/2]
+    rows = []
+    for j, output in enumerate(outputs):
+        fA, fB = Y[:n,j], Y[n:2*n,j]
+        fAB = Y[2*n:,j].reshape(d, n)
+        ok = np.isfinite(fA) & np.isfinite(fB) & np.all(np.isfinite(fAB), axis=0)
+        m = np.sum(ok)
+        if m < 2:
+            raise ValueError('too few valid runs for output '+output)
+        fA, fB, fAB = fA[ok], fB[ok], fAB[:,ok]
+        S1, ST = _sobol_estimates(fA, fB, fAB, np.arange(m))
+        S1_boot, ST_boot = _sobol_estimates(fA, fB, fAB, rng.integers(0, m, (n_boot, m)))
+        S1_ci, ST_ci = np.quantile(S1_boot, q, axis=1), np.quantile(ST_boot, q, axis=1)
+        for i, name in enumerate(names):
+            rows.append({'output':output, 'parameter':name, 'S1':S1[i], 'S1_low':S1_ci[0,i], 'S1_high':S1_ci[1,i],
+                         'ST':ST[i], 'ST_low':ST_ci[0,i], 'ST_high':ST_ci[1,i], 'runs':m})
+    return pd.DataFrame(rows)
+
+# Morris design of d parameters within lower and upper: r trajectories of d+1 points, array (r*(d+1), d),
+# every point moves one parameter by delta = levels/(2*(levels-1)) of its range, in random order; also returns the design in [0, 1]
+def morris_design(lower, upper, r=50, levels=4, seed=0):
+    lower, upper = np.asarray(lower, dtype=float), np.asarray(upper, dtype=float)
+    d = len(lower)
+    rng = np.random.default_rng(seed)
+    delta = levels/(2.*(levels-1))
+    grid = np.arange(levels)/(levels-1.)
+    U = np.empty((r, d+1, d))
+    for k in range(r):
+        x = rng.choice(grid, d)
+        sign = np.where(x+delta <= 1+1e-12, 1., -1.)
+        U[k,0] = x
+        for step, i in enumerate(rng.permutation(d)):
+            x = x.copy()
+            x[i] += sign[i]*delta
+            U[k,step+1] = x
+    U = U.reshape(r*(d+1), d)
+    return lower+(upper-lower)*U, U
+
+# elementary effects of the runs Y (r*(d+1), outputs) of the design U (in [0, 1]) of 'morris_design', a dataframe with a row for every output and parameter:
+# mu, mu* with its bootstrap confidence interval (conf), sigma, and the number of valid effects (trajectories with a NaN run lose the effects next to it)
+def morris_indices(U, Y, names, outputs=None, n_boot=500, conf=0.95, seed=0):
+    Y = np.asarray(Y, dtype=float).reshape(len(Y), -1)
+    d = len(names)
+    r = len(Y)//(d+1)
+    if len(Y) != r*(d+1):
+        raise ValueError('the number of runs is not a multiple of the number of parameters + 1')
+    outputs = list(outputs) if outputs is not None else ['y%d' % j for j in range(Y.shape[1])]
+    dU = np.diff(U.reshape(r, d+1, d), axis=1)
+    moved = np.argmax(np.abs(dU), axis=2)
+    step = np.take_along_axis(dU, moved[:,:,None], axis=2)[:,:,0]
+    order = np.argsort(moved, axis=1)
+    rng = np.random.default_rng(seed)
+    q = [(1-conf)/2, (1+conf)/2]
+    rows = []
+    for j, output in enumerate(outputs):
+        EE = np.diff(Y[:,j].reshape(r, d+1), axis=1)/step
+        EE = np.take_along_axis(EE, order, axis=1)
+        for i, name in enumerate(names):
+            ee = EE[np.isfinite(EE[:,i]),i]
+            m = len(ee)
+            if m < 2:
+                raise ValueError('too few valid elementary effects of %s for output %s' % (name, output))
+            boot = np.mean(np.abs(ee[rng.integers(0, m, (n_boot, m))]), axis=1)
+            ci = np.quantile(boot, q)
+            rows.append({'output':output, 'parameter':name, 'mu':np.mean(ee), 'mu_star':np.mean(np.abs(ee)),
+                         'mu_star_low':ci[0], 'mu_star_high':ci[1], 'sigma':np.std(ee, ddof=1), 'effects':m})
+    return pd.DataFrame(rows)
+
+# runs of the design X by function f (arrays (m, d) to (m, outputs)) in chunks of batch, on a process pool of workers (1: in this process)
+def run_design(f, X, workers=1, batch=128):
+    chunks = [X[i:i+batch] for i in range(0, len(X), batch)]
+    if workers == 1:
+        Y = [f(chunk) for chunk in chunks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            Y = list(pool.map(f, chunks))
+    return np.vstack(Y)
+
+# model of the analyses: the batched engines with olivine Ni at fo_values and melt Ni at mgo_values
+def _model(setting, bounds, fo_values, mgo_values, P):
+    return Surrogate(setting, bounds, fo_values=fo_values, mgo_values=mgo_values, P=P)
+
+# Sobol indices of the outputs of a setting (e.g., 'scenarios' of models2023.py) to the parameters within bounds {name:(lower, upper)}
+# outputs: names of 'Surrogate.outputs' (default: olivine Ni at the Fo and melt Ni at the MgO values); n*(d+2) runs
+def sobol_analysis(setting, bounds, n=512, outputs=None, fo_values=(88.,), mgo_values=(8.,), P=0.001, workers=1, batch=128, n_boot=500, conf=0.95, seed=0):
+    model = _model(setting, bounds, fo_values, mgo_values, P)
+    if outputs is None:
+        outputs = ['olppm_Ni_Fo%g' % fo for fo in fo_values]+['clppm_Ni_MgO%g' % mgo for mgo in mgo_values]
+    columns = [model.outputs.index(output) for output in outputs]
+    X = saltelli_design(model.lower, model.upper, n, seed)
+    Y = run_design(model.evaluate, X, workers, batch)
+    return sobol_indices(Y[:,columns], model.names, outputs, n_boot, conf, seed)
+
+# Morris screening of the outputs of a setting to the parameters within bounds {name:(lower, upper)}, r*(d+1) runs
+def morris_analysis(setting, bounds, r=50, levels=4, outputs=None, fo_values=(88.,), mgo_values=(8.,), P=0.001, workers=1, batch=128, n_boot=500, conf=0.95, seed=0):
+    model = _model(setting, bounds, fo_values, mgo_values, P)
+    if outputs is None:
+        outputs = ['olppm_Ni_Fo%g' % fo for fo in fo_values]+['clppm_Ni_MgO%g' % mgo for mgo in mgo_values]
+    columns = [model.outputs.index(output) for output in outputs]
+    X, U = morris_design(model.lower, model.upper, r, levels, seed)
+    Y = run_design(model.evaluate, X, workers, batch)
+    return morris_indices(U, Y[:,columns], model.names, outputs, n_boot, conf, seed)
+
+## checks: the Ishigami function (analytical indices S1 0.314, 0.442, 0 and ST 0.558, 0.442, 0.244; Morris ranks x1 and x2 above x3 in mu*),
+# then the sensitivity of olivine Ni at Fo 88 and melt Ni at MgO 8 of Hawaii to the source, melting, crystallization and Kd parameters
+if __name__ == '__main__':
+    def ishigami(X, a=7., b=0.1):
+        return (np.sin(X[:,0])+a*np.sin(X[:,1])**2+b*X[:,2]**4*np.sin(X[:,0]))[:,None]
+    names = ['x1','x2','x3']
+    lower, upper = [-np.pi]*3, [np.pi]*3
+    X = saltelli_design(lower, upper, 4096)
+    table = sobol_indices(run_design(ishigami, X), names)
+    print(table[['parameter','S1','S1_low','S1_high','ST','ST_low','ST_high']].round(3).to_string(index=False))
+    S1_exact, ST_exact = np.array([0.3139, 0.4424, 0.]), np.array([0.5576, 0.4424, 0.2437])
+    ok = np.max(np.abs(table['S1']-S1_exact)) < 0.03 and np.max(np.abs(table['ST']-ST_exact)) < 0.03
+    X, U = morris_design(lower, upper, 200)
+    morris = morris_indices(U, run_design(ishigami, X), names)
+    print(morris[['parameter','mu','mu_star','mu_star_low','mu_star_high','sigma']].round(2).to_string(index=False))
+    ok = ok and morris['mu_star'][2] < min(morris['mu_star'][0], morris['mu_star'][1])
+
+    from models2023 import scenarios
+    from constants2023 import kd_default
+    setting = scenarios['Haw']
+    bounds = {'NiO':(0.22,0.28), 'ol':(48.,58.), 'cpx':(22.,32.), 'Po':(40.,50.), 'F':(0.04,0.08), 'P':(0.001,5.),
+              'kdNi_C':(kd_default['kdNi_C']-0.1, kd_default['kdNi_C']+0.1), 'kdNi_opxol':(0.8*kd_default['kdNi_opxol'], 1.2*kd_default['kdNi_opxol']),
+              'Toplis_S':(kd_default['Toplis_S']-0.5, kd_default['Toplis_S']+0.5)}
+    for name, (low, high) in bounds.items():
+        print('%s: %g to %g' % (name, low, high))
+    start = time.perf_counter()
+    table = sobol_analysis(setting, bounds, n=256)
+    sobol_time = time.perf_counter()-start
+    print(table.drop(columns='runs').round(3).to_string(index=False))
+    print('Sobol: %d runs, %d valid, %.1f s' % (256*(len(bounds)+2), table['runs'].min(), sobol_time))
+    start = time.perf_counter()
+    morris = morris_analysis(setting, bounds, r=40)
+    morris_time = time.perf_counter()-start
+    print(morris.drop(columns='effects').round(1).to_string(index=False))
+    print('Morris: %d runs, %.1f s' % (40*(len(bounds)+1), morris_time))
+    # the indices are shares of the variance, their sums within the sampling error of 1 (first order <= 1 <= total)
+    for output, rows in table.groupby('output'):
+        print('%s: sum S1 %.2f, sum ST %.2f' % (output, rows['S1'].sum(), rows['ST'].sum()))
+        ok = ok and rows['S1'].sum() < 1.1 and rows['ST'].sum() > 0.9
+    sys.exit(0 if ok else 1)
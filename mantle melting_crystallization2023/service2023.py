@@ -0,0 +1,399 @@
+# local model-query service: the model stages of models2023.py behind a small HTTP/JSON server, and its client
+# the server keeps the results of the stages in memory (melting columns, liquidus temperatures, olivine-only and ol-pl-cpx crystallization paths),
+# so a column or path asked again, also by another notebook, is returned without calculating it again; queries asked while the same stage is
+# being calculated wait for that calculation. The HTTP front end is asyncio (one thread), the stages are calculated in a pool of worker processes.
+# Queries can be single, a batch (calculated concurrently, results in the same order), or jobs (submitted, then polled by their id).
+# Only the Python standard library, numpy and pandas are used, everything runs on one machine.
+# server: python service2023.py [--port 8765] [--workers 2] [--warm]       client: Client('http://127.0.0.1:8765')
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import asyncio
+import json
+import sys
+import time
+from collections import OrderedDict
+
+# stages with their parameters and default values; the parameters of a stage (with the defaults filled in) are the key of its cache
+stage_defaults = {'melting':{'source_wt':None, 'source_phase':None, 'Po':None, 'melting_model':'polybaric'},
+                  'liquidus':{'magma':None, 'P':0.001},
+                  'olonly':{'magma':None, 'Fe2Fet':None, 'Po':None, 'P':0.001, 'T_range':350, 'xtalization_model':'fractional'},
+                  'wl1990':{'magma':None, 'Fe2Fet':None, 'T_range':250}}
+
+def stage_params(stage, params):
+    params = {key:params.get(key, default) for key, default in stage_defaults[stage].items()}
+    missing = [key for key, value in params.items() if value is None]
+    if missing:
+        raise ValueError('missing parameters of %s: %s' % (stage, ', '.join(missing)))
+    return params
+
+# calculation of one stage (in a worker process)
+def compute_stage(stage, params):
+    import models2023
+    if stage == 'melting':
+        return models2023.melting_column(params['source_wt'], params['source_phase'], params['Po'], params['melting_model'])
+    if stage == 'liquidus':
+        import numpy as np
+        from olonly_batch2023 import cationmole_magma_batch, molarSiO2_adjust_batch, firstT_olonly_batch
+        clcm = cationmole_magma_batch({key:np.array([value]) for key, value in params['magma'].items()})
+        return float(firstT_olonly_batch(clcm, params['P'], molarSiO2_adjust_batch(clcm)[1])[0])
+    if stage == 'olonly':
+        return models2023.olonly_model(params['magma'], params['Fe2Fet'], params['Po'], params['P'], params['T_range'], params['xtalization_model'])
+    if stage == 'wl1990':
+        return models2023.wl1990_model(params['magma'], params['Fe2Fet'], params['T_range'])
+    raise ValueError('unknown stage: '+str(stage))
+
+# the worker processes import the models once when they start
+def _warm_worker():
+    import models2023
+
+# JSON form of the results: dataframes as {'__dataframe__': {'columns', 'index', 'data'}}, numbers (also sympy and numpy numbers) as floats and ints
+def _number(value):
+    if value is None or isinstance(value, (bool, str, int, float)):
+        return value
+    try:
+        return int(value) if float(value).is_integer() and 'int' in type(value).__name__ else float(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+def encode(value):
+    import pandas as pd
+    if isinstance(value, pd.DataFrame):
+        return {'__dataframe__':{'columns':[str(c) for c in value.columns], 'index':[_number(i) for i in value.index],
+                                 'data':[[_number(v) for v in row] for row in value.itertuples(index=False, name=None)]}}
+    if isinstance(value, dict):
+        return {str(key):encode(v) for key, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode(v) for v in value]
+    return _number(value)
+
+def decode(value):
+    if isinstance(value, dict):
+        if '__dataframe__' in value:
+            import pandas as pd
+            table = value['__dataframe__']
+            return pd.DataFrame(table['data'], index=table['index'], columns=table['columns'], dtype=None)
+        return {key:decode(v) for key, v in value.items()}
+    if isinstance(value, list):
+        return [decode(v) for v in value]
+    return value
+
+# the server side: caches of the stages, the queries, and the jobs
+# workers: worker processes calculating the stages (1: one thread of the server process), cache_size: results kept per stage (least recently used removed)
+class ModelService:
+    def __init__(self, workers=2, cache_size=256):
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        if workers == 1:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        else:
+            self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker)
+        self.workers = workers
+        self.cache_size = cache_size
+        self.caches = {stage:OrderedDict() for stage in stage_defaults}
+        self.counts = {stage:{'hits':0, 'shared':0, 'misses':0, 'seconds':0.} for stage in stage_defaults}
+        self.pending = {}
+        self.jobs = {}
+        self.queries = 0
+        self.started = time.time()
+
+    # result of a stage from the cache, from the same calculation running for another query, or calculated by the pool
+    async def stage(self, stage, params):
+        params = stage_params(stage, params)
+        key = json.dumps(params, sort_keys=True)
+        cache = self.caches[stage]
+        if key in cache:
+            cache.move_to_end(key)
+            self.counts[stage]['hits'] += 1
+            return cache[key]
+        if key in self.pending:
+            self.counts[stage]['shared'] += 1
+            return await asyncio.shield(self.pending[key])
+        self.counts[stage]['misses'] += 1
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().run_in_executor(self.executor, compute_stage, stage, params)
+        self.pending[key] = future
+        try:
+            result = await future
+        finally:
+            del self.pending[key]
+        self.counts[stage]['seconds'] += time.perf_counter()-start
+        cache[key] = result
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return result
+
+    # one query: {'op': operation, 'params': {...}}
+    # 'melting_column' (source_wt, source_phase, Po, melting_model) returns the melting dataframe, 'select_magma' (and F_target, itg)
+    # the step and composition of the magma, 'liquidus' (magma, P) the first olivine temperature in Celsius, 'olonly' (magma, Fe2Fet, Po, P, T_range,
+    # xtalization_model) and 'wl1990' (magma, Fe2Fet, T_range) the crystallization dataframes, 'scenario' all stages from the source:
+    # magma, liquidus and olivine-only crystallization (and ol-pl-cpx crystallization if 'wl1990_T_range' is given, of the magma at 'wl1990_F_target')
+    async def query(self, op, params):
+        from models2023 import select_magma, select_magma_wl1990
+        self.queries += 1
+        if op == 'melting_column':
+            return await self.stage('melting', params)
+        if op == 'select_magma':
+            melting_df = await self.stage('melting', params)
+            itg = params.get('itg', 'itg1') if params.get('melting_model', 'polybaric') != 'isobaric' else None
+            ip_magma, magma = select_magma(melting_df, params['F_target'], itg=itg)
+            return {'ip_magma':int(ip_magma), 'magma':{key:float(value) for key, value in magma.items()}}
+        if op in ('liquidus', 'olonly', 'wl1990'):
+            return await self.stage(op, params)
+        if op == 'scenario':
+            selected = await self.query('select_magma', params)
+            magma = selected['magma']
+            tasks = [self.stage('liquidus', dict(params, magma=magma)), self.stage('olonly', dict(params, magma=magma))]
+            if 'wl1990_T_range' in params:
+                melting_df = await self.stage('melting', params)
+                magma_wl1990 = select_magma_wl1990(melting_df, params.get('wl1990_F_target', params['F_target']))[1]
+                magma_wl1990 = {key:float(value) for key, value in magma_wl1990.items()}
+                tasks.append(self.stage('wl1990', dict(params, magma=magma_wl1990, T_range=params['wl1990_T_range'])))
+            results = await asyncio.gather(*tasks)
+            out = dict(selected, liquidus=results[0], olonly=results[1])
+            if len(results) > 2:
+                out['wl1990'] = results[2]
+            return out
+        raise ValueError('unknown operation: '+str(op))
+
+    async def batch(self, queries):
+        results = await asyncio.gather(*(self.query(q['op'], q.get('params', {})) for q in queries), return_exceptions=True)
+        return [{'error':'%s: %s' % (type(r).__name__, r)} if isinstance(r, Exception) else {'result':r} for r in results]
+
+    # job of a query or a batch ({'queries': [...]}), runs in the background, its status and result are kept until the server stops
+    def submit(self, request):
+        job = '%d' % (len(self.jobs)+1)
+        self.jobs[job] = {'status':'pending', 'submitted':time.time()}
+        async def run():
+            try:
+                if 'queries' in request:
+                    result = await self.batch(request['queries'])
+                else:
+                    result = await self.query(request['op'], request.get('params', {}))
+                self.jobs[job].update(status='done', result=encode(result), finished=time.time())
+            except Exception as error:
+                self.jobs[job].update(status='error', error='%s: %s' % (type(error).__name__, error), finished=time.time())
+        self.jobs[job]['task'] = asyncio.ensure_future(run())
+        return job
+
+    def stats(self):
+        return {'uptime':time.time()-self.started, 'workers':self.workers, 'queries':self.queries,
+                'jobs':{status:sum(1 for j in self.jobs.values() if j['status'] == status) for status in ('pending','done','error')},
+                'stages':{stage:dict(self.counts[stage], entries=len(self.caches[stage])) for stage in stage_defaults}}
+
+    # HTTP routes: GET /health, GET /stats, POST /query, POST /batch, POST /jobs, GET /jobs/<id>
+    async def route(self, method, path, body):
+        if method == 'GET' and path == '/health':
+            return 200, {'status':'ok'}
+        if method == 'GET' and path == '/stats':
+            return 200, self.stats()
+        if method == 'POST' and path == '/query':
+            request = json.loads(body)
+            return 200, {'result':encode(await self.query(request['op'], request.get('params', {})))}
+        if method == 'POST' and path == '/batch':
+            return 200, {'results':encode(await self.batch(json.loads(body)['queries']))}
+        if method == 'POST' and path == '/jobs':
+            return 200, {'job':self.submit(json.loads(body))}
+        if method == 'GET' and path.startswith('/jobs/'):
+            job = self.jobs.get(path[len('/jobs/'):])
+            if job is None:
+                return 404, {'error':'unknown job'}
+            return 200, {key:value for key, value in job.items() if key != 'task'}
+        return 404, {'error':'unknown path: %s %s' % (method, path)}
+
+    # one HTTP request per connection
+    async def handle(self, reader, writer):
+        try:
+            method, path, _ = (await reader.readline()).decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1')
+                if line in ('\r\n', '\n', ''):
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+            try:
+                status, payload = await self.route(method, path, body)
+            except (ValueError, KeyError, TypeError) as error:
+                status, payload = 400, {'error':'%s: %s' % (type(error).__name__, error)}
+            except Exception as error:
+                status, payload = 500, {'error':'%s: %s' % (type(error).__name__, error)}
+            data = json.dumps(payload).encode()
+            reason = {200:'OK', 400:'Bad Request', 404:'Not Found', 500:'Internal Server Error'}[status]
+            writer.write(('HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\nConnection: close\r\n\r\n'
+                          % (status, reason, len(data))).encode()+data)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+# run the service until stopped (Ctrl-C); warm: calculate the default Hawaii and MORB scenarios of models2023.py at the start
+# ready: None, or a threading.Event set when the server listens, with the port, the loop and the asyncio.Event stopping the server (ready.port, ready.loop, ready.stop)
+async def serve(host='127.0.0.1', port=8765, workers=2, cache_size=256, warm=False, ready=None):
+    service = ModelService(workers, cache_size)
+    server = await asyncio.start_server(service.handle, host, port)
+    if warm:
+        from models2023 import scenarios
+        await service.batch([{'op':'scenario', 'params':dict(s)} for s in scenarios.values()])
+    if ready is not None:
+        ready.port = server.sockets[0].getsockname()[1]
+        ready.loop = asyncio.get_running_loop()
+        ready.stop = asyncio.Event()
+        ready.set()
+        async with server:
+            await ready.stop.wait()
+    else:
+        async with server:
+            await server.serve_forever()
+    service.close()
+
+# start the service in a background thread of this process (e.g., for a notebook or the checks), port 0 picks a free port
+# returns the url and a function that stops the service
+def start_in_thread(host='127.0.0.1', port=0, workers=1, cache_size=256, warm=False):
+    import threading
+    ready = threading.Event()
+    thread = threading.Thread(target=lambda:asyncio.run(serve(host, port, workers, cache_size, warm, ready)), daemon=True)
+    thread.start()
+    ready.wait()
+    def stop():
+        ready.loop.call_soon_threadsafe(ready.stop.set)
+        thread.join()
+    return 'http://%s:%d' % (host, ready.port), stop
+
+# client of the service (standard library only, results are decoded back to dataframes and dictionaries)
+class Client:
+    def __init__(self, url='http://127.0.0.1:8765', timeout=600):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _request(self, method, path, payload=None):
+        import urllib.request
+        import urllib.error
+        data = None if payload is None else json.dumps(encode(payload)).encode()
+        request = urllib.request.Request(self.url+path, data=data, method=method, headers={'Content-Type':'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as error:
+            raise RuntimeError(json.loads(error.read()).get('error', str(error))) from None
+
+    def health(self):
+        return self._request('GET', '/health')['status'] == 'ok'
+
+    def stats(self):
+        return self._request('GET', '/stats')
+
+    def query(self, op, **params):
+        return decode(self._request('POST', '/query', {'op':op, 'params':params})['result'])
+
+    # several queries calculated concurrently by the service, queries: list of {'op':..., 'params':{...}}
+    # returns the results in the same order, a failed query gives a RuntimeError object instead of its result
+    def batch(self, queries):
+        out = self._request('POST', '/batch', {'queries':queries})['results']
+        return [decode(r['result']) if 'result' in r else RuntimeError(r['error']) for r in out]
+
+    def melting_column(self, source_wt, source_phase, Po, melting_model='polybaric'):
+        return self.query('melting_column', source_wt=source_wt, source_phase=source_phase, Po=Po, melting_model=melting_model)
+
+    def select_magma(self, source_wt, source_phase, Po, F_target, itg='itg1', melting_model='polybaric'):
+        return self.query('select_magma', source_wt=source_wt, source_phase=source_phase, Po=Po, F_target=F_target, itg=itg, melting_model=melting_model)
+
+    def liquidus(self, magma, P=0.001):
+        return self.query('liquidus', magma=magma, P=P)
+
+    def olonly(self, magma, Fe2Fet, Po, P=0.001, T_range=350, xtalization_model='fractional'):
+        return self.query('olonly', magma=magma, Fe2Fet=Fe2Fet, Po=Po, P=P, T_range=T_range, xtalization_model=xtalization_model)
+
+    def wl1990(self, magma, Fe2Fet, T_range=250):
+        return self.query('wl1990', magma=magma, Fe2Fet=Fe2Fet, T_range=T_range)
+
+    # all stages of a scenario (e.g., a scenario of models2023.py), returns ip_magma, magma, liquidus, olonly (and wl1990)
+    def scenario(self, **params):
+        return self.query('scenario', **params)
+
+    # jobs: submit a query (op and params) or a batch (queries), then poll the job or wait for its result
+    def submit(self, op=None, queries=None, **params):
+        return self._request('POST', '/jobs', {'queries':queries} if queries is not None else {'op':op, 'params':params})['job']
+
+    def job(self, job):
+        return self._request('GET', '/jobs/'+str(job))
+
+    def wait(self, job, poll=0.1, timeout=None):
+        start = time.time()
+        while True:
+            state = self.job(job)
+            if state['status'] == 'done':
+                result = state['result']
+                if isinstance(result, list):
+                    return [decode(r['result']) if 'result' in r else RuntimeError(r['error']) for r in result]
+                return decode(result)
+            if state['status'] == 'error':
+                raise RuntimeError(state['error'])
+            if timeout is not None and time.time()-start > timeout:
+                raise TimeoutError('job %s is still running' % job)
+            time.sleep(poll)
+
+## server, or the checks with '--check': a service in a thread, the results of the service are the same as the models2023.py functions,
+# the second query of a scenario is served from the caches, batches, jobs and errors
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='local model-query service of melting and crystallization')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=2, help='worker processes (1: a thread of the server process)')
+    parser.add_argument('--cache-size', type=int, default=256, help='results kept per stage')
+    parser.add_argument('--warm', action='store_true', help='calculate the default Hawaii and MORB scenarios at the start')
+    parser.add_argument('--check', action='store_true', help='run the checks instead of the server')
+    args = parser.parse_args()
+    if not args.check:
+        print('serving on http://%s:%d with %d workers' % (args.host, args.port, args.workers))
+        try:
+            asyncio.run(serve(args.host, args.port, args.workers, args.cache_size, args.warm))
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+    import numpy as np
+    from models2023 import scenarios
+    from models2023 import melting_column, select_magma, olonly_model
+    ok = True
+    url, stop = start_in_thread(workers=args.workers)
+    client = Client(url)
+    try:
+        s = dict(scenarios['Haw'])
+        start = time.perf_counter()
+        cold = client.scenario(**s)
+        cold_time = time.perf_counter()-start
+        start = time.perf_counter()
+        warm = client.scenario(**s)
+        warm_time = time.perf_counter()-start
+        melting_df = melting_column(s['source_wt'], s['source_phase'], s['Po'])
+        ip_magma, magma = select_magma(melting_df, s['F_target'], s['itg'])
+        direct = olonly_model(magma, s['Fe2Fet'], s['Po'], T_range=s['T_range'])
+        same = (cold['ip_magma'] == ip_magma and np.allclose(warm['olonly'].to_numpy(dtype=float), direct.to_numpy(dtype=float), rtol=1e-12, equal_nan=True)
+                and list(warm['olonly'].columns) == list(direct.columns))
+        print('Hawaii scenario: first query %.2f s, second query %.3f s (caches), same as models2023: %s, liquidus %.1f C'
+              % (cold_time, warm_time, same, warm['liquidus']))
+        queries = [{'op':'scenario', 'params':dict(scenarios['MORB'], Po=Po)} for Po in (14, 16, 18, 20)]
+        start = time.perf_counter()
+        results = client.batch(queries+[{'op':'liquidus', 'params':{'magma':{'MgO':10}}}])
+        print('batch of 4 MORB scenarios in %.2f s, failed query: %s' % (time.perf_counter()-start, results[-1]))
+        job = client.submit('melting_column', source_wt=s['source_wt'], source_phase=s['source_phase'], Po=s['Po'])
+        column = client.wait(job)
+        same_column = np.allclose(column.to_numpy(dtype=float), melting_df.to_numpy(dtype=float), equal_nan=True)
+        print('job %s: melting column %s, same as models2023: %s' % (job, column.shape, same_column))
+        try:
+            client.query('unknown')
+            error = False
+        except RuntimeError as e:
+            error = 'unknown operation' in str(e)
+        stats = client.stats()['stages']
+        print('caches: %s' % {stage:(c['entries'], c['hits'], c['misses']) for stage, c in stats.items()})
+        ok = (same and same_column and error and all(not isinstance(r, Exception) for r in results[:-1]) and isinstance(results[-1], RuntimeError)
+              and warm_time < cold_time and stats['melting']['hits'] >= 2)
+    finally:
+        stop()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,230 @@
+# surrogate (emulator) of melting and olivine-only crystallization for fast queries, e.g., interactive exploration and large inversions
+# inputs: the parameters of 'Inversion' (inversion2023.py): source oxides and modes, Po, F and P (pressure of crystallization), within bounds
+# outputs: the primary magma (wt%, the accumulated melt at F), the Fo of its first olivine, olivine Ni (ppm) at fixed Fo and melt Ni (ppm) at fixed MgO
+# emulator: polynomial chaos expansion, Legendre polynomials of the inputs scaled to [-1, 1] up to a total degree,
+# least squares fit of the log of every output to the engine outputs of a space-filling design (scrambled Sobol points within the bounds),
+# evaluated in batches in several processes; the degree of every output is chosen by its leave-one-out error,
+# and the leave-one-out error is the error estimate (1 sigma, relative because the outputs are fitted in log)
+# fallback: inputs outside the bounds, or near design points whose outputs could not be calculated (e.g., F beyond the melting column), are calculated by the engine
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import json
+import sys
+import time
+from olonly_batch2023 import magma_keys
+from inversion2023 import Inversion
+from misfit2023 import curve_at_bins
+
+# multi-indices of the Legendre polynomials of d inputs with total degree <= degree, (terms, d), constant first
+def _multi_indices(d, degree):
+    if d == 0:
+        return np.zeros((1, 0), dtype=int)
+    rows = [(k,)+rest for k in range(degree+1) for rest in map(tuple, _multi_indices(d-1, degree-k))]
+    rows.sort(key=lambda r:(sum(r), tuple(-v for v in r)))
+    return np.array(rows, dtype=int)
+
+# monomial coefficients of the Legendre polynomials P0..P_degree, array (degree+1, degree+1), column n for P_n
+_coefficients = {}
+
+def _legendre_coefficients(degree):
+    if degree not in _coefficients:
+        from numpy.polynomial import legendre
+        coefficients = np.zeros((degree+1, degree+1))
+        for n in range(degree+1):
+            coefficients[:n+1,n] = legendre.leg2poly(np.eye(degree+1)[n])[:n+1]
+        _coefficients[degree] = coefficients
+    return _coefficients[degree]
+
+# Legendre polynomials P0..P_degree of u (m, d) in [-1, 1], array (m, d, degree+1), from the powers of u
+def _legendre(u, degree):
+    return (u[...,None]**np.arange(degree+1))@_legendre_coefficients(degree)
+
+# design matrix of the multi-indices alpha for scaled inputs u (m, d), (m, terms)
+def _basis(u, alpha, degree):
+    L = _legendre(u, degree)
+    return np.prod(L.reshape(len(u), -1)[:,np.arange(u.shape[1])*(degree+1)+alpha], axis=2)
+
+# least squares fit of y (n) with the design matrix A (n, terms), returns the coefficients and the leave-one-out residuals
+def _fit_loo(A, y):
+    Q, R = np.linalg.qr(A)
+    coef = np.linalg.solve(R, Q.T@y)
+    h = np.sum(Q**2, axis=1)  # leverages, diagonal of the hat matrix
+    return coef, (y-A@coef)/np.maximum(1-h, 1e-12)
+
+# surrogate of one scenario
+# setting: the scenario ('source_wt', 'source_phase', 'Po', 'F_target', 'itg', 'Fe2Fet', 'T_range', see 'Inversion'), bounds: {input: (lower, upper)}
+# fo_values: Fo of the olivine Ni outputs, mgo_values: MgO (wt%) of the melt Ni outputs, max_degree: largest total degree tried
+class Surrogate:
+    def __init__(self, setting, bounds, fo_values=(88., 85.), mgo_values=(8.,), max_degree=4, P=0.001, neighbours=4):
+        self.setting = setting
+        self.bounds = {name:tuple(float(v) for v in bounds[name]) for name in bounds}
+        self.engine = Inversion(setting, bounds, figures=('CLD_Ni_Fo','LLD_Ni_MgO'), P=P)
+        self.names = self.engine.names
+        self.lower, self.upper = self.engine.lower, self.engine.upper
+        self.fo_values = np.asarray(fo_values, dtype=float)
+        self.mgo_values = np.asarray(mgo_values, dtype=float)
+        self.outputs = (['magma_'+key for key in magma_keys]+['Fo_first']+['olppm_Ni_Fo%g' % v for v in self.fo_values]
+                        +['clppm_Ni_MgO%g' % v for v in self.mgo_values])
+        self.max_degree = max_degree
+        self.neighbours = neighbours
+        self.X = None
+        self.Y = None
+
+    # engine outputs of inputs X (m, inputs), array (m, outputs), NaN where an output cannot be calculated
+    def evaluate(self, X):
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        magma, curves = self.engine.forward(X)
+        Fo, Ni = curves['CLD_Ni_Fo']
+        MgO, clNi = curves['LLD_Ni_MgO']
+        with np.errstate(invalid='ignore'):
+            Fo_first = np.where(np.any(np.isfinite(Fo), axis=1), np.nanmax(np.where(np.isfinite(Fo), Fo, -np.inf), axis=1), np.nan)
+        return np.column_stack([magma[key] for key in magma_keys]+[Fo_first, curve_at_bins(Fo, Ni, self.fo_values), curve_at_bins(MgO, clNi, self.mgo_values)])
+
+    def scale(self, X):
+        return 2*(np.atleast_2d(np.asarray(X, dtype=float))-self.lower)/(self.upper-self.lower)-1
+
+    # engine outputs of a space-filling design of n points (scrambled Sobol, seeded), in batches of 'batch' points on 'workers' processes (1: this process)
+    def train(self, n=1024, seed=0, workers=1, batch=128):
+        from scipy.stats import qmc
+        X = qmc.scale(qmc.Sobol(d=len(self.names), seed=seed).random(n), self.lower, self.upper)
+        chunks = [X[i:i+batch] for i in range(0, n, batch)]
+        if workers == 1:
+            Y = [self.evaluate(chunk) for chunk in chunks]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                Y = list(pool.map(self.evaluate, chunks))
+        self.X, self.Y = X, np.vstack(Y)
+        return self.fit()
+
+    # fit of every output on its valid design points, with the total degree of smallest leave-one-out error (at most half as many terms as points)
+    # returns the fit table: degree, number of terms, valid points and error estimate of every output
+    def fit(self):
+        from scipy.spatial import cKDTree
+        u = self.scale(self.X)
+        self.valid = np.isfinite(self.Y) & (self.Y > 0)
+        self.tree = cKDTree(u)
+        self.alpha, self.coef, self.sigma, self.degree = [], [], [], []
+        for j in range(len(self.outputs)):
+            ok = self.valid[:,j]
+            y = np.log(self.Y[ok,j])
+            best = None
+            for degree in range(1, self.max_degree+1):
+                alpha = _multi_indices(len(self.names), degree)
+                if len(alpha) > np.sum(ok)/2:
+                    break
+                coef, loo = _fit_loo(_basis(u[ok], alpha, degree), y)
+                rms = np.sqrt(np.mean(loo**2))
+                if best is None or rms < best[0]:
+                    best = (rms, degree, alpha, coef)
+            if best is None:
+                raise ValueError('too few valid design points for output '+self.outputs[j])
+            self.sigma.append(best[0])
+            self.degree.append(best[1])
+            self.alpha.append(best[2])
+            self.coef.append(best[3])
+        self.sigma = np.array(self.sigma)
+        # all outputs in one basis (the terms of the largest degree), coefficients 0 for the terms not used by an output
+        self.top = max(self.degree)
+        self.terms = _multi_indices(len(self.names), self.top)
+        self.C = np.zeros((len(self.terms), len(self.outputs)))
+        for j, coef in enumerate(self.coef):
+            self.C[:len(coef),j] = coef
+        self.all_valid = bool(np.all(self.valid))
+        return {output:{'degree':self.degree[j], 'terms':len(self.alpha[j]), 'valid':int(np.sum(self.valid[:,j])), 'sigma':self.sigma[j]}
+                for j, output in enumerate(self.outputs)}
+
+    # inputs inside the training domain: within the bounds and all outputs calculated at the nearest design points
+    def inside(self, X):
+        u = self.scale(X)
+        inside = np.all(np.abs(u) <= 1, axis=1)
+        if np.any(inside) and not self.all_valid:
+            _, near = self.tree.query(u[inside], k=self.neighbours)
+            inside[inside] = np.all(self.valid[np.atleast_2d(near)], axis=(1, 2))
+        return inside
+
+    # predictions of inputs X (m, inputs): 'mean' and 'sd' (m, outputs; sd is the 1 sigma error, 0 for the engine),
+    # 'engine' (True where the input is outside the training domain and the output is calculated by the engine, if fallback)
+    def predict(self, X, fallback=True):
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        u = self.scale(X)
+        mean = np.exp(_basis(np.clip(u, -1, 1), self.terms, self.top)@self.C)
+        sd = mean*self.sigma
+        engine = ~self.inside(X) if fallback else np.zeros(len(X), dtype=bool)
+        if np.any(engine):
+            mean[engine] = self.evaluate(X[engine])
+            sd[engine] = 0
+        return {'mean':mean, 'sd':sd, 'engine':engine}
+
+    # comparison with the engine at n new points (Sobol points of another seed) inside the training domain:
+    # rms relative error and fraction of the engine outputs within 1 and 2 sigma of every output
+    def validate(self, n=256, seed=1):
+        from scipy.stats import qmc
+        X = qmc.scale(qmc.Sobol(d=len(self.names), seed=seed).random(n), self.lower, self.upper)
+        X = X[self.inside(X)]
+        truth = self.evaluate(X)
+        prediction = self.predict(X, fallback=False)
+        table = {}
+        for j, output in enumerate(self.outputs):
+            ok = np.isfinite(truth[:,j]) & (truth[:,j] > 0)
+            z = np.log(truth[ok,j]/prediction['mean'][ok,j])/self.sigma[j]
+            table[output] = {'points':int(np.sum(ok)), 'rms':float(np.sqrt(np.mean((truth[ok,j]/prediction['mean'][ok,j]-1)**2))),
+                             'sigma':float(self.sigma[j]), 'within_1sigma':float(np.mean(np.abs(z) <= 1)), 'within_2sigma':float(np.mean(np.abs(z) <= 2))}
+        return table
+
+    # save the design and its engine outputs (the fit is repeated when loaded)
+    def save(self, path):
+        np.savez(path, X=self.X, Y=self.Y, setting=json.dumps(self.setting), bounds=json.dumps(self.bounds),
+                 fo_values=self.fo_values, mgo_values=self.mgo_values, max_degree=self.max_degree, P=self.engine.P, neighbours=self.neighbours)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            surrogate = cls(json.loads(str(f['setting'])), json.loads(str(f['bounds'])), f['fo_values'], f['mgo_values'],
+                            int(f['max_degree']), float(f['P']), int(f['neighbours']))
+            surrogate.X, surrogate.Y = f['X'], f['Y']
+        surrogate.fit()
+        return surrogate
+
+## checks: training on the Hawaii scenario, the error of the surrogate against the engine at new points (and the calibration of the error estimate),
+# the time of one prediction and of one engine call, and the fallback outside the bounds
+if __name__ == '__main__':
+    import os
+    import tempfile
+    from models2023 import scenarios
+    bounds = {'NiO':(0.2,0.3), 'MnO':(0.11,0.16), 'gt':(5.,15.), 'Po':(35.,60.), 'F':(0.03,0.1), 'P':(0.001,10.)}
+    surrogate = Surrogate(scenarios['Haw'], bounds)
+    start = time.perf_counter()
+    fit = surrogate.train(n=1024, seed=0, workers=2)
+    print('trained on %d engine evaluations in %.1f s' % (len(surrogate.X), time.perf_counter()-start))
+    check = surrogate.validate(n=256, seed=1)
+    print('%-18s %6s %6s %6s %9s %9s %9s' % ('output', 'degree', 'valid', 'tested', 'rms', 'sigma', 'in 2sigma'))
+    for output in surrogate.outputs:
+        print('%-18s %6d %6d %6d %9.2e %9.2e %9.2f' % (output, fit[output]['degree'], fit[output]['valid'], check[output]['points'],
+              check[output]['rms'], check[output]['sigma'], check[output]['within_2sigma']))
+    x = np.array([[0.25, 0.135, 9.2, 45., 0.06, 0.001]])
+    surrogate.predict(x)
+    start = time.perf_counter()
+    for _ in range(1000):
+        prediction = surrogate.predict(x)
+    predict_time = (time.perf_counter()-start)/1000
+    many = np.repeat(x, 10000, axis=0)
+    start = time.perf_counter()
+    surrogate.predict(many)
+    batch_time = (time.perf_counter()-start)/len(many)
+    start = time.perf_counter()
+    truth = surrogate.evaluate(x)
+    engine_time = time.perf_counter()-start
+    print('one prediction %.0f microseconds (%.1f per input in a batch of 10000), one engine call %.0f ms; Ni at Fo 88: surrogate %.0f +- %.0f ppm, engine %.0f ppm'
+          % (predict_time*1e6, batch_time*1e6, engine_time*1e3, prediction['mean'][0,8], prediction['sd'][0,8], truth[0,8]))
+    outside = surrogate.predict([[0.25, 0.135, 9.2, 65., 0.06, 0.001]])
+    print('outside the bounds (Po 65): engine used %s' % outside['engine'][0])
+    with tempfile.TemporaryDirectory() as folder:
+        surrogate.save(os.path.join(folder, 'surrogate.npz'))
+        loaded = Surrogate.load(os.path.join(folder, 'surrogate.npz'))
+    same = np.array_equal(loaded.predict(x)['mean'], prediction['mean'])
+    print('saved and loaded surrogate gives the same predictions: %s' % same)
+    calibrated = all(0.85 <= check[output]['within_2sigma'] for output in surrogate.outputs)
+    sys.exit(0 if calibrated and outside['engine'][0] and same else 1)
@@ -0,0 +1,178 @@
+# stored major-element trajectories of melting and olivine-only crystallization, and the recalculation of Ni and Mn only (trace pass)
+# Ni and Mn do not change the major elements: their partition-coefficient parameters ('kd_default' in constants2023.py, Eqn. 3 KdNi constants,
+# KdNi(mineral/ol), KDMnFe, KdMn(mineral/l)) only need T, P, f_step, the mineral modes, KdMg, KdFe and SiO2 of every step.
+# 'trajectories' runs the polybaric melting columns (melting_batch2023.py) and the olivine-only crystallization of the selected magmas
+# (olonly_batch2023.py) once and keeps these arrays; 'trace_pass' recalculates Ni and Mn of the melts, the olivine and the residue
+# for many parameterizations at once (arrays steps x columns x parameterizations), without solving the major elements again.
+# The recurrences of the melting residue and of fractional crystallization are cumulative products over the steps:
+# melting: residue after a step = residue*D/(D*(1-f_step)+f_step), melt = residue before the step/(D*(1-f_step)+f_step),
+# fractional crystallization: liquid = liquid before the step/(Kd*(1-F_step)+F_step).
+# Parameters of the major elements (Toplis_H, Toplis_S, Toplis_W of KDFeMg) need new trajectories.
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import json
+import sys
+import time
+from constants2023 import kd_default
+from reactions2023 import phases
+from melting_batch2023 import melting_batch, batch_kd
+from olonly_batch2023 import magma_keys, olonly_batch
+
+major_kd_keys = ('Toplis_H','Toplis_S','Toplis_W')  # parameters that change the major elements
+trace_kd_keys = tuple(key for key in kd_default if key not in major_kd_keys)  # parameters of the trace pass
+# arrays kept from the melting columns (steps, columns) and from the olivine-only crystallization (steps, magmas)
+melting_trajectory_names = ['T Celsius','P kbar','f_step','F_liq','kdMgO_oll_cm','kdFeO_oll_cm','clSiO2_wt']+phases
+olonly_trajectory_names = ['T Celsius','melt fraction','F_step','cmkdMgoll','cmkdFe2oll','clwt_SiO2','clwt_MgO','clwt_FeO','Fo']
+
+# major-element trajectories of polybaric melting of the columns and of the olivine-only crystallization of their magmas
+# source_wt, source_phase, Po: as 'melting_batch' (arrays of the columns); F_target: extent of melting of the magma of each column, the accumulated melt
+# (itg: 'itg1' or 'itg2') at the step closest to F_target as 'select_magma' (models2023.py); P, T_range, xtalization_model: as 'olonly_batch'
+# kd: None or the parameters of the major elements (Toplis_H, Toplis_S, Toplis_W), numbers or arrays of the columns
+# returns a dictionary: 'melting' and 'olonly' (dictionaries of arrays), 'ip_magma' (step of the magma in each column) and the settings
+def trajectories(source_wt, source_phase, Po, F_target, itg='itg1', P=0.001, T_range=350, xtalization_model='fractional', kd=None):
+    kd = {} if kd is None else {key:kd[key] for key in kd if key in major_kd_keys}
+    melt = melting_batch(source_wt, source_phase, Po, kd)
+    n = melt['F_liq'].shape[1]
+    Po = np.broadcast_to(np.asarray(Po, dtype=float), (n,)).copy()
+    F = melt['F_liq_'+itg]
+    ip_magma = np.nanargmin(np.where(np.isfinite(F), np.abs(F-np.asarray(F_target, dtype=float)), np.inf), axis=0)
+    magma = {key:melt['cl'+key+'_wt_'+itg][ip_magma,np.arange(n)] for key in magma_keys}
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        out = olonly_batch(magma, P=P, T_range=T_range, xtalization_model=xtalization_model, kd=kd)
+    melting = {name:melt[name] for name in melting_trajectory_names}
+    melting.update({'Po':Po, 'steps':melt['steps']})
+    melting.update({'source_'+key:np.broadcast_to(np.asarray(source_wt[key], dtype=float), (n,)).copy() for key in ('NiO','MnO')})
+    melting.update({key:np.asarray(value, dtype=float) for key, value in batch_kd(kd, n).items() if key in major_kd_keys})
+    olonly = {name:out[name] for name in olonly_trajectory_names}
+    return {'melting':melting, 'olonly':olonly, 'ip_magma':ip_magma, 'itg':itg, 'xtalization_model':xtalization_model, 'P':P, 'T_range':T_range}
+
+# parameters of the trace pass as arrays (m): 'kd_default' with the values of kd (numbers or arrays of the m parameterizations) replaced
+# the parameters of the major elements must be those of the trajectories
+def trace_kd(kd, melting):
+    kd = {} if kd is None else dict(kd)
+    for key in major_kd_keys:
+        if key in kd and not np.all(np.equal.outer(np.asarray(kd[key], dtype=float), melting[key])):
+            raise ValueError(key+' changes the major elements, calculate the trajectories with it (trajectories)')
+    kd = {key:np.atleast_1d(np.asarray(kd.get(key, kd_default[key]), dtype=float)) for key in trace_kd_keys}
+    m = max(len(value) for value in kd.values())
+    return {key:np.broadcast_to(value, (m,)) for key, value in kd.items()}
+
+# Ni and Mn of polybaric fractional melting for the parameterizations kd (arrays m), same equations as 'melting_step_batch' (melting_batch2023.py)
+# returns arrays (steps, columns, m) named as the columns of the melting dataframe: melt ('clNiO_wt', 'clMnO_wt'), olivine ('olNiO_wt', 'olMnO_wt'),
+# residue after the step ('resNiO_wt', 'resMnO_wt'), bulk partition coefficients ('DNiO', 'DMnO'), KdNi and KdMn(ol/l),
+# and the accumulated melts ('clNiO_wt_itg1', 'clNiO_wt_itg2', ... NaN for itg2 with Po >= 30 kbar)
+def melting_trace(melting, kd):
+    t = {name:melting[name][:,:,None] for name in melting_trajectory_names}
+    k = {key:kd[key][None,None,:] for key in kd}
+    high = (melting['Po'] >= 30)[None,:,None]
+    f_step = t['f_step']
+    out = {}
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        kdNi_oll = np.exp(k['kdNi_A']/(t['T Celsius']+273.15)+k['kdNi_B']*t['clSiO2_wt']+k['kdNi_C'])*(t['kdMgO_oll_cm']*1.09)
+        kdMn = {'oll':k['KDMnFe']*t['kdFeO_oll_cm']*1.09, 'opxl':np.where(high, k['kdMn_opxl_highP'], k['kdMn_opxl_lowP']),
+                'cpxl':np.where(high, k['kdMn_cpxl_highP'], k['kdMn_cpxl_lowP']), 'gtl':k['kdMn_gtl'], 'spl':k['kdMn_spl']}
+        D = {'Ni':kdNi_oll*(t['ol']+t['opx']*k['kdNi_opxol']+t['cpx']*k['kdNi_cpxol']+t['gt']*k['kdNi_gtol']+t['sp']*k['kdNi_spol'])*0.01,
+             'Mn':(t['ol']*kdMn['oll']+t['opx']*kdMn['opxl']+t['cpx']*kdMn['cpxl']+t['gt']*kdMn['gtl']+t['sp']*kdMn['spl'])*0.01}
+        for e, oxide, kd_oll in (('Ni', 'NiO', kdNi_oll), ('Mn', 'MnO', kdMn['oll'])):
+            denominator = D[e]*(1-f_step)+f_step
+            residue = melting['source_'+oxide][None,:,None]*np.cumprod(D[e]/denominator, axis=0)  # residue after each step
+            before = np.concatenate([np.broadcast_to(melting['source_'+oxide][None,:,None], (1,)+residue.shape[1:]), residue[:-1]])
+            cl = before/denominator
+            itg1 = np.cumsum(cl*f_step, axis=0)/t['F_liq']
+            out.update({'cl'+oxide+'_wt':cl, 'ol'+oxide+'_wt':cl*kd_oll, 'res'+oxide+'_wt':residue, 'D'+oxide:D[e],
+                        'Kd'+e+'_oll_wt':np.broadcast_to(kd_oll, cl.shape), 'cl'+oxide+'_wt_itg1':itg1,
+                        'cl'+oxide+'_wt_itg2':np.where(melting['Po'][None,:,None] < 30, np.cumsum(itg1*t['F_liq'], axis=0)/np.cumsum(t['F_liq'], axis=0), np.nan)})
+    return out
+
+# Ni and Mn of olivine-only crystallization of magmas with NiO and MnO (wt%, arrays (magmas, m)) for the parameterizations kd,
+# same equations as 'olonly_batch_steps' (olonly_batch2023.py); returns arrays (steps, magmas, m): 'clppm_Ni', 'clppm_Mn', 'clwt_MnO',
+# 'olppm_Ni', 'olppm_Mn', 'wtkdNioll', 'wtkdMnoll'
+def olonly_trace(olonly, magma_NiO, magma_MnO, kd, xtalization_model='fractional'):
+    t = {name:olonly[name][:,:,None] for name in olonly_trajectory_names}
+    k = {key:kd[key][None,None,:] for key in kd}
+    clppm_magma = {'Ni':np.asarray(magma_NiO, dtype=float)[None]*58.6934/74.69*10**4, 'Mn':np.asarray(magma_MnO, dtype=float)[None]*54.938/70.94*10**4}
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        kds = {'Ni':np.exp(k['kdNi_A']/(t['T Celsius']+273.15)+k['kdNi_B']*t['clwt_SiO2']+k['kdNi_C'])*(t['cmkdMgoll']*1.09),
+               'Mn':k['KDMnFe']*t['cmkdFe2oll']*1.09}
+        out = {}
+        for e in ('Ni', 'Mn'):
+            if xtalization_model == 'fractional':  # F_step of the first step is 1: the liquid is the magma
+                clppm = clppm_magma[e]*np.cumprod(1/(kds[e]*(1-t['F_step'])+t['F_step']), axis=0)
+            else:
+                clppm = clppm_magma[e]/(kds[e]*(1-t['melt fraction'])+t['melt fraction'])
+            out.update({'clppm_'+e:clppm, 'olppm_'+e:clppm*kds[e], 'wtkd'+e+'oll':np.broadcast_to(kds[e], clppm.shape)})
+    out['clwt_MnO'] = out['clppm_Mn']/(10**4)*70.94/54.938
+    return out
+
+# Ni and Mn of the stored trajectories for the parameterizations kd (numbers or arrays m of the parameters of 'trace_kd_keys', the others are the point values)
+# returns a dictionary: 'kd' (arrays m), 'melting' (see 'melting_trace'), 'magma' (NiO and MnO, arrays (columns, m)) and 'olonly' (see 'olonly_trace')
+def trace_pass(trajectory, kd=None):
+    kd = trace_kd(kd, trajectory['melting'])
+    melting = melting_trace(trajectory['melting'], kd)
+    n = len(trajectory['ip_magma'])
+    magma = {key:melting['cl'+key+'_wt_'+trajectory['itg']][trajectory['ip_magma'],np.arange(n)] for key in ('NiO','MnO')}
+    olonly = olonly_trace(trajectory['olonly'], magma['NiO'], magma['MnO'], kd, trajectory['xtalization_model'])
+    return {'kd':kd, 'melting':melting, 'magma':magma, 'olonly':olonly}
+
+# the trajectories in one '.npz' file and back
+def save_trajectories(path, trajectory):
+    arrays = {part+'/'+name:value for part in ('melting','olonly') for name, value in trajectory[part].items()}
+    settings = {key:trajectory[key] for key in ('itg','xtalization_model','P','T_range')}
+    np.savez(path, ip_magma=trajectory['ip_magma'], settings=json.dumps(settings), **arrays)
+
+def load_trajectories(path):
+    with np.load(path) as f:
+        trajectory = json.loads(str(f['settings']))
+        trajectory['ip_magma'] = f['ip_magma']
+        for part in ('melting','olonly'):
+            trajectory[part] = {name.split('/', 1)[1]:f[name] for name in f.files if name.startswith(part+'/')}
+    return trajectory
+
+## checks on the Hawaii and MORB scenarios (models2023.py): 200 draws of the Ni and Mn parameters (uncertainty2023.py) recalculated by the trace pass
+# against melting and crystallization of one column per draw with the same parameters (melting_batch, olonly_batch), the times of both,
+# the trajectories saved and loaded, and the error raised for a parameter of the major elements
+if __name__ == '__main__':
+    import os
+    import tempfile
+    from models2023 import scenarios
+    from uncertainty2023 import draw_kd, kd_sd
+    ok = True
+    m = 200
+    for name, s in scenarios.items():
+        kd = draw_kd(m, seed=2, sd={key:value for key, value in kd_sd.items() if key not in major_kd_keys})
+        start = time.perf_counter()
+        trajectory = trajectories(s['source_wt'], s['source_phase'], s['Po'], s['F_target'], s['itg'], T_range=s['T_range'])
+        trajectory_time = time.perf_counter()-start
+        with tempfile.TemporaryDirectory() as folder:
+            save_trajectories(os.path.join(folder, 'trajectory.npz'), trajectory)
+            trajectory = load_trajectories(os.path.join(folder, 'trajectory.npz'))
+        start = time.perf_counter()
+        trace = trace_pass(trajectory, kd)
+        trace_time = time.perf_counter()-start
+        # one column per draw: melting and crystallization again with the parameters of the draw
+        start = time.perf_counter()
+        melt = melting_batch(s['source_wt'], s['source_phase'], np.full(m, float(s['Po'])), kd)
+        n_steps = melt['F_liq'].shape[0]
+        magma = {key:melt['cl'+key+'_wt_'+s['itg']][trajectory['ip_magma'][0]] for key in magma_keys}  # F does not depend on Ni and Mn
+        with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+            out = olonly_batch(magma, T_range=s['T_range'], kd=kd)
+        full_time = time.perf_counter()-start
+        rel = lambda a, b: np.nanmax(np.abs(a/b-1))
+        diff = max(rel(trace['melting']['clNiO_wt'][:n_steps,0], melt['clNiO_wt']), rel(trace['melting']['clMnO_wt'][:n_steps,0], melt['clMnO_wt']),
+                   rel(trace['melting']['resNiO_wt'][:n_steps,0], melt['resNiO_wt']), rel(trace['melting']['olNiO_wt'][:n_steps,0], melt['olNiO_wt']),
+                   rel(trace['magma']['NiO'][0], magma['NiO']), rel(trace['magma']['MnO'][0], magma['MnO']),
+                   rel(trace['olonly']['olppm_Ni'][:,0], out['olppm_Ni']), rel(trace['olonly']['olppm_Mn'][:,0], out['olppm_Mn']))
+        fo = trajectory['olonly']['Fo'][:,0]
+        i = np.nanargmin(np.abs(fo-88))
+        p5, p50, p95 = np.percentile(trace['olonly']['olppm_Ni'][i,0], (5, 50, 95))
+        print('%-5s trajectories %.2f s, trace pass of %d parameterizations %.3f s, all again with one column per draw %.2f s, largest relative difference %.1e; olivine Ni at Fo %.1f: %.0f-%.0f-%.0f ppm (p5-p50-p95)'
+              % (name, trajectory_time, m, trace_time, full_time, diff, fo[i], p5, p50, p95))
+        ok = ok and diff < 1e-9
+    try:
+        trace_pass(trajectory, {'Toplis_S':-7.})
+        ok = False
+    except ValueError as error:
+        print('Toplis_S:', error)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,100 @@
+# Monte Carlo propagation of the uncertainties of the partition-coefficient parameters through melting and olivine-only crystallization
+# the point values of the Ni, Mn and Fe-Mg partition-coefficient parameters ('kd_default' in constants2023.py) are replaced by n random draws,
+# the melting columns and the olivine-only crystallization of all draws are calculated as one batch (melting_batch2023.py, olonly_batch2023.py),
+# every draw is one melting column and one magma, and the CLDs (olivine Ni, Mn vs Fo) and LLDs (melt Ni, MnO vs MgO) of the draws
+# are summarized as percentile bands at Fo and MgO bins ('BinnedTracer' of olonly_batch2023.py), e.g., error envelopes for the Ni-Fo figure.
+# The draws are reproducible: the same seed gives the same draws.
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import sys
+import time
+from constants2023 import frozen, kd_default
+from melting_batch2023 import melting_batch, melting_isoequ_batch
+from olonly_batch2023 import magma_keys, olonly_batch_steps, BinnedTracer
+
+# assumed 1 sigma uncertainties of the parameters of 'kd_default', parameters not listed (or 0) keep their point values
+# kdNi_C (natural log units) shifts KdNi(ol/l) by about 6%: the coefficients of the KdNi fit are correlated, so only the intercept is varied by default,
+# give the uncertainties of kdNi_A (K) and kdNi_B (per wt% SiO2) to vary them too;
+# Toplis_S (J/mol/K) shifts KDFeMg(ol/l) by about 5%
+kd_sd = frozen({'kdNi_C':0.06,
+                'kdNi_opxol':0.05, 'kdNi_cpxol':0.04, 'kdNi_gtol':0.03, 'kdNi_spol':0.2,
+                'KDMnFe':0.03,
+                'kdMn_opxl_highP':0.064, 'kdMn_opxl_lowP':0.07, 'kdMn_cpxl_highP':0.077, 'kdMn_cpxl_lowP':0.085, 'kdMn_gtl':0.12, 'kdMn_spl':0.05,
+                'Toplis_S':0.4})
+# partition coefficients are positive, they are drawn from lognormal distributions with the point value as median and sd/value as sigma of the log,
+# the other parameters from normal distributions
+kd_lognormal = ('kdNi_opxol','kdNi_cpxol','kdNi_gtol','kdNi_spol','KDMnFe',
+                'kdMn_opxl_highP','kdMn_opxl_lowP','kdMn_cpxl_highP','kdMn_cpxl_lowP','kdMn_gtl','kdMn_spl')
+
+# n draws of the partition-coefficient parameters, dictionary of arrays (n) with all keys of kd
+# a standard normal array is drawn for every parameter in the order of kd, also when its sd is 0,
+# so that changing the uncertainty of one parameter does not change the draws of the others
+def draw_kd(n, seed=None, sd=kd_sd, kd=kd_default):
+    rng = np.random.default_rng(seed)
+    draws = {}
+    for key in kd:
+        z = rng.standard_normal(n)
+        s = sd.get(key, 0.)
+        if key in kd_lognormal:
+            draws[key] = kd[key]*np.exp(z*s/kd[key])
+        else:
+            draws[key] = kd[key]+z*s
+    return draws
+
+# Monte Carlo over the partition-coefficient parameters for one source: melting of n columns (one per draw), the accumulated melt closest to F_target
+# of each column as the magma (same as 'select_magma' of models2023.py), and olivine-only crystallization of the n magmas
+# melting_model: 'polybaric' (itg: 'itg1' or 'itg2') or 'isobaric', other inputs as in 'melting_column', 'select_magma' and 'olonly_model' (models2023.py)
+# returns a dictionary: 'olonly_CLD' and 'olonly_LLD' (dataframes of the percentile bands at the bins, see 'BinnedTracer.summary'),
+# 'kd' (the draws), 'magma' (the magma of each draw) and 'ip_magma' (its step in the melting column)
+def kd_monte_carlo(source_wt, source_phase, Po, F_target, n=1000, seed=0, sd=kd_sd, melting_model='polybaric', itg='itg1',
+                   P=0.001, T_range=350, xtalization_model='fractional', fo_bins=None, mgo_bins=None, percentiles=(5, 50, 95)):
+    if melting_model not in ('polybaric','isobaric'):
+        raise ValueError("melting_model must be 'polybaric' or 'isobaric'")
+    if fo_bins is None:
+        fo_bins = np.arange(78., 93.01, 0.25)
+    if mgo_bins is None:
+        mgo_bins = np.arange(4., 20.01, 0.25)
+    kd = draw_kd(n, seed, sd)
+    Po = np.full(n, float(Po))
+    if melting_model == 'polybaric':
+        melt = melting_batch(source_wt, source_phase, Po, kd)
+        suffix = '_'+itg
+    else:
+        melt = melting_isoequ_batch(source_wt, source_phase, Po, kd)
+        suffix = ''
+    F = melt['F_liq'+suffix]
+    ip_magma = np.nanargmin(np.where(np.isfinite(F), np.abs(F-F_target), np.inf), axis=0)  # first step closest to F_target, as 'idxmin'
+    magma = {key:melt['cl'+key+'_wt'+suffix][ip_magma,np.arange(n)] for key in magma_keys}
+    cld = BinnedTracer(fo_bins, n, ['olppm_Ni','olppm_Mn'])
+    lld = BinnedTracer(mgo_bins, n, ['clppm_Ni','clwt_MnO'])
+    for step in olonly_batch_steps(magma, P=P, T_range=T_range, xtalization_model=xtalization_model, kd=kd):
+        cld.update(step['Fo'], step)
+        lld.update(step['clwt_MgO'], step)
+    return {'olonly_CLD':cld.summary('Fo', percentiles), 'olonly_LLD':lld.summary('MgO', percentiles), 'kd':kd, 'magma':magma, 'ip_magma':ip_magma}
+
+## checks: with all uncertainties 0 every draw gives the magma of 'melting_column' and 'select_magma' and the bands have no width,
+# the same seed gives the same bands, and the time of 1000 draws of the default Hawaii and MORB scenarios
+if __name__ == '__main__':
+    from models2023 import scenarios
+    from models2023 import melting_column, select_magma
+    ok = True
+    for name, s in scenarios.items():
+        itg, F_target = s['itg'], s['F_target']
+        point = kd_monte_carlo(s['source_wt'], s['source_phase'], s['Po'], F_target, n=4, sd={}, itg=itg, T_range=s['T_range'])
+        ip_magma, magma = select_magma(melting_column(s['source_wt'], s['source_phase'], s['Po']), F_target, itg=itg)
+        magma_diff = max(np.max(np.abs(point['magma'][key]/magma[key]-1)) for key in magma_keys)
+        cld = point['olonly_CLD']
+        width = np.nanmax(np.abs(cld['olppm_Ni_max']-cld['olppm_Ni_min']))
+        start = time.perf_counter()
+        run1 = kd_monte_carlo(s['source_wt'], s['source_phase'], s['Po'], F_target, n=1000, seed=1, itg=itg, T_range=s['T_range'])
+        seconds = time.perf_counter()-start
+        run2 = kd_monte_carlo(s['source_wt'], s['source_phase'], s['Po'], F_target, n=1000, seed=1, itg=itg, T_range=s['T_range'])
+        same = run1['olonly_CLD'].equals(run2['olonly_CLD']) and run1['olonly_LLD'].equals(run2['olonly_LLD'])
+        band = run1['olonly_CLD'].dropna()
+        k = len(band)//2
+        print('%-5s sd 0: magma difference %.1e, band width %.1e ppm; 1000 draws in %.2f s, same seed same bands: %s; Ni at Fo %.2f: %.0f-%.0f-%.0f ppm (p5-p50-p95)'
+              % (name, magma_diff, width, seconds, same, band['Fo'].iloc[k], band['olppm_Ni_p5'].iloc[k], band['olppm_Ni_p50'].iloc[k], band['olppm_Ni_p95'].iloc[k]))
+        ok = ok and magma_diff <= 1e-9 and width <= 1e-9 and same
+    sys.exit(0 if ok else 1)
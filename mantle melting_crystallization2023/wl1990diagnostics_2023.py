@@ -0,0 +1,65 @@
+# summarize the diagnostics records of the 'state' calls of an ol-pl-cpx crystallization run
+# the records are collected by passing a list as 'diagnostics' to 'get_first_T', 'frac_model_trange', 'eq_model_trange' or 'wl1990_model' (models2023.py),
+# each record is the diagnostics dictionary of one 'state' call (see 'state' in wl1990state_2023.py) with the calling function ('caller') and its 'step'
+# used to find the compositions and temperatures that need many iterations
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import json
+
+iteration_bins = [0,1,2,3,5,10,20,50,100,300,1000,3000,3001]  # default bins of the iteration histograms, the last bin holds the runs reaching max_iter (3000)
+
+def select_records(records, caller=None):
+    return [record for record in records if caller is None or record['caller'] == caller]
+
+# histogram of the number of iterations per 'state' call (e.g., per temperature step with caller='frac_model_trange'), returns (counts, bin edges)
+def iteration_histogram(records, caller=None, bins=iteration_bins):
+    iterations = [record['iterations'] for record in select_records(records, caller)]
+    return np.histogram(iterations, bins=bins)
+
+# one line per calling function: calls, iterations (total, mean, max), calls that did not converge or reached max_iter,
+# singular matrices, clamped Newton steps and restarts of the liquidus search
+def summary(records):
+    out = {}
+    for record in records:
+        s = out.setdefault(record['caller'], {'calls':0,'iterations':0,'max_iterations':0,'not_converged':0,'max_iter':0,
+                                               'singular':0,'clamps':0,'restarts':0})
+        s['calls'] += 1
+        s['iterations'] += record['iterations']
+        s['max_iterations'] = max(s['max_iterations'], record['iterations'])
+        s['not_converged'] += not record['converged']
+        s['max_iter'] += record['max_iter']
+        s['singular'] += sum(1 for path in record['solve_path'] if path == 'singular' or 'lstsq' in path)  # 'lstsq': solved by least squares in the robust solver
+        s['clamps'] += len(record['clamps'])
+        s['restarts'] += record.get('restart', False)
+    for s in out.values():
+        s['mean_iterations'] = s['iterations']/s['calls']
+    return out
+
+def format_summary(records):
+    lines = ['%-18s %6s %10s %6s %6s %13s %8s %8s %7s %8s' % ('caller','calls','iterations','mean','max','not converged','max_iter','singular','clamps','restarts')]
+    for caller, s in summary(records).items():
+        lines.append('%-18s %6d %10d %6.1f %6d %13d %8d %8d %7d %8d' % (caller, s['calls'], s['iterations'], s['mean_iterations'], s['max_iterations'],
+                                                                       s['not_converged'], s['max_iter'], s['singular'], s['clamps'], s['restarts']))
+    return '\n'.join(lines)
+
+# the n records with the most iterations: caller, step, temperature (Celsius), iterations, phases present at the end,
+# number of clamped steps and the phase list changes, and the system components to rerun 'state' on them
+def worst_records(records, n=10, caller=None):
+    out = []
+    for record in sorted(select_records(records, caller), key=lambda record: -record['iterations'])[:n]:
+        changes = sum(1 for a, b in zip(record['phase_lists'][:-1], record['phase_lists'][1:]) if a != b)
+        out.append({'caller':record['caller'],'step':record['step'],'T_C':record['T']-273.15,'iterations':record['iterations'],
+                    'converged':record['converged'],'phases':record['phase_lists'][-1],'clamps':len(record['clamps']),
+                    'phase_list_changes':changes,'system_components':record['system_components']})
+    return out
+
+def write_json(records, path):
+    with open(path,'w') as f:
+        json.dump(records, f, default=float)
+    return path
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
@@ -2,7 +2,10 @@
 # detailed algorithm is introduced in Weaver and Langmuir 1990
 # originally written by Jocelyn Fuentes 2016
 # modified by Mingzhen Yu 2021: add Ni and Mn in the system
-# last modified: Jun 20, 2023
+# Oct 19, 2026: optional diagnostics record of the iterations (diagnostics=True)
+# Oct 19, 2026: robust solver mode (solver='robust'), see 'state_robust'
+# Oct 19, 2026: remove the unused module variable fa_guess
+# last modified: Oct 19, 2026
 
 from wl1990stoich_2023 import *
 from wl1990kdcalc_2023 import *
@@ -10,8 +13,7 @@ import numpy as np
 import math
  
 
-fa_guess = {'plg':0., 'ol':0., 'cpx':0.}  
-def state(system_components,T, uaj, ta, P=1., kdCalc = kdCalc_langmuir1992):  
+def state(system_components,T, uaj, ta, P=1., kdCalc = kdCalc_langmuir1992, diagnostics = False, solver = 'newton'):  
     """State determines the liquid composition and phases present in the system
     at a given temperature and possible pressure (depending on the Kd formula).
     It is possible to also pass a guess or liquid components. If none are given,
@@ -21,7 +23,24 @@ def state(system_components,T, uaj, ta, P=1., kdCalc = kdCalc_langmuir1992):
     This is used for all of the major elements.
     System components must include SiO2, TiO2, Na2O, MgO, FeO, CaO, Al2O3, K2O,
     MnO, and P2O5, NiO.
+
+    The outputs are Qa, Fa, the liquid components, the solid phase components,
+    the number of iterations and whether the solver converged (False when it
+    stopped at its maximum number of iterations, 'MAX ITERATION').
+
+    With diagnostics=True a seventh output is returned, a dictionary with T, P,
+    the system components, 'qa_history' and 'phase_lists' (Qa of the phases
+    present and the phases present, before the first and after each iteration),
+    'clamps' (iteration, phase, 'below 0' or 'above 1', Fa before clamping) when
+    a Newton step gives Fa<0 or Fa>1, 'solve_path' ('matrix' or 'singular' per
+    iteration), 'iterations', 'converged' and 'max_iter'.
+
+    solver='newton' is the original method, solver='robust' uses 'state_robust'.
     """
+    if solver == 'robust':
+        return state_robust(system_components, T, uaj, ta, P=P, kdCalc=kdCalc, diagnostics=diagnostics)
+    elif solver != 'newton':
+        raise ValueError("solver must be 'newton' or 'robust'")
     liquid_components = system_components.copy()  
     max_iter = 3000
     qa = {'plg':0., 'ol':0., 'cpx':0.}
@@ -44,6 +63,9 @@ def state(system_components,T, uaj, ta, P=1., kdCalc = kdCalc_langmuir1992):
         a = False
         solid_phase_components = {phase:{key:0 for key in kdaj['cpx']} for phase in fa}
     i = 0
+    if diagnostics:
+        diag = {'T':float(T),'P':float(P),'system_components':{key:float(value) for key,value in system_components.items()},
+                'qa_history':[{phase:float(qa[phase]) for phase in phase_list}],'phase_lists':[list(phase_list)],'clamps':[],'solve_path':[]}
     while (a == True) and (i<max_iter):
         i += 1
         if len(phase_list) !=0:  # Use Newton Method to find new Fa if there are phases present  
@@ -52,10 +74,14 @@ def state(system_components,T, uaj, ta, P=1., kdCalc = kdCalc_langmuir1992):
             dfa = solve_matrix(pab_dict, qa, phase_list)
             if dfa == 'Singular':
                 print('Singular')
+            if diagnostics:
+                diag['solve_path'].append('singular' if dfa == 'Singular' else 'matrix')
             fa_new = {}
             tst = 0.
             for phase in phase_list:
                 fa_new[phase] = fa[phase] + dfa[phase]
+                if diagnostics and (fa_new[phase]<0 or fa_new[phase]>1):
+                    diag['clamps'].append((i, phase, 'below 0' if fa_new[phase]<0 else 'above 1', float(fa_new[phase])))
                 if fa_new[phase]<0:  # Check to make sure the new Fa is greater than 0 and less than 1
                     fa_new[phase] = 0.1*fa[phase]
                 elif fa_new[phase]>1:
@@ -89,11 +115,126 @@ def state(system_components,T, uaj, ta, P=1., kdCalc = kdCalc_langmuir1992):
                 a = True
             elif (1.-fl)<0:
                 a = True
+            if diagnostics:
+                diag['qa_history'].append({phase:float(qa[phase]) for phase in phase_list})
+                diag['phase_lists'].append(list(phase_list))
         else:
             a = False
-    return qa, fa,liquid_components, solid_phase_components, i
+    if diagnostics:
+        diag.update({'iterations':i,'converged':not a,'max_iter':i>=max_iter,'fa':{phase:float(fa[phase]) for phase in fa}})
+        return qa, fa,liquid_components, solid_phase_components, i, not a, diag
+    return qa, fa,liquid_components, solid_phase_components, i, not a
             
             
+# robust mode of 'state': same equations and convergence criterion (|Qa| <= 10**(-5) for the phases present), with
+# 1. the Newton step solved by least squares when the Pab matrix is singular or ill-conditioned (condition number > cond_max),
+# 2. a backtracking line search: the step is halved until the norm of the residual decreases,
+#    the residual is Qa for the phases present (Fa>0) and max(Qa,0) for the absent phases (Fa=0 requires Qa<=0),
+#    when no step of the Newton direction decreases the residual, other directions are tried in order with a finite-difference Jacobian of Qa
+#    (which, unlike Pab, includes the change of Kd with the liquid composition): the Newton direction, the Newton direction with one phase
+#    dropped (its Fa goes to 0, e.g., when three phases are oversaturated but only two can coexist), and the steepest descent direction.
+#    Qa is not continuous where the SiO2 adjustment of KDFeMg(ol/l) changes equation (molar SiO2 = 0.6 in 'kdCalc_langmuir1992'), so
+#    no direction may decrease the residual, then the Newton step is taken anyway (shortened only to keep the solid fraction <1),
+#    and if the solver does not converge within max_iter iterations the Fa with the smallest residual is returned (and converged=False),
+# 3. a phase whose Fa would become negative is set to 0 (dropped) instead of 0.1*Fa, steps giving a total solid fraction >=1 are shortened,
+#    a dropped phase is added again only when it is oversaturated (Qa>0) and the step that adds it decreases the residual,
+#    so that phases are not added and dropped at every iteration.
+def state_robust(system_components, T, uaj, ta, P=1., kdCalc=kdCalc_langmuir1992, diagnostics=False, max_iter=100, max_halvings=20, cond_max=1e12):
+    tolerance = np.power(10.,-5.)
+    fa = {'plg':0., 'ol':0., 'cpx':0.}
+    kdaj = kdCalc(system_components.copy(), T, P)
+    if diagnostics:
+        diag = {'T':float(T),'P':float(P),'system_components':{key:float(value) for key,value in system_components.items()},
+                'qa_history':[],'phase_lists':[],'clamps':[],'solve_path':[],'step_lengths':[]}
+    i = 0
+    converged = False
+    best = None  # smallest residual
+    while True:
+        # Kd updated at the current Fa, so that the residual is a function of Fa only during the line search
+        kdaj, rj, liquid_components, qa = evaluate_fa(fa, kdaj, system_components, T, P, kdCalc, uaj, ta)
+        res = residual_fa(fa, qa)
+        phase_list = [phase for phase in fa if (qa[phase]>0) or (fa[phase]>0)]
+        if diagnostics:
+            diag['qa_history'].append({phase:float(qa[phase]) for phase in phase_list})
+            diag['phase_lists'].append(list(phase_list))
+        converged = all(abs(value) <= tolerance for value in res.values())
+        norm0 = np.sqrt(sum(value**2 for value in res.values()))
+        if (best is None) or (norm0 < best[0]):
+            best = (norm0, fa, kdaj, liquid_components, qa, phase_list)
+        if converged or (i >= max_iter):
+            break
+        i += 1
+        pab_dict = create_Pab_dict(rj, kdaj, liquid_components, uaj, phase_list)
+        dfa, path = solve_matrix_lstsq(pab_dict, qa, phase_list, cond_max)
+        dfa_newton = dfa
+        step, fa_new = line_search_fa(fa, dfa, phase_list, norm0, kdaj, system_components, T, P, kdCalc, uaj, ta, max_halvings)
+        if fa_new is None:
+            pab_dict = jacobian_fa(fa, qa, phase_list, kdaj, system_components, T, P, kdCalc, uaj, ta)
+            drops = [None]+(phase_list if len(phase_list) > 1 else [])
+            for drop in drops+['descent']:
+                if drop == 'descent':  # minus the gradient of the squared norm of the residual
+                    dfa = {phase2:sum(pab_dict[phase1][phase2]*res[phase1] for phase1 in phase_list) for phase2 in phase_list}
+                    path = 'descent'
+                else:
+                    active = [phase for phase in phase_list if phase != drop]
+                    dfa, path = solve_matrix_lstsq(pab_dict, qa, active, cond_max)
+                    path = 'jacobian-'+path
+                    if drop is not None:
+                        dfa[drop] = -fa[drop]
+                        path = path+'-drop-'+drop
+                step, fa_new = line_search_fa(fa, dfa, phase_list, norm0, kdaj, system_components, T, P, kdCalc, uaj, ta, max_halvings)
+                if fa_new is not None:
+                    break
+        if fa_new is None:
+            dfa = dfa_newton
+            path = 'newton-no-decrease'
+            step, fa_new = line_search_fa(fa, dfa, phase_list, np.inf, kdaj, system_components, T, P, kdCalc, uaj, ta, max_halvings)
+        if diagnostics:
+            diag['solve_path'].append(path)
+            diag['step_lengths'].append(step)
+            for phase in phase_list:
+                if fa[phase]+step*dfa[phase] < 0:
+                    diag['clamps'].append((i, phase, 'below 0', float(fa[phase]+step*dfa[phase])))
+        if fa_new is None:  # every step gives a total solid fraction >= 1
+            break
+        fa = fa_new
+    if not converged:
+        norm0, fa, kdaj, liquid_components, qa, phase_list = best
+    solid_phase_components = {phase:{key:0 for key in kdaj['cpx']} for phase in fa}
+    for phase in phase_list:
+        for component in kdaj['cpx']:
+            solid_phase_components[phase][component] = liquid_components[component]*kdaj[phase][component]
+    if diagnostics:
+        diag.update({'iterations':i,'converged':converged,'max_iter':i>=max_iter,'fa':{phase:float(fa[phase]) for phase in fa}})
+        return qa, fa, liquid_components, solid_phase_components, i, converged, diag
+    return qa, fa, liquid_components, solid_phase_components, i, converged
+
+# backtracking line search of 'state_robust', returns the step length and the new Fa (None if no step decreases the residual)
+def line_search_fa(fa, dfa, phase_list, norm0, kdaj, system_components, T, P, kdCalc, uaj, ta, max_halvings=20):
+    step = 1.
+    for k in range(max_halvings+1):
+        fa_t = dict(fa)
+        for phase in phase_list:
+            fa_t[phase] = max(fa[phase]+step*dfa[phase], 0.)
+        if sum(fa_t.values()) < 1:
+            qa_t = evaluate_fa(fa_t, kdaj, system_components, T, P, kdCalc, uaj, ta)[3]
+            if np.sqrt(sum(value**2 for value in residual_fa(fa_t, qa_t).values())) <= (1-1e-4*step)*norm0:
+                return step, fa_t
+        step = step/2.
+    return 0., None
+
+# minus the finite-difference derivatives of Qa with respect to Fa, in the same form as the Pab dictionary
+def jacobian_fa(fa, qa, phase_list, kdaj, system_components, T, P, kdCalc, uaj, ta, h=1e-7):
+    pab = {'plg':{}, 'cpx':{}, 'ol':{}}
+    for phase2 in phase_list:
+        fa_h = dict(fa)
+        fa_h[phase2] = fa[phase2]+h
+        qa_h = evaluate_fa(fa_h, kdaj, system_components, T, P, kdCalc, uaj, ta)[3]
+        for phase1 in phase_list:
+            pab[phase1][phase2] = -(qa_h[phase1]-qa[phase1])/h
+    return pab
+
+
 # The following functions are called in the codes above            
 def calculate_Rj(fa, kd, component):  # Called by calculate_Pab and calculate_Qa
     temp = 0.
@@ -147,6 +288,37 @@ def solve_matrix(pab, qa, phase_list):  # Called by State
             dfa[phase_list[k]] = dfa_array[k][0]
     return dfa       
     
+# liquid components and Qa for given phase fractions, same sequence as in each iteration of 'state':
+# liquid from the current Kd, Kd recalculated from that liquid, then the liquid and Qa from the new Kd
+def evaluate_fa(fa, kdaj, system_components, T, P, kdCalc, uaj, ta):  # Called by state_robust
+    rj = {}
+    liquid_components = {}
+    for component in kdaj['cpx']:
+        rj[component] = calculate_Rj(fa, kdaj, component)
+        liquid_components[component] = rj[component]*system_components[component]
+    kdaj = kdCalc(liquid_components, T, P)
+    for component in kdaj['cpx']:
+        rj[component] = calculate_Rj(fa, kdaj, component)
+        liquid_components[component] = rj[component]*system_components[component]
+    qa = {phase:calculate_Qa(liquid_components, kdaj, phase, ta, uaj) for phase in fa}
+    return kdaj, rj, liquid_components, qa
+
+# Qa of the phases present, and the oversaturation max(Qa,0) of the absent phases
+def residual_fa(fa, qa):  # Called by state_robust
+    return {phase:(qa[phase] if fa[phase]>0 else max(qa[phase],0.)) for phase in fa}
+
+# Newton step solved directly, or by least squares (pseudo-inverse) when the matrix is singular or ill-conditioned
+def solve_matrix_lstsq(pab, qa, phase_list, cond_max=1e12):  # Called by state_robust
+    pab_array = np.array([[pab[phase1][phase2] for phase2 in phase_list] for phase1 in phase_list], dtype=float)
+    qa_array = np.array([qa[phase] for phase in phase_list], dtype=float)
+    if np.all(np.isfinite(pab_array)) and np.linalg.cond(pab_array) < cond_max:
+        dfa_array = np.linalg.solve(pab_array, qa_array)
+        path = 'matrix'
+    else:
+        dfa_array = np.linalg.lstsq(np.nan_to_num(pab_array), np.nan_to_num(qa_array), rcond=None)[0]
+        path = 'lstsq'
+    return {phase_list[k]:dfa_array[k] for k in range(len(phase_list))}, path
+    
 def newton(qa, fa, kd, system_components, uaj):
     epsilon = np.power(10, -14)  # Don't want to divide by a number smaller than epsilon
     fa_new = {}
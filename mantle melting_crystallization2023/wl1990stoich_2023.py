@@ -3,15 +3,15 @@
 # use stoichiometry, based on Weaver and Langmuir 1990
 # originally written by Jocelyn Fuentes 2016
 # modified by Mingzhen Yu 2021: add Ni and Mn in the system
-# last modified: Jun 20, 2023
+# Oct 19, 2026: read-only atomic mass table from constants2023.py
+# last modified: Oct 19, 2026
 
 import numpy as np
 import math     
 
 
 ## from wl1989stoich2021.py
-mass = {'Si':28.0855, 'Ti':47.867, 'Al':26.9815, 'Fe':55.845, 'Mg':24.305, 
-        'Ca':40.078, 'Na':22.98977,'O':15.999,'K':39.0987, 'P':30.973, 'Mn':54.938, 'Ni': 58.6934}
+from constants2023 import mass  # atomic mass (read-only)
 
 # convert oxide in wt% to cation mole fraction
 def oxideToMolFracElement(oxides):
@@ -0,0 +1,117 @@
+# trace elements of ol-pl-cpx crystallization (Weaver and Langmuir 1990), calculated from the phase fractions of the major-element steps
+# the major elements (with Ni and Mn) are calculated by 'frac_model_trange' and 'eq_model_trange' (wl1990models_2023.py);
+# any number of trace elements follow the crystallized phases of every temperature step with constant partition coefficients:
+# bulk D = sum(fa_phase*Kd_phase)/sum(fa_phase) of the phases crystallized at the step,
+# fractional crystallization: C = C_previous/(liq+(1-liq)*D) at every step (liq: liquid fraction left by the step),
+# equilibrium crystallization: C = C0/(fl+(1-fl)*D) with the total phase fractions of the step
+# all elements and all steps are calculated as arrays (steps, elements) once the major elements are known, a few array operations for the whole path
+# Oct 19, 2026
+# last modified: Oct 19, 2026
+
+import numpy as np
+import sys
+import time
+from constants2023 import frozen
+
+phases_wl1990 = ['ol','cpx','plg']
+
+# default mineral/melt partition coefficients of basaltic melts at low pressure, approximate rounded values (read-only, see constants2023.py)
+# replace them by the values of the study: a dictionary {phase:{element:Kd}} or a dataframe with the phases as columns and the elements as index
+kd_trace_default = frozen({
+    'ol': {'La':0.0005,'Ce':0.0006,'Pr':0.0008,'Nd':0.001,'Sm':0.0015,'Eu':0.002,'Gd':0.003,'Tb':0.004,'Dy':0.006,'Ho':0.008,'Er':0.011,'Tm':0.015,'Yb':0.02,'Lu':0.025,
+           'Sc':0.2,'V':0.05,'Cr':0.8,'Co':2.5,'Cu':0.1,'Zn':1.0,'Ga':0.05,'Li':0.3,'Ti':0.015,'Rb':0.0002,'Sr':0.0002,'Ba':0.0001,'Y':0.008,'Zr':0.005,'Hf':0.005,
+           'Nb':0.0005,'Ta':0.0005,'Th':0.0001,'U':0.0001,'Pb':0.001},
+    'cpx':{'La':0.05,'Ce':0.08,'Pr':0.13,'Nd':0.18,'Sm':0.29,'Eu':0.35,'Gd':0.40,'Tb':0.43,'Dy':0.44,'Ho':0.44,'Er':0.42,'Tm':0.41,'Yb':0.40,'Lu':0.38,
+           'Sc':1.5,'V':1.5,'Cr':3.0,'Co':1.2,'Cu':0.4,'Zn':0.5,'Ga':0.4,'Li':0.2,'Ti':0.4,'Rb':0.001,'Sr':0.1,'Ba':0.0007,'Y':0.45,'Zr':0.12,'Hf':0.25,
+           'Nb':0.005,'Ta':0.01,'Th':0.005,'U':0.004,'Pb':0.01},
+    'plg':{'La':0.15,'Ce':0.12,'Pr':0.10,'Nd':0.08,'Sm':0.06,'Eu':0.4,'Gd':0.04,'Tb':0.035,'Dy':0.03,'Ho':0.025,'Er':0.02,'Tm':0.018,'Yb':0.015,'Lu':0.013,
+           'Sc':0.01,'V':0.02,'Cr':0.05,'Co':0.05,'Cu':0.05,'Zn':0.1,'Ga':1.0,'Li':0.3,'Ti':0.04,'Rb':0.05,'Sr':1.6,'Ba':0.25,'Y':0.03,'Zr':0.001,'Hf':0.01,
+           'Nb':0.01,'Ta':0.01,'Th':0.05,'U':0.05,'Pb':0.5}})
+
+# partition coefficients of the elements as an array (phases, elements), the rows in the order of 'phases_wl1990'
+def kd_matrix(kd, elements, phases=phases_wl1990):
+    return np.array([[kd[phase][elem] for elem in elements] for phase in phases], dtype=float)
+
+# phase fractions crystallized at every step, fa (steps, phases), and the liquid fraction left by the step, liq (steps),
+# from the output of 'frac_model_trange' (fa_dict: accumulated phase fractions of the initial magma, fl: liquid fraction of the initial magma)
+# or 'eq_model_trange' (fa_dict and fl: total phase and liquid fractions at every step)
+def step_fractions(fl, fa_dict, xtalization_model='fractional', phases=phases_wl1990):
+    fl = np.asarray(fl, dtype=float)
+    fa = np.column_stack([np.asarray(fa_dict[phase], dtype=float) for phase in phases])
+    if xtalization_model == 'fractional':
+        fl_before = np.concatenate([[1.], fl[:-1]])
+        fa = np.diff(fa, axis=0, prepend=0.)/fl_before[:,None]
+        return fa, fl/fl_before
+    return fa, fl
+
+# bulk partition coefficients (steps, elements) of the phases crystallized at every step, 0 where nothing crystallizes
+def bulk_d(fa, K):
+    fa_tot = fa.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(fa_tot > 0, (fa @ K)/fa_tot, 0.)
+
+# trace elements of the liquid along a crystallization path, trace_start_comp: concentrations of the initial magma (any unit, e.g., ppm), a dictionary
+# kd: partition coefficients, e.g., 'kd_trace_default'; xtalization_model: 'fractional' (frac_model_trange) or 'equilibrium' (eq_model_trange)
+# returns a dictionary of arrays (steps) of the liquid, the minerals of a step have Kd times the liquid
+def trace_model(fl, fa_dict, trace_start_comp, kd=kd_trace_default, xtalization_model='fractional'):
+    elements = list(trace_start_comp)
+    K = kd_matrix(kd, elements)
+    fa, liq = step_fractions(fl, fa_dict, xtalization_model)
+    factor = 1./(liq[:,None]+(1.-liq[:,None])*bulk_d(fa, K))
+    if xtalization_model == 'fractional':
+        factor = np.cumprod(factor, axis=0)
+    C = factor*np.array([trace_start_comp[elem] for elem in elements], dtype=float)
+    return {elem:C[:,j] for j, elem in enumerate(elements)}
+
+## checks on the MORB magma (models2023.py): an element with Kd 0 in all phases follows 1/fl and one with Kd 1 stays constant,
+# the arrays give the same liquids as the element by element loop of the original code (commented out in wl1990models_2023.py),
+# and the time of the trace elements against the time of the major elements
+if __name__ == '__main__':
+    from wl1990stoich_2023 import oxideToComponent
+    from wl1990kdcalc_2023 import kdCalc_langmuir1992
+    from wl1990models_2023 import get_first_T, frac_model_trange, eq_model_trange
+    from models2023 import default_wl1990_inputs
+    magma, Fe2Fet, T_range = default_wl1990_inputs()
+    t_start = get_first_T(oxideToComponent(magma), P=1., kdCalc=kdCalc_langmuir1992)
+    ok = True
+    kd = {phase:dict(kd_trace_default[phase], zero=0., one=1.) for phase in phases_wl1990}
+    trace_start_comp = {elem:1. for elem in kd['ol']}
+    for xtalization_model, model in (('fractional', frac_model_trange), ('equilibrium', eq_model_trange)):
+        start = time.perf_counter()
+        fl, fa_dict, major_oxide_dict, major_phase_oxide_dict = model(t_start, t_start-T_range, magma, P=1., kdCalc=kdCalc_langmuir1992)
+        major_time = time.perf_counter()-start
+        start = time.perf_counter()
+        trace = trace_model(fl, fa_dict, trace_start_comp, kd, xtalization_model)
+        trace_time = time.perf_counter()-start
+        # the original code: one element and one step at a time
+        fa, liq = step_fractions(fl, fa_dict, xtalization_model)
+        loop = {elem:[] for elem in trace_start_comp}
+        liquid = dict(trace_start_comp)
+        for i in range(len(fl)):
+            fa_tot = sum(fa[i])
+            for elem in trace_start_comp:
+                d = 0.
+                if fa_tot != 0.:
+                    for j, phase in enumerate(phases_wl1990):
+                        d += (fa[i,j]/fa_tot)*kd[phase][elem]
+                if xtalization_model == 'fractional':
+                    liquid[elem] = liquid[elem]/(liq[i]+(1.-liq[i])*d)
+                    loop[elem].append(liquid[elem])
+                else:
+                    loop[elem].append(trace_start_comp[elem]/(liq[i]+(1.-liq[i])*d))
+        diff_loop = max(np.max(np.abs(trace[elem]/np.array(loop[elem])-1)) for elem in trace)
+        diff_zero = np.max(np.abs(trace['zero']*np.asarray(fl)-1))
+        diff_one = np.max(np.abs(trace['one']-1))
+        print('%s: %d steps, liquid fraction %.3f at the end, La x%.2f, Yb x%.2f, Sr x%.2f, Cr x%.3f'
+              % (xtalization_model, len(fl), fl[-1], trace['La'][-1], trace['Yb'][-1], trace['Sr'][-1], trace['Cr'][-1]))
+        print('    Kd 0 against 1/fl %.1e, Kd 1 against 1 %.1e, arrays against the loop %.1e' % (diff_zero, diff_one, diff_loop))
+        # many elements: the default table repeated 10 times
+        many = {'%s_%d' % (elem, k):1. for k in range(10) for elem in kd_trace_default['ol']}
+        kd_many = {phase:{'%s_%d' % (elem, k):kd_trace_default[phase][elem] for k in range(10) for elem in kd_trace_default[phase]} for phase in phases_wl1990}
+        start = time.perf_counter()
+        trace_model(fl, fa_dict, many, kd_many, xtalization_model)
+        many_time = time.perf_counter()-start
+        print('    major elements %.3f s, %d trace elements %.2f ms, %d trace elements %.2f ms'
+              % (major_time, len(trace_start_comp), 1e3*trace_time, len(many), 1e3*many_time))
+        ok = ok and diff_zero < 1e-9 and diff_one < 1e-12 and diff_loop < 1e-12
+    sys.exit(0 if ok else 1)